@@ -1,120 +1,614 @@
 # backend/app.py
+"""
+Soccer Predictor API
+
+create_app() builds the Flask app; `from app import app` still works and
+creates a default one on first access. Scraper and ML modules (pandas,
+scikit-learn, scipy, BeautifulSoup, fake_useragent) are imported inside the
+routes that use them, so importing this module stays cheap. Production
+servers go through wsgi.py, which preloads them once before forking.
+"""
+import os
+
 from dotenv import load_dotenv
 load_dotenv()
 
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
+from sqlalchemy import select
+
+from models.db import db, init_database, migrate, Player, Team, Match
+from models.player_queries import query_players
+from services import metrics, serialization
+
+api = Blueprint("api", __name__)
+
+
+def create_app(config=None):
+    """Flask app with the API routes and the database configured"""
+    app = Flask(__name__)
+    app.json = serialization.JSONProvider(app)
+    CORS(app, expose_headers=["X-Next-Cursor", "ETag"])
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///soccer.db")
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    if config:
+        app.config.update(config)
+    init_database(app)
+    app.register_blueprint(api)
+    app.cli.command("migrate")(migrate_command)
+    # /metrics, per-route and per-stage timings, optional request profiling
+    metrics.init_app(app)
+    # ETags, 304s and gzip for JSON responses
+    serialization.init_app(app)
+    return app
+
+
+def warm_up(app):
+    """
+    Import the ML stack and load the model and player index up front
+
+    Called in the gunicorn master before workers fork (preload_app), so
+    the modules, model arrays and index are shared copy-on-write instead of
+    being loaded by every worker on its first request.
+    """
+    from models.predictor import predictor
+    from models.player_index import player_index
+    import models.prediction_cache, models.season_sim, models.squad_optimizer, models.ingest  # noqa: F401
+
+    predictor.load_model()
+    with app.app_context():
+        migrate()
+        player_index.ensure_loaded()
+        # Workers must not share the master's SQLite connections
+        db.engine.dispose()
+
+
+def start_background(app):
+    """
+    Start the prediction precompute thread when PRECOMPUTE_INTERVAL is set
+    and, with METRICS_DIR, the thread sharing this worker's metrics
+    """
+    metrics.start_flusher()
+    interval = os.getenv("PRECOMPUTE_INTERVAL")
+    if interval:
+        from models.prediction_cache import precompute_worker
+        precompute_worker.start(app, interval=int(interval))
 
-from models.db import db, Player, Team, Match
-from scraper.fbref_scraper import FBrefScraper
-from scraper.data_parser import DataParser
-from models.predictor import predictor  # keep if used elsewhere
-import pandas as pd  # keep if used elsewhere
 
-# ---- create app BEFORE any @app.route ----
-app = Flask(__name__)
-CORS(app)
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///soccer.db"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-db.init_app(app)
+def start_job_workers(processes=None):
+    """
+    Job worker processes owned by this process and stopped when it exits,
+    for the single-process servers (python app.py, waitress); how many is
+    models.jobs.job_worker_processes(). Under gunicorn the master starts
+    worker.py once instead (gunicorn.conf.py).
+    """
+    import atexit
+    from models.jobs import JobWorkerPool, job_worker_processes
+
+    processes = job_worker_processes() if processes is None else processes
+    if processes <= 0:
+        return None
+    pool = JobWorkerPool(create_app, processes=processes)
+    pool.start()
+    atexit.register(pool.stop)
+    return pool
+
+
+def migrate_command():
+    """Create missing tables and indexes (flask --app app migrate)"""
+    migrate()
+
+
+_scraper = None
+
+
+def get_scraper():
+    """Shared FBrefScraper, created on first use (fake_useragent may fetch UA data)"""
+    global _scraper
+    if _scraper is None:
+        from scraper.fbref_scraper import FBrefScraper
+        _scraper = FBrefScraper()
+    return _scraper
+
+
+_default_app = None
+
+
+def __getattr__(name):
+    # Module attribute `app` for `from app import app` and `flask --app app`
+    global _default_app
+    if name == "app":
+        if _default_app is None:
+            _default_app = create_app()
+        return _default_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Initialize components
-scraper = FBrefScraper()
-parser = DataParser()
 
 # ---- routes ----
-@app.route("/")
+@api.route("/")
 def home():
     return jsonify({"message": "Soccer Predictor API", "status": "active"})
 
-@app.route("/api/ping", methods=["GET"])
+@api.route("/api/ping", methods=["GET"])
 def ping():
     return jsonify({"ok": True}), 200
 
-# Import AFTER app exists; alias to avoid clashing with /api/teams route name
-from services.football_data import get_teams as fd_get_teams
-
-@app.route("/api/teams_fd", methods=["GET"])
+@api.route("/api/teams_fd", methods=["GET"])
 def teams_from_football_data():
+    # Alias to avoid clashing with the /api/teams route name
+    from models.db import read_connection
+    from services.football_data import get_teams as fd_get_teams
     comp = request.args.get("competition", "PL")  # e.g., PL, PD, SA, BL1
-    return jsonify(fd_get_teams(comp)), 200
+    teams = fd_get_teams(comp)
+    # /api/predict takes DB team ids; teams the sync hasn't stored yet get None
+    with read_connection() as conn:
+        team_ids = dict(conn.execute(
+            select(Team.fd_id, Team.id).where(Team.fd_id.in_([t["id"] for t in teams]))
+        ).all())
+    return jsonify([dict(t, team_id=team_ids.get(t["id"])) for t in teams]), 200
+
+@api.route("/api/cache-stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss counters of the HTTP and feature caches"""
+    from services.football_data import cache_stats as fd_cache_stats
+    from models.team_features import feature_cache
+    from models.prediction_cache import prediction_cache
 
-@app.route("/api/fetch-fbref", methods=["POST"])
+    return jsonify({
+        "football_data": fd_cache_stats(),
+        "fbref": _scraper.session.get_stats() if _scraper is not None else None,
+        "team_features": feature_cache.stats(),
+        "predictions": prediction_cache.stats(),
+    })
+
+@api.route("/api/fetch-fbref", methods=["POST"])
 def fetch_fbref_data():
-    """Fetch and store data from FBref"""
+    """Queue an FBref scrape and ingest; poll /api/jobs/<id> for progress"""
+    from models.jobs import submit
+
+    payload = request.get_json(silent=True) or {}
+    league_urls = payload.get("league_urls") or [payload.get("league_url", "/en/comps/9/Premier-League-Stats")]
+    job_id = submit("scrape", {"league_urls": league_urls})
+    response = jsonify({"status": "queued", "job_id": job_id})
+    response.headers["Location"] = f"/api/jobs/{job_id}"
+    return response, 202
+
+@api.route("/api/sync/football-data", methods=["POST"])
+def sync_football_data():
+    """Queue a football-data.org sync of teams, fixtures and results; poll /api/jobs/<id>"""
+    from models.jobs import submit
+
+    payload = request.get_json(silent=True) or {}
+    competitions = payload.get("competitions")
+    if competitions is not None and not (isinstance(competitions, list)
+                                         and all(isinstance(c, str) for c in competitions)):
+        return jsonify({"status": "error", "message": "competitions must be a list of codes"}), 400
+    job_id = submit("fd_sync", {"competitions": competitions, "full": bool(payload.get("full"))})
+    response = jsonify({"status": "queued", "job_id": job_id})
+    response.headers["Location"] = f"/api/jobs/{job_id}"
+    return response, 202
+
+@api.route("/api/jobs", methods=["POST"])
+def submit_job():
+    """Queue a background job: {"kind": "scrape|fd_sync|ingest|rate|team_ratings|snapshot|train|simulate|precompute", "params": {...}}"""
+    from models.jobs import submit
+
+    payload = request.get_json(force=True) or {}
+    params = payload.get("params") or {}
+    if not isinstance(params, dict):
+        return jsonify({"status": "error", "message": "params must be an object"}), 400
     try:
-        league_url = request.json.get("league_url", "/en/comps/9/Premier-League-Stats")
-        data = scraper.get_league_data(league_url)
-
-        with app.app_context():
-            for _, row in data.iterrows():
-                player = Player(
-                    fbref_id=row.get("fbref_id", f"player_{row['name'].lower().replace(' ', '_')}"),
-                    name=row["name"],
-                    position=row["position"],
-                    age=row["age"],
-                    team=row["team"],
-                    league=row["league"],
-                    minutes=row["minutes"],
-                    games_played=row.get("games_played", 0),
-                    goals=row.get("goals", 0),
-                    assists=row.get("assists", 0),
-                    xG=row.get("xg", 0),
-                    xA=row.get("xa", 0),
-                    overall=row.get("overall", 70),
-                )
-                db.session.add(player)
-            db.session.commit()
-
-        return jsonify({"status": "success", "players_added": len(data), "message": "FBref data loaded successfully"})
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        job_id = submit(payload.get("kind"), params)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    response = jsonify({"status": "queued", "job_id": job_id})
+    response.headers["Location"] = f"/api/jobs/{job_id}"
+    return response, 202
+
+@api.route("/api/jobs", methods=["GET"])
+def list_jobs_route():
+    """Recent jobs, newest first, optionally filtered by status and kind"""
+    from models.jobs import list_jobs
+
+    # list_jobs clamps the limit to 1..MAX_LIST_LIMIT; unparseable values get the default
+    limit = request.args.get("limit", type=int)
+    limit = 50 if limit is None else limit
+    return jsonify(list_jobs(request.args.get("status"), request.args.get("kind"), limit))
 
-@app.route("/api/players", methods=["GET"])
+@api.route("/api/jobs/<int:job_id>", methods=["GET"])
+def get_job_route(job_id):
+    """Status, progress and (once finished) result or error of a job"""
+    from models.jobs import get_job
+
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+    return jsonify(job)
+
+@api.route("/api/jobs/<int:job_id>/cancel", methods=["POST"])
+def cancel_job_route(job_id):
+    """Cancel a queued job, or ask a running one to stop"""
+    from models.jobs import cancel
+
+    job = cancel(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+    return jsonify(job)
+
+@api.route("/api/players", methods=["GET"])
 def get_players_route():
-    """Get all players"""
-    players = Player.query.all()
-    return jsonify([p.to_dict() for p in players])
+    """Get players, filtered, sorted and paginated (next page cursor in X-Next-Cursor)"""
+    from models.player_queries import players_version
+
+    # Repeat loads of an unchanged page are answered before running the query
+    etag = serialization.body_etag(f"{players_version()}|{request.full_path}".encode("utf-8"))
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    try:
+        players, next_cursor = query_players(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    response = jsonify(players)
+    response.set_etag(etag, weak=True)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+@api.route("/api/players/export", methods=["GET"])
+def export_players():
+    """
+    Every player matching the /api/players filters, streamed as NDJSON
+    (?format=ndjson, the default) or as one JSON array (?format=json)
+    """
+    from models.db import read_connection
+    from models.player_queries import export_query
+
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in ("ndjson", "json"):
+        return jsonify({"status": "error", "message": "format must be ndjson or json"}), 400
+    try:
+        fields, stmt = export_query(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    compress = serialization.accepts(request, "gzip")
+
+    def generate():
+        with read_connection() as conn:
+            rows = conn.execution_options(yield_per=serialization.STREAM_BATCH).execute(stmt)
+            yield from serialization.stream_rows(rows, fields, fmt, compress=compress)
+
+    response = Response(stream_with_context(generate()),
+                        mimetype="application/x-ndjson" if fmt == "ndjson" else "application/json")
+    if compress:
+        response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    return response
 
-@app.route("/api/teams", methods=["GET"])
+def _search_filters(args):
+    filters = {}
+    for name in ("league", "team", "position"):
+        if args.get(name):
+            filters[name] = args[name]
+    for name in ("min_age", "max_age", "min_minutes"):
+        if args.get(name) is not None:
+            filters[name] = args.get(name, type=int)
+            if filters[name] is None:
+                raise ValueError(f"{name} must be an integer")
+    return filters
+
+@api.route("/api/players/similar", methods=["GET"])
+def similar_players():
+    """Players with the most similar per-90 profile to player_id"""
+    from models.player_index import player_index
+
+    player_id = request.args.get("player_id", type=int)
+    if player_id is None:
+        return jsonify({"status": "error", "message": "player_id is required"}), 400
+    try:
+        players = player_index.similar(player_id, k=request.args.get("k", 10, type=int),
+                                       **_search_filters(request.args))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if players is None:
+        return jsonify({"status": "error", "message": "Unknown player"}), 404
+    return jsonify(players)
+
+@api.route("/api/scout/search", methods=["GET"])
+def scout_search():
+    """Top players by a metric, e.g. ?sort=progressive_passes&position=MF&max_age=23"""
+    from models.player_index import player_index
+
+    try:
+        players = player_index.search(
+            sort=request.args.get("sort", "xg"),
+            per90=request.args.get("per90", "1") not in ("0", "false"),
+            k=request.args.get("k", 20, type=int),
+            **_search_filters(request.args),
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify(players)
+
+@api.route("/api/teams", methods=["GET"])
 def get_teams_route():
     """Get all teams (from your DB)"""
-    teams = Team.query.all()
-    return jsonify([t.to_dict() for t in teams])
+    from models.db import read_connection
 
-@app.route("/api/predict", methods=["POST"])
+    # Same keys as Team.to_dict, from plain rows instead of ORM objects
+    columns = {
+        "id": Team.id, "name": Team.name, "league": Team.league, "country": Team.country,
+        "matches_played": Team.matches_played, "wins": Team.wins, "draws": Team.draws,
+        "losses": Team.losses, "goals_for": Team.goals_for, "goals_against": Team.goals_against,
+        "xg": Team.xG, "xga": Team.xGA, "possession": Team.possession,
+    }
+    keys = list(columns)
+    stmt = select(*columns.values()).order_by(Team.id)
+    if request.args.get("league"):
+        stmt = stmt.where(Team.league == request.args["league"])
+    with read_connection() as conn:
+        rows = conn.execute(stmt).all()
+    return jsonify([dict(zip(keys, row)) for row in rows])
+
+def _team_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+@api.route("/api/predict", methods=["POST"])
 def predict_match():
-    """Predict match outcome (dummy for now)"""
+    """Predict match outcome from DB-derived team features"""
+    from models.prediction_cache import predict_fixture
+
     data = request.get_json(force=True) or {}
-    _home_team_id = data.get("home_team")
-    _away_team_id = data.get("away_team")
-    prediction = {
-        "home_win": 0.45,
-        "draw": 0.30,
-        "away_win": 0.25,
-        "confidence": 0.78,
-    }
+    home_team_id = _team_id(data.get("home_team"))
+    away_team_id = _team_id(data.get("away_team"))
+    if home_team_id is None or away_team_id is None:
+        return jsonify({"status": "error", "message": "home_team and away_team must be team ids"}), 400
+
+    prediction = predict_fixture(home_team_id, away_team_id)
+    if prediction is None:
+        return jsonify({"status": "error", "message": "Unknown team"}), 404
     return jsonify(prediction)
 
-@app.route("/api/analyze-squad", methods=["POST"])
+@api.route("/api/predict/precompute", methods=["POST"])
+def precompute_predictions():
+    """Store predictions for all upcoming matches now"""
+    from models.prediction_cache import precompute_upcoming
+
+    try:
+        count = precompute_upcoming()
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify({"status": "success", "fixtures": count})
+
+@api.route("/api/predict/batch", methods=["POST"])
+def predict_batch():
+    """Predict many fixtures in one model pass, results in input order"""
+    from models.predictor import predictor
+    from models.team_features import get_many_fixture_features
+
+    payload = request.get_json(force=True) or {}
+    fixtures = payload.get("fixtures", [])
+    if not isinstance(fixtures, list):
+        return jsonify({"status": "error", "message": "fixtures must be a list"}), 400
+
+    # Anything that isn't a fixture object just gets the default prediction
+    prepared = [{} for _ in fixtures]
+    by_id = []  # (index, home team id, away team id) of fixtures naming DB teams
+    for i, fixture in enumerate(fixtures):
+        if not isinstance(fixture, dict):
+            continue
+        home_team, away_team = fixture.get("home_team"), fixture.get("away_team")
+        if isinstance(home_team, dict) or isinstance(away_team, dict):
+            # Team stats supplied by the caller
+            prepared[i] = fixture
+            continue
+        home_team_id, away_team_id = _team_id(home_team), _team_id(away_team)
+        if home_team_id is not None and away_team_id is not None:
+            by_id.append((i, home_team_id, away_team_id))
+
+    # One lookup for every team named in the batch
+    features = get_many_fixture_features([(home, away, None) for _i, home, away in by_id])
+    for (i, _home, _away), fixture_features in zip(by_id, features):
+        if fixture_features is not None:
+            prepared[i] = dict(zip(("home_team", "away_team", "context"), fixture_features))
+
+    # Rows that got the default prediction are marked "valid": false
+    return jsonify({"predictions": predictor.predict_many(prepared)})
+
+@api.route("/api/models", methods=["GET"])
+def list_models():
+    """Registered model versions and the one being served"""
+    from models.predictor import predictor
+
+    return jsonify({
+        "active": predictor.registry.active_version(),
+        "serving": predictor.version,
+        "versions": predictor.registry.list_versions(),
+    })
+
+@api.route("/api/models/activate", methods=["POST"])
+def activate_model():
+    """Hot-swap the served model; other workers pick it up from the registry"""
+    from models.predictor import predictor
+    from models.prediction_cache import precompute_worker
+
+    version = (request.get_json(force=True) or {}).get("version")
+    if not version:
+        return jsonify({"status": "error", "message": "version is required"}), 400
+    try:
+        predictor.activate(version)
+    except KeyError as e:
+        return jsonify({"status": "error", "message": e.args[0]}), 404
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    precompute_worker.trigger()
+    return jsonify({"status": "success", "active": version})
+
+@api.route("/api/backtest", methods=["GET"])
+def backtest_route():
+    """Accuracy, log loss, Brier score and calibration of stored predictions against results"""
+    from models.backtest import DEFAULT_BINS, run_backtest
+
+    bins = request.args.get("bins", DEFAULT_BINS, type=int)
+    try:
+        report = run_backtest(
+            league=request.args.get("league"),
+            season=request.args.get("season"),
+            model_version=request.args.get("model_version"),
+            bins=bins,
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify(report)
+
+# Simulations up to this many seasons run inside the request; larger ones are queued as jobs
+SYNC_MAX_SIMS = int(os.getenv("SYNC_MAX_SIMS", 10000))
+
+@api.route("/api/simulate-season", methods=["GET"])
+def simulate_season_route():
+    """
+    Title, top-4 and relegation odds from simulating the rest of a league season
+
+    Runs in the request for up to SYNC_MAX_SIMS seasons; more are queued as
+    a simulate job (202, poll /api/jobs/<id>).
+    """
+    from models.season_sim import MAX_SIMS, MODES, load_season, simulate_season
+
+    league = request.args.get("league")
+    if not league:
+        return jsonify({"status": "error", "message": "league is required"}), 400
+    sims = request.args.get("sims", SYNC_MAX_SIMS, type=int)
+    seed = request.args.get("seed", type=int)
+    mode = request.args.get("mode", "model")
+    if sims is None or not 1 <= sims <= MAX_SIMS:
+        return jsonify({"status": "error", "message": f"sims must be between 1 and {MAX_SIMS}"}), 400
+    if mode not in MODES:
+        return jsonify({"status": "error", "message": f"mode must be one of {', '.join(MODES)}"}), 400
+
+    if sims > SYNC_MAX_SIMS:
+        # Too slow for a web worker: run it in a job worker's process pool instead
+        from models.jobs import submit
+
+        job_id = submit("simulate", {"league": league, "season": request.args.get("season"),
+                                     "sims": sims, "seed": seed, "mode": mode})
+        response = jsonify({"status": "queued", "job_id": job_id})
+        response.headers["Location"] = f"/api/jobs/{job_id}"
+        return response, 202
+
+    inputs = load_season(league, request.args.get("season"), mode)
+    if inputs is None:
+        return jsonify({"status": "error", "message": "Unknown league"}), 404
+    try:
+        # One process: forking a pool per request would multiply across web workers
+        result = simulate_season(inputs, n_sims=sims, seed=seed, mode=mode, n_jobs=1)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    result["league"] = league
+    return jsonify(result)
+
+def _json_int(payload, name):
+    """payload[name] as an int, None when absent; raises ValueError for anything else"""
+    value = payload.get(name)
+    if value is None:
+        return None
+    # bool is an int subclass, and int() would truncate floats
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"{name} must be an integer")
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer") from None
+
+@api.route("/api/analyze-squad", methods=["POST"])
 def analyze_squad():
-    """Analyze a custom squad"""
+    """
+    Best XI for a formation from a player pool, with role strengths and weaknesses
+
+    Pool: "squad" (player ids or player dicts with an id), otherwise the
+    players table filtered by league / team / max_age / min_minutes.
+    Constraints: "budget" with "prices" ({player_id: cost}), "max_per_club",
+    and "positions" (slot roles overriding the formation).
+    """
+    from models.squad_optimizer import FORMATIONS, ROLES, DEFAULT_MIN_MINUTES, SquadOptimizer, load_pool
+
     payload = request.get_json(force=True) or {}
-    squad = payload.get("squad", [])
-    _formation = payload.get("formation", "4-4-2")
+    formation = payload.get("formation", "4-4-2")
+    positions = payload.get("positions")
+    if positions is not None:
+        if (not isinstance(positions, list) or not positions
+                or not all(isinstance(p, str) and p.upper() in ROLES for p in positions)):
+            return jsonify({"status": "error",
+                            "message": f"positions must be a list of roles from {', '.join(ROLES)}"}), 400
+        slots = [p.upper() for p in positions]
+    else:
+        slots = FORMATIONS.get(formation)
+    if not slots:
+        return jsonify({"status": "error", "message": f"formation must be one of {', '.join(FORMATIONS)}"}), 400
 
-    total_rating = sum(player.get("overall", 0) for player in squad)
-    avg_rating = total_rating / len(squad) if squad else 0
+    try:
+        max_age = _json_int(payload, "max_age")
+        min_minutes = _json_int(payload, "min_minutes")
+        max_per_club = _json_int(payload, "max_per_club")
+        if max_per_club is not None and max_per_club < 1:
+            raise ValueError("max_per_club must be positive")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    try:
+        squad = payload.get("squad")
+        player_ids = None
+        if squad:
+            if any(isinstance(p, dict) and "id" not in p for p in squad):
+                return jsonify({"status": "error", "message": "squad entries must be player ids"}), 400
+            player_ids = [int(p["id"] if isinstance(p, dict) else p) for p in squad]
+        pool = load_pool(
+            player_ids,
+            league=payload.get("league"),
+            team=payload.get("team"),
+            max_age=max_age,
+            min_minutes=DEFAULT_MIN_MINUTES if min_minutes is None else min_minutes,
+        )
+        prices = {int(k): float(v) for k, v in (payload.get("prices") or {}).items()}
+        budget = payload.get("budget")
+        optimizer = SquadOptimizer(pool)
+        lineup = optimizer.best_xi(
+            slots,
+            budget=None if budget is None else float(budget),
+            prices=prices,
+            max_per_club=max_per_club,
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": f"Invalid request: {e}"}), 400
+    if lineup is None:
+        return jsonify({"status": "error", "message": "No lineup satisfies the formation and constraints"}), 422
 
+    players, roles, strengths, weaknesses = optimizer.report(lineup)
+    total_rating = sum(p["overall"] for p in players)
     return jsonify({
-        "average_rating": round(avg_rating, 1),
+        "formation": formation,
+        "lineup": players,
+        "roles": roles,
+        "average_rating": round(total_rating / len(players), 1),
         "total_rating": total_rating,
-        "formation_suitability": "Good" if len(squad) == 11 else "Incomplete",
-        "strengths": ["Attack", "Creativity"],
-        "weaknesses": ["Defense", "Physicality"],
+        "total_cost": round(sum(prices.get(p["id"], 0) for p in players), 2) if budget is not None else None,
+        "formation_suitability": "Good" if len(players) == 11 else "Incomplete",
+        "strengths": strengths,
+        "weaknesses": weaknesses,
     })
 
 if __name__ == "__main__":
+    # Development server; see wsgi.py for production
+    app = create_app()
     with app.app_context():
-        db.create_all()
+        migrate()
+    start_background(app)
+    # The reloader runs this module in two processes; jobs run from the serving one
+    if os.getenv("WERKZEUG_RUN_MAIN") == "true":
+        start_job_workers()
     app.run(debug=True, port=5000)
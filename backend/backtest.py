@@ -0,0 +1,47 @@
+# backend/backtest.py
+"""
+Score the predictions stored on matches against their results:
+
+    python backtest.py
+    python backtest.py --league Premier-League-Stats --season 2024-2025 --output report.json
+
+Prints accuracy, log loss, Brier score and reliability curves overall and
+per league, season and model version (the same report as /api/backtest).
+"""
+import argparse
+import json
+
+from models.backtest import DEFAULT_BINS, run_backtest
+
+
+def main(argv=None):
+    from app import app
+
+    parser = argparse.ArgumentParser(description="Backtest stored predictions against results")
+    parser.add_argument('--league', default=None)
+    parser.add_argument('--season', default=None)
+    parser.add_argument('--model-version', default=None,
+                        help="registry version, or 'default' for predictions without one")
+    parser.add_argument('--bins', type=int, default=DEFAULT_BINS, help='calibration bins')
+    parser.add_argument('--output', default=None, help='write the report here instead of stdout')
+    args = parser.parse_args(argv)
+    if args.bins < 1:
+        parser.error("--bins must be at least 1")
+
+    with app.app_context():
+        report = run_backtest(args.league, args.season, args.model_version, args.bins)
+    if report['overall'] is None:
+        print("No completed matches with stored predictions")
+        return 1
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,160 @@
+"""
+Microbenchmarks of the predictor, squad page parsing, player ratings,
+snapshot loads and serialization
+
+    python -m benchmarks.bench_micro --players 10000
+
+Prints one JSON object per benchmark (see benchmarks.timing.summarize).
+"""
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from benchmarks.fixtures import load_squad_pages
+from benchmarks.synthetic_db import populate
+from benchmarks.timing import summarize, time_calls
+
+
+def _team(rng):
+    return {'rating': float(rng.uniform(60, 90)), 'form': float(rng.uniform(0, 1)),
+            'goals_scored': float(rng.uniform(0.5, 3)), 'goals_conceded': float(rng.uniform(0.5, 3)),
+            'xG': float(rng.uniform(0.5, 3))}
+
+
+def bench_predictor(n):
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+    from models.predictor import MatchPredictor, ModelBundle, PriorModel, IdentityScaler
+
+    rng = np.random.default_rng(0)
+    fixtures = [(_team(rng), _team(rng), {'days_rest': int(rng.integers(2, 10))}) for _ in range(256)]
+    predictor = MatchPredictor()
+
+    # A fitted scaler + logistic regression stands in for a trained registry model
+    X = rng.normal(size=(500, len(predictor.feature_columns)))
+    y = rng.choice(['home', 'draw', 'away'], 500)
+    scaler = StandardScaler().fit(X)
+    trained = ModelBundle(LogisticRegression(max_iter=500).fit(scaler.transform(X), y), scaler, True, 'bench')
+
+    results = []
+    for label, bundle in (('prior', ModelBundle(PriorModel(), IdentityScaler(), False, None)),
+                          ('logreg', trained)):
+        predictor._swap(bundle)
+        predictor._last_check = float('inf')  # don't look for registry updates mid-benchmark
+        samples = time_calls(lambda i: predictor.predict(*fixtures[i % len(fixtures)]), n)
+        results.append(summarize('predictor.predict', samples, model=label))
+
+    batch = [{'home_team': h, 'away_team': a, 'context': c} for h, a, c in fixtures]
+    samples = time_calls(lambda i: predictor.predict_many(batch), max(1, n // 100))
+    results.append(summarize('predictor.predict_many', samples, model='logreg', batch=len(batch)))
+
+    samples = time_calls(lambda i: predictor._prepare_features(*fixtures[i % len(fixtures)]), n)
+    results.append(summarize('predictor._prepare_features', samples))
+    return results
+
+
+def bench_parse(pages, repeat):
+    from scraper.fbref_scraper import FBrefScraper
+
+    results = []
+    for mode in ('soup', 'fast'):
+        scraper = FBrefScraper.__new__(FBrefScraper)  # skip session/user agent setup
+        scraper.parse_mode = mode
+        samples = time_calls(lambda i: scraper._parse_players(pages[i % len(pages)]),
+                             len(pages) * repeat, warmup=1)
+        results.append(summarize('scraper._parse_players', samples, mode=mode, pages=len(pages)))
+    return results
+
+
+def bench_ratings(app, repeat=5):
+    """compute_ratings over every player in the database"""
+    import pandas as pd
+    from sqlalchemy import select
+    from models.db import db, Player
+    from models.player_ratings import RATING_COLUMNS, compute_ratings
+
+    with app.app_context():
+        rows = db.session.execute(select(*[Player.__table__.c[c] for c in RATING_COLUMNS])).all()
+    df = pd.DataFrame(rows, columns=RATING_COLUMNS)
+    samples = time_calls(lambda i: compute_ratings(df), repeat, warmup=1)
+    return [summarize('player_ratings.compute_ratings', samples, rows=len(df))]
+
+
+def bench_team_strength(app, repeat=3):
+    """Full Elo replay of the matches table"""
+    from models.db import Match
+    from models.team_strength import team_strength
+
+    with app.app_context():
+        matches = Match.query.count()
+        samples = time_calls(lambda i: team_strength.rebuild(), repeat, warmup=0)
+    return [summarize('team_strength.rebuild', samples, matches=matches)]
+
+
+def bench_snapshots(app, repeat=3):
+    """Loading the players table through the ORM vs. from a Parquet snapshot"""
+    from models import snapshots
+    from models.db import Player
+
+    if not snapshots.available():
+        return []
+    with tempfile.TemporaryDirectory() as tmp, app.app_context():
+        rows = snapshots.export_table('players', tmp)['rows']
+        league = Player.query.with_entities(Player.league).limit(1).scalar()
+        results = [
+            summarize('players.load', time_calls(lambda i: Player.query.all(), repeat, warmup=1),
+                      source='orm', rows=rows),
+            summarize('players.load', time_calls(lambda i: snapshots.load_frame('players', directory=tmp),
+                                                 repeat, warmup=1), source='snapshot', rows=rows),
+            summarize('players.load', time_calls(
+                lambda i: snapshots.load_frame('players', columns=['id', 'minutes', 'xG', 'xA'],
+                                               filters={'league': league}, directory=tmp),
+                repeat, warmup=1), source='snapshot', rows=rows, pruned=True),
+        ]
+    return results
+
+
+def bench_to_dict(app, n):
+    from models.db import Player
+
+    with app.app_context():
+        players = Player.query.limit(1000).all()
+        samples = time_calls(lambda i: [p.to_dict() for p in players], max(1, n // 100))
+    return [summarize('Player.to_dict', samples, rows=len(players))]
+
+
+def run(app, n=2000, pages=None, repeat=3):
+    """Every microbenchmark; app must point at a populated database"""
+    results = bench_predictor(n)
+    results += bench_parse(pages or load_squad_pages(), repeat)
+    results += bench_ratings(app)
+    results += bench_team_strength(app)
+    results += bench_snapshots(app)
+    results += bench_to_dict(app, n)
+    return results
+
+
+def main():
+    from app import create_app
+    from models.db import db
+
+    parser = argparse.ArgumentParser(description="Predictor, parsing, rating and serialization microbenchmarks")
+    parser.add_argument('--players', type=int, default=10000, help='synthetic players to load')
+    parser.add_argument('-n', type=int, default=2000, help='calls per benchmark')
+    parser.add_argument('--pages', default=None, help='directory of saved squad pages')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}"})
+        with app.app_context():
+            db.create_all()
+            populate(args.players)
+        for result in run(app, args.n, load_squad_pages(args.pages)):
+            print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
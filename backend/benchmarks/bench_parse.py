@@ -0,0 +1,72 @@
+"""
+Compare squad page parse paths of FBrefScraper
+
+    python -m benchmarks.bench_parse                 # synthetic pages
+    python -m benchmarks.bench_parse saved/*.html    # pages saved from FBref
+
+Prints one JSON object per parse mode with per-page timings and peak memory.
+Peak memory comes from tracemalloc, which only sees Python allocations, so
+the lxml tree built by the fast path is under-counted.
+"""
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+
+from scraper.fbref_scraper import FBrefScraper
+from benchmarks.fixtures import make_squad_page
+
+
+def bench_mode(mode, pages, repeat):
+    scraper = FBrefScraper.__new__(FBrefScraper)  # skip session/user agent setup
+    scraper.parse_mode = mode
+
+    timings = []
+    for _ in range(repeat):
+        for html in pages:
+            start = time.perf_counter()
+            scraper._parse_players(html)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    peaks = []
+    for html in pages:
+        tracemalloc.start()
+        players = scraper._parse_players(html)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+
+    return {
+        'mode': mode,
+        'pages': len(pages),
+        'players_last_page': len(players),
+        'ms_per_page_mean': round(statistics.mean(timings), 3),
+        'ms_per_page_median': round(statistics.median(timings), 3),
+        'ms_per_page_max': round(max(timings), 3),
+        'peak_kib_mean': round(statistics.mean(peaks), 1),
+        'peak_kib_max': round(max(peaks), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('pages', nargs='*', help='saved squad page HTML files')
+    parser.add_argument('--synthetic', type=int, default=10, help='synthetic pages when none are given')
+    parser.add_argument('--players', type=int, default=30, help='players per synthetic page')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = []
+        for path in args.pages:
+            with open(path, encoding='utf-8') as f:
+                pages.append(f.read())
+    else:
+        pages = [make_squad_page(args.players, seed=i) for i in range(args.synthetic)]
+
+    for mode in ('soup', 'fast'):
+        print(json.dumps(bench_mode(mode, pages, args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
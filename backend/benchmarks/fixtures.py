@@ -0,0 +1,94 @@
+import glob
+import os
+import random
+
+# Column layouts follow FBref squad pages: position/age/minutes at 1/2/5 in
+# the standard table, xG at 8 in shooting and xA at 15 in passing. Both
+# parse paths read cells by data-stat, so the positions don't matter to them.
+STANDARD_STATS = ['position', 'age', 'games', 'games_starts', 'minutes', 'goals',
+                  'assists', 'cards_yellow', 'cards_red', 'progressive_carries',
+                  'progressive_passes']
+SHOOTING_STATS = [f'shoot_{i}' for i in range(7)] + ['xg']
+PASSING_STATS = [f'pass_{i}' for i in range(14)] + ['pass_xa']
+DEFENSE_STATS = [f'def_{i}' for i in range(3)] + ['tackles', 'interceptions']
+OTHER_TABLES = ['keeper', 'keeper_adv', 'passing_types', 'gca', 'possession',
+                'playing_time', 'misc']
+POSITIONS = ['GK', 'DF', 'MF', 'FW', 'DF,MF', 'MF,FW']
+
+
+def _stat_value(rng, stat):
+    if stat == 'position':
+        return rng.choice(POSITIONS)
+    if stat == 'age':
+        return f"{rng.randint(17, 36)}-{rng.randint(0, 364):03d}"
+    if stat == 'minutes':
+        return f"{rng.randint(0, 3420):,}"
+    if stat in ('xg', 'pass_xa'):
+        return f"{rng.uniform(0, 15):.1f}"
+    return str(rng.randint(0, 60))
+
+
+def _table(rng, table_id, stats, players):
+    header = ''.join(f'<th data-stat="{s}">{s}</th>' for s in ['player'] + stats)
+    rows = []
+    for i, (player_id, name) in enumerate(players):
+        if i and i % 12 == 0:
+            # FBref repeats the header inside long tables
+            rows.append(f'<tr class="thead">{header}</tr>')
+        cells = ''.join(f'<td class="right" data-stat="{s}">{_stat_value(rng, s)}</td>' for s in stats)
+        rows.append(
+            f'<tr><th scope="row" class="left" data-append-csv="{player_id}" data-stat="player">'
+            f'<a href="/en/players/{player_id}/{name.replace(" ", "-")}">{name}</a></th>{cells}</tr>'
+        )
+    return (f'<div class="table_container"><table class="stats_table sortable" id="{table_id}">'
+            f'<caption>{table_id}</caption><thead><tr>{header}</tr></thead>'
+            f'<tbody>{"".join(rows)}</tbody></table></div>')
+
+
+def make_squad_page(n_players=30, comp_id=9, seed=0, commented=True):
+    """Synthetic FBref squad page; all but the standard table are commented out"""
+    rng = random.Random(seed)
+    players = [(f'{rng.getrandbits(32):08x}', f'Player {i}') for i in range(n_players)]
+
+    def wrap(block):
+        return f'<div class="placeholder"></div>\n<!--\n{block}\n-->' if commented else block
+
+    sections = [_table(rng, f'stats_standard_{comp_id}', STANDARD_STATS, players)]
+    for kind, stats in (('shooting', SHOOTING_STATS), ('passing', PASSING_STATS),
+                        ('defense', DEFENSE_STATS)):
+        sections.append(wrap(_table(rng, f'stats_{kind}_{comp_id}', stats, players)))
+    for kind in OTHER_TABLES:
+        stats = [f'{kind}_{i}' for i in range(24)]
+        sections.append(wrap(_table(rng, f'stats_{kind}_{comp_id}', stats, players)))
+
+    nav = ''.join(f'<li><a href="/en/squads/{i:08x}/">Club {i}</a></li>' for i in range(400))
+    script = '<script>var sr_data = "%s";</script>' % ('x' * 50000)
+    return (f'<!DOCTYPE html><html><head><title>Squad</title>{script}</head><body>'
+            f'<ul id="nav">{nav}</ul><div id="content">{"".join(sections)}</div></body></html>')
+
+
+DEFAULT_PAGES_DIR = os.path.join(os.path.dirname(__file__), 'pages')
+
+
+def load_squad_pages(directory=None, synthetic=5):
+    """
+    Squad pages saved as *.html in directory (default benchmarks/pages)
+
+    Drop pages saved from FBref there to benchmark real markup. When the
+    directory has none, synthetic pages are generated and saved to it, so
+    later runs parse the same bytes.
+    """
+    directory = directory or DEFAULT_PAGES_DIR
+    paths = sorted(glob.glob(os.path.join(directory, '*.html')))
+    if not paths:
+        os.makedirs(directory, exist_ok=True)
+        for i in range(synthetic):
+            path = os.path.join(directory, f'synthetic_squad_{i}.html')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(make_squad_page(seed=i, commented=i % 2 == 0))
+            paths.append(path)
+    pages = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            pages.append(f.read())
+    return pages
@@ -0,0 +1,139 @@
+"""
+Local stand-in for the football-data.org v4 API, and a sync run against it
+
+    python -m benchmarks.football_data_stub --competitions 8 --per-minute 60
+
+Serves /v4/competitions/<code>/teams and /matches (with dateFrom/dateTo)
+for synthetic competitions, enforcing a per-minute request quota with 429s
+and X-RequestCounter-Reset like the real API. main() runs a full and then
+a delta sync into a throwaway database and prints counts and timings.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import Flask, jsonify, request
+
+from benchmarks.loadtest import LocalServer
+from benchmarks.timing import summarize
+
+TEAMS_PER_COMPETITION = 20
+
+
+def synthetic_competitions(n, seed=0, today=None):
+    """code -> {'teams': [...], 'matches': [...]} shaped like API responses"""
+    rng = np.random.default_rng(seed)
+    today = today or datetime.utcnow().replace(hour=15, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=120)
+    data = {}
+    for c in range(n):
+        code = f"C{c}"
+        team_ids = [10000 * (c + 1) + i for i in range(TEAMS_PER_COMPETITION)]
+        teams = [{'id': t, 'name': f"Stub FC {t}", 'shortName': f"Stub {t}", 'tla': f"S{t % 1000:02d}",
+                  'area': {'name': f"Country {c}"}} for t in team_ids]
+        pairs = [(h, a) for h in team_ids for a in team_ids if h != a]
+        order = rng.permutation(len(pairs))
+        matches = []
+        for k, i in enumerate(order):
+            home, away = pairs[i]
+            kickoff = start + timedelta(hours=12 * k)
+            finished = kickoff < today
+            matches.append({
+                'id': 10 ** 7 * (c + 1) + k,
+                'utcDate': kickoff.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'status': 'FINISHED' if finished else 'TIMED',
+                'season': {'startDate': f"{start.year}-08-01", 'endDate': f"{start.year + 1}-05-31"},
+                'homeTeam': {'id': home, 'name': f"Stub FC {home}"},
+                'awayTeam': {'id': away, 'name': f"Stub FC {away}"},
+                'score': {'fullTime': {'home': int(rng.poisson(1.5)) if finished else None,
+                                       'away': int(rng.poisson(1.2)) if finished else None}},
+            })
+        data[code] = {'teams': teams, 'matches': matches}
+    return data
+
+
+def create_stub_app(competitions, per_minute=10):
+    """Flask app serving the competitions with a per-minute quota per token"""
+    app = Flask(__name__)
+    lock = threading.Lock()
+    counters = {}  # token -> (window start, requests)
+    app.config['stats'] = stats = {'requests': 0, 'throttled': 0}
+
+    @app.before_request
+    def quota():
+        token = request.headers.get('X-Auth-Token')
+        if not token:
+            return jsonify({'message': 'missing token'}), 403
+        now = time.monotonic()
+        with lock:
+            stats['requests'] += 1
+            window, count = counters.get(token, (now, 0))
+            if now - window >= 60:
+                window, count = now, 0
+            if count >= per_minute:
+                stats['throttled'] += 1
+                reset = max(1, int(60 - (now - window)) + 1)
+                response = jsonify({'message': 'request limit reached'})
+                response.headers['X-RequestCounter-Reset'] = str(reset)
+                return response, 429
+            counters[token] = (window, count + 1)
+
+    @app.route('/v4/competitions/<code>/teams')
+    def teams(code):
+        if code not in competitions:
+            return jsonify({'message': 'not found'}), 404
+        return jsonify({'teams': competitions[code]['teams']})
+
+    @app.route('/v4/competitions/<code>/matches')
+    def matches(code):
+        if code not in competitions:
+            return jsonify({'message': 'not found'}), 404
+        rows = competitions[code]['matches']
+        date_from, date_to = request.args.get('dateFrom'), request.args.get('dateTo')
+        if date_from:
+            rows = [m for m in rows if m['utcDate'][:10] >= date_from]
+        if date_to:
+            rows = [m for m in rows if m['utcDate'][:10] <= date_to]
+        return jsonify({'matches': rows})
+
+    return app
+
+
+def main():
+    import requests
+    from app import create_app
+    from models.db import db
+    from models.football_data_sync import sync_competitions
+    from services.football_data import FootballDataClient
+
+    parser = argparse.ArgumentParser(description="football-data.org sync against a local stub")
+    parser.add_argument('--competitions', type=int, default=5)
+    parser.add_argument('--per-minute', type=int, default=60, help='quota enforced by the stub')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    competitions = synthetic_competitions(args.competitions)
+    stub = create_stub_app(competitions, args.per_minute)
+    with tempfile.TemporaryDirectory() as tmp, LocalServer(stub) as server:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'sync.db')}"})
+        client = FootballDataClient(base_url=f"{server.url}/v4", token='stub', session=requests.Session(),
+                                    per_minute=args.per_minute, pool_size=args.workers)
+        with app.app_context():
+            db.create_all()
+            for label in ('full', 'delta'):
+                started = time.perf_counter()
+                result = sync_competitions(list(competitions), client=client, max_workers=args.workers)
+                elapsed = time.perf_counter() - started
+                totals = {key: sum(r[key] for r in result['competitions'].values())
+                          for key in ('matches', 'new_matches', 'updated_matches', 'new_teams')}
+                print(json.dumps(dict(summarize('football_data_sync', [elapsed], sync=label),
+                                      errors=len(result['errors']), **totals, **stub.config['stats'])))
+
+
+if __name__ == '__main__':
+    main()
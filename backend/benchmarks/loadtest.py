@@ -0,0 +1,142 @@
+"""
+Load test of /api/players, /api/predict and /api/analyze-squad
+
+    python -m benchmarks.loadtest --players 100000 --concurrency 8
+    python -m benchmarks.loadtest --url http://localhost:8000 --players 100000
+
+Without --url the app is served in-process by werkzeug's threaded server on
+a synthetic database. With --url the target must already hold data shaped
+like benchmarks.synthetic_db output (team ids 1..N, leagues "League k").
+Prints one JSON object per scenario with throughput and p50/p99 latency.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.synthetic_db import populate, PLAYERS_PER_TEAM, TEAMS_PER_LEAGUE
+from benchmarks.timing import summarize
+
+
+def scenarios(n_teams):
+    """name -> fn(session, base_url, rng) issuing one request"""
+    n_leagues = max(1, n_teams // TEAMS_PER_LEAGUE)
+
+    def players(session, base, rng):
+        params = {'limit': 100, 'league': f"League {rng.randrange(n_leagues)}"}
+        if rng.random() < 0.5:
+            params['sort'] = rng.choice(['goals', 'xg', 'overall'])
+        if rng.random() < 0.3:
+            params['position'] = rng.choice(['DF', 'MF', 'FW'])
+        return session.get(f"{base}/api/players", params=params)
+
+    def predict(session, base, rng):
+        home, away = rng.sample(range(1, n_teams + 1), 2)
+        return session.post(f"{base}/api/predict", json={'home_team': home, 'away_team': away})
+
+    def analyze_squad(session, base, rng):
+        return session.post(f"{base}/api/analyze-squad", json={
+            'formation': rng.choice(['4-3-3', '4-4-2', '4-2-3-1']),
+            'league': f"League {rng.randrange(n_leagues)}",
+            'min_minutes': 0,
+        })
+
+    return {'GET /api/players': players, 'POST /api/predict': predict,
+            'POST /api/analyze-squad': analyze_squad}
+
+
+def run_scenario(name, request_fn, base_url, requests_total, concurrency, seed=0):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one(i):
+        nonlocal errors
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+            local.rng = random.Random(seed * 1000 + i)
+        start = time.perf_counter()
+        try:
+            ok = request_fn(local.session, base_url, local.rng).status_code < 400
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            errors += not ok
+
+    # Warm caches and lazy imports before measuring
+    warm = requests.Session()
+    for i in range(min(5, requests_total)):
+        request_fn(warm, base_url, random.Random(i))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests_total)))
+    wall = time.perf_counter() - started
+    result = summarize(name, latencies, concurrency=concurrency, errors=errors)
+    # Throughput over wall-clock time, not summed latency
+    result['ops_per_s'] = round(requests_total / wall, 1)
+    return result
+
+
+class LocalServer:
+    """The app on werkzeug's threaded server in a background thread"""
+
+    def __init__(self, app):
+        import logging
+        from werkzeug.serving import make_server
+        # Per-request access lines would dominate the output and the timings
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self._server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+
+
+def run(base_url, n_teams, requests_total=500, concurrency=8):
+    return [run_scenario(name, fn, base_url, requests_total, concurrency)
+            for name, fn in scenarios(n_teams).items()]
+
+
+def main():
+    from app import create_app
+    from models.db import db
+
+    parser = argparse.ArgumentParser(description="API load test")
+    parser.add_argument('--url', default=None, help='test a running server instead of an in-process one')
+    parser.add_argument('--players', type=int, default=10000, help='synthetic players (sets team count)')
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+    n_teams = max(2, args.players // PLAYERS_PER_TEAM)
+
+    if args.url:
+        results = run(args.url.rstrip('/'), n_teams, args.requests, args.concurrency)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}"})
+            with app.app_context():
+                db.create_all()
+                populate(args.players)
+            with LocalServer(app) as server:
+                results = run(server.url, n_teams, args.requests, args.concurrency)
+    for result in results:
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
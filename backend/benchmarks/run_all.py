@@ -0,0 +1,113 @@
+"""
+Run the whole offline benchmark suite and write one JSON report
+
+    python -m benchmarks.run_all --players 100000 --output bench.json
+    python -m benchmarks.run_all --compare before.json bench.json
+
+The report carries the git commit, machine and scale next to every result,
+so reports from different commits can be compared with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks import bench_micro, loadtest
+from benchmarks.fixtures import load_squad_pages
+from benchmarks.synthetic_db import populate
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(players, n, requests_total, concurrency, pages_dir=None):
+    from app import create_app
+    from models.db import db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}"})
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            counts = populate(players)
+            populate_seconds = time.perf_counter() - started
+
+        results = bench_micro.run(app, n, load_squad_pages(pages_dir))
+        with loadtest.LocalServer(app) as server:
+            results += loadtest.run(server.url, counts['teams'], requests_total, concurrency)
+
+    return {
+        'commit': _git_commit(),
+        'created_at': datetime.utcnow().isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'scale': dict(counts, populate_seconds=round(populate_seconds, 2)),
+        'results': results,
+    }
+
+
+def _key(result):
+    # Everything that isn't a measurement identifies the benchmark variant
+    measured = {'n', 'ops_per_s', 'mean_us', 'p50_us', 'p99_us', 'max_us', 'errors'}
+    return json.dumps({k: v for k, v in result.items() if k not in measured}, sort_keys=True)
+
+
+def compare(before, after):
+    """Per-benchmark p50/p99/throughput ratios (after / before)"""
+    old = {_key(r): r for r in before['results']}
+    rows = []
+    for result in after['results']:
+        base = old.get(_key(result))
+        if base is None:
+            continue
+        rows.append({
+            'bench': result['bench'],
+            'variant': {k: v for k, v in json.loads(_key(result)).items() if k != 'bench'},
+            'p50_ratio': round(result['p50_us'] / base['p50_us'], 3) if base['p50_us'] else None,
+            'p99_ratio': round(result['p99_us'] / base['p99_us'], 3) if base['p99_us'] else None,
+            'throughput_ratio': round(result['ops_per_s'] / base['ops_per_s'], 3) if base['ops_per_s'] else None,
+        })
+    return {'before': before.get('commit'), 'after': after.get('commit'), 'rows': rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run all offline benchmarks")
+    parser.add_argument('--players', type=int, default=10000, help='synthetic players (1k to 1M)')
+    parser.add_argument('-n', type=int, default=2000, help='calls per microbenchmark')
+    parser.add_argument('--requests', type=int, default=500, help='requests per load scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--pages', default=None, help='directory of saved squad pages')
+    parser.add_argument('--output', default=None, help='write the report here instead of stdout')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two reports')
+    args = parser.parse_args()
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path, encoding='utf-8') as f:
+                reports.append(json.load(f))
+        print(json.dumps(compare(*reports), indent=2))
+        return
+
+    report = run_suite(args.players, args.n, args.requests, args.concurrency, args.pages)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Synthetic teams, players and matches at configurable scale
+
+    python -m benchmarks.synthetic_db /tmp/bench.db --players 100000
+
+Rows are generated with NumPy and written with batched executemany inserts,
+so a million players take seconds rather than minutes. Always point it at a
+throwaway database, never soccer.db.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from models.db import db, Player, Team, Match
+
+BATCH_SIZE = 20000
+POSITIONS = np.array(['GK', 'DF', 'DF', 'DF', 'MF', 'MF', 'MF', 'FW', 'FW', 'DF,MF', 'MF,FW'])
+PLAYERS_PER_TEAM = 25
+TEAMS_PER_LEAGUE = 20
+
+
+def populate(players=10000, matches=None, seed=0, upcoming=0.1):
+    """
+    Fill an empty database inside the current app context
+
+    players: player rows; teams follow at 25 players each, leagues at 20 teams
+    matches: match rows (default: a double round robin per league); the last
+             `upcoming` fraction of each league's schedule is left unplayed
+    Returns row counts.
+    """
+    rng = np.random.default_rng(seed)
+    n_teams = max(2, players // PLAYERS_PER_TEAM)
+    team_league = np.arange(n_teams) // TEAMS_PER_LEAGUE
+    team_names = [f"Club {i}" for i in range(n_teams)]
+    league_names = [f"League {i}" for i in range(team_league.max() + 1)]
+
+    _insert(Team, [
+        {'id': i + 1, 'fbref_id': f"t{i:07d}", 'name': team_names[i], 'league': league_names[team_league[i]],
+         'matches_played': 0}
+        for i in range(n_teams)
+    ])
+
+    team_of = rng.integers(0, n_teams, players)
+    minutes = rng.integers(0, 3420, players)
+    nineties = minutes / 90.0
+    columns = {
+        'position': POSITIONS[rng.integers(0, len(POSITIONS), players)],
+        'age': rng.integers(17, 38, players),
+        'minutes': minutes,
+        'games_played': np.minimum(38, minutes // 60),
+        'starts': np.minimum(38, minutes // 85),
+        'goals': rng.poisson(0.15 * nineties),
+        'assists': rng.poisson(0.1 * nineties),
+        'xG': np.round(rng.gamma(2.0, 0.08, players) * nineties, 1),
+        'xA': np.round(rng.gamma(2.0, 0.05, players) * nineties, 1),
+        'progressive_passes': rng.poisson(3.0 * nineties),
+        'progressive_carries': rng.poisson(2.0 * nineties),
+        'tackles': rng.poisson(1.5 * nineties),
+        'interceptions': rng.poisson(1.0 * nineties),
+        'overall': rng.integers(55, 92, players),
+    }
+    now = datetime.utcnow()
+    rows = []
+    for start in range(0, players, BATCH_SIZE):
+        stop = min(start + BATCH_SIZE, players)
+        rows = [
+            {'fbref_id': f"p{i:08d}", 'name': f"Player {i}", 'team': team_names[team_of[i]],
+             'team_id': int(team_of[i]) + 1, 'league': league_names[team_league[team_of[i]]],
+             'nationality': 'ENG', 'last_updated': now,
+             **{k: v[i].item() for k, v in columns.items()}}
+            for i in range(start, stop)
+        ]
+        _insert(Player, rows)
+
+    n_matches = _insert_matches(rng, n_teams, team_league, matches, upcoming)
+    db.session.commit()
+    return {'teams': n_teams, 'players': players, 'matches': n_matches}
+
+
+def _insert_matches(rng, n_teams, team_league, limit, upcoming):
+    start = datetime(2024, 8, 10)
+    total = 0
+    for league in np.unique(team_league):
+        teams = np.flatnonzero(team_league == league) + 1
+        home, away = np.meshgrid(teams, teams)
+        mask = home != away
+        home, away = home[mask], away[mask]
+        order = rng.permutation(len(home))
+        home, away = home[order], away[order]
+        if limit is not None:
+            home, away = home[:max(0, limit - total)], away[:max(0, limit - total)]
+        n = len(home)
+        played = np.arange(n) < int(n * (1 - upcoming))
+        home_xg = np.round(rng.gamma(3.0, 0.5, n), 2)
+        away_xg = np.round(rng.gamma(3.0, 0.4, n), 2)
+        home_goals = rng.poisson(home_xg)
+        away_goals = rng.poisson(away_xg)
+        rows = [
+            {'date': start + timedelta(hours=int(i) * 6), 'season': '2024-2025',
+             'home_team_id': int(home[i]), 'away_team_id': int(away[i]),
+             'home_score': int(home_goals[i]) if played[i] else None,
+             'away_score': int(away_goals[i]) if played[i] else None,
+             'home_xG': float(home_xg[i]) if played[i] else None,
+             'away_xG': float(away_xg[i]) if played[i] else None}
+            for i in range(n)
+        ]
+        for batch in range(0, n, BATCH_SIZE):
+            _insert(Match, rows[batch:batch + BATCH_SIZE])
+        total += n
+        if limit is not None and total >= limit:
+            break
+    return total
+
+
+def _insert(model, rows):
+    if rows:
+        db.session.execute(model.__table__.insert(), rows)
+
+
+def main():
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description="Fill a throwaway database with synthetic data")
+    parser.add_argument('path', help='SQLite file to create')
+    parser.add_argument('--players', type=int, default=10000)
+    parser.add_argument('--matches', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{args.path}"})
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        counts = populate(args.players, args.matches, args.seed)
+    print(json.dumps(dict(counts, seconds=round(time.perf_counter() - started, 2))))
+
+
+if __name__ == '__main__':
+    main()
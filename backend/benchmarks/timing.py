@@ -0,0 +1,33 @@
+import statistics
+import time
+
+
+def summarize(name, samples, **extra):
+    """Result record for per-call durations in seconds"""
+    ordered = sorted(samples)
+    total = sum(ordered)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return dict({
+        'bench': name,
+        'n': len(ordered),
+        'ops_per_s': round(len(ordered) / total, 1) if total else None,
+        'mean_us': round(statistics.mean(ordered) * 1e6, 2),
+        'p50_us': round(pct(50) * 1e6, 2),
+        'p99_us': round(pct(99) * 1e6, 2),
+        'max_us': round(ordered[-1] * 1e6, 2),
+    }, **extra)
+
+
+def time_calls(fn, n, warmup=10):
+    """Per-call durations of n calls to fn(i)"""
+    for i in range(min(warmup, n)):
+        fn(i)
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
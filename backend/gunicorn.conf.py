@@ -0,0 +1,61 @@
+# backend/gunicorn.conf.py
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 2))
+worker_class = "gthread" if threads > 1 else "sync"
+# Load the app (and, via wsgi.warm_up, the model) once in the master and fork
+preload_app = True
+# Simulations and squad searches can take a few seconds
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = 200
+accesslog = "-"
+
+
+def on_starting(server):
+    # Drop metrics snapshots of a previous run's workers
+    metrics_dir = os.getenv("METRICS_DIR")
+    if metrics_dir and os.path.isdir(metrics_dir):
+        for name in os.listdir(metrics_dir):
+            if name.startswith("metrics-"):
+                os.remove(os.path.join(metrics_dir, name))
+
+
+def when_ready(server):
+    # Job workers run once, next to the web workers rather than inside each
+    # of them, so recycling a web worker (max_requests) never takes a
+    # running job down. Set JOB_WORKERS=0 to run worker.py separately.
+    from models.jobs import job_worker_processes
+
+    processes = job_worker_processes()
+    if processes > 0:
+        import subprocess
+        import sys
+
+        worker_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
+        server.job_workers = subprocess.Popen([sys.executable, worker_script, "--processes", str(processes)])
+        server.log.info("Started %d job workers (pid %d)", processes, server.job_workers.pid)
+
+
+def on_exit(server):
+    job_workers = getattr(server, "job_workers", None)
+    if job_workers is not None:
+        job_workers.terminate()
+        try:
+            job_workers.wait(10)
+        except Exception:
+            job_workers.kill()
+
+
+def post_fork(server, worker):
+    # Threads don't survive fork, so background threads start in each worker.
+    # With several workers prefer a cron POST to /api/predict/precompute
+    # over PRECOMPUTE_INTERVAL, which would run the job in every worker.
+    from wsgi import app
+    from app import start_background
+
+    start_background(app)
@@ -1,5 +1,12 @@
 # Models package initialization
 from .db import db, Player, Team, Match
-from .predictor import predictor  
 
-__all__ = ['db', 'Player', 'Team', 'Match', 'predictor']  
\ No newline at end of file
+__all__ = ['db', 'Player', 'Team', 'Match', 'predictor']
+
+
+def __getattr__(name):
+    # The predictor pulls in the ML stack, so only import it when asked for
+    if name == 'predictor':
+        from .predictor import predictor
+        return predictor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,149 @@
+"""
+Backtests of the probabilities stored on matches against their results
+
+Completed matches with prob_* set are streamed from one SQL query in
+chunks. Each chunk is scored with NumPy and reduced to sums per (league,
+season, model version) cell and per calibration bin, so memory stays flat
+however many matches there are; the report's slices are roll-ups of those
+sums. Scores follow models.training: multi-class log loss and Brier score
+(summed over the three outcomes).
+"""
+import numpy as np
+from sqlalchemy import select
+
+from .db import Match, Team, read_connection
+
+OUTCOMES = ['home', 'draw', 'away']
+SLICES = ['league', 'season', 'model_version']
+DEFAULT_BINS = 10
+CHUNK_SIZE = 100000
+EPS = 1e-15
+UNVERSIONED = 'default'  # predictions written without a registry model
+
+_SUMS = ['n', 'correct', 'log_loss', 'brier']
+_CALIBRATION_SUMS = ['n', 'predicted', 'observed']
+
+
+def _select(league=None, season=None, model_version=None):
+    stmt = (
+        select(Match.prob_home_win, Match.prob_draw, Match.prob_away_win,
+               Match.home_score, Match.away_score,
+               Team.league, Match.season, Match.prediction_version)
+        .outerjoin(Team, Team.id == Match.home_team_id)
+        .where(Match.home_score.isnot(None), Match.away_score.isnot(None),
+               Match.prob_home_win.isnot(None), Match.prob_draw.isnot(None),
+               Match.prob_away_win.isnot(None))
+    )
+    if league:
+        stmt = stmt.where(Team.league == league)
+    if season:
+        stmt = stmt.where(Match.season == season)
+    if model_version:
+        if model_version == UNVERSIONED:
+            stmt = stmt.where(Match.prediction_version.is_(None))
+        else:
+            stmt = stmt.where(Match.prediction_version == model_version)
+    return stmt
+
+
+def _score_chunk(rows, bins):
+    """(cell sums, calibration sums) DataFrames for one chunk of query rows"""
+    import pandas as pd
+
+    chunk = pd.DataFrame(rows, columns=['p_home', 'p_draw', 'p_away', 'home_score', 'away_score'] + SLICES)
+    proba = chunk[['p_home', 'p_draw', 'p_away']].to_numpy(float)
+    proba = proba / np.where(proba.sum(axis=1) > 0, proba.sum(axis=1), 1.0)[:, None]
+    goal_diff = chunk['home_score'].to_numpy(float) - chunk['away_score'].to_numpy(float)
+    actual = np.where(goal_diff > 0, 0, np.where(goal_diff < 0, 2, 1))
+    onehot = np.eye(len(OUTCOMES))[actual]
+
+    keys = chunk[SLICES].fillna({'league': 'unknown', 'season': 'unknown', 'model_version': UNVERSIONED})
+    scored = keys.assign(
+        n=1,
+        correct=(proba.argmax(axis=1) == actual).astype(int),
+        log_loss=-np.log(np.clip(proba[np.arange(len(actual)), actual], EPS, 1.0)),
+        brier=((proba - onehot) ** 2).sum(axis=1),
+    )
+    cells = scored.groupby(SLICES, sort=False)[_SUMS].sum()
+
+    # Reliability: one row per match and outcome, binned by predicted probability
+    bin_index = np.minimum((proba * bins).astype(int), bins - 1)
+    calibration = pd.DataFrame({
+        **{dim: np.repeat(keys[dim].to_numpy(), len(OUTCOMES)) for dim in SLICES},
+        'outcome': np.tile(np.arange(len(OUTCOMES)), len(actual)),
+        'bin': bin_index.ravel(),
+        'n': 1,
+        'predicted': proba.ravel(),
+        'observed': onehot.ravel(),
+    }).groupby(SLICES + ['outcome', 'bin'], sort=False)[_CALIBRATION_SUMS].sum()
+    return cells, calibration
+
+
+def _metrics(sums):
+    n = int(sums['n'])
+    return {
+        'matches': n,
+        'accuracy': round(float(sums['correct']) / n, 4),
+        'log_loss': round(float(sums['log_loss']) / n, 4),
+        'brier': round(float(sums['brier']) / n, 4),
+    }
+
+
+def _curves(calibration, bins):
+    """{outcome: [reliability bins]} from calibration sums indexed by (outcome, bin)"""
+    curves = {}
+    for k, outcome in enumerate(OUTCOMES):
+        points = []
+        if k in calibration.index.get_level_values('outcome'):
+            for b, row in calibration.xs(k, level='outcome').sort_index().iterrows():
+                points.append({
+                    'bin': [round(b / bins, 4), round((b + 1) / bins, 4)],
+                    'matches': int(row['n']),
+                    'predicted': round(float(row['predicted'] / row['n']), 4),
+                    'observed': round(float(row['observed'] / row['n']), 4),
+                })
+        curves[outcome] = points
+    return curves
+
+
+def run_backtest(league=None, season=None, model_version=None, bins=DEFAULT_BINS, chunk_size=CHUNK_SIZE):
+    """
+    Accuracy, log loss, Brier score and reliability curves for stored
+    predictions, overall and per league, season and model version
+
+    The filters narrow the matches evaluated; model_version='default'
+    selects predictions written without a registry model.
+    """
+    import pandas as pd
+
+    if bins < 1:
+        raise ValueError("bins must be at least 1")
+    cell_parts, calibration_parts = [], []
+    with read_connection() as conn:
+        result = conn.execution_options(yield_per=chunk_size).execute(
+            _select(league, season, model_version))
+        for rows in result.partitions():
+            cells, calibration = _score_chunk(rows, bins)
+            cell_parts.append(cells)
+            calibration_parts.append(calibration)
+
+    if not cell_parts:
+        return {'overall': None, 'calibration': {o: [] for o in OUTCOMES},
+                **{f'by_{dim}': [] for dim in SLICES}}
+
+    cells = pd.concat(cell_parts).groupby(level=SLICES).sum()
+    calibration = pd.concat(calibration_parts).groupby(level=SLICES + ['outcome', 'bin']).sum()
+
+    report = {
+        'overall': _metrics(cells.sum()),
+        'calibration': _curves(calibration.groupby(level=['outcome', 'bin']).sum(), bins),
+    }
+    for dim in SLICES:
+        by_dim = cells.groupby(level=dim).sum()
+        dim_calibration = calibration.groupby(level=[dim, 'outcome', 'bin']).sum()
+        report[f'by_{dim}'] = [
+            dict({dim: value}, **_metrics(sums),
+                 calibration=_curves(dim_calibration.xs(value, level=dim), bins))
+            for value, sums in by_dim.iterrows()
+        ]
+    return report
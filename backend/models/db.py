@@ -1,11 +1,145 @@
+import os
+from contextlib import contextmanager
+
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import event, inspect, make_url
+from sqlalchemy.schema import CreateColumn
 
 db = SQLAlchemy()
 
+# Per-connection SQLite settings. WAL lets readers run alongside the single
+# writer; synchronous=NORMAL is durable in WAL mode except for the last
+# commits on power loss; cache_size is negative for KiB.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -int(os.getenv('SQLITE_CACHE_KB', 64 * 1024)),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_BYTES', 256 * 1024 * 1024)),
+    'temp_store': 'MEMORY',
+}
+BUSY_TIMEOUT = float(os.getenv('DB_BUSY_TIMEOUT', 15))  # seconds a writer waits for the lock
+READ_BIND = 'read'
+
+
+def init_database(app):
+    """
+    db.init_app with connection settings for concurrent web and job workers
+
+    SQLite databases get the pragmas above, a busy timeout and a bounded
+    pool. API reads can go through read_connection(), which uses the
+    DATABASE_READ_URL replica if configured, and otherwise a separate
+    query_only pool on the same SQLite file so reads never queue behind a
+    scrape's write transaction for a connection.
+    """
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    is_sqlite_file = url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    if is_sqlite_file:
+        options.setdefault('connect_args', {}).setdefault('timeout', BUSY_TIMEOUT)
+        options.setdefault('pool_size', int(os.getenv('DB_POOL_SIZE', 5)))
+        options.setdefault('max_overflow', int(os.getenv('DB_MAX_OVERFLOW', 10)))
+        options.setdefault('pool_timeout', BUSY_TIMEOUT)
+
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    read_url = app.config.get('DATABASE_READ_URL', os.getenv('DATABASE_READ_URL'))
+    if read_url:
+        binds.setdefault(READ_BIND, read_url)
+    elif is_sqlite_file and app.config.get('SQLITE_READ_POOL', True):
+        # Binds given as a URL don't get SQLALCHEMY_ENGINE_OPTIONS, so pass
+        # the busy timeout and pool limits along with it
+        binds.setdefault(READ_BIND, {'url': app.config['SQLALCHEMY_DATABASE_URI'], **options})
+
+    db.init_app(app)
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+                event.listen(engine, 'connect', _sqlite_connect_hook(read_only=bind_key == READ_BIND))
+
+
+def _sqlite_connect_hook(read_only):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return set_pragmas
+
+
+def read_connection():
+    """Connection for read-only queries: the read bind if there is one, else the primary engine"""
+    engine = db.engines.get(READ_BIND) or db.engine
+    return engine.connect()
+
+
+@contextmanager
+def write_transaction():
+    """
+    engine.begin() that takes SQLite's write lock up front
+
+    A deferred transaction that reads and then writes fails at once with
+    "database is locked" when another writer got in between; BEGIN IMMEDIATE
+    waits for the busy timeout instead. Use it for read-then-write blocks.
+    """
+    with db.engine.begin() as conn:
+        if conn.dialect.name == 'sqlite':
+            conn.exec_driver_sql('BEGIN IMMEDIATE')
+        yield conn
+
+
+def migrate():
+    """
+    Bring the database up to the current schema
+
+    create_all() adds missing tables but never columns or indexes on tables
+    that already exist, so nullable columns and indexes declared after a
+    database was created are added here. Building an index on a large table
+    holds the write lock for a few seconds.
+    """
+    # Models only live on the primary; the read bind is the same schema
+    db.create_all(bind_key=None)
+    engine = db.engine
+    inspector = inspect(engine)
+    tables = inspector.get_table_names()
+    existing = {table: {ix['name'] for ix in inspector.get_indexes(table)} for table in tables}
+    columns = {table: {c['name'] for c in inspector.get_columns(table)} for table in tables}
+    created = []
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            for column in table.columns:
+                if table.name in columns and column.name not in columns[table.name]:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+                    created.append(f"{table.name}.{column.name}")
+            for index in table.indexes:
+                if index.name not in existing.get(table.name, ()):
+                    index.create(conn, checkfirst=True)
+                    created.append(index.name)
+        if engine.dialect.name == 'sqlite' and created:
+            # Refresh planner statistics for the new indexes
+            conn.exec_driver_sql('ANALYZE')
+    if created:
+        print(f"Created columns and indexes: {', '.join(created)}")
+    return created
+
 class Player(db.Model):
     """Stores comprehensive player stats from FBref"""
     __tablename__ = 'players'
+    # Back the /api/players filters and keyset sorts (SQLite appends the rowid id)
+    __table_args__ = (
+        db.Index('ix_players_league_team', 'league', 'team'),
+        db.Index('ix_players_league_overall', 'league', 'overall'),
+        db.Index('ix_players_overall', 'overall'),
+        db.Index('ix_players_goals', 'goals'),
+        db.Index('ix_players_xg', 'xG'),
+        db.Index('ix_players_xa', 'xA'),
+        db.Index('ix_players_team', 'team'),
+        # Squad ratings for team features; incremental player index refresh
+        db.Index('ix_players_team_id', 'team_id'),
+        db.Index('ix_players_last_updated', 'last_updated'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     fbref_id = db.Column(db.String(50), unique=True, nullable=False)
@@ -63,9 +197,17 @@ class Player(db.Model):
 class Team(db.Model):
     """Stores team data from FBref"""
     __tablename__ = 'teams'
+    # League tables for simulations and squad pools; name lookups at ingest
+    __table_args__ = (
+        db.Index('ix_teams_league', 'league'),
+        db.Index('ix_teams_name', 'name'),
+        # Upsert target of the football-data.org sync
+        db.Index('ux_teams_fd_id', 'fd_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     fbref_id = db.Column(db.String(50), unique=True, nullable=False)
+    fd_id = db.Column(db.Integer)  # football-data.org team id
     name = db.Column(db.String(100), nullable=False)
     league = db.Column(db.String(100))
     country = db.Column(db.String(50))
@@ -87,11 +229,40 @@ class Team(db.Model):
     def __repr__(self):
         return f'<Team {self.name} ({self.league})>'
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'league': self.league,
+            'country': self.country,
+            'matches_played': self.matches_played,
+            'wins': self.wins,
+            'draws': self.draws,
+            'losses': self.losses,
+            'goals_for': self.goals_for,
+            'goals_against': self.goals_against,
+            'xg': self.xG,
+            'xga': self.xGA,
+            'possession': self.possession
+        }
+
 class Match(db.Model):
     """Stores match predictions and results"""
     __tablename__ = 'matches'
+    # Per-team history in date order, used by the feature store and team features
+    __table_args__ = (
+        db.Index('ix_matches_home_team_date', 'home_team_id', 'date'),
+        db.Index('ix_matches_away_team_date', 'away_team_id', 'date'),
+        # Upcoming fixtures (home_score IS NULL, date >= now) for precompute
+        db.Index('ix_matches_date', 'date'),
+        # Backtests slice stored predictions by season
+        db.Index('ix_matches_season', 'season'),
+        # Upsert target of the football-data.org sync
+        db.Index('ux_matches_fd_id', 'fd_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
+    fd_id = db.Column(db.Integer)  # football-data.org match id
     date = db.Column(db.DateTime)
     season = db.Column(db.String(20))
     
@@ -109,6 +280,7 @@ class Match(db.Model):
     prob_home_win = db.Column(db.Float)
     prob_draw = db.Column(db.Float)
     prob_away_win = db.Column(db.Float)
+    prediction_version = db.Column(db.String(100))  # model version that wrote prob_*
     
     # Relationships
     home_team = db.relationship('Team', foreign_keys=[home_team_id])
@@ -116,12 +288,12 @@ class Match(db.Model):
 
     def get_prediction_accuracy(self):
         """Calculate if prediction was correct"""
-        if self.home_score is None:
+        if self.home_score is None or self.away_score is None or self.prob_home_win is None:
             return None
         predicted_outcome = max(
-            ['home', prob_home_win],
-            ['draw', prob_draw],
-            ['away', prob_away_win],
+            ['home', self.prob_home_win],
+            ['draw', self.prob_draw or 0.0],
+            ['away', self.prob_away_win or 0.0],
             key=lambda x: x[1]
         )[0]
         
@@ -132,7 +304,132 @@ class Match(db.Model):
         
         return predicted_outcome == actual_outcome
 
-# Initialize database (run this once)
-def init_db():
+class TeamFeatureState(db.Model):
+    """Rolling per-team aggregates maintained by the feature store"""
+    __tablename__ = 'team_feature_states'
+    
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), primary_key=True)
+    recent_results = db.Column(db.String(20), default='')  # oldest first, e.g. 'WDLWW'
+    goals_for_ewm = db.Column(db.Float)
+    goals_against_ewm = db.Column(db.Float)
+    xg_for_ewm = db.Column(db.Float)
+    xg_against_ewm = db.Column(db.Float)
+    matches = db.Column(db.Integer, default=0)
+    last_match_date = db.Column(db.DateTime)
+    last_match_id = db.Column(db.Integer)
+    
+    def __repr__(self):
+        return f'<TeamFeatureState team={self.team_id} ({self.matches} matches)>'
+
+class TeamFeatureHistory(db.Model):
+    """
+    One match applied to a team's rolling state: the result as applied and
+    the state after it (see models.feature_store)
+    """
+    __tablename__ = 'team_feature_history'
+    # Applied-match anti-join and replays from a team's (date, match_id);
+    # ids aren't reused, so max(id) moves whenever anything is re-applied
+    __table_args__ = (
+        db.Index('ux_team_feature_history_team_match', 'team_id', 'match_id', unique=True),
+        db.Index('ix_team_feature_history_team_date', 'team_id', 'date', 'match_id'),
+        {'sqlite_autoincrement': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False)
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id'), nullable=False)
+    date = db.Column(db.DateTime, nullable=False)
+    # The match as applied, from the team's side
+    goals_for = db.Column(db.Integer)
+    goals_against = db.Column(db.Integer)
+    xg_for = db.Column(db.Float)
+    xg_against = db.Column(db.Float)
+    # State after it
+    recent_results = db.Column(db.String(20), default='')
+    goals_for_ewm = db.Column(db.Float)
+    goals_against_ewm = db.Column(db.Float)
+    xg_for_ewm = db.Column(db.Float)
+    xg_against_ewm = db.Column(db.Float)
+    matches = db.Column(db.Integer)
+
+    def __repr__(self):
+        return f'<TeamFeatureHistory team={self.team_id} match={self.match_id}>'
+
+class TeamRating(db.Model):
+    """A team's Elo rating before and after one match (see models.team_strength)"""
+    __tablename__ = 'team_ratings'
+    # Point-in-time lookups: a team's latest row before a date; training joins
+    # and the sync's unrated-match check by match; replays from a (date, match_id).
+    # The score is kept as rated, so the sync can tell when it was corrected
+    __table_args__ = (
+        db.Index('ix_team_ratings_team_date', 'team_id', 'date', 'match_id'),
+        db.Index('ix_team_ratings_match', 'match_id'),
+        db.Index('ix_team_ratings_date', 'date', 'match_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False)
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id'), nullable=False)
+    date = db.Column(db.DateTime, nullable=False)
+    rating_before = db.Column(db.Float, nullable=False)
+    rating = db.Column(db.Float, nullable=False)  # after the match
+    goals_for = db.Column(db.Integer)  # the team's score as rated
+    goals_against = db.Column(db.Integer)
+
+    def __repr__(self):
+        return f'<TeamRating team={self.team_id} {self.date:%Y-%m-%d} {self.rating:.0f}>'
+
+class PredictionRun(db.Model):
+    """One precompute pass writing prob_* columns of upcoming matches"""
+    __tablename__ = 'prediction_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    model_version = db.Column(db.String(100))  # None for the legacy/default model
+    data_version = db.Column(db.String(100))  # team_features.features_version() when it ran
+    fixtures = db.Column(db.Integer)
+    finished_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<PredictionRun {self.model_version} ({self.fixtures} fixtures)>'
+
+class SyncState(db.Model):
+    """Last successful sync of one competition from an external source"""
+    __tablename__ = 'sync_states'
+    
+    source = db.Column(db.String(30), primary_key=True)  # e.g. 'football_data'
+    key = db.Column(db.String(50), primary_key=True)  # competition code
+    synced_at = db.Column(db.DateTime)
+    teams = db.Column(db.Integer)
+    matches = db.Column(db.Integer)
+    
+    def __repr__(self):
+        return f'<SyncState {self.source}:{self.key} {self.synced_at}>'
+
+class Job(db.Model):
+    """Background job in the SQLite-backed queue (see models.jobs)"""
+    __tablename__ = 'jobs'
+    # Workers claim the oldest queued job; the API lists by status
+    __table_args__ = (
+        db.Index('ix_jobs_status_id', 'status', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    params = db.Column(db.Text)  # JSON
+    progress = db.Column(db.Text)  # JSON: done, total, message
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    cancel_requested = db.Column(db.Boolean, default=False)
+    worker = db.Column(db.String(100))  # host:pid running it
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} ({self.status})>'
+
+# Initialize or upgrade the database
+def init_db(app):
     with app.app_context():
-        db.create_all()
\ No newline at end of file
+        migrate()
\ No newline at end of file
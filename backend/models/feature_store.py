@@ -0,0 +1,378 @@
+import threading
+
+import numpy as np
+from sqlalchemy import select, delete, and_, case, or_, exists, tuple_, union_all
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .db import db, read_connection, write_transaction, Match, TeamFeatureHistory, TeamFeatureState
+from .team_strength import team_strength, to_feature, INITIAL_RATING
+
+# pandas is only imported by the full-history methods; serving just reads the state
+
+FORM_MATCHES = 5
+EWM_ALPHA = 0.2  # weight of the newest match in the exponentially weighted averages
+DEFAULT_DAYS_REST = 7
+BATCH_SIZE = 5000
+# Keep IN (...) lists under SQLite's bound parameter limit
+LOOKUP_CHUNK = 900
+POINTS = {'W': 1.0, 'D': 0.5, 'L': 0.0}
+
+# Aggregate name -> (team-perspective column, TeamFeatureState column)
+EWM_STATS = {
+    'goals_for': ('gf', 'goals_for_ewm'),
+    'goals_against': ('ga', 'goals_against_ewm'),
+    'xg_for': ('xgf', 'xg_for_ewm'),
+    'xg_against': ('xga', 'xg_against_ewm'),
+}
+
+_MATCH_COLUMNS = ['match_id', 'date', 'season', 'home_team_id', 'away_team_id',
+                  'home_score', 'away_score', 'home_xG', 'away_xG']
+
+
+def _completed():
+    return and_(Match.home_score.isnot(None), Match.away_score.isnot(None), Match.date.isnot(None))
+
+
+def _match_select():
+    return select(Match.id, Match.date, Match.season, Match.home_team_id, Match.away_team_id,
+                  Match.home_score, Match.away_score, Match.home_xG, Match.away_xG)
+
+
+def _side_select(is_home):
+    """Completed matches from the home (or away) team's side"""
+    team, gf, ga, xgf, xga = ((Match.home_team_id, Match.home_score, Match.away_score, Match.home_xG, Match.away_xG)
+                              if is_home else
+                              (Match.away_team_id, Match.away_score, Match.home_score, Match.away_xG, Match.home_xG))
+    return select(team.label('team_id'), Match.id.label('match_id'), Match.date.label('date'),
+                  gf.label('goals_for'), ga.label('goals_against'),
+                  xgf.label('xg_for'), xga.label('xg_against')).where(_completed(), team.isnot(None))
+
+
+def _sides():
+    return union_all(_side_select(True), _side_select(False)).subquery('sides')
+
+
+def _unapplied():
+    """(team_id, date, match_id) of completed matches missing from a team's history"""
+    sides = _sides()
+    history = TeamFeatureHistory
+    return select(sides.c.team_id, sides.c.date, sides.c.match_id).where(~exists().where(
+        history.team_id == sides.c.team_id, history.match_id == sides.c.match_id))
+
+
+def _changed():
+    """
+    (team_id, applied date, match_id, current date) of history rows whose
+    match changed since: score or xG corrected, rescheduled, or no longer
+    a completed match of that team
+    """
+    history = TeamFeatureHistory
+    is_home = history.team_id == Match.home_team_id
+
+    def side(home_value, away_value):
+        return case((is_home, home_value), else_=away_value)
+
+    return (
+        select(history.team_id, history.date, history.match_id, Match.date)
+        .outerjoin(Match, Match.id == history.match_id)  # primary key lookups
+        .where(or_(
+            Match.id.is_(None), ~_completed(), history.date != Match.date,
+            and_(history.team_id.is_distinct_from(Match.home_team_id),
+                 history.team_id.is_distinct_from(Match.away_team_id)),
+            history.goals_for.is_distinct_from(side(Match.home_score, Match.away_score)),
+            history.goals_against.is_distinct_from(side(Match.away_score, Match.home_score)),
+            history.xg_for.is_distinct_from(side(Match.home_xG, Match.away_xG)),
+            history.xg_against.is_distinct_from(side(Match.away_xG, Match.home_xG)),
+        ))
+    )
+
+
+_STATE_COLUMNS = ['recent_results', 'goals_for_ewm', 'goals_against_ewm', 'xg_for_ewm', 'xg_against_ewm', 'matches']
+
+
+def _initial_state(team_id):
+    return {'team_id': team_id, 'recent_results': '', 'goals_for_ewm': None, 'goals_against_ewm': None,
+            'xg_for_ewm': None, 'xg_against_ewm': None, 'matches': 0,
+            'last_match_date': None, 'last_match_id': None}
+
+
+def _state_from(team_id, row):
+    """Team state after a history row"""
+    state = {'team_id': team_id, **{c: row[c] for c in _STATE_COLUMNS}}
+    state.update(recent_results=state['recent_results'] or '', matches=state['matches'] or 0,
+                 last_match_date=row['date'], last_match_id=row['match_id'])
+    return state
+
+
+def _history_row(state, match_id, date, gf, ga, xgf, xga):
+    return {'team_id': state['team_id'], 'match_id': match_id, 'date': date, 'goals_for': gf,
+            'goals_against': ga, 'xg_for': xgf, 'xg_against': xga,
+            **{c: state[c] for c in _STATE_COLUMNS}}
+
+
+def _serving_features(state):
+    """FeatureStore.team_features of a TeamFeatureState row (or None)"""
+    if state is None or not state.matches:
+        return None
+    features = {
+        'form': sum(POINTS[r] for r in state.recent_results) / FORM_MATCHES,
+        'last_match': state.last_match_date,
+    }
+    if state.goals_for_ewm is not None:
+        features['goals_scored'] = state.goals_for_ewm
+    if state.goals_against_ewm is not None:
+        features['goals_conceded'] = state.goals_against_ewm
+    if state.xg_for_ewm is not None:
+        features['xG'] = state.xg_for_ewm
+    return features
+
+
+class FeatureStore:
+    """
+    Rolling per-team form, goals and xG built from the matches table
+
+    State lives in team_feature_states, and team_feature_history keeps
+    each applied match with the state after it. sync() finds matches
+    missing from a team's history (an anti-join on match ids) or changed
+    since they were applied, resets the team to the state before the
+    earliest of them and replays from there, so new results cost O(1) each
+    and a late or corrected one only its team's matches after it.
+    rebuild() and training_rows() replay the full history in one vectorized
+    pandas pass and agree with sync() exactly (EWMs use the adjust=False
+    recurrence).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    # ---- serving ----
+    def team_features(self, team_id):
+        """
+        Form, EW goals/xG and last match date for a team, or None without history
+        Keys match MatchPredictor._prepare_features team dicts.
+        """
+        return _serving_features(db.session.get(TeamFeatureState, team_id))
+
+    def team_features_many(self, team_ids):
+        """{team_id: team_features(team_id)} for the given teams that have history"""
+        team_ids = list(team_ids)
+        features = {}
+        for start in range(0, len(team_ids), LOOKUP_CHUNK):
+            states = db.session.execute(select(TeamFeatureState).where(
+                TeamFeatureState.team_id.in_(team_ids[start:start + LOOKUP_CHUNK]))).scalars()
+            for state in states:
+                team_features = _serving_features(state)
+                if team_features is not None:
+                    features[state.team_id] = team_features
+        return features
+
+    # ---- incremental ----
+    def sync(self):
+        """
+        Apply completed matches not yet in a team's history, and re-apply
+        ones whose result changed since; returns team results applied
+        """
+        with self._lock:
+            with read_connection() as conn:
+                if (conn.execute(_unapplied().limit(1)).first() is None
+                        and conn.execute(_changed().limit(1)).first() is None):
+                    return 0
+            # Re-read under the write lock so two workers can't apply a match twice
+            with write_transaction() as conn:
+                starts = {}
+                for team_id, date, match_id in conn.execute(_unapplied()).all():
+                    starts[team_id] = min(starts.get(team_id, (date, match_id)), (date, match_id))
+                for team_id, date, match_id, new_date in conn.execute(_changed()).all():
+                    for when in (date, new_date):
+                        if when is not None:
+                            starts[team_id] = min(starts.get(team_id, (when, match_id)), (when, match_id))
+                return sum(self._replay_team(conn, team_id, start) for team_id, start in starts.items())
+
+    def _replay_team(self, conn, team_id, start):
+        """
+        Reset a team's state to before start (date, match_id) and apply its
+        matches from there; returns matches applied
+        """
+        history = TeamFeatureHistory.__table__
+        conn.execute(delete(history).where(
+            history.c.team_id == team_id, tuple_(history.c.date, history.c.match_id) >= tuple_(*start)))
+        previous = conn.execute(
+            select(history).where(history.c.team_id == team_id)
+            .order_by(history.c.date.desc(), history.c.match_id.desc()).limit(1)
+        ).mappings().first()
+        state = _initial_state(team_id) if previous is None else _state_from(team_id, previous)
+
+        sides = union_all(*[
+            _side_select(is_home).where(team_column == team_id, tuple_(Match.date, Match.id) >= tuple_(*start))
+            for is_home, team_column in ((True, Match.home_team_id), (False, Match.away_team_id))
+        ]).subquery()
+        matches = conn.execute(select(sides).order_by(sides.c.date, sides.c.match_id)).all()
+        rows = []
+        for _team_id, match_id, date, gf, ga, xgf, xga in matches:
+            self._apply(state, {'match_id': match_id, 'date': date}, gf, ga, xgf, xga)
+            rows.append(_history_row(state, match_id, date, gf, ga, xgf, xga))
+        if rows:
+            conn.execute(history.insert(), rows)
+
+        table = TeamFeatureState.__table__
+        if not state['matches']:
+            conn.execute(delete(table).where(table.c.team_id == team_id))
+        else:
+            stmt = sqlite_insert(table).values(**state)
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c.team_id],
+                set_={c: stmt.excluded[c] for c in state if c != 'team_id'},
+            ))
+        return len(rows)
+
+    @staticmethod
+    def _apply(state, match, gf, ga, xgf, xga):
+        result = 'W' if gf > ga else 'L' if gf < ga else 'D'
+        state['recent_results'] = (state['recent_results'] + result)[-FORM_MATCHES:]
+        for value, column in ((gf, 'goals_for_ewm'), (ga, 'goals_against_ewm'),
+                              (xgf, 'xg_for_ewm'), (xga, 'xg_against_ewm')):
+            if value is None:
+                continue
+            previous = state[column]
+            state[column] = float(value) if previous is None else (1 - EWM_ALPHA) * previous + EWM_ALPHA * value
+        state['matches'] += 1
+        state['last_match_date'] = match['date']
+        state['last_match_id'] = match['match_id']
+
+    # ---- full history ----
+    def rebuild(self):
+        """Recompute every team's history and state from the full match history"""
+        import pandas as pd
+
+        with self._lock:
+            _matches, long = self._history()
+            history, table = TeamFeatureHistory.__table__, TeamFeatureState.__table__
+            with write_transaction() as conn:
+                conn.execute(delete(history))
+                conn.execute(delete(table))
+                if not len(long):
+                    return 0
+                results = long.groupby('team_id', sort=False)['result']
+                recent = pd.Series('', index=long.index)
+                for lag in range(FORM_MATCHES - 1, -1, -1):
+                    recent = recent + results.shift(lag).fillna('')
+                frame = pd.DataFrame({
+                    'team_id': long['team_id'].astype(int),
+                    'match_id': long['match_id'].astype(int),
+                    'date': long['date'].dt.to_pydatetime(),
+                    'goals_for': long['gf'].astype(int),
+                    'goals_against': long['ga'].astype(int),
+                    'xg_for': long['xgf'],
+                    'xg_against': long['xga'],
+                    'recent_results': recent,
+                    'goals_for_ewm': long['gf_after'],
+                    'goals_against_ewm': long['ga_after'],
+                    'xg_for_ewm': long['xgf_after'],
+                    'xg_against_ewm': long['xga_after'],
+                    'matches': long['n_after'].astype(int),
+                })
+                records = frame.astype(object).where(frame.notna(), None).to_dict('records')
+                for start in range(0, len(records), BATCH_SIZE):
+                    conn.execute(history.insert(), records[start:start + BATCH_SIZE])
+
+                last = frame.groupby('team_id', sort=False).tail(1)
+                states = last.drop(columns=['goals_for', 'goals_against', 'xg_for', 'xg_against']).rename(
+                    columns={'date': 'last_match_date', 'match_id': 'last_match_id'})
+                conn.execute(table.insert(), states.astype(object).where(states.notna(), None).to_dict('records'))
+            return len(long)
+
+    def training_rows(self, feature_columns=None):
+        """
+        One point-in-time-correct row per completed match
+
+        Each row only uses matches played before it. Columns follow
+        MatchPredictor.feature_columns, plus result, date, season and match_id.
+        Team ratings are the sides' Elo going into the match (models.team_strength).
+        """
+        import pandas as pd
+
+        matches, long = self._history()
+        if matches.empty:
+            return pd.DataFrame(columns=(feature_columns or []) + ['result', 'date', 'season', 'match_id'])
+
+        before = long.set_index(['match_id', 'is_home'])
+        home = before.xs(True, level='is_home').reindex(matches['match_id'])
+        away = before.xs(False, level='is_home').reindex(matches['match_id'])
+        elo = team_strength.pre_match_ratings().set_index('match_id').reindex(matches['match_id'])
+        elo = elo.fillna(INITIAL_RATING)
+
+        rows = pd.DataFrame({
+            'match_id': matches['match_id'].to_numpy(),
+            'date': matches['date'].to_numpy(),
+            'season': matches['season'].to_numpy(),
+            'home_team_rating': to_feature(elo['home_rating'].to_numpy()),
+            'away_team_rating': to_feature(elo['away_rating'].to_numpy()),
+            'home_team_form': home['form_before'].to_numpy(),
+            'away_team_form': away['form_before'].to_numpy(),
+            'home_goals_scored': home['gf_before'].fillna(1.5).to_numpy(),
+            'away_goals_scored': away['gf_before'].fillna(1.5).to_numpy(),
+            'home_goals_conceded': home['ga_before'].fillna(1.2).to_numpy(),
+            'away_goals_conceded': away['ga_before'].fillna(1.2).to_numpy(),
+            'home_xG': home['xgf_before'].fillna(1.8).to_numpy(),
+            'away_xG': away['xgf_before'].fillna(1.8).to_numpy(),
+            'days_since_last_match': np.minimum(home['rest_before'].to_numpy(),
+                                                away['rest_before'].to_numpy()),
+        })
+        hs, as_ = matches['home_score'].to_numpy(), matches['away_score'].to_numpy()
+        rows['result'] = np.where(hs > as_, 'home', np.where(hs < as_, 'away', 'draw'))
+        if feature_columns:
+            rows = rows[feature_columns + ['result', 'date', 'season', 'match_id']]
+        return rows
+
+    @staticmethod
+    def _history():
+        """
+        (matches, long): completed matches in date order, and one row per
+        team per match with aggregates before (*_before) and after (*_after) it
+        """
+        import pandas as pd
+
+        stmt = _match_select().where(_completed()).order_by(Match.date, Match.id)
+        matches = pd.DataFrame(db.session.execute(stmt).all(), columns=_MATCH_COLUMNS)
+        if matches.empty:
+            return matches, pd.DataFrame()
+        matches['date'] = pd.to_datetime(matches['date'])
+
+        def side(team, gf, ga, xgf, xga, is_home):
+            return pd.DataFrame({
+                'match_id': matches['match_id'], 'date': matches['date'],
+                'team_id': matches[team], 'is_home': is_home,
+                'gf': matches[gf].astype(float), 'ga': matches[ga].astype(float),
+                'xgf': matches[xgf].astype(float), 'xga': matches[xga].astype(float),
+            })
+
+        long = pd.concat([
+            side('home_team_id', 'home_score', 'away_score', 'home_xG', 'away_xG', True),
+            side('away_team_id', 'away_score', 'home_score', 'away_xG', 'home_xG', False),
+        ], ignore_index=True)
+        long = long[long['team_id'].notna()]
+        long = long.sort_values(['team_id', 'date', 'match_id'], kind='stable').reset_index(drop=True)
+
+        long['result'] = np.where(long['gf'] > long['ga'], 'W', np.where(long['gf'] < long['ga'], 'L', 'D'))
+        long['points'] = long['result'].map(POINTS)
+        groups = long.groupby('team_id', sort=False)
+
+        long['form_after'] = groups['points'].rolling(FORM_MATCHES, min_periods=1).sum() \
+            .reset_index(level=0, drop=True) / FORM_MATCHES
+        for col, _state_col in EWM_STATS.values():
+            long[f'{col}_after'] = groups[col].ewm(alpha=EWM_ALPHA, adjust=False, ignore_na=True).mean() \
+                .reset_index(level=0, drop=True)
+            # ewm carries the last value over NaNs only after the first observation
+            long[f'{col}_after'] = long.groupby('team_id', sort=False)[f'{col}_after'].ffill()
+        long['n_after'] = groups.cumcount() + 1
+
+        after = ['form_after'] + [f'{c}_after' for c, _ in EWM_STATS.values()]
+        shifted = long.groupby('team_id', sort=False)[after + ['date']].shift()
+        for col in after:
+            long[col.replace('_after', '_before')] = shifted[col]
+        long['form_before'] = long['form_before'].fillna(0.5)  # calculate_team_form([])
+        long['rest_before'] = (long['date'] - shifted['date']).dt.days.fillna(DEFAULT_DAYS_REST)
+        return matches, long
+
+
+feature_store = FeatureStore()
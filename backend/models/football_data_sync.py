@@ -0,0 +1,222 @@
+"""
+Bulk sync of teams, fixtures and results from football-data.org
+
+Competitions are fetched concurrently through one FootballDataClient, so
+they share its connection pool and per-minute quota. The first sync of a
+competition (or full=True) pulls its whole current season; later ones only
+ask for the date window from shortly before the last sync to HORIZON_DAYS
+ahead. Fetched rows are compared with what's stored and only new or
+changed teams and matches are written, with batched
+INSERT ... ON CONFLICT(fd_id) statements, one transaction per competition.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from services.leagues import COMPETITION_LEAGUES, team_name_key
+from .db import db, Team, Match, SyncState
+from .team_features import feature_cache
+
+SOURCE = 'football_data'
+DEFAULT_COMPETITIONS = ['PL', 'PD', 'BL1', 'SA', 'FL1']
+LOOKBACK_DAYS = 3   # days before the last sync fetched again, for late results and reschedules
+HORIZON_DAYS = 30   # upcoming fixtures fetched by a delta sync
+FINISHED = ('FINISHED', 'AWARDED')
+BATCH_SIZE = 500
+LOOKUP_CHUNK = 900  # SQLite bound parameter limit
+
+MATCH_COLUMNS = ['date', 'season', 'home_team_id', 'away_team_id', 'home_score', 'away_score']
+
+
+def sync_competitions(competitions=None, full=False, client=None, max_workers=4, progress=None):
+    """
+    Sync teams and matches of several competitions; returns per-competition
+    counts and the competitions that failed
+
+    client: FootballDataClient (default: the shared one from services.football_data)
+    progress: callable(done, total, competition)
+    """
+    if client is None:
+        from services.football_data import client as shared_client
+        client = shared_client()
+    competitions = competitions or DEFAULT_COMPETITIONS
+    # Windows are taken from the start of this sync, so nothing that changes mid-sync is skipped
+    started = datetime.utcnow()
+    windows = _windows(competitions, full, started)
+
+    results, errors = {}, []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(_fetch, client, code, *windows[code]): code for code in competitions}
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                code = futures[future]
+                try:
+                    teams, matches = future.result()
+                    # Writes stay on this thread; the fetch threads never touch the session
+                    results[code] = _store(code, teams, matches, started, windows[code])
+                except Exception as e:
+                    db.session.rollback()
+                    errors.append({'competition': code, 'error': str(e)})
+                if progress:
+                    progress(done, len(competitions), code)
+        except BaseException:
+            # e.g. a cancelled job: don't start the fetches still queued
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    return {'competitions': results, 'errors': errors}
+
+
+def _windows(competitions, full, now):
+    """competition -> (date_from, date_to); (None, None) fetches the whole season"""
+    states = {}
+    if not full:
+        states = dict(db.session.execute(
+            select(SyncState.key, SyncState.synced_at)
+            .where(SyncState.source == SOURCE, SyncState.key.in_(competitions))
+        ).all())
+    windows = {}
+    for code in competitions:
+        last = states.get(code)
+        if last is None:
+            windows[code] = (None, None)
+        else:
+            windows[code] = ((last - timedelta(days=LOOKBACK_DAYS)).date(),
+                             (now + timedelta(days=HORIZON_DAYS)).date())
+    return windows
+
+
+def _fetch(client, code, date_from, date_to):
+    return client.competition_teams(code), client.competition_matches(code, date_from, date_to)
+
+
+def _store(code, teams, matches, synced_at, window):
+    league = COMPETITION_LEAGUES.get(code, code)
+    # Teams only seen in fixtures (e.g. promoted mid-fetch) are added too
+    fd_teams = {t['id']: t for t in teams if t.get('id') is not None}
+    for match in matches:
+        for side in ('homeTeam', 'awayTeam'):
+            team = match.get(side) or {}
+            if team.get('id') is not None and team['id'] not in fd_teams:
+                fd_teams[team['id']] = team
+
+    try:
+        team_ids, new_teams = _upsert_teams(list(fd_teams.values()), league)
+        rows = [_match_row(m, team_ids) for m in matches if m.get('id') is not None]
+        new_matches, changed_matches, touched = _upsert_matches(rows)
+
+        table = SyncState.__table__
+        stmt = sqlite_insert(table).values(source=SOURCE, key=code, synced_at=synced_at,
+                                           teams=len(fd_teams), matches=len(rows))
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.source, table.c.key],
+            set_={c: stmt.excluded[c] for c in ('synced_at', 'teams', 'matches')},
+        ))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    # Core statements don't go through the ORM flush hooks
+    if touched:
+        feature_cache.invalidate(touched)
+    return {
+        'window': [d.isoformat() if d else None for d in window],
+        'teams': len(fd_teams),
+        'new_teams': new_teams,
+        'matches': len(rows),
+        'new_matches': new_matches,
+        'updated_matches': changed_matches,
+    }
+
+
+def _upsert_teams(fd_teams, league):
+    """Link or insert teams by football-data id; returns ({fd_id: Team.id}, inserted)"""
+    fd_ids = [t['id'] for t in fd_teams]
+    known = _lookup(select(Team.fd_id, Team.id), Team.fd_id, fd_ids)
+
+    # Teams FBref ingestion already created get linked by name instead of duplicated
+    unlinked = [t for t in fd_teams if t['id'] not in known]
+    if unlinked:
+        by_name = {team_name_key(name): team_id for name, team_id in db.session.execute(
+            select(Team.name, Team.id).where(Team.fd_id.is_(None), Team.league == league)
+        ).all()}
+        links = {}
+        for team in unlinked:
+            for name in (team.get('shortName'), team.get('name')):
+                team_id = by_name.get(team_name_key(name))
+                if team_id is not None and team_id not in links.values():
+                    links[team['id']] = team_id
+                    break
+        if links:
+            table = Team.__table__
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('b_id')).values(fd_id=bindparam('b_fd_id')),
+                [{'b_id': team_id, 'b_fd_id': fd_id} for fd_id, team_id in links.items()],
+            )
+            known.update(links)
+
+    new = [t for t in fd_teams if t['id'] not in known]
+    for start in range(0, len(new), BATCH_SIZE):
+        stmt = sqlite_insert(Team.__table__).on_conflict_do_nothing(index_elements=['fd_id'])
+        db.session.execute(stmt, [
+            {'fbref_id': f"fd-{t['id']}", 'fd_id': t['id'], 'name': t.get('name') or t.get('shortName'),
+             'league': league, 'country': (t.get('area') or {}).get('name')}
+            for t in new[start:start + BATCH_SIZE]
+        ])
+    if new:
+        known.update(_lookup(select(Team.fd_id, Team.id), Team.fd_id, [t['id'] for t in new]))
+    return known, len(new)
+
+
+def _match_row(match, team_ids):
+    season = match.get('season') or {}
+    start, end = (season.get('startDate') or '')[:4], (season.get('endDate') or '')[:4]
+    full_time = (match.get('score') or {}).get('fullTime') or {}
+    finished = match.get('status') in FINISHED
+    utc_date = match.get('utcDate')
+    return {
+        'fd_id': match['id'],
+        'date': datetime.fromisoformat(utc_date.replace('Z', '+00:00')).replace(tzinfo=None) if utc_date else None,
+        'season': f"{start}-{end}" if start and end else None,
+        'home_team_id': team_ids.get((match.get('homeTeam') or {}).get('id')),
+        'away_team_id': team_ids.get((match.get('awayTeam') or {}).get('id')),
+        'home_score': full_time.get('home') if finished else None,
+        'away_score': full_time.get('away') if finished else None,
+    }
+
+
+def _upsert_matches(rows):
+    """Write new and changed matches; returns (inserted, updated, team ids touched)"""
+    columns = [Match.fd_id] + [getattr(Match, c) for c in MATCH_COLUMNS]
+    stored = {row[0]: tuple(row[1:]) for row in _lookup_rows(select(*columns), Match.fd_id,
+                                                             [r['fd_id'] for r in rows])}
+    to_write = [r for r in rows if stored.get(r['fd_id']) != tuple(r[c] for c in MATCH_COLUMNS)]
+    if not to_write:
+        return 0, 0, set()
+
+    table = Match.__table__
+    for start in range(0, len(to_write), BATCH_SIZE):
+        stmt = sqlite_insert(table)
+        # Stored predictions (prob_*) are left alone
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.fd_id],
+            set_={c: stmt.excluded[c] for c in MATCH_COLUMNS},
+        )
+        db.session.execute(stmt, to_write[start:start + BATCH_SIZE])
+
+    inserted = sum(1 for r in to_write if r['fd_id'] not in stored)
+    touched = {r[side] for r in to_write for side in ('home_team_id', 'away_team_id')} - {None}
+    return inserted, len(to_write) - inserted, touched
+
+
+def _lookup(stmt, column, values):
+    return dict(_lookup_rows(stmt, column, values))
+
+
+def _lookup_rows(stmt, column, values):
+    rows = []
+    for start in range(0, len(values), LOOKUP_CHUNK):
+        rows.extend(db.session.execute(stmt.where(column.in_(values[start:start + LOOKUP_CHUNK]))).all())
+    return rows
@@ -0,0 +1,252 @@
+import re
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .db import db, Player, Team
+from .player_ratings import rate_players
+from .team_features import feature_cache
+from .player_index import player_index
+from services.leagues import team_name_key
+from scraper.data_parser import (
+    DataParser, PLAYER_INT_COLUMNS, PLAYER_FLOAT_COLUMNS, PLAYER_TEXT_COLUMNS,
+)
+
+BATCH_SIZE = 500
+# Keep IN (...) lists under SQLite's bound parameter limit
+LOOKUP_CHUNK = 900
+
+# Columns written by ingestion; a row whose values all match is left alone.
+# overall/potential come from the rating engine, not from the scrape.
+INGEST_COLUMNS = PLAYER_TEXT_COLUMNS + PLAYER_INT_COLUMNS + PLAYER_FLOAT_COLUMNS + [
+    'age', 'team_id',
+]
+
+
+def ingest_players(df):
+    """
+    Validate scraped player rows and upsert them into the players table
+
+    Everything is written inside one transaction with batched
+    INSERT ... ON CONFLICT(fbref_id) DO UPDATE statements; rows identical to
+    what's stored are skipped. Teams not stored yet are created in the same
+    transaction, so the football-data.org sync can link them by name.
+    Ratings are then recomputed for every player, since percentiles shift
+    with each new row. Returns inserted/updated/unchanged/rejected counts,
+    how many players' ratings changed and how many teams were created.
+    """
+    scraped = len(df)
+    if df.empty:
+        return {'inserted': 0, 'updated': 0, 'unchanged': 0, 'rejected': 0, 'rerated': 0, 'new_teams': 0}
+
+    df = DataParser.clean_player_data(df)
+    try:
+        team_ids, new_teams = _upsert_teams(df)
+    except Exception:
+        db.session.rollback()
+        raise
+    df['team_id'] = pd.Series([team_ids.get(key, np.nan) for key in _team_keys(df)], index=df.index, dtype=float)
+    df = df[INGEST_COLUMNS]
+
+    existing = _existing_players(df['fbref_id'].tolist())
+    is_new = ~df['fbref_id'].isin(existing.index)
+    changed = _changed_rows(df[~is_new], existing)
+
+    to_write = pd.concat([df[is_new], df[~is_new][changed]])
+    counts = {
+        'inserted': int(is_new.sum()),
+        'updated': int(changed.sum()),
+        'unchanged': int((~changed).sum()),
+        'rejected': scraped - len(df),
+        'rerated': 0,
+        'new_teams': new_teams,
+    }
+    if to_write.empty:
+        if new_teams:
+            db.session.commit()
+        return counts
+
+    to_write = to_write.assign(last_updated=datetime.utcnow())
+    # object dtype so missing values become None rather than NaN/<NA>
+    rows = to_write.astype(object).where(to_write.notna(), None).to_dict('records')
+
+    table = Player.__table__
+    update_columns = [c for c in INGEST_COLUMNS if c != 'fbref_id'] + ['last_updated']
+    try:
+        for start in range(0, len(rows), BATCH_SIZE):
+            stmt = sqlite_insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.fbref_id],
+                set_={c: stmt.excluded[c] for c in update_columns},
+            )
+            db.session.execute(stmt, rows[start:start + BATCH_SIZE])
+        counts['rerated'] = rate_players()['updated']
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    # Core statements don't go through the ORM flush hooks
+    feature_cache.invalidate()
+    player_index.refresh()
+    return counts
+
+
+def _upsert_teams(df):
+    """
+    Map (team name, league) -> Team.id, inserting the teams that aren't
+    stored; returns (mapping, inserted)
+
+    A name only identifies a team within its league: different leagues can
+    have clubs of the same name. Scrapes carry the squad URL (team_url),
+    whose id becomes Team.fbref_id; other sources get a slug of the name,
+    like players without an id, with the league appended when another
+    league already has a team by that name. A team the football-data.org sync
+    created in the same league under another spelling ('Arsenal FC') takes
+    the FBref id instead of being duplicated.
+    """
+    columns = [c for c in ('team', 'league', 'team_url') if c in df.columns]
+    teams = df[columns].dropna(subset=['team']).drop_duplicates(['team', 'league'], keep='last')
+    if teams.empty:
+        return {}, 0
+    keys = _team_keys(teams)
+    known = _team_ids(keys)
+
+    is_new = [key not in known for key in keys]
+    if not any(is_new):
+        return known, 0
+    new = teams[is_new]
+    urls = new['team_url'] if 'team_url' in new.columns else pd.Series(pd.NA, index=new.index)
+    rows = [
+        {'fbref_id': _squad_id(url), 'name': name, 'league': league}
+        for (name, league), url in zip(_team_keys(new), urls)
+    ]
+    _assign_slugs(rows)
+    # A squad stored under another name (e.g. renamed) keeps its row
+    by_fbref_id = _lookup(select(Team.fbref_id, Team.id), Team.fbref_id, [r['fbref_id'] for r in rows])
+    inserts = [r for r in rows if r['fbref_id'] not in by_fbref_id]
+    links = _link_synced_teams(inserts)
+    if links:
+        by_fbref_id.update(links)
+        inserts = [r for r in inserts if r['fbref_id'] not in links]
+    table = Team.__table__
+    for start in range(0, len(inserts), BATCH_SIZE):
+        stmt = sqlite_insert(table).on_conflict_do_nothing(index_elements=[table.c.fbref_id])
+        db.session.execute(stmt, inserts[start:start + BATCH_SIZE])
+    if inserts:
+        by_fbref_id = _lookup(select(Team.fbref_id, Team.id), Team.fbref_id, [r['fbref_id'] for r in rows])
+    known.update(((r['name'], r['league']), by_fbref_id[r['fbref_id']])
+                 for r in rows if r['fbref_id'] in by_fbref_id)
+    return known, len(inserts)
+
+
+def _team_keys(df):
+    """(name, league) of each row, with None for a missing league"""
+    return [(name, None if pd.isna(league) else league) for name, league in zip(df['team'], df['league'])]
+
+
+def _assign_slugs(rows):
+    """
+    Give rows without a squad id the fbref_id 'team_<name>', or
+    'team_<name>_<league>' when a team of another league has that slug or
+    shares the name in this batch
+    """
+    missing = [r for r in rows if r['fbref_id'] is None]
+    if not missing:
+        return
+    slugs = ['team_' + r['name'].lower().replace(' ', '_') for r in missing]
+    taken = _lookup(select(Team.fbref_id, Team.league), Team.fbref_id, sorted(set(slugs)))
+    counts = Counter(slugs)
+    for row, slug in zip(missing, slugs):
+        clash = counts[slug] > 1 or taken.get(slug, row['league']) not in (None, row['league'])
+        row['fbref_id'] = f"{slug}_{row['league'].lower()}" if clash and row['league'] else slug
+
+
+def _link_synced_teams(rows):
+    """
+    Give football-data.org teams (fbref_id 'fd-<id>') with the same league
+    and name key the FBref id of a row; returns {fbref_id: Team.id}
+    """
+    leagues = sorted({r['league'] for r in rows if r['league']})
+    if not leagues:
+        return {}
+    synced = {}
+    for team_id, name, league in db.session.execute(
+        select(Team.id, Team.name, Team.league)
+        .where(Team.fbref_id.like('fd-%'), Team.league.in_(leagues))
+    ).all():
+        synced.setdefault((league, team_name_key(name)), team_id)
+    links = {}
+    for row in rows:
+        team_id = synced.get((row['league'], team_name_key(row['name'])))
+        if team_id is not None and team_id not in links.values():
+            links[row['fbref_id']] = team_id
+    if links:
+        table = Team.__table__
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('b_id')).values(fbref_id=bindparam('b_fbref_id')),
+            [{'b_id': team_id, 'b_fbref_id': fbref_id} for fbref_id, team_id in links.items()],
+        )
+    return links
+
+
+def _squad_id(url):
+    """'18bb7c10' from '/en/squads/18bb7c10/Arsenal-Stats', None otherwise"""
+    if url is None or pd.isna(url):
+        return None
+    match = re.search(r'/squads/([^/]+)', str(url))
+    return match.group(1) if match else None
+
+
+def _team_ids(keys):
+    """Map (team name, league) -> Team.id for the keys that exist"""
+    names = sorted({name for name, _ in keys})
+    wanted = set(keys)
+    rows = []
+    for start in range(0, len(names), LOOKUP_CHUNK):
+        rows.extend(db.session.execute(select(Team.name, Team.league, Team.id)
+                                       .where(Team.name.in_(names[start:start + LOOKUP_CHUNK]))).all())
+    return {(name, league): team_id for name, league, team_id in rows if (name, league) in wanted}
+
+
+def _lookup(stmt, column, values):
+    rows = []
+    for start in range(0, len(values), LOOKUP_CHUNK):
+        rows.extend(db.session.execute(stmt.where(column.in_(values[start:start + LOOKUP_CHUNK]))).all())
+    return dict(rows)
+
+
+def _existing_players(fbref_ids):
+    """Stored values of INGEST_COLUMNS for the given ids, indexed by fbref_id"""
+    table = Player.__table__
+    columns = [table.c[c] for c in INGEST_COLUMNS]
+    rows = []
+    for start in range(0, len(fbref_ids), LOOKUP_CHUNK):
+        chunk = fbref_ids[start:start + LOOKUP_CHUNK]
+        rows.extend(db.session.execute(select(*columns).where(table.c.fbref_id.in_(chunk))).all())
+    return pd.DataFrame(rows, columns=INGEST_COLUMNS).set_index('fbref_id')
+
+
+def _changed_rows(df, existing):
+    """Boolean Series, True where a row differs from its stored version"""
+    if df.empty:
+        return pd.Series(False, index=df.index)
+    old = existing.reindex(df['fbref_id'])
+    changed = np.zeros(len(df), dtype=bool)
+    for col in INGEST_COLUMNS:
+        if col == 'fbref_id':
+            continue
+        new_values = df[col].reset_index(drop=True)
+        old_values = old[col].reset_index(drop=True)
+        if col in PLAYER_TEXT_COLUMNS:
+            new_values, old_values = new_values.astype(object), old_values.astype(object)
+        else:
+            new_values = pd.to_numeric(new_values, errors='coerce').astype(float)
+            old_values = pd.to_numeric(old_values, errors='coerce').astype(float)
+        both_missing = new_values.isna() & old_values.isna()
+        changed |= ((new_values != old_values) & ~both_missing).to_numpy()
+    return pd.Series(changed, index=df.index)
@@ -0,0 +1,477 @@
+"""
+Background jobs on a SQLite-backed queue
+
+The web process only inserts rows into the jobs table; worker processes
+(python worker.py, which the gunicorn master starts with JOB_WORKERS, or
+owned by the dev/waitress server) claim the oldest queued job with a
+compare-and-set UPDATE, run it and write progress, result or error back.
+No broker is involved, so anything that can reach the database can
+submit or watch jobs.
+
+Cancellation is cooperative: a queued job is cancelled at once, a running
+one stops the next time its handler reports progress.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import traceback
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import OperationalError
+
+from .db import db, migrate, write_transaction, Job
+
+STATUSES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+FINISHED = ('succeeded', 'failed', 'cancelled')
+POLL_INTERVAL = 1.0  # seconds an idle worker waits between queue checks
+PROGRESS_INTERVAL = 0.5  # minimum seconds between progress writes
+MAX_LIST_LIMIT = 500
+# Ingest jobs only read files from here; job params come from the (unauthenticated) API
+INGEST_DIR = os.getenv('INGEST_DIR', 'ingest')
+INGEST_EXTENSIONS = ('.csv', '.parquet')
+
+HANDLERS = {}
+VALIDATORS = {}
+
+
+def job_worker_processes():
+    """
+    How many job worker processes a server starts itself: JOB_WORKERS,
+    default 1; 0 when worker.py runs separately
+    """
+    return int(os.getenv('JOB_WORKERS', 1))
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job_handler(kind, validate=None):
+    """
+    Register fn(ctx, **params) as the handler for a job kind; validate(params)
+    runs at submit time and raises ValueError for params it rejects
+    """
+    def register(fn):
+        HANDLERS[kind] = fn
+        if validate is not None:
+            VALIDATORS[kind] = validate
+        return fn
+    return register
+
+
+# ---- queue ----
+def submit(kind, params=None):
+    """Queue a job and return its id; raises ValueError for unknown kinds or invalid params"""
+    if kind not in HANDLERS:
+        raise ValueError(f"kind must be one of {', '.join(sorted(HANDLERS))}")
+    if kind in VALIDATORS:
+        VALIDATORS[kind](params or {})
+    job = Job(kind=kind, status='queued', params=json.dumps(params or {}),
+              progress=json.dumps({'done': 0, 'total': None, 'message': 'queued'}))
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def get_job(job_id):
+    job = db.session.get(Job, job_id)
+    return None if job is None else job_to_dict(job)
+
+
+def list_jobs(status=None, kind=None, limit=50):
+    stmt = select(Job).order_by(Job.id.desc()).limit(max(1, min(int(limit), MAX_LIST_LIMIT)))
+    if status:
+        stmt = stmt.where(Job.status == status)
+    if kind:
+        stmt = stmt.where(Job.kind == kind)
+    return [job_to_dict(job, with_result=False) for job in db.session.execute(stmt).scalars()]
+
+
+def cancel(job_id):
+    """Cancel a job; returns its new state, or None if it doesn't exist"""
+    now = datetime.utcnow()
+    with db.engine.begin() as conn:
+        # Queued jobs never start; running ones see the flag at their next progress report
+        conn.execute(update(Job).where(Job.id == job_id, Job.status == 'queued')
+                     .values(status='cancelled', cancel_requested=True, finished_at=now))
+        conn.execute(update(Job).where(Job.id == job_id, Job.status == 'running')
+                     .values(cancel_requested=True))
+    db.session.expire_all()
+    return get_job(job_id)
+
+
+def job_to_dict(job, with_result=True):
+    row = {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'params': json.loads(job.params or '{}'),
+        'progress': json.loads(job.progress or '{}'),
+        'cancel_requested': bool(job.cancel_requested),
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if with_result:
+        row['result'] = json.loads(job.result) if job.result else None
+        row['error'] = job.error
+    return row
+
+
+def claim_next(worker_name):
+    """Atomically move the oldest queued job to running; returns (id, kind, params) or None"""
+    with write_transaction() as conn:
+        candidates = conn.execute(
+            select(Job.id).where(Job.status == 'queued').order_by(Job.id).limit(5)
+        ).scalars().all()
+        for job_id in candidates:
+            claimed = conn.execute(
+                update(Job).where(Job.id == job_id, Job.status == 'queued')
+                .values(status='running', worker=worker_name, started_at=datetime.utcnow())
+            ).rowcount
+            if claimed:
+                row = conn.execute(select(Job.kind, Job.params).where(Job.id == job_id)).one()
+                return job_id, row.kind, json.loads(row.params or '{}')
+    return None
+
+
+def _finish(job_id, status, result=None, error=None):
+    with db.engine.begin() as conn:
+        conn.execute(update(Job).where(Job.id == job_id).values(
+            status=status, finished_at=datetime.utcnow(), error=error,
+            result=None if result is None else json.dumps(result, default=str),
+        ))
+
+
+def recover_orphans():
+    """Fail running jobs whose worker process on this host has died"""
+    host = socket.gethostname()
+    with db.engine.begin() as conn:
+        running = conn.execute(select(Job.id, Job.worker).where(Job.status == 'running')).all()
+        for job_id, worker in running:
+            worker_host, _, pid = (worker or '').rpartition(':')
+            if worker_host == host and pid.isdigit() and not _pid_alive(int(pid)):
+                conn.execute(update(Job).where(Job.id == job_id, Job.status == 'running').values(
+                    status='failed', error='Worker process exited', finished_at=datetime.utcnow()))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobContext:
+    """Passed to handlers for progress reports and cancellation checks"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._last_write = 0.0
+
+    def progress(self, done=None, total=None, message=None):
+        """Record progress; raises JobCancelled if the job was cancelled"""
+        now = time.monotonic()
+        # Throttle counted ticks; stage changes and the last tick always go through
+        tick = done is not None and done != total
+        if tick and now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(update(Job).where(Job.id == self.job_id).values(
+                    progress=json.dumps({'done': done, 'total': total, 'message': message})))
+                cancelled = conn.execute(select(Job.cancel_requested).where(Job.id == self.job_id)).scalar()
+        except OperationalError as e:
+            # Progress is best effort; don't fail the job over a busy database
+            print(f"Job {self.job_id}: progress not recorded ({e})")
+            return
+        if cancelled:
+            raise JobCancelled()
+
+
+def run_job(job_id, kind, params):
+    """Run one claimed job to completion in this process"""
+    ctx = JobContext(job_id)
+    started = time.monotonic()
+    try:
+        result = HANDLERS[kind](ctx, **params)
+    except JobCancelled:
+        _finish(job_id, 'cancelled')
+        print(f"Job {job_id} ({kind}) cancelled")
+    except Exception as e:
+        db.session.rollback()
+        _finish(job_id, 'failed', error=f"{e}\n{traceback.format_exc(limit=5)}")
+        print(f"Job {job_id} ({kind}) failed: {e}")
+    else:
+        _finish(job_id, 'succeeded', result=result)
+        print(f"Job {job_id} ({kind}) finished in {time.monotonic() - started:.1f}s")
+    finally:
+        db.session.remove()
+
+
+# ---- workers ----
+def _worker_main(app_factory, poll_interval):
+    # The parent handles shutdown; a job in progress is failed by recover_orphans
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    app = app_factory()
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    with app.app_context():
+        while True:
+            claimed = claim_next(name)
+            if claimed is None:
+                time.sleep(poll_interval)
+                continue
+            run_job(*claimed)
+
+
+class JobWorkerPool:
+    """
+    Worker processes pulling from the jobs table
+
+    Workers aren't daemonic because training and simulations start their own
+    process pools.
+    """
+
+    def __init__(self, app_factory, processes=2, poll_interval=POLL_INTERVAL):
+        self.app_factory = app_factory
+        self.processes = processes
+        self.poll_interval = poll_interval
+        self._workers = []
+
+    def start(self):
+        app = self.app_factory()
+        with app.app_context():
+            migrate()
+            recover_orphans()
+        for _ in range(self.processes):
+            worker = multiprocessing.Process(target=_worker_main, name='job-worker',
+                                             args=(self.app_factory, self.poll_interval))
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, timeout=5):
+        for worker in self._workers:
+            worker.terminate()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def join(self):
+        for worker in self._workers:
+            worker.join()
+
+
+# ---- handlers ----
+@job_handler('scrape')
+def scrape_job(ctx, league_urls=None, max_workers=4, snapshot=True):
+    """Scrape FBref leagues and ingest the players; progress per team"""
+    from scraper.fbref_scraper import FBrefScraper
+    from scraper.scheduler import ScrapeScheduler
+    from .ingest import ingest_players
+    from .team_features import sync_match_features
+
+    league_urls = league_urls or ['/en/comps/9/Premier-League-Stats']
+    ctx.progress(0, None, f"Fetching {len(league_urls)} league table(s)")
+    checkpoint = scrape_checkpoint_path(league_urls)
+    os.makedirs(os.path.dirname(checkpoint), exist_ok=True)
+    scheduler = ScrapeScheduler(
+        FBrefScraper(), max_workers=max_workers, checkpoint_path=checkpoint,
+        progress=lambda done, total, team: ctx.progress(done, total, f"Scraped {team}"),
+    )
+    data = scheduler.run(league_urls)
+    if snapshot and not data.empty:
+        _snapshot_scrape(data)
+    ctx.progress(None, None, f"Ingesting {len(data)} players")
+    counts = ingest_players(data)
+    if not scheduler.errors:
+        # Everything is stored; a later scrape of these leagues fetches afresh
+        os.remove(checkpoint)
+    return dict(counts, errors=scheduler.errors, features=sync_match_features())
+
+
+def scrape_checkpoint_path(league_urls, day=None):
+    """
+    Checkpoint file for scraping these leagues on this (UTC) day
+
+    Keyed on the leagues rather than the job, so resubmitting a scrape that
+    failed, was cancelled or had failed pages resumes from the pages already
+    fetched; the next day's scrape starts over.
+    """
+    key = hashlib.sha1('\n'.join(sorted(set(league_urls))).encode('utf-8')).hexdigest()[:16]
+    day = day or datetime.utcnow().date()
+    return os.path.join('cache', 'jobs', f"scrape-{day:%Y%m%d}-{key}.jsonl")
+
+
+def _snapshot_scrape(data):
+    """Keep the scraped frame as Parquet, one partition per league and scrape date"""
+    from scraper.data_parser import DataParser
+    from . import snapshots
+
+    if not snapshots.available():
+        return
+    frame = DataParser.clean_player_data(data).assign(scraped_on=datetime.utcnow().date().isoformat())
+    snapshots.write_frame('fbref_players', frame, ['league', 'scraped_on'])
+
+
+@job_handler('fd_sync')
+def football_data_sync_job(ctx, competitions=None, full=False, max_workers=4):
+    """
+    Sync teams, fixtures and results from football-data.org, then rate the
+    new results; progress per competition
+    """
+    from .football_data_sync import sync_competitions
+    from .team_features import sync_match_features
+
+    ctx.progress(0, None, "Fetching competitions")
+    result = sync_competitions(
+        competitions, full=full, max_workers=max_workers,
+        progress=lambda done, total, code: ctx.progress(done, total, f"Synced {code}"),
+    )
+    ctx.progress(None, None, "Rating new results")
+    return dict(result, features=sync_match_features())
+
+
+def resolve_ingest_path(path):
+    """
+    Absolute path of a file in INGEST_DIR named by a relative path; raises
+    ValueError for absolute paths, '..' and anything resolving outside it
+    """
+    if not isinstance(path, str) or not path:
+        raise ValueError("path must be a file name in the ingest directory")
+    parts = path.replace('\\', '/').split('/')
+    if os.path.isabs(path) or os.path.splitdrive(path)[0] or '..' in parts:
+        raise ValueError("path must be relative to the ingest directory, without '..'")
+    if not path.lower().endswith(INGEST_EXTENSIONS):
+        raise ValueError(f"path must be one of {', '.join(INGEST_EXTENSIONS)}")
+    root = os.path.realpath(INGEST_DIR)
+    resolved = os.path.realpath(os.path.join(root, path))
+    # Symlinks inside the directory can still point elsewhere
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError("path must be inside the ingest directory")
+    return resolved
+
+
+def _validate_ingest(params):
+    resolve_ingest_path(params.get('path'))
+
+
+@job_handler('ingest', validate=_validate_ingest)
+def ingest_job(ctx, path):
+    """Ingest player rows from a CSV or Parquet file in INGEST_DIR"""
+    import pandas as pd
+    from .ingest import ingest_players
+    from .team_features import sync_match_features
+
+    ctx.progress(0, 2, f"Reading {path}")
+    # Checked again: the file may have been swapped for a symlink since submit
+    resolved = resolve_ingest_path(path)
+    data = pd.read_parquet(resolved) if resolved.lower().endswith('.parquet') else pd.read_csv(resolved)
+    ctx.progress(1, 2, f"Ingesting {len(data)} players")
+    counts = ingest_players(data)
+    # Results stored outside a sync (e.g. before an upgrade) get rated here too
+    counts['features'] = sync_match_features()
+    ctx.progress(2, 2, "Done")
+    return counts
+
+
+@job_handler('rate')
+def rate_job(ctx):
+    """Recompute every player's overall/potential (ingestion does this already)"""
+    from .player_ratings import rate_players
+    from .player_index import player_index
+
+    ctx.progress(0, 1, "Rating players")
+    try:
+        counts = rate_players()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    player_index.refresh()
+    ctx.progress(1, 1, "Done")
+    return counts
+
+
+@job_handler('team_ratings')
+def team_ratings_job(ctx):
+    """Replay the full match history into the Elo team ratings and rolling team state"""
+    from .feature_store import feature_store
+    from .team_strength import team_strength
+    from .team_features import record_features_change
+
+    ctx.progress(0, 2, "Rating teams")
+    matches = team_strength.rebuild()
+    ctx.progress(1, 2, "Rebuilding team form")
+    feature_store.rebuild()
+    record_features_change(matches)
+    ctx.progress(2, 2, "Done")
+    return {'matches': matches}
+
+
+@job_handler('snapshot')
+def snapshot_job(ctx, tables=None, training_rows=True):
+    """Export database tables (and the training rows) to Parquet snapshots"""
+    from . import snapshots
+
+    tables = tables or list(snapshots.TABLES)
+    total = len(tables) + bool(training_rows)
+    rows = {}
+    for done, name in enumerate(tables):
+        ctx.progress(done, total, f"Exporting {name}")
+        rows[name] = snapshots.export_table(name)['rows']
+    if training_rows:
+        ctx.progress(len(tables), total, "Exporting training rows")
+        rows['training_rows'] = snapshots.export_training_rows()['rows']
+    ctx.progress(total, total, "Done")
+    return {'rows': rows, 'directory': os.path.abspath(snapshots.SNAPSHOT_DIR)}
+
+
+@job_handler('train')
+def train_job(ctx, jobs=None, budget=None, splits=4, families=None):
+    """Retrain MatchPredictor on the match history and activate the new version"""
+    from .feature_store import feature_store
+    from .predictor import predictor
+
+    ctx.progress(0, 2, "Building training rows")
+    rows = feature_store.training_rows(predictor.feature_columns)
+    ctx.progress(1, 2, f"Searching models on {len(rows)} matches")
+    version = predictor.train(rows, n_jobs=jobs, time_budget=budget, n_splits=splits, families=families)
+    if version is None:
+        raise RuntimeError("Training did not produce a new model")
+    ctx.progress(2, 2, "Done")
+    return {'version': version, 'metrics': predictor.registry.meta(version)['metrics']}
+
+
+@job_handler('simulate')
+def simulate_job(ctx, league, season=None, sims=100000, seed=None, mode='model'):
+    """Monte Carlo projection of a league season"""
+    from .season_sim import load_season, simulate_season
+
+    ctx.progress(0, 2, f"Loading {league} fixtures")
+    inputs = load_season(league, season, mode)
+    if inputs is None:
+        raise ValueError(f"Unknown league: {league}")
+    ctx.progress(1, 2, f"Simulating {sims} seasons")
+    result = simulate_season(inputs, n_sims=sims, seed=seed, mode=mode)
+    ctx.progress(2, 2, "Done")
+    return dict(result, league=league)
+
+
+@job_handler('precompute')
+def precompute_job(ctx):
+    """Store predictions for every upcoming match"""
+    from .prediction_cache import precompute_upcoming
+
+    ctx.progress(0, 1, "Predicting upcoming matches")
+    count = precompute_upcoming()
+    ctx.progress(1, 1, "Done")
+    return {'fixtures': count}
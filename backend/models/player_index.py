@@ -0,0 +1,232 @@
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+from .db import Player, read_connection
+from .player_queries import players_version
+
+# Player columns held in the index, in matrix column order
+METRICS = ['goals', 'assists', 'xG', 'xA', 'progressive_passes',
+           'progressive_carries', 'tackles', 'interceptions']
+# API names for METRICS (matching Player.to_dict where it has them)
+METRIC_NAMES = ['goals', 'assists', 'xg', 'xa', 'progressive_passes',
+                'progressive_carries', 'tackles', 'interceptions']
+POSITION_CODES = ['GK', 'DF', 'MF', 'FW']
+
+# Below this many minutes per-90 rates are mostly noise
+DEFAULT_MIN_MINUTES = 450
+
+
+class _Snapshot:
+    """Immutable column arrays; queries read one snapshot without locking"""
+
+    def __init__(self, ids, names, teams, leagues, positions, ages, minutes, raw, last_updated):
+        self.ids = ids
+        self.names = names
+        self.teams = teams
+        self.leagues = leagues
+        self.positions = positions
+        self.ages = ages
+        self.minutes = minutes
+        self.raw = raw
+        self.last_updated = last_updated
+        self.row_of = {int(player_id): row for row, player_id in enumerate(ids)}
+
+        nineties = minutes / 90.0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.per90 = np.where(nineties[:, None] > 0, raw / nineties[:, None], 0.0)
+        # Standardized per-90 profile used for similarity
+        mean = self.per90.mean(axis=0) if len(ids) else np.zeros(len(METRICS))
+        std = self.per90.std(axis=0) if len(ids) else np.ones(len(METRICS))
+        self.profile = ((self.per90 - mean) / np.where(std > 0, std, 1.0)).astype(np.float32)
+        self.profile_sq = (self.profile ** 2).sum(axis=1)
+        self.position_flags = {
+            code: np.char.find(positions.astype(str), code) >= 0 for code in POSITION_CODES
+        }
+
+
+class PlayerIndex:
+    """
+    Read-optimized NumPy column store of player metrics for scouting queries
+
+    Loaded lazily on first use; refresh() pulls only rows whose last_updated
+    moved since the previous load, so it's cheap to call after each ingest.
+    Ingest runs in job workers, so queries also compare players_version()
+    with the loaded one every reload_interval seconds and refresh when
+    another process changed the table. Rows deleted from the players table
+    stay until rebuild().
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._version = None
+        self._last_check = 0.0
+        self.reload_interval = 5  # seconds between checks for players changed elsewhere
+
+    @property
+    def loaded(self):
+        return self._snapshot is not None
+
+    def ensure_loaded(self):
+        if self._snapshot is None:
+            self.rebuild()
+        elif time.monotonic() - self._last_check >= self.reload_interval:
+            self._last_check = time.monotonic()
+            if players_version() != self._version:
+                self.refresh()
+        return self._snapshot
+
+    def rebuild(self):
+        """Load every player from the DB"""
+        with self._lock:
+            # Version first: a write landing during the fetch is picked up by the next check
+            version = players_version()
+            self._snapshot = self._build(self._fetch(None), None)
+            self._version, self._last_check = version, time.monotonic()
+
+    def refresh(self):
+        """Merge players updated since the last load; no-op until first loaded"""
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return
+            version = players_version()
+            rows = self._fetch(snapshot.last_updated)
+            if rows:
+                self._snapshot = self._build(rows, snapshot)
+            self._version, self._last_check = version, time.monotonic()
+
+    def __len__(self):
+        return 0 if self._snapshot is None else len(self._snapshot.ids)
+
+    # ---- queries ----
+    def similar(self, player_id, k=10, **filters):
+        """k players with the closest standardized per-90 profile to player_id"""
+        snap = self.ensure_loaded()
+        row = snap.row_of.get(int(player_id))
+        if row is None:
+            return None
+        filters.setdefault('min_minutes', DEFAULT_MIN_MINUTES)
+        mask = self._mask(snap, **filters)
+        mask[row] = False
+
+        # |a - b|^2 = |a|^2 + |b|^2 - 2ab, one matrix-vector product over all players
+        target = snap.profile[row]
+        sq_distances = snap.profile_sq - 2 * (snap.profile @ target) + snap.profile_sq[row]
+        candidates = np.flatnonzero(mask)
+        top = self._top_k(candidates, -sq_distances[candidates], k)
+        return [dict(self._row_dict(snap, i, per90=True),
+                     distance=round(float(np.sqrt(max(sq_distances[i], 0.0))), 4))
+                for i in top]
+
+    def search(self, sort='xg', per90=True, k=20, **filters):
+        """Top-k players by a metric after vectorized filtering"""
+        if sort not in METRIC_NAMES:
+            raise ValueError(f"sort must be one of {', '.join(METRIC_NAMES)}")
+        snap = self.ensure_loaded()
+        if per90:
+            filters.setdefault('min_minutes', DEFAULT_MIN_MINUTES)
+        mask = self._mask(snap, **filters)
+
+        values = (snap.per90 if per90 else snap.raw)[:, METRIC_NAMES.index(sort)]
+        candidates = np.flatnonzero(mask)
+        top = self._top_k(candidates, values[candidates], k)
+        return [self._row_dict(snap, i, per90=per90) for i in top]
+
+    # ---- internals ----
+    @staticmethod
+    def _mask(snap, league=None, team=None, position=None, min_age=None,
+              max_age=None, min_minutes=None):
+        mask = np.ones(len(snap.ids), dtype=bool)
+        if league:
+            mask &= snap.leagues == league
+        if team:
+            mask &= snap.teams == team
+        if position:
+            codes = [c.strip().upper() for c in position.split(',') if c.strip()]
+            unknown = [c for c in codes if c not in snap.position_flags]
+            if unknown:
+                raise ValueError(f"Unknown positions: {', '.join(unknown)}")
+            mask &= np.logical_or.reduce([snap.position_flags[c] for c in codes])
+        # NaN ages fail both comparisons, so unknown ages drop out of age filters
+        if min_age is not None:
+            mask &= snap.ages >= min_age
+        if max_age is not None:
+            mask &= snap.ages <= max_age
+        if min_minutes is not None:
+            mask &= snap.minutes >= min_minutes
+        return mask
+
+    @staticmethod
+    def _top_k(candidates, scores, k):
+        """Candidate rows with the k highest scores, best first"""
+        if len(candidates) == 0 or k <= 0:
+            return []
+        if len(candidates) > k:
+            part = np.argpartition(-scores, k - 1)[:k]
+            candidates, scores = candidates[part], scores[part]
+        return candidates[np.argsort(-scores, kind='stable')]
+
+    @staticmethod
+    def _row_dict(snap, i, per90):
+        values = snap.per90[i] if per90 else snap.raw[i]
+        row = {
+            'id': int(snap.ids[i]),
+            'name': snap.names[i],
+            'team': snap.teams[i],
+            'league': snap.leagues[i],
+            'position': snap.positions[i],
+            'age': None if np.isnan(snap.ages[i]) else int(snap.ages[i]),
+            'minutes': int(snap.minutes[i]),
+        }
+        row.update({name: round(float(v), 3) for name, v in zip(METRIC_NAMES, values)})
+        row['per90'] = per90
+        return row
+
+    @staticmethod
+    def _fetch(since):
+        columns = [Player.id, Player.name, Player.team, Player.league, Player.position,
+                   Player.age, Player.minutes, Player.last_updated] + [getattr(Player, m) for m in METRICS]
+        stmt = select(*columns)
+        if since is not None:
+            stmt = stmt.where(Player.last_updated > since)
+        with read_connection() as conn:
+            return conn.execute(stmt).all()
+
+    @staticmethod
+    def _build(rows, previous):
+        n_fixed = 8
+        ids = np.array([r[0] for r in rows], dtype=np.int64)
+        names = np.array([r[1] for r in rows], dtype=object)
+        teams = np.array([r[2] for r in rows], dtype=object)
+        leagues = np.array([r[3] for r in rows], dtype=object)
+        positions = np.array([r[4] or '' for r in rows], dtype=object)
+        ages = np.array([np.nan if r[5] is None else r[5] for r in rows], dtype=float)
+        minutes = np.array([r[6] or 0 for r in rows], dtype=float)
+        raw = np.array([[v or 0 for v in r[n_fixed:]] for r in rows], dtype=float).reshape(len(rows), len(METRICS))
+        stamps = [r[7] for r in rows if r[7] is not None]
+        last_updated = max(stamps) if stamps else None
+
+        if previous is not None:
+            # Overwrite updated players in place, append new ones
+            existing = np.array([previous.row_of.get(int(i), -1) for i in ids], dtype=np.int64)
+            update, new = existing >= 0, existing < 0
+            columns = []
+            for old, fresh in ((previous.ids, ids), (previous.names, names), (previous.teams, teams),
+                               (previous.leagues, leagues), (previous.positions, positions),
+                               (previous.ages, ages), (previous.minutes, minutes), (previous.raw, raw)):
+                merged = old.copy()
+                merged[existing[update]] = fresh[update]
+                columns.append(np.concatenate([merged, fresh[new]]))
+            if previous.last_updated is not None:
+                last_updated = max(filter(None, [last_updated, previous.last_updated]))
+            return _Snapshot(*columns, last_updated)
+
+        return _Snapshot(ids, names, teams, leagues, positions, ages, minutes, raw, last_updated)
+
+
+player_index = PlayerIndex()
+
@@ -0,0 +1,199 @@
+import base64
+import json
+
+from sqlalchemy import func, select, tuple_, or_
+
+from .db import Player, read_connection
+
+# API field name -> Player column; the first block matches Player.to_dict()
+PLAYER_FIELDS = {
+    'id': Player.id,
+    'name': Player.name,
+    'position': Player.position,
+    'team': Player.team,
+    'age': Player.age,
+    'goals': Player.goals,
+    'assists': Player.assists,
+    'xg': Player.xG,
+    'xa': Player.xA,
+    'overall': Player.overall,
+    'potential': Player.potential,
+
+    'fbref_id': Player.fbref_id,
+    'league': Player.league,
+    'nationality': Player.nationality,
+    'minutes': Player.minutes,
+    'games_played': Player.games_played,
+    'starts': Player.starts,
+    'progressive_passes': Player.progressive_passes,
+    'progressive_carries': Player.progressive_carries,
+    'tackles': Player.tackles,
+    'interceptions': Player.interceptions,
+}
+DEFAULT_FIELDS = ['id', 'name', 'position', 'team', 'age', 'goals', 'assists',
+                  'xg', 'xa', 'overall', 'potential']
+
+SORT_FIELDS = {
+    'id': Player.id,
+    'goals': Player.goals,
+    'xg': Player.xG,
+    'xa': Player.xA,
+    'overall': Player.overall,
+}
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def query_players(args):
+    """
+    Filtered, sorted, keyset-paginated player listing
+
+    args: mapping of query string parameters
+      league, team, position   exact league/team; position matches any listed code
+      min_age, max_age, min_minutes
+      sort                     one of SORT_FIELDS, default id
+      order                    asc or desc (default desc for metrics, asc for id)
+      limit, cursor            page size and the cursor returned with the last page
+      fields                   comma separated subset of PLAYER_FIELDS
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    Raises ValueError for invalid parameters.
+    """
+    fields = _parse_fields(args.get('fields'))
+    sort, order = _sort_args(args)
+    limit = min(_int_arg(args, 'limit', DEFAULT_LIMIT), MAX_LIMIT)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+
+    sort_col = SORT_FIELDS[sort]
+    # The cursor needs the sort key and id even when they weren't asked for;
+    # they go after the requested fields so rows can be zipped with fields
+    selected = list(dict.fromkeys(fields + ['id', sort]))
+    stmt = _filter(select(*[PLAYER_FIELDS[f].label(f) for f in selected]), args, sort)
+
+    cursor = args.get('cursor')
+    if cursor:
+        last_value, last_id = _decode_cursor(cursor)
+        key = tuple_(sort_col, Player.id) if sort != 'id' else Player.id
+        last = tuple_(last_value, last_id) if sort != 'id' else last_id
+        stmt = stmt.where(key < last if order == 'desc' else key > last)
+
+    stmt = _order(stmt, sort, order)
+    # One extra row tells us whether there is another page
+    with read_connection() as conn:
+        rows = conn.execute(stmt.limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(last[selected.index(sort)], last[selected.index('id')])
+
+    return [dict(zip(fields, row)) for row in rows], next_cursor
+
+
+def export_query(args):
+    """
+    (fields, statement) for every player matching the query_players filters,
+    in the requested order; for streaming, so limit and cursor are ignored
+    """
+    fields = _parse_fields(args.get('fields'))
+    sort, order = _sort_args(args)
+    stmt = _filter(select(*[PLAYER_FIELDS[f].label(f) for f in fields]), args, sort)
+    return fields, _order(stmt, sort, order)
+
+
+_VERSION_QUERY = select(select(func.max(Player.last_updated)).scalar_subquery(),
+                        select(func.max(Player.id)).scalar_subquery())
+
+
+def players_version():
+    """
+    Changes whenever players are added or re-ingested (ingest stamps
+    last_updated); two index lookups, so it's cheap enough to check before
+    answering a request from the client's cache
+    """
+    with read_connection() as conn:
+        # One subquery per max: SQLite only answers a lone min()/max() from the
+        # end of an index; both in one SELECT scan the whole index
+        last_updated, max_id = conn.execute(_VERSION_QUERY).one()
+    return f"{last_updated.isoformat() if last_updated else ''}:{max_id or 0}"
+
+
+def _sort_args(args):
+    sort = args.get('sort', 'id')
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_FIELDS)}")
+    order = args.get('order', 'asc' if sort == 'id' else 'desc')
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be asc or desc")
+    return sort, order
+
+
+def _filter(stmt, args, sort):
+    if args.get('league'):
+        stmt = stmt.where(Player.league == args['league'])
+    if args.get('team'):
+        stmt = stmt.where(Player.team == args['team'])
+    if args.get('position'):
+        codes = [p.strip().upper() for p in args['position'].split(',') if p.strip()]
+        stmt = stmt.where(or_(*[Player.position.contains(code) for code in codes]))
+    if args.get('min_age') is not None:
+        stmt = stmt.where(Player.age >= _int_arg(args, 'min_age'))
+    if args.get('max_age') is not None:
+        stmt = stmt.where(Player.age <= _int_arg(args, 'max_age'))
+    if args.get('min_minutes') is not None:
+        stmt = stmt.where(Player.minutes >= _int_arg(args, 'min_minutes'))
+    if sort != 'id':
+        # NULLs can't take part in a keyset comparison; unrated players drop out of rankings
+        stmt = stmt.where(SORT_FIELDS[sort].isnot(None))
+    return stmt
+
+
+def _order(stmt, sort, order):
+    sort_col = SORT_FIELDS[sort]
+    if order == 'desc':
+        return stmt.order_by(sort_col.desc(), Player.id.desc())
+    return stmt.order_by(sort_col.asc(), Player.id.asc())
+
+
+def _parse_fields(value):
+    if not value:
+        return list(DEFAULT_FIELDS)
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in PLAYER_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(fields))
+
+
+def _int_arg(args, name, default=None):
+    value = args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+
+
+def _encode_cursor(sort_value, player_id):
+    raw = json.dumps([sort_value, player_id]).encode('utf-8')
+    # Unpadded, so the cursor needs no escaping in a query string
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor):
+    """(sort value, player id) of a cursor; raises ValueError unless both are numbers"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii') + b'=' * (-len(cursor) % 4))
+        sort_value, player_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    # Sort keys are numeric columns; anything else (e.g. null) would silently
+    # compare as no rows or all rows
+    if (not isinstance(sort_value, (int, float)) or isinstance(sort_value, bool)
+            or not isinstance(player_id, int) or isinstance(player_id, bool)):
+        raise ValueError("Invalid cursor")
+    return sort_value, player_id
@@ -0,0 +1,137 @@
+"""
+Position- and league-aware player ratings computed from per-90 metrics
+
+Every player is ranked against the others in the same league and position
+group (primary FBref position code) on the per-90 rates of the group's
+metrics plus minutes played. The weighted percentile is shrunk towards the
+middle for players with few minutes, scaled by league strength and mapped
+to 0-100. Potential adds the growth still expected at the player's age.
+The whole table is rated in one pandas/NumPy pass.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, select, update
+
+from .db import db, Player
+from services.leagues import league_key
+
+# Per-90 metric weights per position group; goalkeepers are rated on minutes alone
+POSITION_WEIGHTS = {
+    'GK': {},
+    'DF': {'tackles': 0.8, 'interceptions': 0.8, 'progressive_passes': 0.5,
+           'progressive_carries': 0.3, 'xA': 0.2},
+    'MF': {'progressive_passes': 0.8, 'xA': 0.6, 'progressive_carries': 0.5,
+           'tackles': 0.4, 'interceptions': 0.4, 'xG': 0.3},
+    'FW': {'xG': 1.0, 'xA': 0.6, 'progressive_carries': 0.4, 'progressive_passes': 0.2},
+}
+METRICS = ['xG', 'xA', 'progressive_passes', 'progressive_carries', 'tackles', 'interceptions']
+MINUTES_WEIGHT = 0.6      # weight of the playing time percentile in every group
+SHRINK_MINUTES = 900      # minutes at which half of a player's percentile counts
+
+# League keys (services.leagues.league_key) -> rating multiplier
+LEAGUE_STRENGTH = {
+    'Premier-League-Stats': 1.0,
+    'La-Liga-Stats': 0.98,
+    'Bundesliga-Stats': 0.97,
+    'Serie-A-Stats': 0.97,
+    'Ligue-1-Stats': 0.95,
+}
+DEFAULT_LEAGUE_STRENGTH = 0.88
+
+RATING_MIN = 45
+RATING_MAX = 92
+POTENTIAL_MAX = 99
+# Rating points still expected to come at each age, before headroom scaling
+GROWTH_AGES = [16, 18, 20, 22, 24, 26, 28]
+GROWTH_POINTS = [18, 14, 10, 6, 3, 1, 0]
+
+RATING_COLUMNS = ['id', 'position', 'league', 'age', 'minutes', 'overall', 'potential'] + METRICS
+
+
+def position_groups(positions):
+    """Primary position code ('DF,MF' -> 'DF'); unknown positions count as midfielders"""
+    primary = positions.fillna('').astype(str).str.split(',', n=1).str[0].str.strip().str.upper()
+    return primary.where(primary.isin(list(POSITION_WEIGHTS)), 'MF')
+
+
+def compute_ratings(df):
+    """
+    (overall, potential) integer arrays for a frame with RATING_COLUMNS
+    (id, overall and potential aren't needed)
+    """
+    n = len(df)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    minutes = pd.to_numeric(df['minutes'], errors='coerce').fillna(0).clip(lower=0).to_numpy(float)
+    nineties = minutes / 90.0
+    frame = pd.DataFrame({
+        # Rows stored before leagues were normalized may hold a URL part such as '9'
+        'league': df['league'].map(league_key, na_action='ignore').fillna('').astype(str).to_numpy(),
+        'group': position_groups(df['position']).to_numpy(),
+        'minutes': minutes,
+    })
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for metric in METRICS:
+            raw = pd.to_numeric(df[metric], errors='coerce').fillna(0).to_numpy(float)
+            frame[metric] = np.where(nineties > 0, raw / nineties, 0.0)
+
+    # Percentile within league and position group for every column at once
+    ranked = frame.groupby(['league', 'group'], sort=False)[['minutes'] + METRICS].rank(pct=True)
+
+    weights = np.zeros((n, len(METRICS)))
+    for group, group_weights in POSITION_WEIGHTS.items():
+        rows = (frame['group'] == group).to_numpy()
+        for metric, w in group_weights.items():
+            weights[rows, METRICS.index(metric)] = w
+    score = (ranked[METRICS].to_numpy() * weights).sum(axis=1) + MINUTES_WEIGHT * ranked['minutes'].to_numpy()
+    score /= weights.sum(axis=1) + MINUTES_WEIGHT
+
+    # Few minutes say little about a player, so pull their score towards the middle
+    reliability = minutes / (minutes + SHRINK_MINUTES)
+    score = 0.5 + (score - 0.5) * reliability
+
+    strength = frame['league'].map(LEAGUE_STRENGTH).fillna(DEFAULT_LEAGUE_STRENGTH).to_numpy()
+    overall = np.rint(RATING_MIN + (RATING_MAX - RATING_MIN) * score * strength)
+
+    age = pd.to_numeric(df['age'], errors='coerce').to_numpy(float)
+    growth = np.where(np.isnan(age), 0.0, np.interp(age, GROWTH_AGES, GROWTH_POINTS))
+    # Players already near the top have less room left to grow
+    headroom = np.clip((POTENTIAL_MAX - overall) / (POTENTIAL_MAX - RATING_MIN), 0.0, 1.0)
+    potential = np.minimum(POTENTIAL_MAX, np.rint(overall + growth * headroom))
+    return overall.astype(np.int64), potential.astype(np.int64)
+
+
+def rate_players():
+    """
+    Recompute overall/potential for every player in the current session
+
+    Only rows whose ratings changed are written (and get a new
+    last_updated, so the player index and ETags notice). The caller
+    commits. Returns rated/updated counts.
+    """
+    table = Player.__table__
+    rows = db.session.execute(select(*[table.c[c] for c in RATING_COLUMNS])).all()
+    df = pd.DataFrame(rows, columns=RATING_COLUMNS)
+    overall, potential = compute_ratings(df)
+    if df.empty:
+        return {'rated': 0, 'updated': 0}
+
+    old_overall = pd.to_numeric(df['overall'], errors='coerce').to_numpy(float)
+    old_potential = pd.to_numeric(df['potential'], errors='coerce').to_numpy(float)
+    # NaN != x, so unrated players always count as changed
+    changed = np.flatnonzero((old_overall != overall) | (old_potential != potential))
+    if len(changed):
+        now = datetime.utcnow()
+        stmt = (update(table).where(table.c.id == bindparam('b_id'))
+                .values(overall=bindparam('b_overall'), potential=bindparam('b_potential'),
+                        last_updated=bindparam('b_last_updated')))
+        ids = df['id'].to_numpy()
+        db.session.execute(stmt, [
+            {'b_id': int(ids[i]), 'b_overall': int(overall[i]), 'b_potential': int(potential[i]),
+             'b_last_updated': now}
+            for i in changed
+        ])
+    return {'rated': len(df), 'updated': len(changed)}
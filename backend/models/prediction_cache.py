@@ -0,0 +1,218 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from .db import db, Match, PredictionRun
+from .predictor import predictor
+from .team_features import feature_cache, features_version, get_fixture_features, get_many_fixture_features
+
+
+class PredictionCache:
+    """
+    TTL/LRU cache of prediction dicts with request coalescing
+
+    Concurrent misses for the same key share one computation: the first
+    caller computes, the others wait on its Future. Keys carry the model
+    generation, the features data version and the teams' feature
+    generations, so a model swap or a feature update (in this process or
+    a job's) makes older entries unreachable and LRU evicts them; the TTL
+    bounds how long anything missed by both is served.
+    """
+
+    def __init__(self, max_size=4096, ttl=600):
+        self.max_size = max_size
+        self.ttl = ttl  # seconds
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1])
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return dict(pending.result())
+
+        result = None
+        try:
+            result = compute()
+        except BaseException as e:
+            # Interrupts too, or the callers waiting on this key would hang
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+                if not pending.done():
+                    self._entries[key] = (time.monotonic() + self.ttl, dict(result))
+                    while len(self._entries) > self.max_size:
+                        self._entries.popitem(last=False)
+        pending.set_result(result)
+        return dict(result)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'coalesced': self.coalesced}
+
+
+prediction_cache = PredictionCache()
+
+
+def predict_fixture(home_team_id, away_team_id):
+    """
+    Prediction for two team ids, None if either team doesn't exist
+
+    Served from the cache, then from probabilities the precompute job stored
+    on an upcoming match with the current model, then computed.
+    """
+    # Read versions before features, so a concurrent update can only
+    # leave behind an entry nobody will look up again
+    data_version = feature_cache.data_version()
+    key = (home_team_id, away_team_id, predictor.generation, data_version,
+           feature_cache.generation(home_team_id), feature_cache.generation(away_team_id))
+    fixture = get_fixture_features(home_team_id, away_team_id)
+    if fixture is None:
+        return None
+    home_team, away_team, context = fixture
+    key += (context['days_rest'],)
+
+    def compute():
+        stored = _stored_prediction(home_team_id, away_team_id, data_version)
+        if stored is not None:
+            return stored
+        return predictor.predict(home_team, away_team, context)
+
+    return prediction_cache.get_or_compute(key, compute)
+
+
+def _stored_prediction(home_team_id, away_team_id, data_version):
+    """
+    Precomputed probabilities of the next upcoming meeting, if the current
+    model wrote them from the current features data
+    """
+    last_run = db.session.execute(
+        select(PredictionRun.model_version, PredictionRun.data_version)
+        .order_by(PredictionRun.id.desc()).limit(1)
+    ).first()
+    if (last_run is None or last_run.model_version != predictor.version
+            or last_run.data_version != data_version):
+        return None
+    match = db.session.execute(
+        select(Match.prob_home_win, Match.prob_draw, Match.prob_away_win)
+        .where(Match.home_team_id == home_team_id, Match.away_team_id == away_team_id,
+               Match.home_score.is_(None), Match.date >= datetime.utcnow(),
+               Match.prob_home_win.isnot(None))
+        .order_by(Match.date)
+        .limit(1)
+    ).first()
+    if match is None:
+        return None
+    return {
+        'home_win': match.prob_home_win,
+        'draw': match.prob_draw,
+        'away_win': match.prob_away_win,
+        'confidence': max(match),
+        'is_trained': predictor.is_trained,
+    }
+
+
+def precompute_upcoming():
+    """Predict every upcoming match in one batch and store prob_* on the rows"""
+    upcoming = db.session.execute(
+        select(Match.id, Match.date, Match.home_team_id, Match.away_team_id)
+        .where(Match.home_score.is_(None), Match.date >= datetime.utcnow())
+    ).all()
+    version = predictor.version
+    # Taken before the features, so a change during the run makes it stale rather than current
+    data_version = features_version()
+
+    fixtures, match_ids = [], []
+    prepared = get_many_fixture_features(
+        [(home_team_id, away_team_id, date) for _id, date, home_team_id, away_team_id in upcoming])
+    for (match_id, *_), features in zip(upcoming, prepared):
+        if features is None:
+            continue
+        fixtures.append(dict(zip(('home_team', 'away_team', 'context'), features)))
+        match_ids.append(match_id)
+    predictions = predictor.predict_many(fixtures)
+
+    try:
+        if match_ids:
+            db.session.execute(update(Match), [
+                {'id': match_id, 'prob_home_win': p['home_win'], 'prob_draw': p['draw'],
+                 'prob_away_win': p['away_win'], 'prediction_version': version}
+                for match_id, p in zip(match_ids, predictions)
+            ])
+        db.session.add(PredictionRun(model_version=version, data_version=data_version,
+                                     fixtures=len(match_ids)))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(match_ids)
+
+
+class PrecomputeWorker:
+    """Daemon thread re-running precompute_upcoming every interval seconds or when triggered"""
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._thread = None
+        self.last_run = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, app, interval=900):
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._loop, args=(app, interval),
+                                        name='prediction-precompute', daemon=True)
+        self._thread.start()
+
+    def trigger(self):
+        """Run soon, e.g. after a model swap; no-op when the worker isn't started"""
+        self._wake.set()
+
+    def _loop(self, app, interval):
+        while True:
+            started = time.monotonic()
+            try:
+                with app.app_context():
+                    count = precompute_upcoming()
+                self.last_run = {'fixtures': count, 'seconds': round(time.monotonic() - started, 3),
+                                 'finished_at': datetime.utcnow().isoformat()}
+            except Exception as e:
+                print(f"Prediction precompute failed: {e}")
+            self._wake.wait(interval)
+            self._wake.clear()
+
+
+precompute_worker = PrecomputeWorker()
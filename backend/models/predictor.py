@@ -1,19 +1,62 @@
-import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
+from collections import namedtuple
 import joblib
-from datetime import datetime, timedelta
 import os
+import threading
+import time
+
+from .registry import ModelRegistry, hash_training_data
+from services.metrics import stage
+# pandas and scikit-learn are imported by train() and by unpickling a model,
+# so serving processes don't pay for them at import time
+
+# Everything a prediction needs, swapped as one object so a concurrent
+# request never pairs the new model with the old scaler
+ModelBundle = namedtuple('ModelBundle', ['model', 'scaler', 'is_trained', 'version'])
+
+# Per-team inputs in feature column order (home then away for each) with
+# the values used when a team dict lacks them
+TEAM_FEATURE_DEFAULTS = [
+    ('rating', 75),
+    ('form', 0.5),          # 0-1
+    ('goals_scored', 1.5),
+    ('goals_conceded', 1.2),
+    ('xG', 1.8),
+]
+DEFAULT_DAYS_REST = 7
+
+
+class PriorModel:
+    """Stand-in classifier returning fixed outcome probabilities"""
+    classes_ = np.array(['away', 'draw', 'home'])
+
+    def __init__(self, prior=(0.25, 0.30, 0.45)):
+        self.prior = np.asarray(prior, dtype=float)
+
+    def predict_proba(self, X):
+        return np.tile(self.prior, (len(X), 1))
+
+
+class IdentityScaler:
+    """Scaler stand-in for PriorModel"""
+
+    def transform(self, X):
+        return np.asarray(X, dtype=float)
+
 
 class MatchPredictor:
-    def __init__(self):
-        self.model = None
-        self.scaler = StandardScaler()
+    def __init__(self, registry=None):
+        self._bundle = ModelBundle(None, IdentityScaler(), False, None)
+        self.registry = registry or ModelRegistry()
+        # Pre-registry artifact locations, still loaded if no version is active
         self.model_path = 'models/match_predictor.joblib'
         self.scaler_path = 'models/scaler.joblib'
-        self.is_trained = False
+        self._outcome_cache = None
+        self._swap_lock = threading.Lock()
+        self._generation = 0
+        self._active_stamp = None
+        self._last_check = 0.0
+        self.reload_interval = 5  # seconds between checks for a newly activated version
         
         # Feature columns for training
         self.feature_columns = [
@@ -28,78 +71,114 @@ class MatchPredictor:
         # Create models directory if it doesn't exist
         os.makedirs('models', exist_ok=True)
     
-    def train(self, historical_matches):
+    # The active bundle's parts, kept as attributes for existing callers
+    @property
+    def model(self):
+        return self._bundle.model
+    
+    @model.setter
+    def model(self, value):
+        self._bundle = self._bundle._replace(model=value)
+    
+    @property
+    def scaler(self):
+        return self._bundle.scaler
+    
+    @scaler.setter
+    def scaler(self, value):
+        self._bundle = self._bundle._replace(scaler=value)
+    
+    @property
+    def is_trained(self):
+        return self._bundle.is_trained
+    
+    @is_trained.setter
+    def is_trained(self, value):
+        self._bundle = self._bundle._replace(is_trained=value)
+    
+    @property
+    def version(self):
+        return self._bundle.version
+    
+    @property
+    def generation(self):
+        """Counter bumped on every model swap, for keying cached predictions"""
+        self._current_bundle()
+        return self._generation
+    
+    def train(self, historical_matches, n_jobs=None, time_budget=None, n_splits=4, families=None):
         """
         Train the prediction model on historical match data
-        historical_matches: List of dicts with match data
+        historical_matches: List of dicts (or a DataFrame) with match data,
+        in chronological order unless a 'date' or 'season' column says otherwise
+        
+        Model families and hyperparameters are chosen by rolling-origin
+        cross-validation (see models.training), searched on n_jobs processes
+        within time_budget seconds.
+        
+        Returns the new registry version, or None if training failed; the
+        model being served is then left as it was.
         """
-        if not historical_matches or len(historical_matches) < 20:
-            print("Insufficient data for training. Using default model.")
-            self._create_default_model()
-            return
+        if historical_matches is None or len(historical_matches) < 20:
+            print("Insufficient data for training. Keeping the current model.")
+            return None
+        
+        import pandas as pd
+        from .training import search_models, fit_final
         
         try:
             # Convert to DataFrame
-            df = pd.DataFrame(historical_matches)
+            if isinstance(historical_matches, pd.DataFrame):
+                df = historical_matches.reset_index(drop=True)
+            else:
+                df = pd.DataFrame(historical_matches)
             
-            # Prepare features and target
-            X = df[self.feature_columns]
-            y = df['result']  # 'home', 'draw', or 'away'
+            # Pick the configuration with the best out-of-time log loss
+            search = search_models(df, self.feature_columns, n_splits=n_splits, n_jobs=n_jobs,
+                                   time_budget=time_budget, families=families)
+            best = search['best']
             
-            # Scale features
-            X_scaled = self.scaler.fit_transform(X)
+            # Refit it on the full history
+            model, scaler = fit_final(df, self.feature_columns, best['family'], best['params'])
             
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X_scaled, y, test_size=0.2, random_state=42
+            # Store as a new registry version and serve it
+            version = self.registry.register(
+                model, scaler, self.feature_columns,
+                metrics=dict(best['scores'], family=best['family'], params=best['params'],
+                             n_samples=len(df), candidates=len(search['leaderboard']),
+                             skipped=search['skipped']),
+                data_hash=hash_training_data(df[self.feature_columns + ['result']]),
             )
+            self._swap(ModelBundle(model, scaler, True, version))
             
-            # Train model (using Gradient Boosting for better performance)
-            self.model = GradientBoostingClassifier(
-                n_estimators=100,
-                learning_rate=0.1,
-                max_depth=3,
-                random_state=42
-            )
-            
-            self.model.fit(X_train, y_train)
-            
-            # Save model and scaler
-            joblib.dump(self.model, self.model_path)
-            joblib.dump(self.scaler, self.scaler_path)
-            
-            self.is_trained = True
-            
-            # Calculate training accuracy
-            train_accuracy = self.model.score(X_train, y_train)
-            test_accuracy = self.model.score(X_test, y_test)
-            
-            print(f"Model trained successfully!")
-            print(f"Training accuracy: {train_accuracy:.3f}")
-            print(f"Test accuracy: {test_accuracy:.3f}")
+            print(f"Model {version} trained successfully!")
+            print(f"Best: {best['family']} {best['params']}")
+            print(f"CV log loss: {best['scores']['log_loss']:.4f}  "
+                  f"Brier: {best['scores']['brier']:.4f}  "
+                  f"accuracy: {best['scores']['accuracy']:.3f}")
+            return version
             
         except Exception as e:
-            print(f"Error training model: {e}")
-            self._create_default_model()
+            print(f"Error training model: {e}. Keeping the current model.")
+            return None
     
     def _create_default_model(self):
-        """Create a simple default model when training data is insufficient"""
-        self.model = RandomForestClassifier(n_estimators=50, random_state=42)
-        
-        # Create minimal dummy data for basic functionality
-        X_dummy = np.random.rand(20, len(self.feature_columns))
-        y_dummy = np.random.choice(['home', 'draw', 'away'], 20, p=[0.45, 0.25, 0.30])
-        
-        self.model.fit(X_dummy, y_dummy)
-        self.is_trained = False
+        """Serve fixed outcome priors when no trained model is available"""
+        # Nothing is fitted here, so a cold start never trains
+        self._swap(ModelBundle(PriorModel(), IdentityScaler(), False, None))
     
     def load_model(self):
-        """Load pre-trained model and scaler"""
+        """Load the active registry version (or legacy files) memory-mapped"""
         try:
-            if os.path.exists(self.model_path) and os.path.exists(self.scaler_path):
-                self.model = joblib.load(self.model_path)
-                self.scaler = joblib.load(self.scaler_path)
-                self.is_trained = True
+            self._active_stamp = self.registry.active_stamp()
+            version = self.registry.active_version()
+            if version:
+                self._load_version(version)
+                print(f"Model {version} loaded from registry")
+            elif os.path.exists(self.model_path) and os.path.exists(self.scaler_path):
+                model = joblib.load(self.model_path, mmap_mode='r')
+                scaler = joblib.load(self.scaler_path, mmap_mode='r')
+                self._swap(ModelBundle(model, scaler, True, None))
                 print("Pre-trained model loaded successfully!")
             else:
                 self._create_default_model()
@@ -107,6 +186,35 @@ class MatchPredictor:
             print(f"Error loading model: {e}")
             self._create_default_model()
     
+    def activate(self, version):
+        """Make a registry version active here and, via the registry, in every worker"""
+        self._load_version(version)
+        self.registry.activate(version)
+        self._active_stamp = self.registry.active_stamp()
+    
+    def _load_version(self, version):
+        model, scaler, meta = self.registry.load(version)
+        if meta['feature_columns'] != self.feature_columns:
+            raise ValueError(f"Model {version} was trained on a different feature schema")
+        self._swap(ModelBundle(model, scaler, True, version))
+    
+    def _swap(self, bundle):
+        with self._swap_lock:
+            self._bundle = bundle
+            self._generation += 1
+    
+    def _current_bundle(self):
+        """Active bundle, loading it on first use and picking up newly activated versions"""
+        if self._bundle.model is None:
+            self.load_model()
+        else:
+            now = time.monotonic()
+            if now - self._last_check >= self.reload_interval:
+                self._last_check = now
+                if self.registry.active_stamp() != self._active_stamp:
+                    self.load_model()
+        return self._bundle
+    
     def predict(self, home_team_data, away_team_data, match_context=None):
         """
         Predict match outcome between two teams
@@ -116,68 +224,121 @@ class MatchPredictor:
         away_team_data: Dict with team stats
         match_context: Optional dict with additional context
         """
-        if self.model is None:
-            self.load_model()
+        bundle = self._current_bundle()
         
         # Prepare feature vector
-        features = self._prepare_features(home_team_data, away_team_data, match_context)
+        with stage('features'):
+            features = self._prepare_features(home_team_data, away_team_data, match_context)
         
         if features is None:
             # Return reasonable defaults if feature preparation fails
-            return {
-                'home_win': 0.45,
-                'draw': 0.30,
-                'away_win': 0.25,
-                'confidence': 0.65,
-                'is_trained': self.is_trained
-            }
+            return self._default_prediction(bundle.is_trained)
         
         try:
-            # Scale features
-            features_scaled = self.scaler.transform([features])
-            
-            # Get predictions
-            probabilities = self.model.predict_proba(features_scaled)[0]
-            classes = self.model.classes_
+            with stage('inference'):
+                # Scale features
+                features_scaled = bundle.scaler.transform(np.asarray([features], dtype=float))
+                
+                # Get predictions
+                probabilities = bundle.model.predict_proba(features_scaled)[0]
+            home_idx, draw_idx, away_idx = self._outcome_indices(bundle.model)
             
             # Convert to dictionary
             result = {
-                'home_win': float(probabilities[list(classes).index('home')]),
-                'draw': float(probabilities[list(classes).index('draw')]),
-                'away_win': float(probabilities[list(classes).index('away')]),
+                'home_win': float(probabilities[home_idx]),
+                'draw': float(probabilities[draw_idx]),
+                'away_win': float(probabilities[away_idx]),
                 'confidence': float(np.max(probabilities)),
-                'is_trained': self.is_trained
+                'is_trained': bundle.is_trained
             }
             
             return result
             
         except Exception as e:
             print(f"Prediction error: {e}")
-            return {
-                'home_win': 0.45,
-                'draw': 0.30,
-                'away_win': 0.25,
-                'confidence': 0.65,
-                'is_trained': False
+            return self._default_prediction(False)
+    
+    def predict_many(self, fixtures):
+        """
+        Predict outcomes for many fixtures with a single model pass
+        
+        Parameters:
+        fixtures: List of dicts with 'home_team', 'away_team' and optional 'context'
+        
+        Returns a list of prediction dicts in input order, each with a
+        'valid' flag. Fixtures whose features can't be prepared get the same
+        defaults as predict() and 'valid': False.
+        """
+        bundle = self._current_bundle()
+        
+        results = [dict(self._default_prediction(bundle.is_trained), valid=False) for _ in fixtures]
+        if not fixtures:
+            return results
+        
+        with stage('features'):
+            features, valid = self._prepare_feature_matrix(fixtures)
+        rows = np.flatnonzero(valid)
+        if rows.size == 0:
+            return results
+        
+        try:
+            with stage('inference'):
+                features_scaled = bundle.scaler.transform(features[rows])
+                probabilities = bundle.model.predict_proba(features_scaled)
+        except Exception as e:
+            # Fall back to per-row predictions so one bad fixture can't sink the batch
+            print(f"Batch prediction error: {e}")
+            for i in rows:
+                fixture = fixtures[i]
+                results[i] = dict(self.predict(
+                    fixture.get('home_team'), fixture.get('away_team'), fixture.get('context')
+                ), valid=True)
+            return results
+        
+        home_idx, draw_idx, away_idx = self._outcome_indices(bundle.model)
+        confidence = probabilities.max(axis=1)
+        for pos, i in enumerate(rows):
+            results[i] = {
+                'home_win': float(probabilities[pos, home_idx]),
+                'draw': float(probabilities[pos, draw_idx]),
+                'away_win': float(probabilities[pos, away_idx]),
+                'confidence': float(confidence[pos]),
+                'is_trained': bundle.is_trained,
+                'valid': True
             }
+        
+        return results
+    
+    def _default_prediction(self, is_trained):
+        """Reasonable defaults used when a prediction can't be made"""
+        return {
+            'home_win': 0.45,
+            'draw': 0.30,
+            'away_win': 0.25,
+            'confidence': 0.65,
+            'is_trained': is_trained
+        }
+    
+    def _outcome_indices(self, model):
+        """Column indices of 'home', 'draw', 'away' in model's predict_proba output"""
+        # Cached per model object so predictions don't rebuild the class list
+        cache = self._outcome_cache
+        if cache is None or cache[0] is not model:
+            classes = list(model.classes_)
+            indices = (classes.index('home'), classes.index('draw'), classes.index('away'))
+            cache = self._outcome_cache = (model, indices)
+        return cache[1]
     
     def _prepare_features(self, home_team, away_team, match_context):
         """Prepare feature vector for prediction"""
         try:
-            # Calculate basic features
+            # home_team_rating, away_team_rating, home_team_form, ... then days_since_last_match
             features = [
-                home_team.get('rating', 75),          # home_team_rating
-                away_team.get('rating', 75),          # away_team_rating
-                home_team.get('form', 0.5),           # home_team_form (0-1)
-                away_team.get('form', 0.5),           # away_team_form (0-1)
-                home_team.get('goals_scored', 1.5),   # home_goals_scored
-                away_team.get('goals_scored', 1.5),   # away_goals_scored
-                home_team.get('goals_conceded', 1.2), # home_goals_conceded
-                away_team.get('goals_conceded', 1.2), # away_goals_conceded
-                home_team.get('xG', 1.8),             # home_xG
-                away_team.get('xG', 1.8),             # away_xG
-                match_context.get('days_rest', 7) if match_context else 7  # days_since_last_match
+                team.get(key, default)
+                for key, default in TEAM_FEATURE_DEFAULTS
+                for team in (home_team, away_team)
             ]
+            features.append(match_context.get('days_rest', DEFAULT_DAYS_REST) if match_context else DEFAULT_DAYS_REST)
             
             return features
             
@@ -185,6 +346,42 @@ class MatchPredictor:
             print(f"Feature preparation error: {e}")
             return None
     
+    def _prepare_feature_matrix(self, fixtures):
+        """
+        Prepare a feature matrix for many fixtures
+        
+        Returns (features, valid) where features is a float array of shape
+        (len(fixtures), len(feature_columns)) and valid marks the rows that
+        could be prepared. Built a column at a time, so the values of every
+        fixture go through one list comprehension and one conversion per
+        feature instead of a _prepare_features call per fixture.
+        """
+        features = np.full((len(fixtures), len(self.feature_columns)), np.nan)
+        # Rows _prepare_features would reject: missing team dicts or a context that isn't one
+        usable = [
+            i for i, fixture in enumerate(fixtures)
+            if isinstance(fixture, dict)
+            and isinstance(fixture.get('home_team'), dict)
+            and isinstance(fixture.get('away_team'), dict)
+            and isinstance(fixture.get('context') or {}, dict)
+        ]
+        if not usable:
+            return features, np.zeros(len(fixtures), dtype=bool)
+        
+        homes = [fixtures[i]['home_team'] for i in usable]
+        aways = [fixtures[i]['away_team'] for i in usable]
+        columns = []
+        for key, default in TEAM_FEATURE_DEFAULTS:
+            columns.append([team.get(key, default) for team in homes])
+            columns.append([team.get(key, default) for team in aways])
+        columns.append([(fixtures[i].get('context') or {}).get('days_rest', DEFAULT_DAYS_REST) for i in usable])
+        
+        for j, column in enumerate(columns):
+            features[usable, j] = _to_floats(column)
+        
+        valid = np.isfinite(features).all(axis=1)
+        return features, valid
+    
     def calculate_team_form(self, recent_results):
         """
         Calculate team form based on recent results
@@ -203,6 +400,20 @@ class MatchPredictor:
         
         return min(1.0, form_score / 5)  # Normalize to 0-1
 
+def _to_floats(values):
+    """values as a float array, NaN where a value isn't numeric"""
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        converted = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                converted[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return converted
+
+
 # Global predictor instance
 predictor = MatchPredictor()
 
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime
+
+import joblib
+
+DEFAULT_REGISTRY_DIR = os.path.join('models', 'registry')
+ACTIVE_FILE = 'ACTIVE'
+# register()'s names: v<UTC timestamp>-<data hash prefix or 'nodata'>
+VERSION_PATTERN = re.compile(r'^v\d{20}-[0-9A-Za-z]{1,16}$')
+
+
+def hash_training_data(df):
+    """Stable content hash of a training DataFrame"""
+    import pandas as pd
+
+    row_hashes = pd.util.hash_pandas_object(df, index=False).values
+    digest = hashlib.sha256(row_hashes.tobytes())
+    digest.update(','.join(map(str, df.columns)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Versioned model artifacts on disk
+
+    Each version is a directory holding model.joblib, scaler.joblib and
+    meta.json (feature schema, metrics, training data hash). The ACTIVE file
+    names the version every worker should serve; it's replaced atomically,
+    so activating a version is a single rename.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.getenv('MODEL_REGISTRY_DIR', DEFAULT_REGISTRY_DIR)
+        os.makedirs(self.root, exist_ok=True)
+
+    def register(self, model, scaler, feature_columns, metrics=None, data_hash=None, activate=True):
+        """Store a trained model and scaler as a new version and return its name"""
+        created = datetime.utcnow()
+        version = f"v{created:%Y%m%d%H%M%S%f}-{(data_hash or 'nodata')[:8]}"
+        meta = {
+            'version': version,
+            'created_at': created.isoformat(),
+            'model_class': type(model).__name__,
+            'feature_columns': list(feature_columns),
+            'classes': [str(c) for c in getattr(model, 'classes_', [])],
+            'metrics': metrics or {},
+            'data_hash': data_hash,
+        }
+
+        # Build in a temp dir and rename, so a half-written version is never visible
+        tmp_dir = tempfile.mkdtemp(dir=self.root, prefix='.tmp-')
+        try:
+            # Uncompressed dumps, so numpy arrays can be memory-mapped on load
+            joblib.dump(model, os.path.join(tmp_dir, 'model.joblib'))
+            joblib.dump(scaler, os.path.join(tmp_dir, 'scaler.joblib'))
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, indent=2)
+            os.rename(tmp_dir, os.path.join(self.root, version))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def _path(self, version):
+        """
+        Directory of a stored version; raises KeyError for anything else
+
+        Versions come from API requests and the ACTIVE file, and loading one
+        unpickles its files, so the name is checked before it's joined to a path.
+        """
+        if (not isinstance(version, str) or not VERSION_PATTERN.match(version)
+                or os.path.basename(version) != version):
+            raise KeyError(f"Unknown model version: {version}")
+        path = os.path.join(self.root, version)
+        if not os.path.isfile(os.path.join(path, 'meta.json')):
+            raise KeyError(f"Unknown model version: {version}")
+        return path
+
+    def load(self, version, mmap=True):
+        """(model, scaler, meta) for a version; arrays are memory-mapped read-only"""
+        path = self._path(version)
+        mmap_mode = 'r' if mmap else None
+        model = joblib.load(os.path.join(path, 'model.joblib'), mmap_mode=mmap_mode)
+        scaler = joblib.load(os.path.join(path, 'scaler.joblib'), mmap_mode=mmap_mode)
+        return model, scaler, self.meta(version)
+
+    def meta(self, version):
+        with open(os.path.join(self._path(version), 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def activate(self, version):
+        self._path(version)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.active-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.root, ACTIVE_FILE))
+
+    def active_version(self):
+        try:
+            with open(os.path.join(self.root, ACTIVE_FILE), encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def active_stamp(self):
+        """Cheap change marker for the ACTIVE pointer (mtime), None if unset"""
+        try:
+            return os.stat(os.path.join(self.root, ACTIVE_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def list_versions(self):
+        """Metadata of every stored version, newest first"""
+        versions = [
+            name for name in os.listdir(self.root)
+            if VERSION_PATTERN.match(name) and os.path.isfile(os.path.join(self.root, name, 'meta.json'))
+        ]
+        return [self.meta(v) for v in sorted(versions, reverse=True)]
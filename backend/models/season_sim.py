@@ -0,0 +1,276 @@
+"""
+Monte Carlo league-table projections
+
+Remaining fixtures are played out as batched NumPy draws: each chunk of
+seasons is one (seasons x fixtures) array of outcomes or goals, and team
+totals come from multiplying it by fixture/team incidence matrices, so
+there is no Python loop over matches. Chunks run in worker processes and
+each gets its own child seed of the request seed, so results depend on
+the seed but not on how many workers ran them.
+"""
+import multiprocessing
+import os
+import secrets
+
+import numpy as np
+from sqlalchemy import select, or_
+
+from .db import db, Team, Match
+from .predictor import predictor
+from .team_features import get_many_fixture_features, get_many_team_features
+
+MODES = ('model', 'xg')
+CHUNK_SIZE = 10000  # seasons per batch; bounds memory at ~chunk x fixtures x 4 bytes per array
+MAX_SIMS = 1000000
+
+
+class SeasonInputs:
+    """Current table and remaining fixtures for one league season"""
+
+    def __init__(self, team_ids, names, points, goals_for, goals_against, played,
+                 home_idx, away_idx, probs=None, rates=None):
+        self.team_ids = team_ids
+        self.names = names
+        self.points = np.asarray(points, dtype=np.float64)
+        self.goals_for = np.asarray(goals_for, dtype=np.float64)
+        self.goals_against = np.asarray(goals_against, dtype=np.float64)
+        self.played = np.asarray(played, dtype=np.int64)
+        self.home_idx = np.asarray(home_idx, dtype=np.int64)
+        self.away_idx = np.asarray(away_idx, dtype=np.int64)
+        self.probs = probs    # (fixtures, 3) home/draw/away probabilities
+        self.rates = rates    # (fixtures, 2) home/away expected goals
+
+
+def simulate_season(inputs, n_sims=100000, seed=None, mode='model', n_jobs=None,
+                    top_n=4, relegation=3):
+    """
+    Play the remaining fixtures n_sims times
+
+    mode='model' draws each result from inputs.probs; goal difference then
+    stays at its current value for tie-breaks. mode='xg' draws Poisson goals
+    from inputs.rates, so goal difference and goals scored are simulated too.
+    Returns per-team position probabilities, title/top_n/relegation odds and
+    expected points, strongest projected finish first.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    if mode == 'model' and inputs.probs is None:
+        raise ValueError("model mode needs fixture probabilities")
+    if mode == 'xg' and inputs.rates is None:
+        raise ValueError("xg mode needs fixture goal rates")
+    if not 1 <= n_sims <= MAX_SIMS:
+        raise ValueError(f"sims must be between 1 and {MAX_SIMS}")
+
+    n_teams = len(inputs.team_ids)
+    if seed is None:
+        # Drawn here rather than left to SeedSequence, whose 128-bit entropy
+        # can't be passed back by JSON clients (JavaScript numbers are doubles)
+        seed = secrets.randbits(53)
+    seed_seq = np.random.SeedSequence(seed)
+    sizes = [CHUNK_SIZE] * (n_sims // CHUNK_SIZE)
+    if n_sims % CHUNK_SIZE:
+        sizes.append(n_sims % CHUNK_SIZE)
+    tasks = list(zip(seed_seq.spawn(len(sizes)), sizes))
+
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(tasks))
+    if n_jobs > 1:
+        with multiprocessing.Pool(n_jobs, _init_worker, (inputs, mode)) as pool:
+            parts = pool.starmap(_run_chunk, tasks)
+    else:
+        _init_worker(inputs, mode)
+        parts = [_run_chunk(*task) for task in tasks]
+
+    position_counts = sum(p[0] for p in parts)
+    points_total = sum(p[1] for p in parts)
+
+    position_probs = position_counts / n_sims
+    expected_points = points_total / n_sims
+    table = []
+    for t in range(n_teams):
+        table.append({
+            'team_id': inputs.team_ids[t],
+            'team': inputs.names[t],
+            'played': int(inputs.played[t]),
+            'points': int(inputs.points[t]),
+            'expected_points': round(float(expected_points[t]), 2),
+            'title': round(float(position_probs[t, 0]), 4),
+            f'top_{top_n}': round(float(position_probs[t, :top_n].sum()), 4),
+            'relegation': round(float(position_probs[t, n_teams - relegation:].sum()), 4)
+                          if relegation else 0.0,
+            'positions': [round(float(p), 4) for p in position_probs[t]],
+        })
+    table.sort(key=lambda row: (-row['expected_points'], -row['title']))
+    return {
+        'mode': mode,
+        'sims': n_sims,
+        'seed': seed_seq.entropy,
+        'remaining_fixtures': int(len(inputs.home_idx)),
+        'table': table,
+    }
+
+
+# ---- worker processes ----
+_worker_data = {}
+
+
+def _init_worker(inputs, mode):
+    n_teams, n_fixtures = len(inputs.team_ids), len(inputs.home_idx)
+    home = np.zeros((n_fixtures, n_teams), dtype=np.float32)
+    away = np.zeros((n_fixtures, n_teams), dtype=np.float32)
+    home[np.arange(n_fixtures), inputs.home_idx] = 1
+    away[np.arange(n_fixtures), inputs.away_idx] = 1
+    data = {'inputs': inputs, 'mode': mode, 'home': home, 'away': away}
+    if mode == 'model':
+        probs = np.asarray(inputs.probs, dtype=np.float32)
+        data['home_cut'] = probs[:, 0]
+        data['draw_cut'] = probs[:, 0] + probs[:, 1]
+    else:
+        rates = np.asarray(inputs.rates, dtype=np.float64)
+        data['home_cdf'] = _poisson_cdf(rates[:, 0])
+        data['away_cdf'] = _poisson_cdf(rates[:, 1])
+    _worker_data.update(data)
+
+
+def _poisson_cdf(rates):
+    """
+    (goals, fixtures) Poisson CDF table, up to where float32 can't tell it from 1
+    Sampling by counting the thresholds a uniform draw exceeds is about
+    2.5x faster than Generator.poisson for rates this small.
+    """
+    rows = []
+    pmf = np.exp(-rates)
+    cdf = pmf.copy()
+    k = 0
+    while True:
+        rows.append(cdf.astype(np.float32))
+        if (rows[-1] >= 1).all() or k >= 50:
+            break
+        k += 1
+        pmf = pmf * rates / k
+        cdf = cdf + pmf
+    return np.array(rows)
+
+
+def _draw_goals(rng, cdf, n):
+    u = rng.random((n, cdf.shape[1]), dtype=np.float32)
+    goals = np.zeros(u.shape, dtype=np.uint8)
+    for threshold in cdf:
+        goals += u > threshold
+    return goals.astype(np.float32)
+
+
+def _run_chunk(seed_seq, n):
+    """(position counts [team, position], summed final points) for n seasons"""
+    d = _worker_data
+    inputs, home, away = d['inputs'], d['home'], d['away']
+    rng = np.random.default_rng(seed_seq)
+    n_teams = len(inputs.team_ids)
+
+    if d['mode'] == 'model':
+        u = rng.random((n, len(inputs.home_idx)), dtype=np.float32)
+        home_win = u < d['home_cut']
+        draw = ~home_win & (u < d['draw_cut'])
+        away_win = ~home_win & ~draw
+        del u
+        goal_diff = np.broadcast_to(inputs.goals_for - inputs.goals_against, (n, n_teams))
+        goals_for = np.broadcast_to(inputs.goals_for, (n, n_teams))
+    else:
+        home_goals = _draw_goals(rng, d['home_cdf'], n)
+        away_goals = _draw_goals(rng, d['away_cdf'], n)
+        home_win = home_goals > away_goals
+        draw = home_goals == away_goals
+        away_win = home_goals < away_goals
+        goals_for = inputs.goals_for + home_goals @ home + away_goals @ away
+        goals_against = inputs.goals_against + away_goals @ home + home_goals @ away
+        goal_diff = goals_for - goals_against
+        del home_goals, away_goals
+
+    draw = draw.astype(np.float32)
+    home_points = 3 * home_win.astype(np.float32) + draw
+    away_points = 3 * away_win.astype(np.float32) + draw
+    points = inputs.points + home_points @ home + away_points @ away
+
+    # Points, then goal difference, then goals scored, then a coin toss
+    key = (np.rint(points) * 1e8 + (np.rint(goal_diff) + 10000) * 1e3
+           + np.rint(goals_for) + rng.random((n, n_teams)))
+    order = np.argsort(-key, axis=1)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(n_teams)[None, :], axis=1)
+
+    flat = (np.arange(n_teams)[None, :] * n_teams + positions).ravel()
+    counts = np.bincount(flat, minlength=n_teams * n_teams).reshape(n_teams, n_teams)
+    return counts, points.sum(axis=0, dtype=np.float64)
+
+
+# ---- inputs from the DB ----
+def load_season(league, season=None, mode=None):
+    """
+    SeasonInputs for a league from the matches table, or None if the league
+    has no teams. season defaults to the latest season with matches.
+    Fixture probabilities come from the served model and goal rates from
+    each side's rolling xG for and opponent's goals conceded; a mode loads
+    only what simulate_season needs for it (None loads both).
+    """
+    teams = db.session.execute(
+        select(Team.id, Team.name).where(Team.league == league).order_by(Team.name)
+    ).all()
+    if not teams:
+        return None
+    team_ids = [t.id for t in teams]
+    index = {team_id: i for i, team_id in enumerate(team_ids)}
+
+    involving = or_(Match.home_team_id.in_(team_ids), Match.away_team_id.in_(team_ids))
+    if season is None:
+        season = db.session.execute(
+            select(Match.season).where(involving).order_by(Match.date.desc()).limit(1)
+        ).scalar()
+    rows = db.session.execute(
+        select(Match.date, Match.home_team_id, Match.away_team_id, Match.home_score, Match.away_score)
+        .where(Match.season == season, involving)
+        .order_by(Match.date, Match.id)
+    ).all()
+
+    n = len(team_ids)
+    points, goals_for, goals_against, played = np.zeros(n), np.zeros(n), np.zeros(n), np.zeros(n)
+    fixtures = []
+    for date, home_id, away_id, home_score, away_score in rows:
+        # Cup ties against teams outside the league don't count towards the table
+        if home_id not in index or away_id not in index:
+            continue
+        h, a = index[home_id], index[away_id]
+        if home_score is None or away_score is None:
+            fixtures.append((date, home_id, away_id, h, a))
+            continue
+        played[[h, a]] += 1
+        goals_for[h] += home_score
+        goals_against[h] += away_score
+        goals_for[a] += away_score
+        goals_against[a] += home_score
+        if home_score > away_score:
+            points[h] += 3
+        elif home_score < away_score:
+            points[a] += 3
+        else:
+            points[[h, a]] += 1
+
+    probs = rates = None
+    if mode in (None, 'model'):
+        prepared = get_many_fixture_features([(home_id, away_id, date) for date, home_id, away_id, _h, _a in fixtures])
+        predictions = predictor.predict_many([
+            {'home_team': home_team, 'away_team': away_team, 'context': context}
+            for home_team, away_team, context in prepared
+        ])
+        probs = np.array([[p['home_win'], p['draw'], p['away_win']] for p in predictions]).reshape(-1, 3)
+        probs = probs / probs.sum(axis=1, keepdims=True).clip(min=1e-12)
+    if mode in (None, 'xg'):
+        team_features = get_many_team_features(team_ids)
+        rates = np.array([
+            [(team_features[home_id]['xG'] + team_features[away_id]['goals_conceded']) / 2,
+             (team_features[away_id]['xG'] + team_features[home_id]['goals_conceded']) / 2]
+            for _date, home_id, away_id, _h, _a in fixtures
+        ]).reshape(-1, 2).clip(min=0.05)
+
+    return SeasonInputs(
+        team_ids, [t.name for t in teams], points, goals_for, goals_against, played,
+        [f[3] for f in fixtures], [f[4] for f in fixtures], probs=probs, rates=rates,
+    )
@@ -0,0 +1,278 @@
+"""
+Columnar Parquet snapshots of the database tables and scraped frames
+
+    export_table('matches')      players / teams / matches from SQLite
+    export_training_rows()       feature store training rows, by season
+    write_frame(name, df, cols)  any frame, e.g. a scrape, replacing the partitions it covers
+    load(name, columns=..., filters={'season': [...]})
+
+Snapshots are hive-partitioned datasets (league=.../season=...) under
+SNAPSHOT_DIR. Loads go through Arrow with memory-mapped files, reading only
+the requested columns and skipping partitions and row groups the filters
+rule out, which is much cheaper than building ORM objects or re-scraping.
+
+Each write produces a new version directory, SNAPSHOT_DIR/<name>/v.../,
+and the ACTIVE file next to them names the one to read; it's replaced
+atomically like the model registry's, so there's always a complete
+snapshot to load. Partial writes start from hard links to the active
+version's files. The previous version is kept for readers that resolved
+it just before a swap; older ones are removed. Needs pyarrow.
+"""
+import base64
+import json
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from datetime import datetime
+
+from sqlalchemy import select, Boolean, DateTime, Float, Integer
+
+from .db import Player, Team, Match, read_connection
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # snapshots are unavailable without pyarrow
+    pa = None
+
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshots')
+EXPORT_BATCH = 50000  # rows fetched from SQLite per record batch
+MANIFEST = '_manifest.json'  # leading underscore: ignored by Arrow's dataset discovery
+ACTIVE_FILE = 'ACTIVE'
+_VERSION = re.compile(r'^v\d{20}-[0-9a-f]{8}$')
+
+# Snapshot name -> (model, partition columns); partition columns are strings
+TABLES = {
+    'players': (Player, ['league']),
+    'teams': (Team, ['league']),
+    'matches': (Match, ['league', 'season']),  # league of the home team
+}
+
+
+def available():
+    return pa is not None
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Snapshots need pyarrow (pip install pyarrow)")
+
+
+def _arrow_type(column_type):
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp('us')
+    return pa.string()
+
+
+# ---- export ----
+def export_table(name, directory=None):
+    """Replace the snapshot of a database table; returns its manifest"""
+    _require_pyarrow()
+    if name not in TABLES:
+        raise ValueError(f"table must be one of {', '.join(TABLES)}")
+    model, partition_cols = TABLES[name]
+    columns = list(model.__table__.columns)
+    stmt = select(*columns)
+    fields = [pa.field(c.name, _arrow_type(c.type)) for c in columns]
+    if name == 'matches':
+        stmt = stmt.add_columns(Team.league).outerjoin(Team, Team.id == Match.home_team_id)
+        fields.append(pa.field('league', pa.string()))
+    schema = pa.schema(fields)
+
+    def batches(conn):
+        result = conn.execution_options(yield_per=EXPORT_BATCH).execute(stmt)
+        for rows in result.partitions():
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    with read_connection() as conn:
+        return _write(name, batches(conn), schema, partition_cols, directory, replace=True)
+
+
+def export_training_rows(directory=None):
+    """Snapshot of FeatureStore.training_rows partitioned by season; returns its manifest"""
+    from .feature_store import feature_store
+    from .predictor import predictor
+
+    _require_pyarrow()
+    rows = feature_store.training_rows(predictor.feature_columns)
+    rows['season'] = rows['season'].astype('string')
+    table = pa.Table.from_pandas(rows, preserve_index=False)
+    return _write('training_rows', table.to_batches(), table.schema, ['season'], directory, replace=True)
+
+
+def write_frame(name, df, partition_cols, directory=None):
+    """
+    Write a DataFrame into a snapshot, replacing only the partitions it has
+    rows for (e.g. the leagues of one scrape); returns the manifest
+    """
+    _require_pyarrow()
+    df = df.copy()
+    for col in partition_cols:
+        df[col] = df[col].astype('string')
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return _write(name, table.to_batches(), table.schema, partition_cols, directory, replace=False)
+
+
+def _write(name, batches, schema, partition_cols, directory, replace):
+    root = os.path.join(directory or SNAPSHOT_DIR, name)
+    partitioning = ds.partitioning(pa.schema([(c, pa.string()) for c in partition_cols]), flavor='hive')
+    options = dict(schema=schema, format='parquet', partitioning=partitioning,
+                   max_rows_per_group=EXPORT_BATCH * 2)
+    os.makedirs(root, exist_ok=True)
+    previous = _active_path(root)
+    version = f"v{datetime.utcnow():%Y%m%d%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+
+    # Build in a temp dir and rename, so a half-written version is never visible
+    staging = tempfile.mkdtemp(dir=root, prefix='.tmp-')
+    try:
+        if replace or previous is None:
+            ds.write_dataset(batches, staging, existing_data_behavior='overwrite_or_ignore', **options)
+        else:
+            # Files are never modified once written, so links are a safe copy;
+            # delete_matching only unlinks them from the new version
+            _link_files(previous, staging)
+            ds.write_dataset(batches, staging, existing_data_behavior='delete_matching',
+                             basename_template=f"part-{uuid.uuid4().hex[:8]}-{{i}}.parquet", **options)
+        meta = _write_manifest(staging, name, schema, partition_cols, version)
+        os.rename(staging, os.path.join(root, version))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    _activate(root, version)
+    _prune(root, version, previous)
+    return meta
+
+
+def _active_path(root):
+    """Directory of the active version, the snapshot itself for the pre-versioning layout, or None"""
+    try:
+        with open(os.path.join(root, ACTIVE_FILE), encoding='utf-8') as f:
+            version = f.read().strip()
+        if version:
+            return os.path.join(root, version)
+    except FileNotFoundError:
+        pass
+    return root if os.path.isfile(os.path.join(root, MANIFEST)) else None
+
+
+def _activate(root, version):
+    fd, tmp_path = tempfile.mkstemp(dir=root, prefix='.active-')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(root, ACTIVE_FILE))
+
+
+def _prune(root, version, previous):
+    """Remove versions older than the previous one, and files of the pre-versioning layout"""
+    keep = {version, os.path.basename(previous) if previous else None}
+    for entry in os.listdir(root):
+        path = os.path.join(root, entry)
+        if _VERSION.match(entry):
+            # A version without a manifest is still being written by someone else
+            if entry not in keep and entry < version and os.path.isfile(os.path.join(path, MANIFEST)):
+                shutil.rmtree(path, ignore_errors=True)
+        elif previous == root and (entry == MANIFEST or '=' in entry or entry.endswith('.parquet')):
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+
+def _link_files(source, target):
+    """Hard link (or copy, across devices) every data file of source into target"""
+    for path in _files(source):
+        relative = os.path.relpath(path, source)
+        if relative.split(os.sep)[0].startswith(('.', '_')) or _VERSION.match(relative.split(os.sep)[0]):
+            continue
+        destination = os.path.join(target, relative)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        try:
+            os.link(path, destination)
+        except OSError:
+            shutil.copy2(path, destination)
+
+
+def _write_manifest(path, name, schema, partition_cols, version):
+    manifest = {
+        'name': name,
+        'version': version,
+        'rows': ds.dataset(path, format='parquet').count_rows() if any(_files(path)) else 0,
+        'partitioning': partition_cols,
+        'columns': schema.names,
+        'schema': base64.b64encode(schema.serialize().to_pybytes()).decode('ascii'),
+        'written_at': datetime.utcnow().isoformat(),
+    }
+    with open(os.path.join(path, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def _files(path):
+    for root, _dirs, files in os.walk(path):
+        for file in files:
+            if file.endswith('.parquet'):
+                yield os.path.join(root, file)
+
+
+# ---- load ----
+def snapshot_path(name, directory=None):
+    """Directory of a snapshot's active version; raises FileNotFoundError if it was never written"""
+    path = _active_path(os.path.join(directory or SNAPSHOT_DIR, name))
+    if path is None:
+        raise FileNotFoundError(f"No snapshot named {name}")
+    return path
+
+
+def manifest(name, directory=None):
+    """A snapshot's manifest; raises FileNotFoundError if it was never written"""
+    with open(os.path.join(snapshot_path(name, directory), MANIFEST), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load(name, columns=None, filters=None, directory=None):
+    """
+    Snapshot as a pyarrow Table
+
+    columns: subset of columns to read (partition columns included)
+    filters: {column: value or list of values}, DNF tuples or an Arrow
+             expression; partitions and row groups that can't match are skipped
+    """
+    _require_pyarrow()
+    # Resolved once, so the manifest and the files are of the same version
+    path = snapshot_path(name, directory)
+    with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+        meta = json.load(f)
+    schema = pa.ipc.read_schema(pa.py_buffer(base64.b64decode(meta['schema'])))
+    if meta['rows'] == 0:
+        table = schema.empty_table()
+        return table.select(columns) if columns else table
+    partitioning = ds.partitioning(pa.schema([(c, pa.string()) for c in meta['partitioning']]), flavor='hive')
+    return pq.read_table(path, columns=columns,
+                         filters=_filters(filters), partitioning=partitioning, memory_map=True)
+
+
+def load_frame(name, columns=None, filters=None, directory=None):
+    """Snapshot as a pandas DataFrame"""
+    return load(name, columns, filters, directory).to_pandas()
+
+
+def _filters(filters):
+    if filters is None or not isinstance(filters, dict):
+        return filters
+    clauses = []
+    for column, value in filters.items():
+        if isinstance(value, (list, tuple, set)):
+            clauses.append((column, 'in', list(value)))
+        else:
+            clauses.append((column, '=', value))
+    return clauses or None
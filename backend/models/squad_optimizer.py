@@ -0,0 +1,263 @@
+"""
+Formation-aware best-XI search over the players table
+
+Every candidate gets a suitability score per role: overall rating plus the
+role's weighted per-90 metric profile (standardized across the pool),
+discounted when the role isn't the player's listed primary position. The
+XI is then an exact assignment problem (scipy's linear_sum_assignment) or,
+with budget / per-club limits, a small integer program (scipy's milp)
+over the best candidates for each role.
+"""
+from collections import Counter
+
+import numpy as np
+from scipy.optimize import Bounds, LinearConstraint, linear_sum_assignment, milp
+from scipy.sparse import coo_matrix
+from sqlalchemy import select
+
+from .db import db, Player
+
+# role -> (label, FBref position codes that can play it, primary first, metric weights)
+ROLES = {
+    'GK': ('Goalkeeper', ['GK'], {}),
+    'CB': ('Centre backs', ['DF'], {'tackles': 1.0, 'interceptions': 1.0, 'progressive_passes': 0.3}),
+    'FB': ('Full backs', ['DF', 'MF'], {'tackles': 0.6, 'interceptions': 0.4, 'progressive_carries': 0.6,
+                                         'progressive_passes': 0.5, 'xA': 0.4}),
+    'DM': ('Defensive midfield', ['MF', 'DF'], {'tackles': 1.0, 'interceptions': 1.0,
+                                                 'progressive_passes': 0.6}),
+    'CM': ('Central midfield', ['MF'], {'progressive_passes': 1.0, 'progressive_carries': 0.6,
+                                        'tackles': 0.4, 'xA': 0.4}),
+    'AM': ('Attacking midfield', ['MF', 'FW'], {'xA': 1.0, 'progressive_passes': 0.6, 'xG': 0.6,
+                                                'progressive_carries': 0.4}),
+    'W': ('Wingers', ['FW', 'MF'], {'progressive_carries': 1.0, 'xA': 0.8, 'xG': 0.8}),
+    'ST': ('Strikers', ['FW'], {'xG': 1.2, 'goals': 0.8, 'xA': 0.3}),
+}
+
+FORMATIONS = {
+    '4-4-2': ['GK', 'FB', 'CB', 'CB', 'FB', 'W', 'CM', 'CM', 'W', 'ST', 'ST'],
+    '4-3-3': ['GK', 'FB', 'CB', 'CB', 'FB', 'DM', 'CM', 'CM', 'W', 'ST', 'W'],
+    '4-2-3-1': ['GK', 'FB', 'CB', 'CB', 'FB', 'DM', 'DM', 'W', 'AM', 'W', 'ST'],
+    '4-1-4-1': ['GK', 'FB', 'CB', 'CB', 'FB', 'DM', 'W', 'CM', 'CM', 'W', 'ST'],
+    '3-5-2': ['GK', 'CB', 'CB', 'CB', 'FB', 'DM', 'CM', 'AM', 'FB', 'ST', 'ST'],
+    '3-4-3': ['GK', 'CB', 'CB', 'CB', 'FB', 'CM', 'CM', 'FB', 'W', 'ST', 'W'],
+    '5-3-2': ['GK', 'FB', 'CB', 'CB', 'CB', 'FB', 'CM', 'DM', 'CM', 'ST', 'ST'],
+}
+
+METRICS = ['goals', 'xG', 'xA', 'progressive_passes', 'progressive_carries', 'tackles', 'interceptions']
+
+DEFAULT_OVERALL = 70      # for players the rating engine hasn't rated yet
+METRIC_WEIGHT = 3.0       # overall points per standard deviation of role metric profile
+SECONDARY_FIT = 0.95      # score multiplier when the role isn't the primary position
+DEFAULT_MIN_MINUTES = 450
+CANDIDATES_PER_ROLE = 40  # candidates kept per role for the constrained search
+
+
+def load_pool(player_ids=None, league=None, team=None, max_age=None, min_minutes=DEFAULT_MIN_MINUTES):
+    """Candidate rows from the players table; explicit player_ids ignore the filters"""
+    columns = [Player.id, Player.name, Player.team, Player.position, Player.age,
+               Player.minutes, Player.overall] + [getattr(Player, m) for m in METRICS]
+    stmt = select(*columns)
+    if player_ids is not None:
+        stmt = stmt.where(Player.id.in_(player_ids))
+    else:
+        if league:
+            stmt = stmt.where(Player.league == league)
+        if team:
+            stmt = stmt.where(Player.team == team)
+        if max_age is not None:
+            stmt = stmt.where(Player.age <= max_age)
+        if min_minutes:
+            stmt = stmt.where(Player.minutes >= min_minutes)
+    return db.session.execute(stmt).all()
+
+
+class SquadOptimizer:
+    """Best XI for a formation over a fixed candidate pool"""
+
+    def __init__(self, rows):
+        self.ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.names = [r[1] for r in rows]
+        self.teams = np.array([r[2] or '' for r in rows], dtype=object)
+        self.positions = [r[3] or '' for r in rows]
+        self.ages = [r[4] for r in rows]
+        self.overall = np.array([DEFAULT_OVERALL if r[6] is None else r[6] for r in rows], dtype=float)
+
+        minutes = np.array([r[5] or 0 for r in rows], dtype=float)
+        raw = np.array([[v or 0 for v in r[7:]] for r in rows], dtype=float).reshape(len(rows), len(METRICS))
+        nineties = minutes / 90.0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            per90 = np.where(nineties[:, None] > 0, raw / nineties[:, None], 0.0)
+        std = per90.std(axis=0) if len(rows) else np.ones(len(METRICS))
+        mean = per90.mean(axis=0) if len(rows) else np.zeros(len(METRICS))
+        self.z = np.clip((per90 - mean) / np.where(std > 0, std, 1.0), -3, 3)
+
+        self.roles = list(ROLES)
+        weights = np.zeros((len(METRICS), len(self.roles)))
+        for j, role in enumerate(self.roles):
+            role_weights = ROLES[role][2]
+            for metric, w in role_weights.items():
+                weights[METRICS.index(metric), j] = w / sum(role_weights.values())
+        overall_z = (self.overall - self.overall.mean()) / (self.overall.std() or 1.0) if len(rows) else self.overall
+        # Goalkeepers have no outfield metrics, so their profile is just their rating
+        self.metric_score = self.z @ weights
+        self.metric_score[:, self.roles.index('GK')] = overall_z
+
+        fit = np.zeros((len(rows), len(self.roles)))
+        for i, position in enumerate(self.positions):
+            codes = [c.strip() for c in position.upper().split(',') if c.strip()]
+            for j, role in enumerate(self.roles):
+                allowed = ROLES[role][1]
+                if codes and codes[0] in allowed:
+                    fit[i, j] = 1.0
+                elif any(c in allowed for c in codes):
+                    fit[i, j] = SECONDARY_FIT
+        self.eligible = fit > 0
+        # Precomputed per-role suitability; -inf marks positions a player can't fill
+        self.suitability = np.where(self.eligible, (self.overall[:, None] + METRIC_WEIGHT * self.metric_score) * fit,
+                                    -np.inf)
+
+    def best_xi(self, slots, budget=None, prices=None, max_per_club=None):
+        """
+        Players for each slot maximizing total suitability
+
+        prices: {player_id: cost}; with a budget, players without a price are skipped
+        Returns a list of (slot role, row) or None when no XI fits the constraints.
+        """
+        unknown = [s for s in slots if s not in ROLES]
+        if unknown:
+            raise ValueError(f"Unknown positions: {', '.join(unknown)}")
+        usable = np.ones(len(self.ids), dtype=bool)
+        cost = None
+        if budget is not None:
+            prices = prices or {}
+            cost = np.array([prices.get(int(i), np.nan) for i in self.ids], dtype=float)
+            usable &= ~np.isnan(cost)
+
+        if budget is None and not max_per_club:
+            return self._assign(slots, usable)
+        return self._solve_milp(slots, usable, cost, budget, max_per_club)
+
+    def _assign(self, slots, usable):
+        """Exact unconstrained XI as a rectangular assignment problem"""
+        role_cols = [self.roles.index(s) for s in slots]
+        # The best len(slots) players per role always contain an optimal choice
+        keep = self._candidates(role_cols, usable, len(slots))
+        if len(keep) < len(slots):
+            return None
+        scores = self.suitability[np.ix_(keep, role_cols)]
+        cost = np.where(np.isfinite(scores), -scores, 1e9)
+        rows, cols = linear_sum_assignment(cost)
+        if (cost[rows, cols] >= 1e9).any():
+            return None
+        order = np.argsort(cols)
+        return [(slots[c], int(keep[r])) for r, c in zip(rows[order], cols[order])]
+
+    def _solve_milp(self, slots, usable, cost, budget, max_per_club):
+        """XI under budget and per-club limits as a 0/1 integer program over roles"""
+        need = Counter(slots)
+        role_cols = [self.roles.index(r) for r in need]
+        keep = self._candidates(role_cols, usable, CANDIDATES_PER_ROLE, cost)
+        if cost is not None:
+            # Cheap fallbacks so a tight budget still has something feasible
+            for j in role_cols:
+                ok = np.flatnonzero(usable & self.eligible[:, j])
+                keep = np.union1d(keep, ok[np.argsort(cost[ok], kind='stable')[:len(slots)]])
+
+        # One variable per eligible (candidate, role) pair
+        pairs = [(p, k) for p in keep for k, j in enumerate(role_cols) if self.eligible[p, j]]
+        if not pairs:
+            return None
+        var_player = np.array([p for p, _ in pairs])
+        var_role = np.array([k for _, k in pairs])
+        n_vars = len(pairs)
+        var_idx = np.arange(n_vars)
+        objective = -self.suitability[var_player, np.array(role_cols)[var_role]]
+
+        constraints = []
+        # Each role filled exactly as many times as the formation needs it
+        counts = np.array([need[r] for r in need], dtype=float)
+        constraints.append(LinearConstraint(
+            coo_matrix((np.ones(n_vars), (var_role, var_idx)), shape=(len(need), n_vars)), counts, counts))
+        # A player fills at most one slot
+        players, player_row = np.unique(var_player, return_inverse=True)
+        constraints.append(LinearConstraint(
+            coo_matrix((np.ones(n_vars), (player_row, var_idx)), shape=(len(players), n_vars)), 0, 1))
+        if max_per_club:
+            clubs, club_row = np.unique(self.teams[var_player].astype(str), return_inverse=True)
+            constraints.append(LinearConstraint(
+                coo_matrix((np.ones(n_vars), (club_row, var_idx)), shape=(len(clubs), n_vars)), 0, max_per_club))
+        if budget is not None:
+            constraints.append(LinearConstraint(cost[var_player][None, :], -np.inf, budget))
+
+        result = milp(objective, constraints=constraints, integrality=np.ones(n_vars),
+                      bounds=Bounds(0, 1), options={'time_limit': 5})
+        if result.x is None:
+            return None
+        chosen = np.flatnonzero(result.x > 0.5)
+
+        # Hand the chosen players back to slots in formation order
+        roles = list(need)
+        by_role = {}
+        for v in chosen[np.argsort(objective[chosen], kind='stable')]:
+            by_role.setdefault(roles[var_role[v]], []).append(int(var_player[v]))
+        return [(slot, by_role[slot].pop(0)) for slot in slots]
+
+    def _candidates(self, role_cols, usable, per_role, cost=None):
+        """Union of the top per_role candidates for each role (and best value for money)"""
+        keep = []
+        for j in role_cols:
+            ok = np.flatnonzero(usable & self.eligible[:, j])
+            scores = self.suitability[ok, j]
+            if len(ok) > per_role:
+                top = ok[np.argpartition(-scores, per_role - 1)[:per_role]]
+            else:
+                top = ok
+            keep.append(top)
+            if cost is not None and len(ok):
+                value = scores / np.maximum(cost[ok], 1e-9)
+                keep.append(ok[np.argsort(-value, kind='stable')[:per_role]])
+        return np.unique(np.concatenate(keep)) if keep else np.array([], dtype=np.int64)
+
+    # ---- reporting ----
+    def report(self, lineup):
+        """Lineup rows plus role-level strengths and weaknesses from the metrics"""
+        players = []
+        role_groups = {}
+        for slot, i in lineup:
+            j = self.roles.index(slot)
+            players.append({
+                'slot': slot,
+                'id': int(self.ids[i]),
+                'name': self.names[i],
+                'team': self.teams[i],
+                'position': self.positions[i],
+                'age': self.ages[i],
+                'overall': int(self.overall[i]),
+                'suitability': round(float(self.suitability[i, j]), 2),
+            })
+            role_groups.setdefault(slot, []).append(i)
+
+        roles = []
+        for slot, rows in role_groups.items():
+            j = self.roles.index(slot)
+            weights = ROLES[slot][2]
+            metric_means = {m: float(self.z[rows, METRICS.index(m)].mean()) for m in weights}
+            roles.append({
+                'role': slot,
+                'label': ROLES[slot][0],
+                'score': round(float(self.metric_score[rows, j].mean()), 3),
+                'best_metric': max(metric_means, key=metric_means.get) if metric_means else None,
+                'worst_metric': min(metric_means, key=metric_means.get) if metric_means else None,
+            })
+        roles.sort(key=lambda r: -r['score'])
+
+        # Relative to the rest of this XI, so even a strong side gets its weak links named
+        average = np.mean([r['score'] for r in roles])
+        strengths = [_describe(r, 'best_metric') for r in roles if r['score'] > average][:2]
+        weaknesses = [_describe(r, 'worst_metric') for r in reversed(roles) if r['score'] < average][:2]
+        return players, roles, strengths, weaknesses
+
+
+def _describe(role, metric_key):
+    metric = role[metric_key]
+    return f"{role['label']} ({metric})" if metric else role['label']
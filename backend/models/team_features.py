@@ -0,0 +1,296 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .db import (
+    db, read_connection, write_transaction,
+    Player, Team, Match, SyncState, TeamFeatureHistory, TeamFeatureState, TeamRating,
+)
+from .feature_store import feature_store
+from .team_strength import INITIAL_RATING, LOOKUP_CHUNK, team_strength, to_feature
+from services.metrics import stage
+
+# Values _prepare_features falls back to when a team has no history
+DEFAULT_FEATURES = {
+    'rating': 75,
+    'form': 0.5,
+    'goals_scored': 1.5,
+    'goals_conceded': 1.2,
+    'xG': 1.8,
+    'days_rest': 7,
+}
+
+
+def features_version():
+    """
+    Changes whenever data team features are computed from may have changed,
+    whichever process wrote it: players re-ingested or re-rated, matches
+    rated or folded into the rolling state, or a football-data.org sync
+    (which can correct stored results). Max/sum lookups on indexes and
+    small tables, so it's cheap to check every few seconds.
+    """
+    with read_connection() as conn:
+        row = conn.execute(select(
+            select(func.max(Player.last_updated)).scalar_subquery(),
+            select(func.max(Player.id)).scalar_subquery(),
+            select(func.max(TeamRating.id)).scalar_subquery(),
+            select(func.sum(TeamFeatureState.matches)).scalar_subquery(),
+            select(func.max(TeamFeatureHistory.id)).scalar_subquery(),
+            select(func.max(SyncState.synced_at)).scalar_subquery(),
+        )).one()
+    return ':'.join('' if v is None else str(v) for v in row)
+
+
+class TeamFeatureCache:
+    """
+    In-process TTL/LRU cache of per-team feature dicts keyed by team id
+
+    Writes in this process invalidate entries directly. Jobs write from
+    other processes, so data_version() also compares features_version()
+    with the last one seen every check_interval seconds and drops every
+    entry when it moved.
+    """
+
+    def __init__(self, max_size=512, ttl=600, check_interval=5):
+        self.max_size = max_size
+        self.ttl = ttl  # seconds
+        self.check_interval = check_interval  # seconds between features_version() checks
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Bumped on invalidation so results derived from features can be keyed on them
+        self._generation = 0
+        self._team_generations = {}
+        self._data_version = None
+        self._last_check = 0.0
+
+    def data_version(self):
+        """features_version() as of the last check, re-checked every check_interval seconds"""
+        now = time.monotonic()
+        if self._data_version is not None and now - self._last_check < self.check_interval:
+            return self._data_version
+        version = features_version()
+        with self._lock:
+            changed = self._data_version is not None and version != self._data_version
+            self._data_version, self._last_check = version, now
+        if changed:
+            self.invalidate()
+        return version
+
+    def get(self, team_id):
+        with self._lock:
+            entry = self._entries.get(team_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[team_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(team_id)
+            self.hits += 1
+            return dict(entry[1])
+
+    def set(self, team_id, features):
+        with self._lock:
+            self._entries[team_id] = (time.monotonic() + self.ttl, dict(features))
+            self._entries.move_to_end(team_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, team_ids=None):
+        """Drop the given team ids, or everything when team_ids is None"""
+        with self._lock:
+            if team_ids is None:
+                self._entries.clear()
+                self._generation += 1
+                return
+            for team_id in team_ids:
+                self._entries.pop(team_id, None)
+                self._team_generations[team_id] = self._team_generations.get(team_id, 0) + 1
+
+    def generation(self, team_id):
+        """Changes whenever the team's features may have changed"""
+        with self._lock:
+            return self._generation, self._team_generations.get(team_id, 0)
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+feature_cache = TeamFeatureCache()
+
+
+def get_team_features(team_id, as_of=None):
+    """
+    Feature dict for a team as expected by MatchPredictor._prepare_features
+    Returns None if the team doesn't exist
+    """
+    return get_many_team_features([team_id], as_of).get(team_id)
+
+
+def get_many_team_features(team_ids, as_of=None):
+    """get_team_features for many teams with one lookup; {team_id: features} of those that exist"""
+    return {team_id: _with_rest(features, as_of) for team_id, features in _cached_team_features(team_ids).items()}
+
+
+def get_fixture_features(home_team_id, away_team_id, as_of=None):
+    """
+    (home_team, away_team, match_context) ready for MatchPredictor.predict
+    Returns None if either team doesn't exist
+    """
+    return get_many_fixture_features([(home_team_id, away_team_id, as_of)])[0]
+
+
+def get_many_fixture_features(fixtures):
+    """
+    get_fixture_features for many (home_team_id, away_team_id, as_of)
+    fixtures, in order, with one lookup for all the teams involved
+    """
+    with stage('features'):
+        teams = _cached_team_features({team_id for fixture in fixtures for team_id in fixture[:2]})
+        prepared = []
+        for home_team_id, away_team_id, as_of in fixtures:
+            if home_team_id not in teams or away_team_id not in teams:
+                prepared.append(None)
+                continue
+            home_team = _with_rest(teams[home_team_id], as_of)
+            away_team = _with_rest(teams[away_team_id], as_of)
+            # The model has a single rest feature; use the more tired side
+            context = {'days_rest': min(home_team.pop('days_rest'), away_team.pop('days_rest'))}
+            prepared.append((home_team, away_team, context))
+    return prepared
+
+
+def _cached_team_features(team_ids):
+    """{team_id: features} for the teams that exist, computing cache misses in one go"""
+    feature_cache.data_version()
+    found, missing = {}, []
+    for team_id in team_ids:
+        features = feature_cache.get(team_id)
+        if features is None:
+            missing.append(team_id)
+        else:
+            found[team_id] = features
+    if missing:
+        computed = _compute_team_features(missing)
+        for team_id, features in computed.items():
+            feature_cache.set(team_id, features)
+        found.update(computed)
+    return found
+
+
+def _with_rest(features, as_of):
+    """Copy of cached features with the rest days before as_of (default now)"""
+    features = dict(features)
+    # Rest days depend on the kick-off time, so derive them outside the cache
+    last_match = features.pop('last_match', None)
+    if last_match is not None:
+        features['days_rest'] = max(0, ((as_of or datetime.utcnow()) - last_match).days)
+    return features
+
+
+def _compute_team_features(team_ids):
+    """
+    {team_id: features} of Elo rating plus rolling form, goals, xG and last
+    match date from the feature store, for the given teams that exist
+    """
+    teams = []
+    for start in range(0, len(team_ids), LOOKUP_CHUNK):
+        teams.extend(db.session.execute(
+            select(Team.id, Team.matches_played, Team.goals_for, Team.goals_against, Team.xG)
+            .where(Team.id.in_(team_ids[start:start + LOOKUP_CHUNK]))
+        ).all())
+    ids = [team.id for team in teams]
+    # Training rows use the Elo rating, and the initial one for teams without
+    # rated matches, so serve the same. Requests only read: the jobs that
+    # write matches apply them (sync_match_features)
+    ratings = team_strength.current_many(ids)
+    rolling = feature_store.team_features_many(ids)
+
+    computed = {}
+    for team in teams:
+        features = dict(DEFAULT_FEATURES)
+        features['last_match'] = None
+        features['rating'] = to_feature(ratings.get(team.id, INITIAL_RATING))
+        if team.id in rolling:
+            features.update(rolling[team.id])
+        elif team.matches_played:
+            # No match rows yet, fall back on the season totals scraped for the team
+            if team.goals_for is not None:
+                features['goals_scored'] = team.goals_for / team.matches_played
+            if team.goals_against is not None:
+                features['goals_conceded'] = team.goals_against / team.matches_played
+            if team.xG is not None:
+                features['xG'] = team.xG / team.matches_played
+        computed[team.id] = features
+    return computed
+
+
+def sync_match_features():
+    """
+    Apply stored results to the Elo ratings and rolling team state
+
+    Run by the jobs that write matches, so serving never writes; returns
+    matches rated and team results applied.
+    """
+    rated = team_strength.sync()
+    applied = feature_store.sync()
+    if rated or applied:
+        record_features_change(rated, applied)
+    return {'rated': rated, 'applied': applied}
+
+
+def record_features_change(matches=None, teams=None):
+    """
+    Stamp a re-rating or replay where features_version() sees it; rewritten
+    rows can get the ids of the ones they replaced, so maxima alone miss it
+    """
+    table = SyncState.__table__
+    stmt = sqlite_insert(table).values(source='features', key='matches', synced_at=datetime.utcnow(),
+                                       matches=matches, teams=teams)
+    with write_transaction() as conn:
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.source, table.c.key],
+            set_={c: stmt.excluded[c] for c in ('synced_at', 'teams', 'matches')},
+        ))
+    # Core statements, which the flush hooks below don't see
+    feature_cache.invalidate()
+
+
+# ---- cache invalidation ----
+# Team ids touched by a flush are only evicted once the transaction commits,
+# so another request can't re-cache the pre-commit rows in between.
+
+def _affected_team_ids(obj):
+    if isinstance(obj, Team):
+        return [obj.id]
+    if isinstance(obj, Match):
+        return [obj.home_team_id, obj.away_team_id]
+    # Players can be linked to a team by name only, so drop everything
+    return [None]
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, _flush_context):
+    pending = session.info.setdefault('team_feature_changes', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Team, Match, Player)):
+            pending.update(_affected_team_ids(obj))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_changes(session):
+    pending = session.info.pop('team_feature_changes', None)
+    if pending:
+        feature_cache.invalidate(None if None in pending else pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('team_feature_changes', None)
@@ -0,0 +1,219 @@
+import threading
+
+from sqlalchemy import select, delete, func, and_, case, exists, or_, tuple_
+from sqlalchemy.orm import aliased
+
+from .db import db, read_connection, write_transaction, Match, TeamRating
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 20.0
+# Keep IN (...) lists under SQLite's bound parameter limit
+LOOKUP_CHUNK = 900
+HOME_ADVANTAGE = 65.0  # Elo points added to the home side when computing expectations
+BATCH_SIZE = 5000
+
+# Elo -> the scale of MatchPredictor's team rating features, where the
+# default of 75 is an unrated team and 25 Elo points make one feature point
+FEATURE_BASE = 75.0
+ELO_PER_FEATURE_POINT = 25.0
+
+
+def expected_home(home_rating, away_rating):
+    """Home side's expected score (win = 1, draw = 0.5)"""
+    return 1.0 / (1.0 + 10.0 ** ((away_rating - home_rating - HOME_ADVANTAGE) / 400.0))
+
+
+def margin_multiplier(goal_diff):
+    """World Football Elo weighting of the winning margin"""
+    margin = abs(goal_diff)
+    if margin <= 1:
+        return 1.0
+    if margin == 2:
+        return 1.5
+    return (11.0 + margin) / 8.0
+
+
+def to_feature(rating):
+    """Elo rating on the model's team rating scale"""
+    return FEATURE_BASE + (rating - INITIAL_RATING) / ELO_PER_FEATURE_POINT
+
+
+def _completed():
+    return and_(Match.home_score.isnot(None), Match.away_score.isnot(None), Match.date.isnot(None),
+                Match.home_team_id.isnot(None), Match.away_team_id.isnot(None))
+
+
+def _match_select():
+    return select(Match.id, Match.date, Match.home_team_id, Match.away_team_id,
+                  Match.home_score, Match.away_score).where(_completed())
+
+
+class TeamStrength:
+    """
+    Elo team ratings with home advantage and margin of victory
+
+    Every completed match adds one team_ratings row per side holding the
+    rating before and after it, so the rating a team carried into any date
+    is one indexed lookup. sync() rates completed matches that have no
+    team_ratings rows yet, and re-rates matches whose score, date or teams
+    changed since: in O(1) each when they come after the latest rated
+    (date, match_id), otherwise (a late, rescheduled or corrected result)
+    by replaying everything from the earliest of them. rebuild() replays
+    the full history in a single pass.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    # ---- serving ----
+    def current(self, team_id):
+        """Latest Elo rating of a team, or None before its first rated match"""
+        stmt = (select(TeamRating.rating).where(TeamRating.team_id == team_id)
+                .order_by(TeamRating.date.desc(), TeamRating.match_id.desc()).limit(1))
+        return db.session.execute(stmt).scalar()
+
+    def current_many(self, team_ids):
+        """{team_id: latest Elo rating} for the given teams that have rated matches"""
+        team_ids = list(team_ids)
+        ratings = {}
+        for start in range(0, len(team_ids), LOOKUP_CHUNK):
+            latest = (select(TeamRating.team_id, TeamRating.rating,
+                             func.row_number().over(
+                                 partition_by=TeamRating.team_id,
+                                 order_by=(TeamRating.date.desc(), TeamRating.match_id.desc()),
+                             ).label('n'))
+                      .where(TeamRating.team_id.in_(team_ids[start:start + LOOKUP_CHUNK]))
+                      .subquery())
+            ratings.update(db.session.execute(
+                select(latest.c.team_id, latest.c.rating).where(latest.c.n == 1)).all())
+        return ratings
+
+    def as_of(self, team_id, when):
+        """Rating a team carried into `when`, from matches strictly before it"""
+        stmt = (select(TeamRating.rating)
+                .where(TeamRating.team_id == team_id, TeamRating.date < when)
+                .order_by(TeamRating.date.desc(), TeamRating.match_id.desc()).limit(1))
+        rating = db.session.execute(stmt).scalar()
+        return INITIAL_RATING if rating is None else rating
+
+    def pre_match_ratings(self):
+        """
+        DataFrame of match_id, home_rating, away_rating: both sides' Elo
+        going into every rated match, after applying pending results
+        """
+        import pandas as pd
+
+        self.sync()
+        home = aliased(TeamRating)
+        away = aliased(TeamRating)
+        stmt = (select(Match.id, home.rating_before, away.rating_before)
+                .join(home, and_(home.match_id == Match.id, home.team_id == Match.home_team_id))
+                .join(away, and_(away.match_id == Match.id, away.team_id == Match.away_team_id)))
+        with read_connection() as conn:
+            rows = conn.execute(stmt).all()
+        return pd.DataFrame(rows, columns=['match_id', 'home_rating', 'away_rating'])
+
+    # ---- incremental ----
+    def sync(self):
+        """Rate new completed matches and re-rate changed ones; returns matches (re)rated"""
+        with self._lock:
+            with read_connection() as conn:
+                if (conn.execute(self._unrated().limit(1)).first() is None
+                        and conn.execute(self._changed().limit(1)).first() is None):
+                    return 0
+            # Re-read under the write lock so two workers can't rate a match twice
+            with write_transaction() as conn:
+                first = conn.execute(self._unrated().order_by(Match.date, Match.id).limit(1)).first()
+                starts = [(first.date, first.id)] if first is not None else []
+                for rated_date, match_id, date in conn.execute(self._changed()).all():
+                    starts.extend((when, match_id) for when in (rated_date, date) if when is not None)
+                if not starts:
+                    return 0
+                start = tuple_(*min(starts))
+                # Ratings from the earliest new or changed match on were computed
+                # without it, so they're replayed; usually there are none
+                conn.execute(delete(TeamRating.__table__)
+                             .where(tuple_(TeamRating.date, TeamRating.match_id) >= start))
+                matches = conn.execute(_match_select().where(tuple_(Match.date, Match.id) >= start)
+                                       .order_by(Match.date, Match.id)).all()
+                ratings = {}
+                for row in matches:
+                    for team_id in (row[2], row[3]):
+                        if team_id not in ratings:
+                            ratings[team_id] = self._latest(conn, team_id)
+                self._insert(conn, self._replay(matches, ratings))
+            return len(matches)
+
+    @staticmethod
+    def _unrated():
+        # Anti-join on the match index of team_ratings
+        return _match_select().where(~exists().where(TeamRating.match_id == Match.id))
+
+    @staticmethod
+    def _changed():
+        """
+        (rated date, match_id, current date) of ratings whose match changed
+        since: score corrected, rescheduled, teams swapped or no longer a
+        completed match. Rows rated before scores were kept count as changed.
+        """
+        is_home = TeamRating.team_id == Match.home_team_id
+        return (
+            select(TeamRating.date, TeamRating.match_id, Match.date)
+            .outerjoin(Match, Match.id == TeamRating.match_id)  # primary key lookups
+            .where(or_(
+                Match.id.is_(None), ~_completed(), TeamRating.date != Match.date,
+                and_(TeamRating.team_id.is_distinct_from(Match.home_team_id),
+                     TeamRating.team_id.is_distinct_from(Match.away_team_id)),
+                TeamRating.goals_for.is_distinct_from(
+                    case((is_home, Match.home_score), else_=Match.away_score)),
+                TeamRating.goals_against.is_distinct_from(
+                    case((is_home, Match.away_score), else_=Match.home_score)),
+            ))
+        )
+
+    @staticmethod
+    def _latest(conn, team_id):
+        rating = conn.execute(
+            select(TeamRating.rating).where(TeamRating.team_id == team_id)
+            .order_by(TeamRating.date.desc(), TeamRating.match_id.desc()).limit(1)
+        ).scalar()
+        return INITIAL_RATING if rating is None else rating
+
+    # ---- full history ----
+    def rebuild(self):
+        """Recompute every rating from the full match history; returns matches rated"""
+        with self._lock, write_transaction() as conn:
+            matches = conn.execute(_match_select().order_by(Match.date, Match.id)).all()
+            conn.execute(delete(TeamRating.__table__))
+            self._insert(conn, self._replay(matches, {}))
+            return len(matches)
+
+    @staticmethod
+    def _replay(matches, ratings):
+        """
+        Apply matches in order to ratings ({team_id: Elo}, updated in place)
+        and return the team_ratings rows they produce
+        """
+        rows = []
+        append = rows.append
+        for match_id, date, home_id, away_id, home_score, away_score in matches:
+            home = ratings.get(home_id, INITIAL_RATING)
+            away = ratings.get(away_id, INITIAL_RATING)
+            result = 1.0 if home_score > away_score else 0.0 if home_score < away_score else 0.5
+            delta = K_FACTOR * margin_multiplier(home_score - away_score) * (result - expected_home(home, away))
+            ratings[home_id] = home + delta
+            ratings[away_id] = away - delta
+            append({'team_id': home_id, 'match_id': match_id, 'date': date, 'rating_before': home,
+                    'rating': home + delta, 'goals_for': home_score, 'goals_against': away_score})
+            append({'team_id': away_id, 'match_id': match_id, 'date': date, 'rating_before': away,
+                    'rating': away - delta, 'goals_for': away_score, 'goals_against': home_score})
+        return rows
+
+    @staticmethod
+    def _insert(conn, rows):
+        table = TeamRating.__table__
+        for start in range(0, len(rows), BATCH_SIZE):
+            conn.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+
+team_strength = TeamStrength()
@@ -0,0 +1,197 @@
+"""
+Time-aware model selection for MatchPredictor
+
+Candidates from several model families are scored with rolling-origin
+cross-validation (always train on the past, validate on what came next) and
+evaluated in parallel worker processes within an optional time budget.
+Run nightly through train_model.py.
+"""
+import itertools
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import (
+    GradientBoostingClassifier, HistGradientBoostingClassifier, RandomForestClassifier,
+)
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import log_loss
+from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
+
+CLASSES = np.array(['away', 'draw', 'home'])
+
+# family -> (estimator class, parameter grid), cheapest families first so a
+# tight time budget still gets a full comparison of the fast ones
+MODEL_FAMILIES = {
+    'logreg': (LogisticRegression, {'C': [0.1, 1.0], 'max_iter': [1000]}),
+    'hist_gb': (HistGradientBoostingClassifier, {
+        'learning_rate': [0.05, 0.1],
+        'max_leaf_nodes': [15, 31],
+        'max_iter': [200],
+        'l2_regularization': [0.0, 1.0],
+        'random_state': [42],
+    }),
+    'random_forest': (RandomForestClassifier, {
+        'n_estimators': [300],
+        'min_samples_leaf': [5, 20],
+        'n_jobs': [1],
+        'random_state': [42],
+    }),
+    'gradient_boosting': (GradientBoostingClassifier, {
+        'n_estimators': [100],
+        'max_depth': [2, 3],
+        'learning_rate': [0.05, 0.1],
+        'random_state': [42],
+    }),
+}
+
+
+def rolling_origin_splits(df, n_splits=4, min_train=20):
+    """
+    (train_idx, val_idx) pairs in time order
+
+    With a 'season' column spanning enough seasons, each fold validates on one
+    season and trains on every season before it; otherwise rows are ordered
+    by 'date' (or taken in the given order) and cut into contiguous blocks.
+    """
+    if 'date' in df.columns:
+        order = np.argsort(pd.to_datetime(df['date']).to_numpy(), kind='stable')
+    elif 'season' in df.columns:
+        order = np.argsort(df['season'].astype(str).to_numpy(), kind='stable')
+    else:
+        order = np.arange(len(df))
+
+    if 'season' in df.columns and df['season'].nunique() > n_splits:
+        seasons = df['season'].astype(str).to_numpy()[order]
+        unique = sorted(set(seasons))
+        splits = []
+        for season in unique[-n_splits:]:
+            train = order[seasons < season]
+            val = order[seasons == season]
+            if len(train) >= min_train and len(val):
+                splits.append((train, val))
+        if splits:
+            return splits
+
+    blocks = np.array_split(order, n_splits + 1)
+    splits = []
+    for k in range(1, n_splits + 1):
+        train = np.concatenate(blocks[:k])
+        if len(train) >= min_train and len(blocks[k]):
+            splits.append((train, blocks[k]))
+    return splits
+
+
+def candidate_configs(families=None):
+    """Every (family, params) combination to evaluate"""
+    configs = []
+    for family in families or MODEL_FAMILIES:
+        _estimator, grid = MODEL_FAMILIES[family]
+        keys = sorted(grid)
+        for values in itertools.product(*(grid[k] for k in keys)):
+            configs.append((family, dict(zip(keys, values))))
+    return configs
+
+
+def build_model(family, params):
+    estimator, _grid = MODEL_FAMILIES[family]
+    return estimator(**params)
+
+
+def aligned_proba(model, X):
+    """predict_proba with columns in CLASSES order, even if a class was unseen in training"""
+    proba = model.predict_proba(X)
+    out = np.zeros((len(X), len(CLASSES)))
+    for j, cls in enumerate(model.classes_):
+        out[:, np.flatnonzero(CLASSES == cls)[0]] = proba[:, j]
+    return out
+
+
+def score_probabilities(y, proba):
+    """Log loss, multi-class Brier score and accuracy"""
+    onehot = (np.asarray(y)[:, None] == CLASSES[None, :]).astype(float)
+    return {
+        'log_loss': float(log_loss(y, np.clip(proba, 1e-15, 1), labels=CLASSES)),
+        'brier': float(((proba - onehot) ** 2).sum(axis=1).mean()),
+        'accuracy': float((CLASSES[proba.argmax(axis=1)] == np.asarray(y)).mean()),
+    }
+
+
+# ---- worker processes ----
+# The data is shipped once per worker through the pool initializer instead
+# of once per task.
+_worker_data = {}
+
+
+def _init_worker(X, y, splits):
+    _worker_data.update(X=X, y=y, splits=splits)
+    # Parallelism comes from the process pool; keep OpenMP/BLAS in each worker
+    # single-threaded so workers don't oversubscribe the cores
+    threadpool_limits(1)
+
+
+def _evaluate(family, params):
+    X, y, splits = _worker_data['X'], _worker_data['y'], _worker_data['splits']
+    started = time.perf_counter()
+    fold_scores = []
+    for train, val in splits:
+        scaler = StandardScaler().fit(X[train])
+        model = build_model(family, params).fit(scaler.transform(X[train]), y[train])
+        fold_scores.append(score_probabilities(y[val], aligned_proba(model, scaler.transform(X[val]))))
+    scores = {k: float(np.mean([s[k] for s in fold_scores])) for k in fold_scores[0]}
+    return {'family': family, 'params': params, 'scores': scores,
+            'seconds': round(time.perf_counter() - started, 3)}
+
+
+def search_models(df, feature_columns, n_splits=4, n_jobs=None, time_budget=None, families=None):
+    """
+    Cross-validate every candidate in parallel and rank them by log loss
+
+    time_budget: seconds; candidates still queued when it runs out are skipped
+    Returns {'best': result, 'leaderboard': [results...], 'skipped': n}
+    """
+    X = df[feature_columns].to_numpy(dtype=float)
+    y = df['result'].to_numpy()
+    splits = rolling_origin_splits(df, n_splits)
+    if not splits:
+        raise ValueError("Not enough history for time-ordered cross-validation")
+
+    configs = candidate_configs(families)
+    deadline = time.monotonic() + time_budget if time_budget else None
+    results = []
+    pool = multiprocessing.Pool(n_jobs or os.cpu_count(), _init_worker, (X, y, splits))
+    try:
+        jobs = [pool.apply_async(_evaluate, config) for config in configs]
+        pool.close()
+        for job in jobs:
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                break
+            job.wait(timeout)
+        for job in jobs:
+            if not job.ready():
+                continue
+            try:
+                results.append(job.get())
+            except Exception as e:
+                print(f"Candidate failed: {e}")
+    finally:
+        # Stops candidates still running when the budget is spent
+        pool.terminate()
+        pool.join()
+
+    if not results:
+        raise TimeoutError("No candidate finished within the time budget")
+    results.sort(key=lambda r: r['scores']['log_loss'])
+    return {'best': results[0], 'leaderboard': results, 'skipped': len(configs) - len(results)}
+
+
+def fit_final(df, feature_columns, family, params):
+    """Fit scaler and model on all rows for the chosen configuration"""
+    X = df[feature_columns].to_numpy(dtype=float)
+    scaler = StandardScaler().fit(X)
+    model = build_model(family, params).fit(scaler.transform(X), df['result'].to_numpy())
+    return model, scaler
@@ -1,5 +1,6 @@
 # Scraper package initialization
 from .fbref_scraper import FBrefScraper
 from .data_parser import DataParser
+from .scheduler import ScrapeScheduler
 
-__all__ = ['FBrefScraper', 'DataParser']
\ No newline at end of file
+__all__ = ['FBrefScraper', 'DataParser', 'ScrapeScheduler']
\ No newline at end of file
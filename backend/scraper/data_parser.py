@@ -1,9 +1,56 @@
+import numpy as np
 import pandas as pd
 
+from services.leagues import league_key
+
+# Scraped column -> Player column
+PLAYER_COLUMN_MAP = {
+    'xg': 'xG',
+    'xa': 'xA',
+}
+
+PLAYER_INT_COLUMNS = [
+    'minutes', 'games_played', 'starts', 'goals', 'assists', 'cards_yellow',
+    'cards_red', 'progressive_passes', 'progressive_carries', 'tackles',
+    'interceptions',
+]
+PLAYER_FLOAT_COLUMNS = ['xG', 'xA']
+PLAYER_TEXT_COLUMNS = ['fbref_id', 'name', 'position', 'nationality', 'team', 'league']
+
+
 class DataParser:
     @staticmethod
     def clean_player_data(df):
         """Convert FBref scraped data to database-ready format"""
-        df['minutes'] = df['minutes'].fillna(0)
-        df['games_played'] = (df['minutes'] / 90).round().astype(int)
-        return df
\ No newline at end of file
+        df = df.rename(columns=PLAYER_COLUMN_MAP).copy()
+        for col in PLAYER_TEXT_COLUMNS + PLAYER_INT_COLUMNS + PLAYER_FLOAT_COLUMNS + ['age']:
+            if col not in df.columns:
+                df[col] = np.nan
+
+        # Text: strip whitespace, treat empty strings as missing
+        for col in PLAYER_TEXT_COLUMNS:
+            df[col] = df[col].astype('string').str.strip().replace('', pd.NA)
+        # League URLs, competition ids and slugs all become the same key
+        df['league'] = df['league'].map(league_key, na_action='ignore').astype('string')
+
+        # Rows without a name can't be identified or displayed
+        df = df[df['name'].notna()]
+        slugs = 'player_' + df['name'].str.lower().str.replace(' ', '_', regex=False)
+        df['fbref_id'] = df['fbref_id'].fillna(slugs)
+        df['position'] = df['position'].fillna('Unknown')
+
+        # Counting stats: numeric, non-negative, missing means zero
+        df['minutes'] = pd.to_numeric(df['minutes'], errors='coerce').fillna(0).clip(lower=0)
+        games = pd.to_numeric(df['games_played'], errors='coerce')
+        df['games_played'] = games.fillna((df['minutes'] / 90).round())
+        for col in PLAYER_INT_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).clip(lower=0).round().astype(int)
+        for col in PLAYER_FLOAT_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0).clip(lower=0.0).astype(float)
+
+        age = pd.to_numeric(df['age'], errors='coerce')
+        df['age'] = age.where(age.between(14, 50)).round().astype('Int64')
+
+        # Last occurrence wins if a player shows up twice (e.g. mid-season transfer)
+        df = df.drop_duplicates(subset='fbref_id', keep='last')
+        return df.reset_index(drop=True)
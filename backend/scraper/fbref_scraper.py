@@ -1,85 +1,93 @@
-import requests
 from bs4 import BeautifulSoup
-import pandas as pd
-import time
+import os
+import re
 from fake_useragent import UserAgent
 
+from services.http_cache import CachedSession
+from services.leagues import league_key
+
+from .table_extractor import extract_squad_players, lxml_html
+
 class FBrefScraper:
-    def __init__(self):
+    def __init__(self, parse_mode=None):
         self.base_url = "https://fbref.com"
         self.ua = UserAgent()
-        self.session = requests.Session()
+        # Squad and league pages only change after matchdays
+        self.session = CachedSession(
+            default_ttl=int(os.getenv("FBREF_CACHE_TTL", 12 * 3600))
+        )
         self.session.headers.update({'User-Agent': self.ua.random})
         self.delay = 5  # seconds between requests
+        # 'fast' parses the stat tables with lxml, 'soup' with BeautifulSoup (no lxml needed)
+        self.parse_mode = parse_mode or ('fast' if lxml_html is not None else 'soup')
 
-    def get_league_data(self, league_url):
+    def get_league_data(self, league_url, checkpoint_path=None):
         """Scrape all teams and players from a league"""
-        league_data = []
-        teams = self._get_teams(league_url)
-        
-        for team in teams[:3]:  # Limit to 3 teams for testing
-            players = self._get_players(team['url'])
-            for player in players:
-                player['team'] = team['name']
-                player['league'] = team['league']
-                league_data.append(player)
-            time.sleep(self.delay)
-        
-        return pd.DataFrame(league_data)
+        from .scheduler import ScrapeScheduler
+        return ScrapeScheduler(self, checkpoint_path=checkpoint_path).run([league_url])
+
+    def get_leagues_data(self, league_urls, max_workers=4, checkpoint_path=None):
+        """Scrape all teams and players from several leagues concurrently"""
+        from .scheduler import ScrapeScheduler
+        scheduler = ScrapeScheduler(self, max_workers=max_workers, checkpoint_path=checkpoint_path)
+        return scheduler.run(league_urls)
 
     def _get_teams(self, league_url):
         """Get all teams in a league"""
         response = self.session.get(f"{self.base_url}{league_url}")
-        soup = BeautifulSoup(response.text, 'html.parser')
+        return self._parse_teams(response.text, league_url)
+
+    def _parse_teams(self, html, league_url):
+        """Parse the team list out of a league page"""
+        soup = BeautifulSoup(html, 'html.parser')
         
         teams = []
-        table = soup.find('table', {'id': 'results2023-202491_overall'})
+        # e.g. results2023-202491_overall; the id embeds season and competition
+        table = soup.find('table', id=re.compile(r'^results.*_overall$'))
+        if table is None:
+            return teams
         for row in table.tbody.find_all('tr'):
             team_link = row.find('a', href=True)
             if team_link and 'squads' in team_link['href']:
                 teams.append({
                     'name': team_link.text.strip(),
                     'url': team_link['href'],
-                    'league': league_url.split('/')[-2]
+                    'league': league_key(league_url)
                 })
         return teams
 
     def _get_players(self, team_url):
         """Get all players from a team"""
         response = self.session.get(f"{self.base_url}{team_url}")
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        players = []
-        tables = {
-            'standard': 'stats_standard_9',
-            'shooting': 'stats_shooting_9',
-            'passing': 'stats_passing_9'
+        return self._parse_players(response.text)
+
+    def _parse_players(self, html):
+        """Parse player stats out of a squad page"""
+        if self.parse_mode == 'fast':
+            return extract_squad_players(html)
+        return self._parse_players_soup(html)
+
+    def _parse_players_soup(self, html):
+        """
+        Parse a squad page with BeautifulSoup instead of lxml
+
+        Same tables (commented out or not), stats and join on player id as
+        the fast path, so both modes return the same players.
+        """
+        return extract_squad_players(html, table_rows=_soup_table_rows)
+
+
+def _soup_table_rows(table_html):
+    """table_extractor row tuples (player_id, name, {data-stat: text}) from BeautifulSoup"""
+    table = BeautifulSoup(table_html, 'html.parser').table
+    for row in table.select('tbody > tr'):
+        cells = {cell.get('data-stat'): cell for cell in row.find_all(['th', 'td'], recursive=False)}
+        player_cell = cells.get('player')
+        if player_cell is None:
+            continue  # mid-table header rows
+        player_id = player_cell.get('data-append-csv')
+        if not player_id:
+            continue
+        yield player_id, player_cell.get_text().strip(), {
+            stat: cell.get_text() for stat, cell in cells.items()
         }
-        
-        # Get basic player info
-        std_table = soup.find('table', {'id': tables['standard']})
-        for row in std_table.tbody.find_all('tr'):
-            cols = row.find_all(['th', 'td'])
-            if len(cols) > 5:  # Minimum columns for valid player
-                player = {
-                    'fbref_id': cols[0].get('data-append-csv'),
-                    'name': cols[0].text.strip(),
-                    'position': cols[1].text.strip(),
-                    'age': int(cols[2].text.split('-')[0]),
-                    'minutes': int(cols[5].text.replace(',', '')) if cols[5].text else 0
-                }
-                players.append(player)
-        
-        # Enrich with advanced stats
-        for stat_type in ['shooting', 'passing']:
-            table = soup.find('table', {'id': tables[stat_type]})
-            if table:
-                for i, row in enumerate(table.tbody.find_all('tr')):
-                    if i < len(players):
-                        cols = row.find_all(['th', 'td'])
-                        if stat_type == 'shooting':
-                            players[i]['xg'] = float(cols[8].text) if cols[8].text else 0.0
-                        elif stat_type == 'passing':
-                            players[i]['xa'] = float(cols[15].text) if cols[15].text else 0.0
-        
-        return players
\ No newline at end of file
@@ -0,0 +1,229 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate  # tokens per second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for a while, e.g. after a 429"""
+        with self._lock:
+            self._tokens = 0
+            self._updated = time.monotonic()
+            self._blocked_until = max(self._blocked_until, self._updated + seconds)
+
+
+class HostRateLimiter:
+    """One token bucket per host so politeness budgets are tracked separately"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.capacity)
+            return self._buckets[host]
+
+    def acquire(self, url):
+        self.bucket(url).acquire()
+
+
+class ScrapeCheckpoint:
+    """
+    Append-only JSON lines log of finished league and squad fetches
+    Re-running a scrape with the same file skips everything already in it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.teams = {}    # league_url -> list of team dicts
+        self.players = {}  # team_url -> list of player dicts
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn write from a crash
+                if 'league_url' in entry:
+                    self.teams[entry['league_url']] = entry['teams']
+                elif 'team_url' in entry:
+                    self.players[entry['team_url']] = entry['players']
+
+    def _append(self, entry):
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def save_teams(self, league_url, teams):
+        self.teams[league_url] = teams
+        self._append({'league_url': league_url, 'teams': teams})
+
+    def save_players(self, team_url, players):
+        self.players[team_url] = players
+        self._append({'team_url': team_url, 'players': players})
+
+
+class ScrapeScheduler:
+    """
+    Fetches league tables and squad pages for many leagues on a bounded
+    thread pool. Requests are paced per host by a token bucket, so total
+    wall-clock time is set by the politeness budget while parsing of one
+    page overlaps with waiting for the next.
+    """
+
+    def __init__(self, scraper, max_workers=4, rate=None, max_retries=4,
+                 backoff=2.0, checkpoint_path=None, progress=None):
+        self.scraper = scraper
+        self.max_workers = max_workers
+        # Default to the scraper's own delay: one request per `delay` seconds per host
+        self.limiter = HostRateLimiter(rate or 1.0 / scraper.delay)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.checkpoint = ScrapeCheckpoint(checkpoint_path) if checkpoint_path else None
+        self.progress = progress  # callable(done, total, label)
+        self.errors = []
+
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        scraper.session.mount('https://', adapter)
+        scraper.session.mount('http://', adapter)
+
+    def run(self, league_urls):
+        """Scrape every squad in the given leagues and return one player DataFrame"""
+        self.errors = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            teams = []
+            futures = {pool.submit(self._league_teams, url): url for url in league_urls}
+            for future in as_completed(futures):
+                try:
+                    teams.extend(future.result())
+                except Exception as e:
+                    self.errors.append({'url': futures[future], 'error': str(e)})
+
+            league_data = []
+            done = 0
+            futures = {pool.submit(self._squad_players, team): team for team in teams}
+            try:
+                for future in as_completed(futures):
+                    team = futures[future]
+                    try:
+                        for player in future.result():
+                            player['team'] = team['name']
+                            player['team_url'] = team['url']
+                            player['league'] = team['league']
+                            league_data.append(player)
+                    except Exception as e:
+                        self.errors.append({'url': team['url'], 'error': str(e)})
+                    done += 1
+                    if self.progress:
+                        self.progress(done, len(teams), team['name'])
+            except BaseException:
+                # A progress callback can abort the run (e.g. a cancelled job);
+                # don't go on to fetch the squads still queued
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        if self.errors:
+            print(f"Scrape finished with {len(self.errors)} failed pages")
+        return pd.DataFrame(league_data)
+
+    def _league_teams(self, league_url):
+        if self.checkpoint and league_url in self.checkpoint.teams:
+            return self.checkpoint.teams[league_url]
+        html = self.fetch(f"{self.scraper.base_url}{league_url}")
+        teams = self.scraper._parse_teams(html, league_url)
+        if self.checkpoint:
+            self.checkpoint.save_teams(league_url, teams)
+        return teams
+
+    def _squad_players(self, team):
+        if self.checkpoint and team['url'] in self.checkpoint.players:
+            # Copies, so tagging team/league doesn't touch the checkpoint
+            return [dict(p) for p in self.checkpoint.players[team['url']]]
+        html = self.fetch(f"{self.scraper.base_url}{team['url']}")
+        players = self.scraper._parse_players(html)
+        if self.checkpoint:
+            self.checkpoint.save_players(team['url'], players)
+        return [dict(p) for p in players]
+
+    def fetch(self, url):
+        """GET a page within the host's rate limit, retrying 429/5xx with backoff"""
+        bucket = self.limiter.bucket(url)
+        # Pages the HTTP cache can answer don't spend the host's budget
+        is_fresh = getattr(self.scraper.session, 'is_fresh', None)
+        cached = is_fresh is not None and is_fresh(url)
+        for attempt in range(self.max_retries + 1):
+            if not cached:
+                bucket.acquire()
+            try:
+                response = self.scraper.session.get(url, timeout=30)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff_delay(attempt))
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = self._retry_after(response) or self._backoff_delay(attempt)
+                if response.status_code == 429:
+                    # Slow down every worker hitting this host, not just this one
+                    bucket.pause(delay)
+                else:
+                    time.sleep(delay)
+                continue
+
+            response.raise_for_status()
+            return response.text
+
+    def _backoff_delay(self, attempt):
+        return self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            return float(response.headers.get('Retry-After', ''))
+        except ValueError:
+            return None
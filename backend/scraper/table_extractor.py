@@ -0,0 +1,121 @@
+import re
+
+try:
+    from lxml import html as lxml_html
+except ImportError:  # the 'soup' parse mode passes its own table_rows
+    lxml_html = None
+
+# FBref ships most stat tables inside HTML comments and un-hides them with
+# JavaScript, so tables are located in the raw text rather than a parsed DOM.
+_TABLE_START = re.compile(r'<table\b[^>]*\bid="stats_(standard|shooting|passing|defense)_[^"]*"')
+_TABLE_END = re.compile(r'</table\s*>', re.IGNORECASE)
+
+# data-stat attribute -> player dict key, per stat table
+SQUAD_TABLE_STATS = {
+    'standard': {
+        'position': 'position',
+        'age': 'age',
+        'games': 'games_played',
+        'games_starts': 'starts',
+        'minutes': 'minutes',
+        'goals': 'goals',
+        'assists': 'assists',
+        'cards_yellow': 'cards_yellow',
+        'cards_red': 'cards_red',
+        'progressive_carries': 'progressive_carries',
+        'progressive_passes': 'progressive_passes',
+    },
+    'shooting': {'xg': 'xg'},
+    'passing': {'pass_xa': 'xa'},
+    'defense': {'tackles': 'tackles', 'interceptions': 'interceptions'},
+}
+
+_INT_STATS = {'age', 'games_played', 'starts', 'minutes', 'goals', 'assists',
+              'cards_yellow', 'cards_red', 'progressive_carries', 'progressive_passes',
+              'tackles', 'interceptions'}
+_FLOAT_STATS = {'xg', 'xa'}
+
+
+def find_stat_tables(html):
+    """
+    Map table type ('standard', 'shooting', ...) to the raw HTML of the first
+    table of that type, whether it's live or commented out
+    """
+    tables = {}
+    for match in _TABLE_START.finditer(html):
+        kind = match.group(1)
+        if kind in tables:
+            continue
+        end = _TABLE_END.search(html, match.end())
+        if end is None:
+            continue
+        tables[kind] = html[match.start():end.end()]
+        if len(tables) == len(SQUAD_TABLE_STATS):
+            break
+    return tables
+
+
+def _convert(key, text):
+    text = text.strip().replace(',', '')
+    if key == 'age':
+        # "25-123" is years-days
+        text = text.split('-')[0]
+    if not text:
+        return 0.0 if key in _FLOAT_STATS else 0
+    try:
+        return float(text) if key in _FLOAT_STATS else int(float(text))
+    except ValueError:
+        return 0.0 if key in _FLOAT_STATS else 0
+
+
+def _table_rows(table_html):
+    """Yield (player_id, name, {data-stat: text}) for each player row"""
+    table = lxml_html.fragment_fromstring(table_html)
+    for row in table.iterfind('.//tbody/tr'):
+        cells = {cell.get('data-stat'): cell for cell in row if cell.tag in ('th', 'td')}
+        player_cell = cells.get('player')
+        if player_cell is None:
+            continue  # mid-table header rows
+        player_id = player_cell.get('data-append-csv')
+        if not player_id:
+            continue
+        yield player_id, player_cell.text_content().strip(), {
+            stat: cell.text_content() for stat, cell in cells.items()
+        }
+
+
+def extract_squad_players(html, table_rows=None):
+    """
+    Parse player stats out of an FBref squad page
+
+    Only the stat tables are parsed, and tables are joined on the player id
+    FBref puts in data-append-csv, so players missing from one table (or rows
+    in a different order) don't shift stats onto the wrong player.
+    table_rows parses one table's HTML into (player_id, name, stats) rows,
+    with lxml by default.
+    """
+    table_rows = table_rows or _table_rows
+    tables = find_stat_tables(html)
+    if 'standard' not in tables:
+        return []
+
+    players = {}
+    for player_id, name, stats in table_rows(tables['standard']):
+        player = {'fbref_id': player_id, 'name': name}
+        for stat, key in SQUAD_TABLE_STATS['standard'].items():
+            value = stats.get(stat, '')
+            player[key] = value.strip() if key == 'position' else _convert(key, value)
+        players[player_id] = player
+
+    for kind in ('shooting', 'passing', 'defense'):
+        if kind not in tables:
+            continue
+        for player_id, _name, stats in table_rows(tables[kind]):
+            player = players.get(player_id)
+            if player is None:
+                continue
+            for stat, key in SQUAD_TABLE_STATS[kind].items():
+                if stat in stats:
+                    player[key] = _convert(key, stats[stat])
+
+    return list(players.values())
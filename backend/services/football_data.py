@@ -1,14 +1,39 @@
 # backend/services/football_data.py
 import os
+import threading
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from .http_cache import CachedSession
+
+BASE = os.getenv("FOOTBALL_DATA_URL", "https://api.football-data.org/v4")
+# Free tier quota; paid plans allow more (FOOTBALL_DATA_PER_MINUTE)
+REQUESTS_PER_MINUTE = int(os.getenv("FOOTBALL_DATA_PER_MINUTE", 10))
+MAX_RETRIES = 3
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def cached_session():
+    """The shared CachedSession, created (with its cache directory) on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # Team lists barely change within a season; fixtures and results do
+            _session = CachedSession(
+                default_ttl=int(os.getenv("FOOTBALL_DATA_CACHE_TTL", 24 * 3600)),
+                ttl_rules=[(r"/matches", 300)],
+            )
+        return _session
 
-BASE = "https://api.football-data.org/v4"
 
 class ApiError(RuntimeError):
     pass
 
-def _headers():
-    token = (os.getenv("FOOTBALL_DATA_TOKEN") or "").strip()
+def _headers(token=None):
+    token = (token or os.getenv("FOOTBALL_DATA_TOKEN") or "").strip()
     if not token:
         raise ApiError("FOOTBALL_DATA_TOKEN is not set (or is empty)")
     return {
@@ -30,21 +55,93 @@ def _raise(e: requests.exceptions.RequestException):
         msg += f" :: {detail[:400]}"
     raise ApiError(msg) from e
 
+
+class FootballDataClient:
+    """
+    football-data.org client safe to share between threads
+
+    Requests go through one pooled session and a client-side token bucket
+    holding the per-minute quota, so concurrent callers queue locally
+    instead of collecting 429s. Responses the cache can answer don't spend
+    quota. A 429 pauses every caller until the API's counter resets.
+    base_url, token and session can point it at a local stub server.
+    """
+
+    def __init__(self, base_url=None, token=None, session=None, per_minute=None, pool_size=8):
+        from scraper.scheduler import TokenBucket
+
+        self.base_url = (base_url or BASE).rstrip("/")
+        self.token = token
+        self.session = session if session is not None else cached_session()
+        per_minute = per_minute or REQUESTS_PER_MINUTE
+        # The API counts requests per rolling minute, so a full minute's quota may go at once
+        self.limiter = TokenBucket(per_minute / 60.0, capacity=per_minute)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, path, params=None):
+        """Decoded JSON of GET base_url + path"""
+        url = f"{self.base_url}{path}"
+        is_fresh = getattr(self.session, "is_fresh", None)
+        cached = is_fresh is not None and is_fresh(url, params)
+        try:
+            for attempt in range(MAX_RETRIES + 1):
+                if not cached:
+                    self.limiter.acquire()
+                r = self.session.get(url, params=params, headers=_headers(self.token), timeout=20)
+                if r.status_code == 429 and attempt < MAX_RETRIES:
+                    self.limiter.pause(self._reset_seconds(r))
+                    continue
+                r.raise_for_status()
+                return r.json()
+        except requests.exceptions.RequestException as e:
+            _raise(e)
+
+    def competition_teams(self, competition):
+        return self.get(f"/competitions/{competition}/teams").get("teams", [])
+
+    def competition_matches(self, competition, date_from=None, date_to=None):
+        """Matches of a competition's current season, optionally within a date window"""
+        params = {}
+        if date_from is not None:
+            params["dateFrom"] = date_from.isoformat()
+        if date_to is not None:
+            params["dateTo"] = date_to.isoformat()
+        return self.get(f"/competitions/{competition}/matches", params=params or None).get("matches", [])
+
+    @staticmethod
+    def _reset_seconds(response):
+        # Seconds until the quota resets; Retry-After as a fallback
+        for header in ("X-RequestCounter-Reset", "Retry-After"):
+            try:
+                return max(1.0, float(response.headers.get(header, "")))
+            except ValueError:
+                continue
+        return 60.0
+
+
+_client = None
+
+def client():
+    """Shared FootballDataClient on the module's cached session"""
+    global _client
+    if _client is None:
+        _client = FootballDataClient()
+    return _client
+
 def get_teams(competition: str = "PL"):
-    try:
-        r = requests.get(f"{BASE}/competitions/{competition}/teams",
-                         headers=_headers(), timeout=20)
-        r.raise_for_status()
-        data = r.json()
-        return [
-            {
-                "id": t["id"],
-                "name": t["name"],
-                "shortName": t.get("shortName"),
-                "tla": t.get("tla"),
-                "crest": t.get("crest"),
-            }
-            for t in data.get("teams", [])
-        ]
-    except requests.exceptions.RequestException as e:
-        _raise(e)
+    return [
+        {
+            "id": t["id"],
+            "name": t["name"],
+            "shortName": t.get("shortName"),
+            "tla": t.get("tla"),
+            "crest": t.get("crest"),
+        }
+        for t in client().competition_teams(competition)
+    ]
+
+def cache_stats():
+    """Hit/miss counters of the football-data.org response cache"""
+    return cached_session().get_stats()
@@ -0,0 +1,180 @@
+# backend/services/http_cache.py
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .metrics import count_outbound, stage
+
+DEFAULT_CACHE_DIR = os.path.join("cache", "http")
+
+# Response headers worth keeping alongside the body
+_STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+LOCK_STRIPES = 64  # per-URL locks are striped over this many, so their number stays fixed
+
+
+class CacheMiss(requests.exceptions.RequestException):
+    """Raised in offline mode when a URL has no recorded response"""
+
+
+class CachedSession(requests.Session):
+    """
+    requests.Session with a shared on-disk cache for GET requests.
+
+    Bodies are stored gzip-compressed, one file per URL. Entries younger than
+    their TTL are served without touching the network; stale entries are
+    revalidated with If-None-Match / If-Modified-Since so an unchanged page
+    costs a 304 instead of a full download. Concurrent requests for the same
+    URL are serialized, so only the first one goes to the network (URLs
+    share LOCK_STRIPES locks, so two different ones occasionally wait on
+    each other too).
+
+    ttl_rules: list of (regex, seconds) matched against the URL, first match wins
+    offline: only ever serve from the cache (e.g. recorded fixtures), raising
+             CacheMiss for anything not on disk
+    """
+
+    def __init__(self, cache_dir=None, default_ttl=3600, ttl_rules=None, offline=False):
+        super().__init__()
+        self.cache_dir = cache_dir or os.getenv("HTTP_CACHE_DIR", DEFAULT_CACHE_DIR)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.default_ttl = default_ttl
+        self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in (ttl_rules or [])]
+        self.offline = offline
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "stored": 0}
+        self._stats_lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    # ---- requests.Session override ----
+    def request(self, method, url, *args, **kwargs):
+        if method.upper() != "GET":
+            return self._send(method, url, *args, **kwargs)
+
+        full_url = requests.Request("GET", url, params=kwargs.get("params")).prepare().url
+        key = self._key(full_url)
+        with self._lock_for(key):
+            entry = self._read(key)
+            if entry is not None and (self.offline or self._is_fresh(entry, full_url)):
+                self._count("hits")
+                return self._build_response(entry, full_url)
+            if self.offline:
+                raise CacheMiss(f"No cached response for {full_url}")
+
+            headers = dict(kwargs.pop("headers", None) or {})
+            if entry is not None:
+                if entry["headers"].get("ETag"):
+                    headers["If-None-Match"] = entry["headers"]["ETag"]
+                if entry["headers"].get("Last-Modified"):
+                    headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+            response = self._send(method, url, *args, headers=headers, **kwargs)
+
+            if response.status_code == 304 and entry is not None:
+                entry["stored_at"] = time.time()
+                self._write(key, entry)
+                self._count("revalidated")
+                return self._build_response(entry, full_url)
+
+            self._count("misses")
+            if response.status_code == 200:
+                self._store(key, full_url, response)
+            return response
+
+    def _send(self, method, url, *args, **kwargs):
+        """The actual network round trip, timed as the "http" stage"""
+        host = urlsplit(url).hostname or ""
+        try:
+            with stage("http"):
+                response = super().request(method, url, *args, **kwargs)
+        except requests.exceptions.RequestException:
+            count_outbound(host, "error")
+            raise
+        count_outbound(host, response.status_code)
+        return response
+
+    # ---- public helpers ----
+    def is_fresh(self, url, params=None):
+        """True if a GET for url would be answered from the cache"""
+        full_url = requests.Request("GET", url, params=params).prepare().url
+        entry = self._read(self._key(full_url))
+        return entry is not None and (self.offline or self._is_fresh(entry, full_url))
+
+    def ttl_for(self, url):
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def get_stats(self):
+        with self._stats_lock:
+            return dict(self.stats)
+
+    # ---- internals ----
+    def _is_fresh(self, entry, url):
+        return time.time() - entry["stored_at"] < self.ttl_for(url)
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _lock_for(self, key):
+        return self._key_locks[int(key[:8], 16) % len(self._key_locks)]
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.gz")
+
+    def _store(self, key, url, response):
+        self._write(key, {
+            "url": url,
+            "stored_at": time.time(),
+            "encoding": response.encoding,
+            "headers": {h: response.headers[h] for h in _STORED_HEADERS if h in response.headers},
+            "body": response.content,
+        })
+        self._count("stored")
+
+    def _read(self, key):
+        """Entry dict for key, or None if missing or unreadable"""
+        try:
+            with gzip.open(self._path(key), "rb") as f:
+                meta = json.loads(f.readline())
+                meta["body"] = f.read()
+            return meta
+        except (OSError, EOFError, ValueError):
+            return None
+
+    def _write(self, key, entry):
+        # The first line holds the metadata, the rest is the raw body
+        meta = {k: v for k, v in entry.items() if k != "body"}
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(json.dumps(meta).encode("utf-8") + b"\n")
+                f.write(entry["body"])
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _build_response(entry, url):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = entry["body"]
+        response.encoding = entry.get("encoding")
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.from_cache = True
+        return response
@@ -0,0 +1,71 @@
+# backend/services/leagues.py
+"""
+League and team keys shared by the scraper, ingestion, ratings and syncs
+
+Players and teams store a league as FBref's season-less slug, e.g.
+'Premier-League-Stats'. league_key() turns the forms a league turns up in
+(a league page URL, with or without a season; a bare FBref competition id;
+a slug) into that key, so lookups like LEAGUE_STRENGTH match whichever
+one a row was written with. team_name_key() does the same for the team
+names FBref and football-data.org spell differently ('Arsenal' and
+'Arsenal FC').
+"""
+import re
+import unicodedata
+
+# FBref competition id -> league key
+FBREF_COMPETITIONS = {
+    '9': 'Premier-League-Stats',
+    '12': 'La-Liga-Stats',
+    '20': 'Bundesliga-Stats',
+    '11': 'Serie-A-Stats',
+    '13': 'Ligue-1-Stats',
+}
+
+# football-data.org competition code -> league key
+COMPETITION_LEAGUES = {
+    'PL': FBREF_COMPETITIONS['9'],
+    'PD': FBREF_COMPETITIONS['12'],
+    'BL1': FBREF_COMPETITIONS['20'],
+    'SA': FBREF_COMPETITIONS['11'],
+    'FL1': FBREF_COMPETITIONS['13'],
+}
+
+# '2023-2024-Premier-League-Stats' (season pages) or '2024-...' (calendar-year leagues)
+_SEASON_PREFIX = re.compile(r'^\d{4}(?:-\d{4})?-')
+
+
+def league_key(value):
+    """
+    League key for a league URL ('/en/comps/9/Premier-League-Stats'), an
+    FBref competition id ('9') or a slug; None for missing values
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    text = str(value).strip().strip('/')
+    if not text:
+        return None
+    parts = text.split('/')
+    if 'comps' in parts:
+        # /en/comps/<id>/[<season>/]<slug>
+        after = parts[parts.index('comps') + 1:]
+        if after and after[0] in FBREF_COMPETITIONS:
+            return FBREF_COMPETITIONS[after[0]]
+        text = after[-1] if after else text
+    elif len(parts) == 1 and text in FBREF_COMPETITIONS:
+        return FBREF_COMPETITIONS[text]
+    return _SEASON_PREFIX.sub('', text.split('/')[-1])
+
+
+# Club-type prefixes and suffixes that only one source uses
+_CLUB_AFFIXES = {'fc', 'afc', 'cf', 'sc', 'ac', 'as', 'ss', 'ssc', 'us', 'rc', 'ogc', 'sv', 'vfb', 'vfl', 'tsg'}
+
+
+def team_name_key(name):
+    """Lowercase, accent-free team name without club affixes, e.g. 'arsenal' for 'Arsenal FC'"""
+    if not name:
+        return None
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    words = re.findall(r'[a-z0-9]+', text.lower())
+    core = [w for w in words if w not in _CLUB_AFFIXES]
+    return ' '.join(core or words) or None
@@ -0,0 +1,364 @@
+# backend/services/metrics.py
+"""
+Request metrics in the Prometheus text format, plus opt-in request profiling
+
+Every request is counted and timed per route. Code on the hot paths wraps
+its internal work in stage() blocks ("db", "features", "inference",
+"serialize", "http"), which feed a per-stage histogram and the request's
+Server-Timing header, so a slow response can be pinned on SQLite, the
+model, JSON encoding or an upstream API. Stages can nest ("db" inside
+"features"), so their times don't add up to the request time.
+
+METRICS=0 turns everything off: no request hooks or SQLAlchemy listeners are
+installed and stage() returns a shared no-op context manager.
+
+Counters live in each process. Under gunicorn with several workers set
+METRICS_DIR to a directory shared by the workers; each one writes its
+snapshot there every few seconds and /metrics serves the sum.
+
+PROFILE_REQUESTS=1 lets a client profile a single request by sending an
+`X-Profile: 1` header or `?profile=1`; the response body is then the
+cProfile report (or a pyinstrument page for `X-Profile: pyinstrument`, if
+it's installed) instead of the normal payload. Leave it off in production.
+"""
+import contextvars
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+ENABLED = os.getenv("METRICS", "1") != "0"
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0") == "1"
+METRICS_DIR = os.getenv("METRICS_DIR")
+FLUSH_INTERVAL = 5.0  # seconds between snapshot writes with METRICS_DIR
+
+# Prometheus client defaults, plus finer steps below 5ms for stages
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025) + REQUEST_BUCKETS
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {'type': 'counter', 'help': self.help, 'labels': self.labels,
+                    'series': [[list(k), v] for k, v in self._values.items()]}
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=REQUEST_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {'type': 'histogram', 'help': self.help, 'labels': self.labels,
+                    'buckets': list(self.buckets),
+                    'series': [[list(k), list(v)] for k, v in self._values.items()]}
+
+
+REGISTRY = {}
+
+
+def _register(metric):
+    REGISTRY[metric.name] = metric
+    return metric
+
+
+REQUESTS = _register(Counter(
+    'soccer_http_requests_total', 'HTTP requests handled', ('method', 'route', 'status')))
+REQUEST_SECONDS = _register(Histogram(
+    'soccer_http_request_duration_seconds', 'Request latency', ('method', 'route')))
+STAGE_SECONDS = _register(Histogram(
+    'soccer_stage_duration_seconds', 'Time spent in an internal stage', ('stage',), STAGE_BUCKETS))
+OUTBOUND = _register(Counter(
+    'soccer_outbound_requests_total', 'Requests sent to upstream sites', ('host', 'status')))
+
+# Per-request stage totals for Server-Timing; None outside a request
+_request_stages = contextvars.ContextVar('request_stages', default=None)
+
+
+class _Stage:
+    __slots__ = ('name', '_start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_stage(self.name, time.perf_counter() - self._start)
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name):
+    """Context manager timing a block as an internal stage"""
+    return _Stage(name) if ENABLED else _NO_STAGE
+
+
+def record_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, name)
+    totals = _request_stages.get()
+    if totals is not None:
+        totals[name] = totals.get(name, 0.0) + seconds
+
+
+def count_outbound(host, status):
+    if ENABLED:
+        OUTBOUND.inc(host, str(status))
+
+
+# ---- exposition ----
+def snapshot():
+    return {name: metric.snapshot() for name, metric in REGISTRY.items()}
+
+
+def _merge(total, other):
+    for name, metric in other.items():
+        if name not in total:
+            total[name] = json.loads(json.dumps(metric))
+            continue
+        series = {tuple(labels): value for labels, value in total[name]['series']}
+        for labels, value in metric['series']:
+            labels = tuple(labels)
+            if labels not in series:
+                series[labels] = value
+            elif metric['type'] == 'counter':
+                series[labels] += value
+            else:
+                series[labels] = [a + b for a, b in zip(series[labels], value)]
+        total[name]['series'] = [[list(k), v] for k, v in series.items()]
+    return total
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def render(metrics=None):
+    """Prometheus text exposition of a snapshot (default: this process, or METRICS_DIR)"""
+    if metrics is None:
+        metrics = collect()
+    lines = []
+    for name, metric in sorted(metrics.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labels, value in sorted(metric['series']):
+            if metric['type'] == 'counter':
+                lines.append(f"{name}{_label_text(metric['labels'], labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric['buckets'] + ['+Inf'], value[:-1]):
+                cumulative += count
+                le = bound if bound == '+Inf' else repr(float(bound))
+                lines.append(f"{name}_bucket{_label_text(metric['labels'], labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_label_text(metric['labels'], labels)} {value[-1]}")
+            lines.append(f"{name}_count{_label_text(metric['labels'], labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+
+def collect():
+    """This process's metrics, merged with the other workers' snapshots under METRICS_DIR"""
+    if not METRICS_DIR:
+        return snapshot()
+    flush()
+    total = {}
+    for path in glob.glob(os.path.join(METRICS_DIR, 'metrics-*.json')):
+        try:
+            with open(path, encoding='utf-8') as f:
+                _merge(total, json.load(f))
+        except (OSError, ValueError):
+            continue  # being replaced right now; it's in the next scrape
+    return total
+
+
+def flush():
+    """Write this process's snapshot to METRICS_DIR"""
+    if not METRICS_DIR:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"metrics-{os.getpid()}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(snapshot(), f)
+    os.replace(tmp, path)
+
+
+def start_flusher():
+    """Daemon thread writing snapshots every FLUSH_INTERVAL seconds (per worker, after fork)"""
+    if not (ENABLED and METRICS_DIR):
+        return
+
+    def loop():
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            try:
+                flush()
+            except OSError as e:
+                print(f"Metrics snapshot not written: {e}")
+
+    threading.Thread(target=loop, name='metrics-flush', daemon=True).start()
+
+
+# ---- Flask and SQLAlchemy hooks ----
+def init_app(app):
+    """Install request timing, DB timing, timed JSON encoding and /metrics on app"""
+    from flask import Response
+
+    app.config.setdefault("PROFILE_REQUESTS", PROFILE_REQUESTS)
+
+    @app.route("/metrics")
+    def metrics_route():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
+
+    if app.config["PROFILE_REQUESTS"]:
+        _install_profiler(app)
+    if not ENABLED:
+        return
+
+    from flask import g, request
+
+    _install_db_timing()
+    app.json = _timed_json_provider(app)
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_token = _request_stages.set({})
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        REQUESTS.inc(request.method, route, str(response.status_code))
+        REQUEST_SECONDS.observe(elapsed, request.method, route)
+        totals = _request_stages.get() or {}
+        timings = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in totals.items()]
+        timings.append(f"total;dur={elapsed * 1000:.2f}")
+        response.headers["Server-Timing"] = ", ".join(timings)
+        return response
+
+    @app.teardown_request
+    def reset_stages(exc):
+        token = g.pop("metrics_token", None)
+        if token is not None:
+            _request_stages.reset(token)
+
+
+_db_timing_installed = False
+
+
+def _install_db_timing():
+    """Time every SQL statement on every engine as the "db" stage"""
+    global _db_timing_installed
+    if _db_timing_installed:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if starts:
+            record_stage("db", time.perf_counter() - starts.pop())
+
+    _db_timing_installed = True
+
+
+def _timed_json_provider(app):
+    from flask.json.provider import DefaultJSONProvider
+
+    class TimedJSONProvider(type(app.json) if isinstance(app.json, DefaultJSONProvider) else DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            with stage("serialize"):
+                return super().dumps(obj, **kwargs)
+
+    return TimedJSONProvider(app)
+
+
+def _install_profiler(app):
+    from flask import Response, g, request
+
+    @app.before_request
+    def start_profile():
+        mode = request.headers.get("X-Profile") or request.args.get("profile")
+        if not mode or mode == "0":
+            return
+        if mode == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                return Response("pyinstrument is not installed\n", status=400, mimetype="text/plain")
+            g.profiler = ("pyinstrument", Profiler())
+            g.profiler[1].start()
+        else:
+            import cProfile
+            g.profiler = ("cprofile", cProfile.Profile())
+            g.profiler[1].enable()
+
+    @app.after_request
+    def finish_profile(response):
+        kind, profiler = g.pop("profiler", (None, None))
+        if profiler is None:
+            return response
+        if kind == "pyinstrument":
+            profiler.stop()
+            report = Response(profiler.output_html(), mimetype="text/html")
+        else:
+            import io
+            import pstats
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(60)
+            report = Response(out.getvalue(), mimetype="text/plain")
+        report.headers["X-Profiled-Status"] = str(response.status_code)
+        if "Server-Timing" in response.headers:
+            report.headers["Server-Timing"] = response.headers["Server-Timing"]
+        return report
@@ -0,0 +1,167 @@
+# backend/services/serialization.py
+"""
+JSON encoding, streaming and HTTP caching for the API
+
+- JSONProvider encodes with orjson when it's installed (stdlib json otherwise)
+- stream_rows() streams query results as NDJSON or a chunked JSON array
+  without building the whole list in memory
+- init_app() adds ETags with 304s and gzip (or brotli, when installed)
+  compression to buffered JSON responses
+
+The ETag is a hash of the uncompressed body, so it's marked weak and
+stays the same whichever encoding the client accepts.
+"""
+import gzip
+import hashlib
+import json
+import zlib
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_SIZE = 1024  # bytes; smaller bodies aren't worth the CPU
+GZIP_LEVEL = 5
+STREAM_BATCH = 500  # rows encoded per chunk when streaming
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def encode(obj, default=None):
+    """obj as compact UTF-8 JSON bytes"""
+    default = default or DefaultJSONProvider.default
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS)
+        except TypeError:
+            pass  # e.g. an int beyond 64 bits; the stdlib encoder has no such limit
+    return json.dumps(obj, default=_stdlib_default(default), separators=(',', ':')).encode('utf-8')
+
+
+def _stdlib_default(default):
+    # orjson encodes NumPy arrays and scalars itself; the stdlib encoder needs them converted
+    def convert(obj):
+        if hasattr(obj, 'tolist'):
+            return obj.tolist()
+        return default(obj)
+    return convert
+
+
+class JSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson
+
+    Datetimes keep Flask's HTTP date format (they go through default), keys
+    keep insertion order. Calls with options orjson doesn't have, and
+    values it can't encode (integers beyond 64 bits, such as the entropy of
+    an unseeded SeedSequence), fall back to the stdlib encoder.
+    """
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or set(kwargs) - {'indent', 'separators', 'default'}:
+            return super().dumps(obj, **kwargs)
+        default = kwargs.pop('default', self.default)
+        option = _ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if kwargs.get('indent') else 0)
+        try:
+            return orjson.dumps(obj, default=default, option=option).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj, default=_stdlib_default(default), **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+# ---- streaming ----
+def stream_rows(rows, columns, fmt='ndjson', compress=False):
+    """
+    Generator of response chunks for an iterable of row tuples
+
+    fmt: 'ndjson' for one object per line, 'json' for a JSON array sent in chunks
+    compress: gzip the stream as it goes
+    """
+    def chunks():
+        first = True
+        if fmt == 'json':
+            yield b'['
+        batch = []
+        for row in rows:
+            batch.append(dict(zip(columns, row)))
+            if len(batch) >= STREAM_BATCH:
+                yield _encode_batch(batch, fmt, first)
+                first = False
+                batch = []
+        if batch:
+            yield _encode_batch(batch, fmt, first)
+        if fmt == 'json':
+            yield b']'
+
+    if not compress:
+        return chunks()
+    return _gzip_stream(chunks())
+
+
+def _encode_batch(batch, fmt, first):
+    if fmt == 'ndjson':
+        return b''.join(encode(row) + b'\n' for row in batch)
+    # A batch is encoded as one array, then its brackets are dropped
+    body = encode(batch)[1:-1]
+    return body if first else b',' + body
+
+
+def _gzip_stream(chunks):
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def accepts(request, encoding):
+    return encoding in request.accept_encodings and request.accept_encodings[encoding] > 0
+
+
+# ---- ETags and compression ----
+def body_etag(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def init_app(app):
+    """ETag / 304 and gzip/brotli compression for buffered JSON responses"""
+    from flask import request
+
+    @app.after_request
+    def cache_and_compress(response):
+        if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+                or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers):
+            return response
+        if request.method in ('GET', 'HEAD'):
+            if not response.get_etag()[0]:
+                response.set_etag(body_etag(response.get_data()), weak=True)
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+
+        body = response.get_data()
+        if len(body) < MIN_COMPRESS_SIZE:
+            return response
+        response.vary.add('Accept-Encoding')
+        if brotli is not None and accepts(request, 'br'):
+            response.set_data(brotli.compress(body, quality=4))
+            response.headers['Content-Encoding'] = 'br'
+        elif accepts(request, 'gzip'):
+            response.set_data(gzip.compress(body, GZIP_LEVEL))
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
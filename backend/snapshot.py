@@ -0,0 +1,46 @@
+# backend/snapshot.py
+"""
+Export the database to Parquet snapshots for training and offline analysis:
+
+    python snapshot.py
+    python snapshot.py --tables matches --no-training-rows --dir /data/snapshots
+
+Writes one hive-partitioned dataset per table under SNAPSHOT_DIR (or
+--dir); load them with models.snapshots.load / load_frame.
+"""
+import argparse
+import json
+
+from models import snapshots
+
+
+def main(argv=None):
+    from app import app
+
+    parser = argparse.ArgumentParser(description="Export database tables to Parquet snapshots")
+    parser.add_argument('--tables', default=','.join(snapshots.TABLES),
+                        help=f"comma separated subset of {','.join(snapshots.TABLES)}")
+    parser.add_argument('--no-training-rows', action='store_true',
+                        help="don't export the feature store training rows")
+    parser.add_argument('--dir', default=None, help='snapshot directory (default: SNAPSHOT_DIR)')
+    args = parser.parse_args(argv)
+
+    tables = [t for t in args.tables.split(',') if t]
+    unknown = [t for t in tables if t not in snapshots.TABLES]
+    if unknown:
+        parser.error(f"unknown tables: {', '.join(unknown)}")
+    if not snapshots.available():
+        parser.error("snapshots need pyarrow (pip install pyarrow)")
+
+    with app.app_context():
+        for name in tables:
+            meta = snapshots.export_table(name, args.dir)
+            print(json.dumps({'snapshot': name, 'rows': meta['rows']}))
+        if not args.no_training_rows:
+            meta = snapshots.export_training_rows(args.dir)
+            print(json.dumps({'snapshot': 'training_rows', 'rows': meta['rows']}))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,28 @@
+import pytest
+
+from app import create_app
+from models.db import db, migrate
+from models.prediction_cache import prediction_cache
+from models.team_features import feature_cache
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Registry, caches and checkpoints use relative paths
+    monkeypatch.chdir(tmp_path)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}", 'TESTING': True})
+    # Module-level caches outlive each test's database
+    feature_cache.invalidate()
+    prediction_cache.invalidate()
+    monkeypatch.setattr(feature_cache, 'check_interval', 0)
+    with app.app_context():
+        migrate()
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
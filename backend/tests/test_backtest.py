@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from models.backtest import OUTCOMES, run_backtest
+from models.db import db, Match, Team
+
+
+@pytest.fixture
+def predictions(app):
+    rng = np.random.default_rng(7)
+    teams = [Team(fbref_id=f"t{i}", name=f"Team {i}", league='Premier-League-Stats' if i < 4 else 'La-Liga-Stats')
+             for i in range(8)]
+    db.session.add_all(teams)
+    db.session.commit()
+    rows = []
+    for i in range(60):
+        home, away = (teams[i % 4], teams[(i + 1) % 4]) if i % 3 else (teams[4 + i % 4], teams[4 + (i + 1) % 4])
+        proba = rng.dirichlet([3, 2, 2])
+        rows.append(Match(
+            date=datetime(2024, 8, 1) + timedelta(days=i), season='2024-2025' if i < 40 else '2025-2026',
+            home_team_id=home.id, away_team_id=away.id,
+            home_score=int(rng.integers(0, 4)), away_score=int(rng.integers(0, 3)),
+            prob_home_win=float(proba[0]), prob_draw=float(proba[1]), prob_away_win=float(proba[2]),
+            prediction_version=None if i % 4 else 'v1',
+        ))
+    # Neither unplayed fixtures nor unpredicted results are scored
+    rows.append(Match(date=datetime(2026, 1, 1), season='2025-2026', home_team_id=teams[0].id,
+                      away_team_id=teams[1].id, prob_home_win=0.5, prob_draw=0.3, prob_away_win=0.2))
+    rows.append(Match(date=datetime(2026, 1, 2), season='2025-2026', home_team_id=teams[0].id,
+                      away_team_id=teams[1].id, home_score=1, away_score=0))
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows[:60]
+
+
+def _expected(matches):
+    proba = np.array([[m.prob_home_win, m.prob_draw, m.prob_away_win] for m in matches])
+    proba /= proba.sum(axis=1, keepdims=True)
+    actual = np.array([0 if m.home_score > m.away_score else 2 if m.home_score < m.away_score else 1
+                       for m in matches])
+    onehot = np.eye(3)[actual]
+    return {
+        'matches': len(matches),
+        'accuracy': round(float((proba.argmax(axis=1) == actual).mean()), 4),
+        'log_loss': round(float(-np.log(proba[np.arange(len(actual)), actual]).mean()), 4),
+        'brier': round(float(((proba - onehot) ** 2).sum(axis=1).mean()), 4),
+    }
+
+
+def test_overall_metrics(predictions):
+    assert run_backtest()['overall'] == _expected(predictions)
+
+
+def test_chunking_does_not_change_the_report(predictions):
+    assert run_backtest(chunk_size=7) == run_backtest()
+
+
+def test_slices_and_filters_agree(predictions):
+    report = run_backtest()
+    by_season = {row['season']: row for row in report['by_season']}
+    assert sum(row['matches'] for row in report['by_season']) == 60
+    assert run_backtest(season='2025-2026')['overall'] == {k: by_season['2025-2026'][k] for k in
+                                                         ('matches', 'accuracy', 'log_loss', 'brier')}
+    by_version = {row['model_version']: row['matches'] for row in report['by_model_version']}
+    assert by_version == {'v1': 15, 'default': 45}
+    assert run_backtest(model_version='default')['overall']['matches'] == 45
+    la_liga = [m for m in predictions if m.home_team_id > 4]
+    assert run_backtest(league='La-Liga-Stats')['overall'] == _expected(la_liga)
+
+
+def test_calibration_bins_cover_every_prediction(predictions):
+    report = run_backtest(bins=5)
+    for outcome in OUTCOMES:
+        points = report['calibration'][outcome]
+        assert sum(p['matches'] for p in points) == 60
+        assert all(p['bin'][0] <= p['predicted'] <= p['bin'][1] for p in points)
+
+
+def test_empty_and_invalid(client, app):
+    assert run_backtest()['overall'] is None
+    assert client.get('/api/backtest?bins=0').status_code == 400
+    assert client.get('/api/backtest').get_json()['by_league'] == []
@@ -0,0 +1,117 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+
+from app import create_app
+from models.db import BUSY_TIMEOUT, READ_BIND, db, migrate, read_connection, write_transaction, Player
+
+
+def _pragma(conn, name):
+    return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_sqlite_pragmas(app):
+    with db.engine.connect() as conn:
+        assert _pragma(conn, 'journal_mode') == 'wal'
+        assert _pragma(conn, 'synchronous') == 1  # NORMAL
+        assert _pragma(conn, 'temp_store') == 2  # MEMORY
+        assert _pragma(conn, 'cache_size') < 0  # KiB
+        assert _pragma(conn, 'busy_timeout') == int(BUSY_TIMEOUT * 1000)
+        assert _pragma(conn, 'query_only') == 0
+    with read_connection() as conn:
+        assert conn.engine is db.engines[READ_BIND]
+        assert _pragma(conn, 'journal_mode') == 'wal'
+        assert _pragma(conn, 'busy_timeout') == int(BUSY_TIMEOUT * 1000)
+        assert _pragma(conn, 'query_only') == 1
+
+
+def test_read_bind_rejects_writes(app):
+    db.session.add(Player(fbref_id='p1', name='Bukayo Saka', position='FW'))
+    db.session.commit()
+
+    with read_connection() as conn:
+        assert conn.execute(text("SELECT name FROM players")).scalar() == 'Bukayo Saka'
+        with pytest.raises(OperationalError, match='readonly'):
+            conn.execute(text("UPDATE players SET name = 'x'"))
+        with pytest.raises(OperationalError, match='readonly'):
+            conn.execute(text("DELETE FROM players"))
+    assert db.session.execute(text("SELECT count(*) FROM players")).scalar() == 1
+
+
+def test_write_transaction_holds_the_write_lock(app, tmp_path):
+    with write_transaction() as conn:
+        conn.execute(text("INSERT INTO players (fbref_id, name, position) VALUES ('p1', 'A', 'FW')"))
+        other = sqlite3.connect(tmp_path / 'test.db', timeout=0)
+        try:
+            # Another writer can't start, but WAL readers see the last commit meanwhile
+            with pytest.raises(sqlite3.OperationalError, match='locked'):
+                other.execute('BEGIN IMMEDIATE')
+            assert other.execute("SELECT count(*) FROM players").fetchone() == (0,)
+        finally:
+            other.close()
+    with read_connection() as conn:
+        assert conn.execute(text("SELECT count(*) FROM players")).scalar() == 1
+
+
+def test_in_memory_database_has_no_read_bind():
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'TESTING': True})
+    with app.app_context():
+        assert READ_BIND not in db.engines
+        # Another app in this process registered the read bind's metadata
+        assert migrate() == []
+        with read_connection() as conn:
+            assert conn.engine is db.engine
+            assert conn.execute(text("SELECT count(*) FROM players")).scalar() == 0
+
+
+# players as created before later columns and indexes were declared
+OLD_SCHEMA = """
+CREATE TABLE players (
+    id INTEGER NOT NULL PRIMARY KEY,
+    fbref_id VARCHAR(50) NOT NULL UNIQUE,
+    name VARCHAR(100) NOT NULL,
+    position VARCHAR(50) NOT NULL,
+    team VARCHAR(100),
+    league VARCHAR(100),
+    goals INTEGER,
+    overall INTEGER
+);
+INSERT INTO players (id, fbref_id, name, position, team, league, goals, overall)
+VALUES (1, 'a1', 'Bukayo Saka', 'FW', 'Arsenal', 'Premier-League-Stats', 16, 86),
+       (2, 'b2', 'Declan Rice', 'MF', 'Arsenal', 'Premier-League-Stats', 7, 84);
+"""
+
+
+def test_migrate_upgrades_an_old_schema_without_data_loss(tmp_path):
+    path = tmp_path / 'old.db'
+    with sqlite3.connect(path) as conn:
+        conn.executescript(OLD_SCHEMA)
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{path}", 'TESTING': True})
+    with app.app_context():
+        created = migrate()
+        inspector = inspect(db.engine)
+        columns = {c['name'] for c in inspector.get_columns('players')}
+        indexes = {ix['name'] for ix in inspector.get_indexes('players')}
+
+        assert {c.name for c in Player.__table__.columns} <= columns
+        assert {ix.name for ix in Player.__table__.indexes} <= indexes
+        assert 'players.xG' in created and 'ix_players_league_team' in created
+        # Tables that didn't exist are created whole
+        assert 'matches' in inspector.get_table_names()
+
+        rows = db.session.execute(
+            text("SELECT id, fbref_id, name, team, goals, overall, xG FROM players ORDER BY id")).all()
+        assert [tuple(r) for r in rows] == [
+            (1, 'a1', 'Bukayo Saka', 'Arsenal', 16, 86, None),
+            (2, 'b2', 'Declan Rice', 'Arsenal', 7, 84, None),
+        ]
+        assert db.session.get(Player, 1).name == 'Bukayo Saka'
+
+        # Nothing left to do the second time
+        assert migrate() == []
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
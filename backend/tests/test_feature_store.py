@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from models.db import db, Match, Team, TeamFeatureHistory, TeamFeatureState
+from models.feature_store import EWM_ALPHA, feature_store
+
+
+@pytest.fixture
+def teams(app):
+    rows = [Team(fbref_id=f"t{i}", name=f"Team {i}", league='Premier-League-Stats') for i in range(3)]
+    db.session.add_all(rows)
+    db.session.commit()
+    return [t.id for t in rows]
+
+
+def _match(home, away, score, day, xg=(None, None)):
+    match = Match(date=datetime(2025, 8, 1) + timedelta(days=day), season='2025-2026',
+                  home_team_id=home, away_team_id=away, home_score=score[0], away_score=score[1],
+                  home_xG=xg[0], away_xG=xg[1])
+    db.session.add(match)
+    db.session.commit()
+    return match
+
+
+def _rows(model, order):
+    columns = [c for c in model.__table__.columns if c.name != 'id']
+    rows = db.session.execute(select(*columns).order_by(*order)).all()
+    return [tuple(round(v, 9) if isinstance(v, float) else v for v in row) for row in rows]
+
+
+def _states():
+    return _rows(TeamFeatureState, [TeamFeatureState.team_id])
+
+
+def _stored():
+    history = _rows(TeamFeatureHistory, [TeamFeatureHistory.team_id, TeamFeatureHistory.match_id])
+    return _states(), history
+
+
+def _assert_sync_matches_rebuild():
+    synced = _stored()
+    feature_store.rebuild()
+    assert _stored() == synced
+
+
+def test_sync_folds_results_into_rolling_state(teams):
+    a, b, _c = teams
+    _match(a, b, (2, 0), 0, xg=(1.5, 0.4))
+    _match(b, a, (1, 1), 7, xg=(0.9, None))
+    assert feature_store.sync() == 4
+    assert feature_store.sync() == 0
+
+    features = feature_store.team_features(a)
+    assert features['form'] == (1.0 + 0.5) / 5
+    assert features['goals_scored'] == pytest.approx((1 - EWM_ALPHA) * 2 + EWM_ALPHA * 1)
+    # A missing xG leaves the average where it was
+    assert features['xG'] == 1.5
+    assert features['last_match'] == datetime(2025, 8, 8)
+    assert feature_store.team_features(teams[2]) is None
+
+
+def test_incremental_sync_matches_rebuild(teams):
+    a, b, c = teams
+    _match(a, b, (2, 1), 0, xg=(1.2, 0.8))
+    feature_store.sync()
+    for day, (home, away), score in [(3, (b, c), (0, 0)), (6, (c, a), (3, 1)), (9, (a, b), (1, 2))]:
+        _match(home, away, score, day, xg=(score[0] * 0.7, score[1] * 0.9))
+        feature_store.sync()
+    _assert_sync_matches_rebuild()
+
+
+def test_late_result_is_applied_and_later_matches_replayed(teams):
+    a, b, c = teams
+    _match(a, b, (2, 1), 0, xg=(1.2, 0.8))
+    _match(a, c, (0, 3), 14, xg=(0.3, 2.1))
+    feature_store.sync()
+    # A postponed fixture from before the latest applied match is played
+    _match(b, a, (4, 0), 7, xg=(2.5, 0.2))
+
+    assert feature_store.sync() == 3  # b's new match; a's late match and the one after it
+    assert feature_store.team_features(a)['form'] == (1.0 + 0.0 + 0.0) / 5
+    assert feature_store.sync() == 0
+    _assert_sync_matches_rebuild()
+
+
+def test_corrected_and_removed_results_are_reapplied(teams):
+    a, b, c = teams
+    first = _match(a, b, (2, 1), 0)
+    _match(b, c, (1, 1), 5)
+    removed = _match(c, a, (0, 2), 9)
+    feature_store.sync()
+
+    first.home_score = 0
+    db.session.delete(removed)
+    db.session.commit()
+    assert feature_store.sync() == 3  # a and b replay the corrected match, b the one after it
+    assert feature_store.team_features(a)['form'] == 0.0
+    assert db.session.get(TeamFeatureState, c).matches == 1
+    _assert_sync_matches_rebuild()
+
+
+def test_training_rows_only_see_earlier_matches(teams):
+    a, b, c = teams
+    _match(a, b, (3, 0), 0)
+    _match(a, c, (0, 2), 4)
+    rows = feature_store.training_rows().set_index('date')
+
+    first, second = rows.loc[datetime(2025, 8, 1)], rows.loc[datetime(2025, 8, 5)]
+    assert (first['home_team_form'], first['home_goals_scored'], first['result']) == (0.5, 1.5, 'home')
+    assert (second['home_team_form'], second['home_goals_scored']) == (0.2, 3.0)
+    assert second['home_team_rating'] > 75  # Elo after beating b, before this match
+    assert second['days_since_last_match'] == 4
+    assert second['result'] == 'away'
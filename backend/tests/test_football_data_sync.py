@@ -0,0 +1,63 @@
+from sqlalchemy import func, select
+
+from models.db import db, Match, Team
+from models.football_data_sync import sync_competitions
+from models.ingest import ingest_players
+from tests.test_ingest import _scrape
+
+
+class FakeClient:
+    def __init__(self, teams, matches):
+        self.teams, self.matches = teams, matches
+        self.windows = []
+
+    def competition_teams(self, code):
+        return self.teams
+
+    def competition_matches(self, code, date_from=None, date_to=None):
+        self.windows.append((date_from, date_to))
+        return self.matches
+
+
+TEAMS = [
+    {'id': 57, 'name': 'Arsenal FC', 'shortName': 'Arsenal', 'area': {'name': 'England'}},
+    {'id': 65, 'name': 'Manchester City FC', 'shortName': 'Man City', 'area': {'name': 'England'}},
+]
+MATCH = {'id': 1001, 'utcDate': '2025-08-17T15:00:00Z', 'status': 'FINISHED',
+         'season': {'startDate': '2025-08-15', 'endDate': '2026-05-24'},
+         'homeTeam': {'id': 57}, 'awayTeam': {'id': 65}, 'score': {'fullTime': {'home': 2, 'away': 1}}}
+
+
+def test_sync_links_teams_fbref_ingestion_created(app):
+    ingest_players(_scrape())
+    result = sync_competitions(['PL'], client=FakeClient(TEAMS, [MATCH]), max_workers=1)
+
+    assert result['errors'] == []
+    stats = result['competitions']['PL']
+    assert stats['new_teams'] == 0  # 'Arsenal' by short name, 'Manchester City FC' by name
+    arsenal = db.session.execute(select(Team).where(Team.fd_id == 57)).scalar_one()
+    assert (arsenal.fbref_id, arsenal.name) == ('18bb7c10', 'Arsenal')
+    city = db.session.execute(select(Team).where(Team.fd_id == 65)).scalar_one()
+    assert city.fbref_id == 'b8fd03ef'
+    match = db.session.execute(select(Match).where(Match.fd_id == 1001)).scalar_one()
+    assert (match.home_team_id, match.home_score, match.season) == (arsenal.id, 2, '2025-2026')
+
+
+def test_resync_writes_only_changes_and_uses_a_window(app):
+    client = FakeClient(TEAMS, [MATCH])
+    sync_competitions(['PL'], client=client, max_workers=1)
+    again = sync_competitions(['PL'], client=client, max_workers=1)['competitions']['PL']
+
+    assert (again['new_teams'], again['new_matches'], again['updated_matches']) == (0, 0, 0)
+    assert client.windows[0] == (None, None) and None not in client.windows[1]
+    assert db.session.execute(select(func.count()).select_from(Team)).scalar() == 2
+    assert {t.league for t in db.session.execute(select(Team)).scalars()} == {'Premier-League-Stats'}
+
+
+def test_failed_competition_is_reported(app):
+    class Broken(FakeClient):
+        def competition_teams(self, code):
+            raise RuntimeError('quota')
+
+    result = sync_competitions(['PL'], client=Broken([], []), max_workers=1)
+    assert result['errors'] == [{'competition': 'PL', 'error': 'quota'}]
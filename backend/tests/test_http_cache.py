@@ -0,0 +1,198 @@
+import subprocess
+import sys
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from services import http_cache
+from services.http_cache import CacheMiss, CachedSession, LOCK_STRIPES
+
+URL = 'https://api.example.test/v4/competitions/PL/teams'
+BODY = b'{"teams": [{"id": 57, "name": "Arsenal FC"}]}'
+ETAG = '"teams-v1"'
+LAST_MODIFIED = 'Sat, 16 Aug 2025 10:00:00 GMT'
+
+
+class RecordedAdapter(BaseAdapter):
+    """Transport answering from recorded (status, headers, body) responses, logging each request"""
+
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = responses
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        status, headers, body = self.responses[request.url]
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(http_cache.time, 'time', clock.time)
+    return clock
+
+
+def _session(tmp_path, responses, **kwargs):
+    session = CachedSession(cache_dir=str(tmp_path / 'http'), **kwargs)
+    adapter = RecordedAdapter(responses)
+    session.mount('https://', adapter)
+    return session, adapter
+
+
+def _recorded(status=200, body=BODY):
+    headers = {'Content-Type': 'application/json', 'ETag': ETAG, 'Last-Modified': LAST_MODIFIED}
+    return {URL: (status, headers, body)}
+
+
+def test_fresh_entry_served_without_network(tmp_path, clock):
+    session, adapter = _session(tmp_path, _recorded(), default_ttl=60)
+
+    first = session.get(URL)
+    clock.now += 59
+    second = session.get(URL)
+
+    assert len(adapter.requests) == 1
+    assert second.content == first.content == BODY
+    assert second.from_cache and second.json()['teams'][0]['id'] == 57
+    assert second.headers['ETag'] == ETAG
+    assert session.get_stats() == {'hits': 1, 'misses': 1, 'revalidated': 0, 'stored': 1}
+
+
+def test_expired_entry_revalidated_with_conditional_request(tmp_path, clock):
+    session, adapter = _session(tmp_path, _recorded(), default_ttl=60)
+    session.get(URL)
+
+    clock.now += 61
+    assert not session.is_fresh(URL)
+    adapter.responses = _recorded(status=304, body=b'')
+    response = session.get(URL)
+
+    conditional = adapter.requests[-1]
+    assert conditional.headers['If-None-Match'] == ETAG
+    assert conditional.headers['If-Modified-Since'] == LAST_MODIFIED
+    assert response.status_code == 200 and response.content == BODY
+    # The 304 restarts the TTL
+    assert session.is_fresh(URL)
+    session.get(URL)
+    assert len(adapter.requests) == 2
+    assert session.get_stats() == {'hits': 1, 'misses': 1, 'revalidated': 1, 'stored': 1}
+
+
+def test_changed_resource_replaces_entry(tmp_path, clock):
+    session, adapter = _session(tmp_path, _recorded(), default_ttl=60)
+    session.get(URL)
+
+    clock.now += 61
+    adapter.responses = _recorded(body=b'{"teams": []}')
+    assert session.get(URL).json() == {'teams': []}
+    clock.now += 1
+    assert session.get(URL).json() == {'teams': []}
+    assert len(adapter.requests) == 2
+    assert session.get_stats() == {'hits': 1, 'misses': 2, 'revalidated': 0, 'stored': 2}
+
+
+def test_ttl_rules_first_match_wins(tmp_path, clock):
+    matches = 'https://api.example.test/v4/competitions/PL/matches?dateFrom=2025-08-15'
+    responses = {**_recorded(), matches: (200, {'Content-Type': 'application/json'}, b'{"matches": []}')}
+    session, adapter = _session(
+        tmp_path, responses, default_ttl=3600, ttl_rules=[(r'/matches', 300), (r'/competitions/', 10)],
+    )
+    assert session.ttl_for(matches) == 300
+    assert session.ttl_for(URL) == 10
+
+    session.get(matches)
+    session.get(URL)
+    clock.now += 301
+    assert not session.is_fresh(matches)
+    assert not session.is_fresh(URL)
+    session.get(matches)
+    assert len(adapter.requests) == 3
+
+
+def test_params_are_part_of_the_key(tmp_path, clock):
+    base = 'https://api.example.test/v4/competitions/PL/matches'
+    responses = {
+        f'{base}?dateFrom=2025-08-15': (200, {}, b'{"matches": [1]}'),
+        f'{base}?dateFrom=2025-08-22': (200, {}, b'{"matches": [2]}'),
+    }
+    session, adapter = _session(tmp_path, responses)
+
+    assert session.get(base, params={'dateFrom': '2025-08-15'}).json() == {'matches': [1]}
+    assert session.get(base, params={'dateFrom': '2025-08-22'}).json() == {'matches': [2]}
+    assert session.is_fresh(base, params={'dateFrom': '2025-08-15'})
+    assert len(adapter.requests) == 2
+
+
+def test_errors_are_not_stored(tmp_path, clock):
+    session, adapter = _session(tmp_path, _recorded(status=500, body=b'oops'))
+
+    assert session.get(URL).status_code == 500
+    assert session.get(URL).status_code == 500
+    assert len(adapter.requests) == 2
+    assert session.get_stats() == {'hits': 0, 'misses': 2, 'revalidated': 0, 'stored': 0}
+
+
+def test_offline_serves_recorded_fixtures(tmp_path, clock):
+    recorder, _ = _session(tmp_path, _recorded(), default_ttl=60)
+    recorder.get(URL)
+
+    clock.now += 10 * 24 * 3600
+    offline, adapter = _session(tmp_path, {}, offline=True)
+    assert offline.is_fresh(URL)
+    assert offline.get(URL).json()['teams'][0]['name'] == 'Arsenal FC'
+    with pytest.raises(CacheMiss):
+        offline.get('https://api.example.test/v4/competitions/BL1/teams')
+    assert adapter.requests == []
+    assert offline.get_stats() == {'hits': 1, 'misses': 0, 'revalidated': 0, 'stored': 0}
+
+
+def test_non_get_bypasses_cache(tmp_path, clock):
+    session, adapter = _session(tmp_path, _recorded())
+
+    session.post(URL)
+    session.post(URL)
+    assert len(adapter.requests) == 2
+    assert not session.is_fresh(URL)
+    assert session.get_stats() == {'hits': 0, 'misses': 0, 'revalidated': 0, 'stored': 0}
+
+
+def test_per_url_locks_stay_bounded(tmp_path, clock):
+    responses = {f'https://api.example.test/v4/teams/{i}': (200, {}, b'{}') for i in range(500)}
+    session, _ = _session(tmp_path, responses)
+
+    for url in responses:
+        session.get(url)
+    assert len(session._key_locks) == LOCK_STRIPES
+    key = session._key(URL)
+    assert session._lock_for(key) is session._lock_for(key)
+
+
+def test_football_data_import_creates_no_cache(tmp_path):
+    # A fresh interpreter, so the module really is imported for the first time
+    code = 'import services.football_data, os; print(os.path.exists(os.path.join("cache", "http")))'
+    env = {'PYTHONPATH': str(http_cache.__file__).rsplit('services', 1)[0], 'PATH': ''}
+    out = subprocess.run([sys.executable, '-c', code], cwd=tmp_path, env=env,
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == 'False'
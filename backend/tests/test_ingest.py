@@ -0,0 +1,80 @@
+import pandas as pd
+from sqlalchemy import select
+
+from models.db import db, Player, Team
+from models.ingest import ingest_players
+
+
+def _scrape(**overrides):
+    rows = [
+        {'fbref_id': 'p1', 'name': 'Bukayo Saka', 'position': 'FW', 'age': 23, 'minutes': 2500, 'xg': 10.5,
+         'xa': 8.1, 'team': 'Arsenal', 'team_url': '/en/squads/18bb7c10/Arsenal-Stats', 'league': '9'},
+        {'fbref_id': 'p2', 'name': 'Declan Rice', 'position': 'MF', 'age': 26, 'minutes': 2900, 'xg': 3.2,
+         'xa': 4.0, 'team': 'Arsenal', 'team_url': '/en/squads/18bb7c10/Arsenal-Stats', 'league': '9'},
+        {'fbref_id': 'p3', 'name': 'Rodri', 'position': 'MF', 'age': 28, 'minutes': 900, 'xg': 1.0,
+         'xa': 1.5, 'team': 'Manchester City', 'team_url': '/en/squads/b8fd03ef/Manchester-City-Stats',
+         'league': '/en/comps/9/Premier-League-Stats'},
+    ]
+    df = pd.DataFrame(rows)
+    for column, values in overrides.items():
+        df[column] = values
+    return df
+
+
+def test_insert_then_update_only_changed_rows(app):
+    assert ingest_players(_scrape()) == {'inserted': 3, 'updated': 0, 'unchanged': 0, 'rejected': 0,
+                                        'rerated': 3, 'new_teams': 2}
+
+    counts = ingest_players(_scrape(minutes=[2500, 3000, 900]))
+    assert (counts['inserted'], counts['updated'], counts['unchanged'], counts['new_teams']) == (0, 1, 2, 0)
+    assert db.session.execute(select(Player.minutes).where(Player.fbref_id == 'p2')).scalar() == 3000
+
+
+def test_ingest_creates_teams_with_league_keys(app):
+    ingest_players(_scrape())
+    teams = {t.name: t for t in db.session.execute(select(Team)).scalars()}
+    assert teams['Arsenal'].fbref_id == '18bb7c10'
+    assert {t.league for t in teams.values()} == {'Premier-League-Stats'}
+    players = dict(db.session.execute(select(Player.fbref_id, Player.team_id)).all())
+    assert players == {'p1': teams['Arsenal'].id, 'p2': teams['Arsenal'].id, 'p3': teams['Manchester City'].id}
+
+
+def test_rows_without_squad_urls_get_a_name_slug(app):
+    counts = ingest_players(_scrape().drop(columns='team_url'))
+    assert counts['new_teams'] == 2
+    assert db.session.execute(select(Team.fbref_id).where(Team.name == 'Manchester City')).scalar() \
+        == 'team_manchester_city'
+
+
+def test_ingest_adopts_a_team_the_fixture_sync_created(app):
+    db.session.add(Team(fbref_id='fd-57', fd_id=57, name='Arsenal FC', league='Premier-League-Stats'))
+    db.session.commit()
+
+    counts = ingest_players(_scrape())
+    assert counts['new_teams'] == 1
+    arsenal = db.session.execute(select(Team).where(Team.fd_id == 57)).scalar_one()
+    assert arsenal.fbref_id == '18bb7c10'
+    assert db.session.execute(select(Player.team_id).where(Player.fbref_id == 'p1')).scalar() == arsenal.id
+    # The next scrape finds it by squad id even though the names differ
+    assert ingest_players(_scrape(minutes=[100, 2900, 900]))['new_teams'] == 0
+
+
+def test_same_team_name_in_two_leagues(app):
+    rows = pd.DataFrame([
+        {'fbref_id': 'e1', 'name': 'Jordan Pickford', 'position': 'GK', 'team': 'Everton', 'league': '9'},
+        {'fbref_id': 'e2', 'name': 'Ramón Martínez', 'position': 'DF', 'team': 'Everton', 'league': 'Primera-Division'},
+    ])
+    assert ingest_players(rows)['new_teams'] == 2
+    teams = dict(db.session.execute(select(Team.league, Team.id).where(Team.name == 'Everton')).all())
+    assert set(teams) == {'Premier-League-Stats', 'Primera-Division'}
+    players = dict(db.session.execute(select(Player.fbref_id, Player.team_id)).all())
+    assert players == {'e1': teams['Premier-League-Stats'], 'e2': teams['Primera-Division']}
+
+    # A later scrape of one league finds its own team, not the other league's
+    more = pd.DataFrame([{'fbref_id': 'e3', 'name': 'Idrissa Gueye', 'position': 'MF', 'team': 'Everton',
+                          'league': '9'}])
+    assert ingest_players(more)['new_teams'] == 0
+    assert db.session.execute(select(Player.team_id).where(Player.fbref_id == 'e3')).scalar() \
+        == teams['Premier-League-Stats']
+    assert sorted(db.session.execute(select(Team.fbref_id)).scalars()) \
+        == ['team_everton_premier-league-stats', 'team_everton_primera-division']
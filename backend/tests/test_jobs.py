@@ -0,0 +1,164 @@
+import logging
+import os
+import time
+
+import pytest
+import requests
+
+from app import create_app, start_job_workers
+from models.db import db, Job
+from models.jobs import (HANDLERS, JobContext, JobWorkerPool, cancel, claim_next, get_job, job_worker_processes,
+                         run_job, resolve_ingest_path, scrape_checkpoint_path, scrape_job, submit)
+
+
+@pytest.fixture
+def echo_handler():
+    HANDLERS['echo'] = lambda ctx, value=None: {'value': value}
+    yield
+    del HANDLERS['echo']
+
+
+def test_submit_rejects_unknown_kinds(app):
+    with pytest.raises(ValueError):
+        submit('nope')
+
+
+def test_jobs_are_claimed_once_in_order(app, echo_handler):
+    first, second = submit('echo', {'value': 1}), submit('echo', {'value': 2})
+    assert claim_next('w:1') == (first, 'echo', {'value': 1})
+    assert claim_next('w:2') == (second, 'echo', {'value': 2})
+    assert claim_next('w:3') is None
+
+    run_job(first, 'echo', {'value': 1})
+    job = get_job(first)
+    assert job['status'] == 'succeeded' and job['result'] == {'value': 1}
+
+
+def test_cancelling_a_queued_job_keeps_it_from_running(app, echo_handler):
+    job_id = submit('echo')
+    assert cancel(job_id)['status'] == 'cancelled'
+    assert claim_next('w:1') is None
+
+
+def test_worker_pool_runs_queued_jobs(app, echo_handler):
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    job_id = submit('echo', {'value': 'done'})
+    pool = JobWorkerPool(lambda: create_app({'SQLALCHEMY_DATABASE_URI': uri}), processes=1, poll_interval=0.05)
+    pool.start()
+    try:
+        deadline = time.monotonic() + 20
+        while time.monotonic() < deadline:
+            db.session.expire_all()
+            if db.session.get(Job, job_id).status == 'succeeded':
+                break
+            time.sleep(0.1)
+    finally:
+        pool.stop()
+    assert get_job(job_id)['result'] == {'value': 'done'}
+
+
+def test_job_workers_can_be_left_to_worker_py(monkeypatch):
+    monkeypatch.setenv('JOB_WORKERS', '0')
+    assert start_job_workers() is None
+
+
+@pytest.mark.parametrize('setting, expected', [(None, 1), ('0', 0), ('3', 3)])
+def test_gunicorn_starts_as_many_job_workers_as_the_dev_server(monkeypatch, setting, expected):
+    import runpy
+    import subprocess
+
+    if setting is None:
+        monkeypatch.delenv('JOB_WORKERS', raising=False)
+    else:
+        monkeypatch.setenv('JOB_WORKERS', setting)
+    assert job_worker_processes() == expected
+
+    started = []
+
+    class FakePopen:
+        pid = 1
+
+        def __init__(self, args):
+            started.append(args)
+
+    class FakeServer:
+        log = logging.getLogger('gunicorn.test')
+
+    monkeypatch.setattr(subprocess, 'Popen', FakePopen)
+    config = runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py'))
+    config['when_ready'](FakeServer())
+    assert [args[-1] for args in started] == ([str(expected)] if expected else [])
+
+
+
+class _FakeScraper:
+    base_url = 'https://fbref.test'
+    delay = 0.001
+
+    def __init__(self):
+        self.session = requests.Session()
+
+    def _parse_teams(self, html, league_url):
+        return [{'name': name, 'url': f"/squads/{name}", 'league': '9'} for name in ('A', 'B')]
+
+    def _parse_players(self, html):
+        return [{'name': f"player of {html}"}]
+
+
+def test_resubmitted_scrape_resumes_from_the_checkpoint(app, monkeypatch):
+    import models.ingest
+    import scraper.fbref_scraper
+    from scraper.scheduler import ScrapeScheduler
+
+    fetched, failing = [], {'https://fbref.test/squads/B'}
+
+    def fetch(self, url):
+        fetched.append(url)
+        if url in failing:
+            raise RuntimeError('boom')
+        return url
+
+    monkeypatch.setattr(scraper.fbref_scraper, 'FBrefScraper', _FakeScraper)
+    monkeypatch.setattr(ScrapeScheduler, 'fetch', fetch)
+    monkeypatch.setattr(models.ingest, 'ingest_players', lambda data: {'players': len(data)})
+    league = '/en/comps/9/Premier-League-Stats'
+
+    first = scrape_job(JobContext(submit('scrape')), league_urls=[league], snapshot=False)
+    assert first['players'] == 1 and len(first['errors']) == 1
+    assert os.path.exists(scrape_checkpoint_path([league]))
+
+    # A new job for the same league only fetches the page that failed
+    fetched.clear()
+    failing.clear()
+    second = scrape_job(JobContext(submit('scrape')), league_urls=[league], snapshot=False)
+    assert fetched == ['https://fbref.test/squads/B']
+    assert second == {'players': 2, 'errors': [], 'features': {'rated': 0, 'applied': 0}}
+    # A complete scrape drops its checkpoint, so the next one fetches afresh
+    assert not os.path.exists(scrape_checkpoint_path([league]))
+
+
+@pytest.mark.parametrize('path', ['/etc/passwd.csv', '../secrets.csv', 'sub/../../x.csv', 'players.txt', '', None])
+def test_ingest_rejects_paths_outside_the_ingest_directory(client, path):
+    response = client.post('/api/jobs', json={'kind': 'ingest', 'params': {'path': path}})
+    assert response.status_code == 400
+
+
+def test_ingest_resolves_files_inside_the_ingest_directory(app, tmp_path, monkeypatch):
+    import models.jobs
+
+    monkeypatch.setattr(models.jobs, 'INGEST_DIR', str(tmp_path / 'ingest'))
+    (tmp_path / 'ingest' / 'week1').mkdir(parents=True)
+    assert resolve_ingest_path('week1/players.csv') == str((tmp_path / 'ingest' / 'week1' / 'players.csv').resolve())
+
+    # A symlink out of the directory is refused too
+    (tmp_path / 'ingest' / 'escape.csv').symlink_to(tmp_path / 'test.db')
+    with pytest.raises(ValueError):
+        resolve_ingest_path('escape.csv')
+
+
+@pytest.mark.parametrize('limit, expected', [('0', 1), ('-5', 1), ('100000', 3), ('abc', 3)])
+def test_job_listing_limit_is_clamped(client, echo_handler, limit, expected):
+    for _ in range(3):
+        submit('echo')
+    response = client.get(f"/api/jobs?limit={limit}")
+    assert response.status_code == 200 and len(response.get_json()) == expected
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.player_ratings import DEFAULT_LEAGUE_STRENGTH, LEAGUE_STRENGTH, RATING_COLUMNS, compute_ratings
+from scraper.data_parser import DataParser
+from scraper.fbref_scraper import FBrefScraper
+from services.leagues import league_key, team_name_key
+
+
+@pytest.mark.parametrize('value, key', [
+    ('/en/comps/9/Premier-League-Stats', 'Premier-League-Stats'),
+    ('/en/comps/9/2023-2024/2023-2024-Premier-League-Stats', 'Premier-League-Stats'),
+    ('/en/comps/12/La-Liga-Stats', 'La-Liga-Stats'),
+    ('9', 'Premier-League-Stats'),
+    ('Premier-League-Stats', 'Premier-League-Stats'),
+    ('/en/comps/22/2024/2024-Major-League-Soccer-Stats', 'Major-League-Soccer-Stats'),
+    ('', None),
+    (None, None),
+])
+def test_league_key(value, key):
+    assert league_key(value) == key
+
+
+def test_every_rated_league_is_a_key():
+    assert all(league_key(league) == league for league in LEAGUE_STRENGTH)
+
+
+def test_scraped_teams_carry_the_league_key():
+    html = ('<table id="results2024-202591_overall"><tbody><tr><td>'
+            '<a href="/en/squads/18bb7c10/Arsenal-Stats">Arsenal</a></td></tr></tbody></table>')
+    teams = FBrefScraper.__new__(FBrefScraper)._parse_teams(html, '/en/comps/9/Premier-League-Stats')
+    assert teams[0]['league'] == 'Premier-League-Stats'
+
+
+def test_cleaning_normalizes_stored_league_values():
+    df = DataParser.clean_player_data(pd.DataFrame({'name': ['A', 'B', 'C'], 'league': ['9', 'La-Liga-Stats', None]}))
+    assert df['league'].tolist()[:2] == ['Premier-League-Stats', 'La-Liga-Stats']
+    assert pd.isna(df['league'].iloc[2])
+
+
+def _players(league):
+    n = 40
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'id': range(n), 'position': 'FW', 'league': league, 'age': 25, 'minutes': rng.integers(900, 3000, n),
+        'overall': None, 'potential': None, 'xG': rng.random(n) * 15, 'xA': rng.random(n) * 8,
+        'progressive_passes': 0, 'progressive_carries': rng.integers(0, 80, n), 'tackles': 0, 'interceptions': 0,
+    })[RATING_COLUMNS]
+
+
+def test_league_strength_applies_to_legacy_league_values():
+    slug, _ = compute_ratings(_players('Premier-League-Stats'))
+    legacy, _ = compute_ratings(_players('9'))
+    unknown, _ = compute_ratings(_players('Some-Other-League-Stats'))
+    assert (legacy == slug).all()
+    assert DEFAULT_LEAGUE_STRENGTH < 1.0 and (unknown <= slug).all() and (unknown < slug).any()
+
+
+@pytest.mark.parametrize('a, b', [
+    ('Arsenal', 'Arsenal FC'),
+    ('Atlético Madrid', 'Atletico Madrid'),
+    ('Milan', 'AC Milan'),
+    ('Paris Saint-Germain', 'Paris Saint-Germain FC'),
+])
+def test_team_name_key_matches_spellings(a, b):
+    assert team_name_key(a) == team_name_key(b)
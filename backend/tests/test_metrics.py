@@ -0,0 +1,111 @@
+import re
+
+import numpy as np
+import pytest
+
+from services import metrics, serialization
+from services.metrics import Counter, Histogram
+
+# name{labels} value, as in the Prometheus text exposition format
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="([^"\\]|\\.)*",?)*\})? \S+$')
+
+
+def _series(text, name):
+    """{label string: value} of the samples of one metric in rendered text"""
+    return {line[len(name):].rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1])
+            for line in text.splitlines() if line.startswith(name + '{') or line.startswith(name + ' ')}
+
+
+def test_histogram_bucket_counts():
+    histogram = Histogram('test_seconds', 'Test latency', ('route',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 1.0, 5.0):
+        histogram.observe(value, '/a')
+    histogram.observe(0.2, '/b')
+
+    series = dict((tuple(k), v) for k, v in histogram.snapshot()['series'])
+    # Upper bounds are inclusive, like Prometheus' le
+    assert series[('/a',)] == [2, 2, 1, pytest.approx(6.65)]
+    assert series[('/b',)] == [0, 1, 0, pytest.approx(0.2)]
+
+    text = metrics.render({'test_seconds': histogram.snapshot()})
+    assert _series(text, 'test_seconds_bucket') == {
+        '{route="/a",le="0.1"}': 2, '{route="/a",le="1.0"}': 4, '{route="/a",le="+Inf"}': 5,
+        '{route="/b",le="0.1"}': 0, '{route="/b",le="1.0"}': 1, '{route="/b",le="+Inf"}': 1,
+    }
+    assert _series(text, 'test_seconds_count') == {'{route="/a"}': 5, '{route="/b"}': 1}
+    assert _series(text, 'test_seconds_sum')['{route="/a"}'] == pytest.approx(6.65)
+
+
+def test_render_format_and_escaping():
+    counter = Counter('test_total', 'Things counted', ('name',))
+    counter.inc('plain')
+    counter.inc('quote " back\\slash\nnewline', amount=3)
+    text = metrics.render({'test_total': counter.snapshot()})
+
+    lines = text.splitlines()
+    assert lines[:2] == ['# HELP test_total Things counted', '# TYPE test_total counter']
+    assert all(SAMPLE.match(line) for line in lines[2:])
+    assert 'test_total{name="quote \\" back\\\\slash\\nnewline"} 3' in lines
+    assert text.endswith('\n')
+
+
+def test_worker_snapshots_are_summed():
+    first, second = Counter('c_total', 'c', ('k',)), Counter('c_total', 'c', ('k',))
+    first.inc('a')
+    second.inc('a', amount=2)
+    second.inc('b')
+    h1, h2 = Histogram('h', 'h', buckets=(1.0,)), Histogram('h', 'h', buckets=(1.0,))
+    h1.observe(0.5)
+    h2.observe(2.0)
+
+    total = metrics._merge(metrics._merge({}, {'c_total': first.snapshot(), 'h': h1.snapshot()}),
+                           {'c_total': second.snapshot(), 'h': h2.snapshot()})
+    assert dict((tuple(k), v) for k, v in total['c_total']['series']) == {('a',): 3, ('b',): 1}
+    assert total['h']['series'] == [[[], [1, 1, 2.5]]]
+
+
+def test_metrics_endpoint(client):
+    assert client.get('/api/teams').status_code == 200
+    before = _series(metrics.render(), 'soccer_http_requests_total').get(
+        '{method="GET",route="/api/teams",status="200"}', 0)
+    client.get('/api/teams')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert 'version=0.0.4' in response.headers['Content-Type']
+    text = response.get_data(as_text=True)
+
+    for line in text.splitlines():
+        assert line.startswith('# HELP ') or line.startswith('# TYPE ') or SAMPLE.match(line), line
+    requests = _series(text, 'soccer_http_requests_total')
+    assert requests['{method="GET",route="/api/teams",status="200"}'] == before + 1
+    assert '{method="GET",route="/api/teams"}' in _series(text, 'soccer_http_request_duration_seconds_count')
+    assert '{stage="db"}' in _series(text, 'soccer_stage_duration_seconds_count')
+
+
+def test_server_timing_header(client):
+    response = client.get('/api/teams')
+    entries = dict(entry.split(';dur=') for entry in response.headers['Server-Timing'].split(', '))
+
+    assert {'db', 'serialize', 'total'} <= set(entries)
+    assert all(float(ms) >= 0 for ms in entries.values())
+    assert float(entries['total']) >= float(entries['db'])
+    # Unmatched routes are timed too, under one label
+    assert 'total;dur=' in client.get('/no/such/route').headers['Server-Timing']
+
+
+def test_json_provider_is_timed_orjson(app):
+    # metrics.init_app wraps whatever provider the app had, so it must still be serialization's
+    assert isinstance(app.json, serialization.JSONProvider)
+    assert type(app.json).__name__ == 'TimedJSONProvider'
+
+    before = dict((tuple(k), v) for k, v in metrics.STAGE_SECONDS.snapshot()['series']).get(('serialize',))
+    with app.test_request_context():
+        body = app.json.dumps({'probs': np.array([0.5, 0.25]), 'n': np.int64(3)})
+    after = dict((tuple(k), v) for k, v in metrics.STAGE_SECONDS.snapshot()['series'])[('serialize',)]
+
+    if serialization.orjson is not None:
+        # orjson encodes NumPy values itself and writes compact JSON
+        assert body == '{"probs":[0.5,0.25],"n":3}'
+    assert sum(after[:-1]) == (sum(before[:-1]) if before else 0) + 1
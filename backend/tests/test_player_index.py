@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from models.db import db, Player
+from models.player_index import PlayerIndex
+
+
+def _player(fbref_id, name, xg, updated, minutes=900):
+    return Player(fbref_id=fbref_id, name=name, position='FW', team='Arsenal',
+                  league='Premier-League-Stats', minutes=minutes, xG=xg, last_updated=updated)
+
+
+def test_search_ranks_by_per90(app):
+    now = datetime.utcnow()
+    db.session.add_all([_player('a', 'A', 5.0, now), _player('b', 'B', 5.0, now, minutes=1800)])
+    db.session.commit()
+    index = PlayerIndex()
+    assert [p['name'] for p in index.search(sort='xg')] == ['A', 'B']
+
+
+def test_queries_pick_up_players_written_elsewhere(app):
+    now = datetime.utcnow()
+    db.session.add(_player('a', 'A', 2.0, now))
+    db.session.commit()
+    index = PlayerIndex()
+    index.reload_interval = 0
+    assert [p['name'] for p in index.search(sort='xg')] == ['A']
+
+    # As an ingest in a job worker would: no refresh() call in this process
+    db.session.add(_player('b', 'B', 9.0, now + timedelta(seconds=1)))
+    player = db.session.query(Player).filter_by(fbref_id='a').one()
+    player.xG, player.last_updated = 12.0, now + timedelta(seconds=1)
+    db.session.commit()
+
+    assert [(p['name'], p['xg']) for p in index.search(sort='xg')] == [('A', 1.2), ('B', 0.9)]
+
+
+def test_version_checks_wait_for_the_interval(app):
+    now = datetime.utcnow()
+    db.session.add(_player('a', 'A', 2.0, now))
+    db.session.commit()
+    index = PlayerIndex()
+    index.reload_interval = 3600
+    index.ensure_loaded()
+
+    db.session.add(_player('b', 'B', 9.0, now + timedelta(seconds=1)))
+    db.session.commit()
+    assert len(index.search(sort='xg')) == 1
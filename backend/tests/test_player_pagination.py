@@ -0,0 +1,86 @@
+import base64
+import json
+
+import pytest
+
+from models.db import db, Player
+from models.player_queries import _encode_cursor
+
+
+@pytest.fixture
+def players(app):
+    rows = []
+    for i in range(1, 38):
+        rows.append(Player(
+            fbref_id=f"p{i}", name=f"Player {i}", position='FW' if i % 2 else 'MF', team=f"Team {i % 3}",
+            league='Premier-League-Stats', age=18 + i % 15, minutes=90 * i,
+            goals=i % 5,  # plenty of ties, broken by id
+            xG=None if i % 7 == 0 else round(i * 0.37 % 4, 2), xA=0.1 * (i % 4), overall=60 + i % 20,
+        ))
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+def _walk(client, **params):
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        response = client.get('/api/players', query_string=query)
+        assert response.status_code == 200, response.get_json()
+        pages.append(response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return pages
+
+
+@pytest.mark.parametrize('sort, order', [
+    ('id', 'asc'), ('id', 'desc'), ('goals', 'desc'), ('goals', 'asc'), ('xg', 'desc'), ('xa', 'asc'),
+    ('overall', 'desc'),
+])
+def test_pages_round_trip_to_the_full_listing(client, players, sort, order):
+    fields = 'id,goals,xg,xa,overall'
+    full = client.get('/api/players', query_string={'sort': sort, 'order': order, 'limit': 1000,
+                                                    'fields': fields}).get_json()
+    pages = _walk(client, sort=sort, order=order, limit=5, fields=fields)
+
+    assert [p for page in pages for p in page] == full
+    assert all(len(page) == 5 for page in pages[:-1])
+    # Players without an xG can't be ranked by it
+    assert len(full) == (37 - 5 if sort == 'xg' else 37)
+
+
+def test_cursor_works_with_filters_and_fields_without_the_sort_key(client, players):
+    pages = _walk(client, sort='goals', position='FW', min_minutes=900, limit=4, fields='name')
+    names = [p['name'] for page in pages for p in page]
+    assert len(names) == len(set(names)) == sum(1 for p in players if p.position == 'FW' and p.minutes >= 900)
+    assert all(set(p) == {'name'} for page in pages for p in page)
+
+
+def test_cursor_survives_without_padding(client, players):
+    first = client.get('/api/players', query_string={'sort': 'xg', 'limit': 3})
+    cursor = first.headers['X-Next-Cursor']
+    assert '=' not in cursor
+    second = client.get('/api/players', query_string={'sort': 'xg', 'limit': 3, 'cursor': cursor.rstrip('=')})
+    assert second.status_code == 200 and len(second.get_json()) == 3
+
+
+def _raw(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).decode('ascii')
+
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor', '%%%', 'é', _raw(5), _raw([1]), _raw([1, 2, 3]), _raw([1, 'x']), _raw({'a': 1, 'b': 2}),
+    _raw([None, 3]), _raw(['x', 3]), _raw([True, 3]), _raw([1.5, 3.5]),
+])
+def test_bad_cursors_are_rejected(client, players, cursor):
+    response = client.get('/api/players', query_string={'sort': 'goals', 'cursor': cursor})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Invalid cursor'
+
+
+def test_float_cursor_values_round_trip(client, players):
+    cursor = _encode_cursor(1.11, 3)
+    rows = client.get('/api/players', query_string={'sort': 'xg', 'cursor': cursor, 'fields': 'id,xg',
+                                                    'limit': 1000}).get_json()
+    assert all((p['xg'], p['id']) < (1.11, 3) for p in rows)
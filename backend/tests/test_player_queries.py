@@ -0,0 +1,22 @@
+from datetime import datetime, timedelta
+
+from models.db import db, Player
+from models.player_queries import _VERSION_QUERY, players_version
+
+
+def test_players_version_reads_both_maxima_from_indexes(app):
+    sql = str(_VERSION_QUERY.compile(db.engine))
+    with db.engine.connect() as conn:
+        plan = [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    assert not [step for step in plan if step.startswith('SCAN players')], plan
+
+
+def test_players_version_moves_on_insert_and_update(app):
+    empty = players_version()
+    player = Player(fbref_id='a', name='A', position='FW', last_updated=datetime(2025, 1, 1))
+    db.session.add(player)
+    db.session.commit()
+    inserted = players_version()
+    player.last_updated += timedelta(days=1)
+    db.session.commit()
+    assert len({empty, inserted, players_version()}) == 3
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from models.db import db, Player
+from models.player_ratings import (
+    DEFAULT_LEAGUE_STRENGTH, POTENTIAL_MAX, RATING_COLUMNS, RATING_MAX, RATING_MIN, SHRINK_MINUTES,
+    compute_ratings, position_groups, rate_players,
+)
+from scraper.data_parser import DataParser
+
+
+def _frame(rows):
+    """RATING_COLUMNS frame of Premier League forwards with 3000 minutes, overridden per row"""
+    defaults = {'id': 0, 'position': 'FW', 'league': 'Premier-League-Stats', 'age': 30, 'minutes': 3000,
+                'overall': None, 'potential': None, 'xG': 0.0, 'xA': 0.0, 'progressive_passes': 0,
+                'progressive_carries': 0, 'tackles': 0, 'interceptions': 0}
+    return pd.DataFrame([{**defaults, 'id': i, **row} for i, row in enumerate(rows)])[RATING_COLUMNS]
+
+
+def test_position_groups():
+    positions = pd.Series(['DF,MF', ' fw', 'GK', None, 'XX'])
+    assert position_groups(positions).tolist() == ['DF', 'FW', 'GK', 'MF', 'MF']
+
+
+def test_percentile_ranking_within_league_and_position():
+    forwards = [{'xG': xg} for xg in (2.0, 8.0, 14.0, 20.0)]
+    overall, _ = compute_ratings(_frame(forwards))
+    assert list(overall) == sorted(overall) and overall[0] < overall[-1]
+    assert RATING_MIN <= overall.min() and overall.max() <= RATING_MAX
+
+    # Defenders and another league's forwards are ranked in their own groups
+    others = [{'position': 'DF', 'xG': 30.0}, {'league': 'La-Liga-Stats', 'xG': 40.0}]
+    mixed, _ = compute_ratings(_frame(forwards + others))
+    assert (mixed[:4] == overall).all()
+
+
+def test_position_weights():
+    # Tackles make a defender, not a forward
+    defenders, _ = compute_ratings(_frame([{'position': 'DF', 'tackles': t} for t in (10, 90)]))
+    forwards, _ = compute_ratings(_frame([{'tackles': t} for t in (10, 90)]))
+    assert defenders[1] > defenders[0] and forwards[1] == forwards[0]
+    # Goalkeepers are rated on minutes alone
+    keepers, _ = compute_ratings(_frame([{'position': 'GK', 'xG': 5.0, 'minutes': 3000},
+                                         {'position': 'GK', 'minutes': 3000},
+                                         {'position': 'GK', 'minutes': 1000}]))
+    assert keepers[0] == keepers[1] > keepers[2]
+
+
+def test_low_minutes_shrink_towards_the_middle():
+    # Alone in their groups, every player ranks top on every metric
+    minutes = [0, 90, 450, 1800, 3400]
+    rows = [{'league': f"Minor-{i}-Stats", 'xG': 0.5 * m / 90, 'minutes': m} for i, m in enumerate(minutes)]
+    overall, _ = compute_ratings(_frame(rows))
+
+    score = [0.5 + 0.5 * m / (m + SHRINK_MINUTES) for m in minutes]
+    expected = np.rint(RATING_MIN + (RATING_MAX - RATING_MIN) * np.array(score) * DEFAULT_LEAGUE_STRENGTH)
+    assert list(overall) == list(expected)
+    # No minutes, no evidence: the middle of the scale
+    assert overall[0] == np.rint(RATING_MIN + (RATING_MAX - RATING_MIN) * 0.5 * DEFAULT_LEAGUE_STRENGTH)
+    assert list(overall) == sorted(overall) and overall[1] < overall[-1]
+
+
+def test_potential_follows_the_age_curve():
+    rows = [{'xG': 10.0, 'age': age} for age in (17, 20, 24, 28, 33, None)]
+    overall, potential = compute_ratings(_frame(rows))
+    assert len(set(overall)) == 1
+    growth = potential - overall
+    assert list(growth) == sorted(growth, reverse=True) and growth[0] > growth[2] > 0
+    # No growth left from 28, or when the age is unknown
+    assert growth[3] == growth[4] == growth[5] == 0
+    assert (potential <= POTENTIAL_MAX).all()
+
+    # Players already rated higher have less headroom left
+    young = _frame([{'xG': xg, 'age': 18} for xg in (1.0, 20.0)])
+    overall, potential = compute_ratings(young)
+    assert overall[1] > overall[0] and potential[1] - overall[1] < potential[0] - overall[0]
+
+
+def test_empty_frame():
+    overall, potential = compute_ratings(pd.DataFrame(columns=RATING_COLUMNS))
+    assert overall.shape == potential.shape == (0,)
+
+
+def test_scraped_rows_carry_no_rating():
+    # Ratings only ever come from the rating engine
+    df = DataParser.clean_player_data(pd.DataFrame({'name': ['A'], 'minutes': [900]}))
+    assert 'overall' not in df.columns
+
+
+def test_rate_players_writes_only_changed_rows(app):
+    for i, xg in enumerate((2.0, 8.0, 14.0)):
+        db.session.add(Player(fbref_id=f"p{i}", name=f"P{i}", position='FW', league='Premier-League-Stats',
+                              age=21, minutes=2700, xG=xg))
+    db.session.commit()
+
+    assert rate_players() == {'rated': 3, 'updated': 3}
+    db.session.commit()
+    rated = db.session.execute(select(Player.fbref_id, Player.overall, Player.potential)
+                               .order_by(Player.fbref_id)).all()
+    assert [r.overall for r in rated] == sorted(r.overall for r in rated)
+    assert all(r.potential > r.overall for r in rated)
+    assert rate_players() == {'rated': 3, 'updated': 0}
+
+    db.session.add(Player(fbref_id='p3', name='P3', position='FW', league='Premier-League-Stats',
+                          age=21, minutes=2700, xG=30.0))
+    db.session.commit()
+    # The newcomer shifts everyone's percentile
+    assert rate_players() == {'rated': 4, 'updated': 4}
+
+
+def test_rate_players_on_an_empty_table(app):
+    assert rate_players() == {'rated': 0, 'updated': 0}
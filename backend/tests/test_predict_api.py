@@ -0,0 +1,88 @@
+from models.db import db, Team
+
+
+def _team(name, fd_id=None, league='Premier-League-Stats'):
+    team = Team(fbref_id=f"t-{name}", name=name, league=league, fd_id=fd_id)
+    db.session.add(team)
+    db.session.commit()
+    return team
+
+
+def test_teams_fd_carries_db_team_ids(client, monkeypatch):
+    import services.football_data as football_data
+
+    linked = _team('Arsenal', fd_id=57)
+    monkeypatch.setattr(football_data, 'get_teams', lambda competition: [
+        {'id': 57, 'name': 'Arsenal FC'}, {'id': 61, 'name': 'Chelsea FC'},
+    ])
+    teams = client.get('/api/teams_fd?competition=PL').get_json()
+    assert [(t['id'], t['team_id']) for t in teams] == [(57, linked.id), (61, None)]
+
+
+def test_predict_takes_db_team_ids(client):
+    home, away = _team('Arsenal', fd_id=57), _team('Chelsea', fd_id=61)
+    response = client.post('/api/predict', json={'home_team': home.id, 'away_team': away.id})
+    assert response.status_code == 200
+    prediction = response.get_json()
+    assert abs(prediction['home_win'] + prediction['draw'] + prediction['away_win'] - 1) < 1e-6
+
+    # A football-data id isn't a team id
+    assert client.post('/api/predict', json={'home_team': 57, 'away_team': 61}).status_code == 404
+
+
+def test_predict_is_read_only_until_a_job_applies_results(client):
+    from datetime import datetime
+
+    from sqlalchemy import func, select
+
+    from models.db import Match, TeamFeatureState, TeamRating
+    from models.team_features import get_team_features, sync_match_features
+
+    home, away = _team('Arsenal'), _team('Chelsea')
+    db.session.add(Match(date=datetime(2025, 8, 17), season='2025-2026', home_team_id=home.id,
+                         away_team_id=away.id, home_score=3, away_score=0))
+    db.session.commit()
+
+    def stored():
+        return tuple(db.session.execute(select(func.count()).select_from(table)).scalar()
+                     for table in (TeamRating, TeamFeatureState))
+
+    assert client.post('/api/predict', json={'home_team': home.id, 'away_team': away.id}).status_code == 200
+    assert stored() == (0, 0)
+    assert get_team_features(home.id)['form'] == 0.5
+
+    assert sync_match_features() == {'rated': 1, 'applied': 2}
+    assert stored() == (2, 2)
+    features = get_team_features(home.id)
+    assert features['rating'] > 75 and features['goals_scored'] == 3.0
+
+
+def test_unrated_teams_get_the_rating_training_uses(app):
+    from models.db import Player
+    from models.team_features import get_team_features
+    from models.team_strength import INITIAL_RATING, to_feature
+
+    team = _team('Promoted')
+    db.session.add(Player(fbref_id='p1', name='Star', position='FW', team='Promoted', team_id=team.id, overall=91))
+    db.session.commit()
+    assert get_team_features(team.id)['rating'] == to_feature(INITIAL_RATING)
+
+
+def test_corrected_score_moves_the_features_version(app):
+    from datetime import datetime
+
+    from models.db import Match
+    from models.team_features import features_version, sync_match_features
+
+    home, away = _team('Arsenal'), _team('Chelsea')
+    match = Match(date=datetime(2025, 8, 17), home_team_id=home.id, away_team_id=away.id,
+                  home_score=1, away_score=0)
+    db.session.add(match)
+    db.session.commit()
+    sync_match_features()
+    version = features_version()
+
+    match.home_score = 0
+    db.session.commit()
+    assert sync_match_features() == {'rated': 1, 'applied': 2}
+    assert features_version() != version
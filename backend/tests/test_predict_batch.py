@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+from models.db import db, Team
+from models.predictor import MatchPredictor
+from models.registry import ModelRegistry
+
+HOME = {'rating': 82, 'form': 0.7, 'goals_scored': 2.1, 'goals_conceded': 0.9, 'xG': 2.3}
+AWAY = {'rating': 78, 'form': 0.4, 'goals_scored': 1.5, 'goals_conceded': 1.8, 'xG': 1.6}
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """A registry whose active version is a fitted logistic regression"""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(0)
+    columns = MatchPredictor().feature_columns
+    X = rng.normal([75, 75, 0.5, 0.5, 1.5, 1.5, 1.2, 1.2, 1.8, 1.8, 7], 1.0, size=(300, len(columns)))
+    margin = X[:, 0] - X[:, 1] + rng.normal(0, 1, len(X))
+    y = np.where(margin > 0.5, 'home', np.where(margin < -0.5, 'away', 'draw'))
+    scaler = StandardScaler().fit(X)
+    model = LogisticRegression(max_iter=500).fit(scaler.transform(X), y)
+
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    registry.register(model, scaler, columns, data_hash='fixture', activate=True)
+    return registry
+
+
+@pytest.fixture
+def predictor(registry):
+    predictor = MatchPredictor(registry)
+    predictor.load_model()
+    assert predictor.is_trained
+    return predictor
+
+
+def _without_flag(prediction):
+    return {k: v for k, v in prediction.items() if k != 'valid'}
+
+
+def test_predict_many_matches_predict(predictor):
+    fixtures = [
+        {'home_team': HOME, 'away_team': AWAY, 'context': {'days_rest': 4}},
+        {'home_team': AWAY, 'away_team': HOME},
+        {'home_team': {}, 'away_team': {'rating': 90}, 'context': None},
+        {'home_team': dict(HOME, form='0.9'), 'away_team': AWAY, 'context': {'days_rest': 2}},
+    ]
+    batch = predictor.predict_many(fixtures)
+
+    assert all(p['valid'] for p in batch)
+    for fixture, prediction in zip(fixtures, batch):
+        single = predictor.predict(fixture['home_team'], fixture['away_team'], fixture.get('context'))
+        assert _without_flag(prediction) == pytest.approx(single)
+    # The fixtures really do differ
+    assert batch[0]['home_win'] != batch[1]['home_win']
+
+
+def test_predict_many_flags_invalid_rows(predictor):
+    default = predictor._default_prediction(True)
+    fixtures = [
+        {},
+        {'home_team': HOME},
+        {'home_team': HOME, 'away_team': 'Chelsea'},
+        {'home_team': HOME, 'away_team': AWAY, 'context': 'midweek'},
+        {'home_team': dict(HOME, rating='strong'), 'away_team': AWAY},
+        {'home_team': dict(HOME, xG=None), 'away_team': AWAY},
+        {'home_team': HOME, 'away_team': dict(AWAY, form=float('nan'))},
+        'not a fixture',
+        {'home_team': HOME, 'away_team': AWAY},
+    ]
+    batch = predictor.predict_many(fixtures)
+
+    assert [p['valid'] for p in batch] == [False] * 8 + [True]
+    for prediction in batch[:-1]:
+        assert _without_flag(prediction) == default
+    assert _without_flag(batch[-1]) == pytest.approx(predictor.predict(HOME, AWAY))
+    assert predictor.predict_many([]) == []
+
+
+def test_feature_matrix_matches_prepare_features(predictor):
+    fixtures = [
+        {'home_team': HOME, 'away_team': AWAY, 'context': {'days_rest': 3}},
+        {'home_team': {'rating': 70}, 'away_team': {}},
+    ]
+    features, valid = predictor._prepare_feature_matrix(fixtures)
+
+    assert valid.all()
+    for row, fixture in zip(features, fixtures):
+        expected = predictor._prepare_features(fixture['home_team'], fixture['away_team'], fixture.get('context'))
+        assert row.tolist() == expected
+
+
+def _team(name):
+    team = Team(fbref_id=f"t-{name}", name=name, league='Premier-League-Stats')
+    db.session.add(team)
+    db.session.commit()
+    return team
+
+
+def test_batch_route_matches_single_predictions(client, registry, monkeypatch):
+    from models.predictor import predictor
+
+    # Put the served model back afterwards
+    for name in ('registry', '_bundle', '_active_stamp'):
+        monkeypatch.setattr(predictor, name, getattr(predictor, name))
+    predictor.registry = registry
+    predictor.load_model()
+    arsenal, chelsea, spurs = _team('Arsenal'), _team('Chelsea'), _team('Spurs')
+
+    fixtures = [
+        {'home_team': arsenal.id, 'away_team': chelsea.id},
+        {'home_team': str(spurs.id), 'away_team': arsenal.id},
+        {'home_team': HOME, 'away_team': AWAY, 'context': {'days_rest': 4}},
+        {'home_team': arsenal.id, 'away_team': 99999},
+        {'home_team': 'Arsenal', 'away_team': chelsea.id},
+        ['not', 'a', 'fixture'],
+    ]
+    response = client.post('/api/predict/batch', json={'fixtures': fixtures})
+    assert response.status_code == 200
+    predictions = response.get_json()['predictions']
+
+    assert [p['valid'] for p in predictions] == [True, True, True, False, False, False]
+    for fixture, prediction in zip(fixtures[:2], predictions):
+        single = client.post('/api/predict', json=fixture).get_json()
+        assert _without_flag(prediction) == pytest.approx(single)
+    assert _without_flag(predictions[2]) == pytest.approx(predictor.predict(HOME, AWAY, {'days_rest': 4}))
+
+    assert client.post('/api/predict/batch', json={'fixtures': {}}).status_code == 400
+    assert client.post('/api/predict/batch', json={'fixtures': []}).get_json() == {'predictions': []}
@@ -0,0 +1,101 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from models.db import db, Match, Player, Team
+from models.prediction_cache import PredictionCache, precompute_upcoming, predict_fixture
+
+
+def _fixture():
+    home = Team(fbref_id='h', name='Home', league='L')
+    away = Team(fbref_id='a', name='Away', league='L')
+    db.session.add_all([home, away])
+    db.session.flush()
+    match = Match(date=datetime.utcnow() + timedelta(days=3), home_team_id=home.id, away_team_id=away.id)
+    db.session.add(match)
+    db.session.commit()
+    return home.id, away.id, match.id
+
+
+def _store_probs(match_id, probs):
+    # Written with Core, as the precompute job in another process would
+    with db.engine.begin() as conn:
+        conn.execute(update(Match).where(Match.id == match_id).values(
+            prob_home_win=probs[0], prob_draw=probs[1], prob_away_win=probs[2]))
+
+
+def test_stored_predictions_are_served_while_features_are_unchanged(app):
+    home_id, away_id, match_id = _fixture()
+    assert precompute_upcoming() == 1
+    _store_probs(match_id, (0.7, 0.2, 0.1))
+    assert predict_fixture(home_id, away_id)['home_win'] == 0.7
+
+
+def test_feature_changes_elsewhere_retire_cached_and_stored_predictions(app):
+    home_id, away_id, match_id = _fixture()
+    precompute_upcoming()
+    _store_probs(match_id, (0.7, 0.2, 0.1))
+    assert predict_fixture(home_id, away_id)['home_win'] == 0.7
+
+    # A re-ingest in a job process changes the inputs of the home side's rating
+    with db.engine.begin() as conn:
+        conn.execute(Player.__table__.insert().values(
+            fbref_id='p', name='P', position='FW', team_id=home_id, overall=90,
+            last_updated=datetime.utcnow()))
+    assert predict_fixture(home_id, away_id)['home_win'] != 0.7
+
+
+def test_entries_expire_after_the_ttl():
+    cache, calls = PredictionCache(ttl=0), []
+    compute = lambda: calls.append(1) or {'home_win': 0.5}
+    cache.get_or_compute('k', compute)
+    cache.get_or_compute('k', compute)
+    assert len(calls) == 2
+
+    cache, calls = PredictionCache(ttl=60), []
+    cache.get_or_compute('k', compute)
+    cache.get_or_compute('k', compute)
+    assert len(calls) == 1
+
+
+class Interrupted(BaseException):
+    pass
+
+
+def test_waiters_see_the_owners_exception_even_if_not_an_exception():
+    cache, started, release = PredictionCache(), threading.Event(), threading.Event()
+
+    def compute():
+        started.set()
+        release.wait(5)
+        raise Interrupted()
+
+    def waiter():
+        try:
+            cache.get_or_compute('k', lambda: {'home_win': 0.1})
+        except BaseException as e:
+            outcome.append(e)
+
+    def owner():
+        with pytest.raises(Interrupted):
+            cache.get_or_compute('k', compute)
+
+    outcome = []
+    owner_thread = threading.Thread(target=owner, daemon=True)
+    owner_thread.start()
+    assert started.wait(5)
+    waiter_thread = threading.Thread(target=waiter, daemon=True)
+    waiter_thread.start()
+    while cache.stats()['coalesced'] == 0:
+        time.sleep(0.001)
+    release.set()
+    owner_thread.join(5)
+    waiter_thread.join(5)
+
+    assert not waiter_thread.is_alive()
+    assert len(outcome) == 1 and isinstance(outcome[0], Interrupted)
+    # Nothing was cached, so the next call computes afresh
+    assert cache.get_or_compute('k', lambda: {'home_win': 0.3}) == {'home_win': 0.3}
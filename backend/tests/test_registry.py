@@ -0,0 +1,82 @@
+import os
+
+import joblib
+import pytest
+
+from models.predictor import IdentityScaler, MatchPredictor, PriorModel
+from models.registry import ModelRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path / 'registry'))
+
+
+def _register(registry, data_hash, activate=False):
+    return registry.register(PriorModel(), IdentityScaler(), MatchPredictor().feature_columns,
+                             data_hash=data_hash, activate=activate)
+
+
+@pytest.fixture
+def planted(tmp_path):
+    """A version-shaped directory outside the registry that must never be loaded"""
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    (outside / 'meta.json').write_text('{"feature_columns": []}')
+    joblib.dump({'pwned': True}, outside / 'model.joblib')
+    joblib.dump({'pwned': True}, outside / 'scaler.joblib')
+    return outside
+
+
+@pytest.mark.parametrize('version', [
+    '../outside', '../../outside', 'v20250101000000000000-abc/../../outside', '/tmp', '', None, 7,
+    'v20250101000000000000-abc/', 'v2025-abc',
+])
+def test_versions_outside_the_registry_are_rejected(registry, planted, version):
+    _register(registry, 'abc')
+    for call in (registry.load, registry.meta, registry.activate):
+        with pytest.raises(KeyError):
+            call(version)
+
+
+def test_activate_route_rejects_traversal(client, planted, monkeypatch):
+    from models.predictor import predictor
+
+    monkeypatch.setattr(predictor, 'registry', ModelRegistry(str(planted.parent / 'registry')))
+    response = client.post('/api/models/activate', json={'version': '../outside'})
+    assert response.status_code == 404
+    assert not os.path.exists(planted.parent / 'registry' / 'ACTIVE')
+
+
+def test_tampered_active_file_is_not_loaded(registry, planted):
+    (planted.parent / 'registry' / 'ACTIVE').write_text('../outside')
+    predictor = MatchPredictor(registry)
+    predictor.load_model()
+    assert predictor.version is None and not predictor.is_trained
+
+
+def test_activation_hot_swaps_other_predictors(registry):
+    first = _register(registry, 'aaaa', activate=True)
+    second = _register(registry, 'bbbb')
+    assert [m['version'] for m in registry.list_versions()] == [second, first]
+
+    serving, admin = MatchPredictor(registry), MatchPredictor(registry)
+    serving.reload_interval = 0
+    assert serving._current_bundle().version == first
+
+    admin.activate(second)
+    assert registry.active_version() == second
+    assert serving._current_bundle().version == second
+    # Unchanged pointer: nothing is reloaded
+    generation = serving.generation
+    serving._current_bundle()
+    assert serving.generation == generation
+
+
+def test_activating_an_unknown_version_keeps_the_current_one(registry):
+    first = _register(registry, 'aaaa', activate=True)
+    predictor = MatchPredictor(registry)
+    predictor.load_model()
+    with pytest.raises(KeyError):
+        predictor.activate('v20990101000000000000-ffff')
+    assert predictor.version == first and registry.active_version() == first
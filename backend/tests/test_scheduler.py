@@ -0,0 +1,211 @@
+import json
+import threading
+
+import pytest
+import requests
+
+from scraper import scheduler
+from scraper.scheduler import HostRateLimiter, ScrapeCheckpoint, ScrapeScheduler, TokenBucket
+
+BASE = 'https://fbref.test'
+
+
+class FakeClock:
+    """monotonic()/sleep() pair where sleeping just moves time forward"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+        self._lock = threading.Lock()
+
+    def monotonic(self):
+        with self._lock:
+            return self.now
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.sleeps.append(seconds)
+            # Like a real sleep, never shorter than the clock can tell apart
+            self.now += max(seconds, 1e-6)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(scheduler.time, 'sleep', clock.sleep)
+    # No jitter, so backoff delays are exact
+    monkeypatch.setattr(scheduler.random, 'uniform', lambda a, b: 0.0)
+    return clock
+
+
+class Response:
+    def __init__(self, status, text='', headers=None):
+        self.status_code, self.text, self.headers = status, text, headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error", response=self)
+
+
+class StubSession:
+    """Answers each URL from a script of responses (the last one repeats), logging request times"""
+
+    def __init__(self, clock, script):
+        self.clock, self.script = clock, script
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        with self._lock:
+            self.calls.append((url, self.clock.now))
+            responses = self.script[url]
+            response = responses.pop(0) if len(responses) > 1 else responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def urls(self):
+        return [url for url, _ in self.calls]
+
+
+class StubScraper:
+    """FBref scraper stand-in whose pages are JSON lists of teams or players"""
+    base_url = BASE
+    delay = 3.0
+
+    def __init__(self, session):
+        self.session = session
+
+    def _parse_teams(self, html, league_url):
+        return json.loads(html)
+
+    def _parse_players(self, html):
+        return json.loads(html)
+
+
+def _scheduler(clock, script, **kwargs):
+    session = StubSession(clock, script)
+    return ScrapeScheduler(StubScraper(session), **kwargs), session
+
+
+def test_token_bucket_refills_at_its_rate(clock):
+    bucket = TokenBucket(rate=0.5, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.sleeps == []
+
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(2.0)]
+
+    # Idle time refills up to the capacity, not beyond
+    clock.now += 60
+    clock.sleeps.clear()
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == [pytest.approx(2.0)]
+
+
+def test_token_bucket_pause_blocks_until_it_ends(clock):
+    bucket = TokenBucket(rate=1.0, capacity=5)
+    start = clock.now
+    bucket.pause(30)
+    bucket.pause(10)  # A shorter pause never cuts a longer one short
+    bucket.acquire()
+    assert clock.now == pytest.approx(start + 30)
+
+
+def test_hosts_have_separate_buckets(clock):
+    limiter = HostRateLimiter(rate=1 / 3, capacity=1)
+    assert limiter.bucket(f"{BASE}/a") is limiter.bucket(f"{BASE}/b")
+    assert limiter.bucket(f"{BASE}/a") is not limiter.bucket('https://other.test/a')
+    limiter.acquire(f"{BASE}/a")
+    limiter.acquire('https://other.test/a')
+    assert clock.sleeps == []
+    limiter.acquire(f"{BASE}/b")
+    assert clock.sleeps == [pytest.approx(3.0)]
+
+
+def test_fetch_pauses_the_host_after_429(clock):
+    url, other = f"{BASE}/squad/1", f"{BASE}/squad/2"
+    sched, session = _scheduler(clock, {
+        url: [Response(429, headers={'Retry-After': '40'}), Response(200, 'ok')],
+        other: [Response(200, 'other')],
+    }, rate=1.0)
+
+    first = clock.now
+    assert sched.fetch(url) == 'ok'
+    (_, t429), (_, retried) = session.calls
+    assert t429 == first and retried >= first + 40
+    # The pause was the host bucket's, so it held back every page on the host
+    assert sched.limiter.bucket(other)._blocked_until == pytest.approx(first + 40)
+    sched.fetch(other)
+    assert session.calls[-1][1] >= first + 40
+
+
+def test_fetch_retries_5xx_with_exponential_backoff(clock):
+    url = f"{BASE}/squad/1"
+    sched, session = _scheduler(clock, {
+        url: [Response(503), Response(502), requests.ConnectionError('reset'), Response(200, 'ok')],
+    }, rate=1000.0, backoff=2.0)
+
+    assert sched.fetch(url) == 'ok'
+    assert len(session.calls) == 4
+    assert [s for s in clock.sleeps if s >= 1] == [2.0, 4.0, 8.0]
+
+
+def test_fetch_gives_up_after_max_retries(clock):
+    url = f"{BASE}/squad/1"
+    sched, session = _scheduler(clock, {url: [Response(500)]}, rate=1000.0, max_retries=2)
+    with pytest.raises(requests.HTTPError):
+        sched.fetch(url)
+    assert len(session.calls) == 3
+
+    # 404s are not retried
+    sched, session = _scheduler(clock, {url: [Response(404)]}, rate=1000.0)
+    with pytest.raises(requests.HTTPError):
+        sched.fetch(url)
+    assert len(session.calls) == 1
+
+
+def _league_script():
+    teams = [{'name': f"Team {i}", 'url': f"/squads/{i}", 'league': 'EPL'} for i in range(3)]
+    return {
+        f"{BASE}/comps/9": [Response(200, json.dumps(teams))],
+        **{f"{BASE}/squads/{i}": [Response(200, json.dumps([{'name': f"Player {i}"}]))] for i in range(3)},
+    }
+
+
+def test_resume_skips_checkpointed_pages(clock, tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    script = _league_script()
+    script[f"{BASE}/squads/2"] = [Response(500)]
+    sched, session = _scheduler(clock, script, rate=1000.0, max_retries=1, checkpoint_path=path)
+
+    first = sched.run(['/comps/9'])
+    assert sorted(first['name']) == ['Player 0', 'Player 1']
+    assert [e['url'] for e in sched.errors] == ['/squads/2']
+
+    # A second run with the same checkpoint only fetches what failed
+    sched, session = _scheduler(clock, _league_script(), rate=1000.0, checkpoint_path=path)
+    second = sched.run(['/comps/9'])
+    assert session.urls() == [f"{BASE}/squads/2"]
+    assert sched.errors == []
+    assert sorted(second['name']) == ['Player 0', 'Player 1', 'Player 2']
+    assert set(second['team']) == {'Team 0', 'Team 1', 'Team 2'}
+    # Tagging players with their team doesn't leak into the checkpoint
+    assert ScrapeCheckpoint(path).players['/squads/0'] == [{'name': 'Player 0'}]
+
+
+def test_checkpoint_ignores_a_torn_last_line(tmp_path):
+    path = tmp_path / 'checkpoint.jsonl'
+    checkpoint = ScrapeCheckpoint(str(path))
+    checkpoint.save_players('/squads/0', [{'name': 'Player 0'}])
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"team_url": "/squads/1", "play')
+
+    resumed = ScrapeCheckpoint(str(path))
+    assert resumed.players == {'/squads/0': [{'name': 'Player 0'}]}
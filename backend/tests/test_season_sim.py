@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from models.db import db, Team, Match
+from models.season_sim import SeasonInputs, simulate_season
+
+LEAGUE = 'Premier-League-Stats'
+
+
+def _league(n_teams=4):
+    teams = [Team(fbref_id=f"t{i}", name=f"Team {i}", league=LEAGUE) for i in range(n_teams)]
+    db.session.add_all(teams)
+    db.session.flush()
+    start = datetime.utcnow() - timedelta(days=30)
+    for k, (home, away) in enumerate((h, a) for h in teams for a in teams if h is not a):
+        played = k % 2 == 0
+        db.session.add(Match(date=start + timedelta(days=5 * k), season='2025-2026',
+                             home_team_id=home.id, away_team_id=away.id,
+                             home_score=1 if played else None, away_score=0 if played else None))
+    db.session.commit()
+    return teams
+
+
+def _inputs():
+    return SeasonInputs([1, 2, 3], ['A', 'B', 'C'], [6, 3, 0], [5, 3, 1], [1, 3, 5], [3, 3, 3],
+                        [0, 1, 2], [1, 2, 0], probs=np.array([[0.5, 0.3, 0.2]] * 3),
+                        rates=np.array([[1.4, 1.1]] * 3))
+
+
+def test_results_depend_on_the_seed_not_the_workers():
+    one = simulate_season(_inputs(), n_sims=25000, seed=7, n_jobs=1)
+    two = simulate_season(_inputs(), n_sims=25000, seed=7, n_jobs=2)
+    assert one == two
+    assert sum(row['title'] for row in one['table']) == 1.0
+
+
+def test_route_runs_small_simulations_inline(client):
+    _league()
+    response = client.get(f"/api/simulate-season?league={LEAGUE}&sims=2000&seed=1")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['sims'] == 2000 and len(body['table']) == 4
+
+
+def test_route_queues_large_simulations(client):
+    from models.jobs import get_job
+
+    _league()
+    response = client.get(f"/api/simulate-season?league={LEAGUE}&sims=500000")
+    assert response.status_code == 202
+    job = get_job(response.get_json()['job_id'])
+    assert job['kind'] == 'simulate' and job['params']['sims'] == 500000
+
+
+def test_route_rejects_bad_parameters(client):
+    assert client.get(f"/api/simulate-season?league={LEAGUE}&sims=0").status_code == 400
+    assert client.get(f"/api/simulate-season?league={LEAGUE}&sims=5000000").status_code == 400
+    assert client.get(f"/api/simulate-season?league={LEAGUE}&mode=nope").status_code == 400
+
+
+def test_unseeded_simulations_report_a_reusable_seed(client):
+    _league()
+    response = client.get(f"/api/simulate-season?league={LEAGUE}&sims=500")
+    assert response.status_code == 200
+    seed = response.get_json()['seed']
+    # Exact in a JavaScript number, so a client can replay the run
+    assert isinstance(seed, int) and 0 <= seed < 2 ** 53
+
+    again = client.get(f"/api/simulate-season?league={LEAGUE}&sims=500&seed={seed}").get_json()
+    assert again['table'] == response.get_json()['table']
+
+
+def test_seeds_beyond_64_bits_are_encoded(client):
+    _league()
+    seed = 2 ** 100 + 7
+    response = client.get(f"/api/simulate-season?league={LEAGUE}&sims=500&seed={seed}")
+    assert response.status_code == 200
+    assert f'"seed":{seed}'.encode() in response.data
+
+
+def test_unseeded_simulate_job_result_can_be_polled(client):
+    from models.jobs import claim_next, run_job
+
+    _league()
+    job_id = client.post('/api/jobs', json={'kind': 'simulate',
+                                            'params': {'league': LEAGUE, 'sims': 500}}).get_json()['job_id']
+    run_job(*claim_next('test:1'))
+    response = client.get(f"/api/jobs/{job_id}")
+    assert response.status_code == 200
+    job = response.get_json()
+    assert job['status'] == 'succeeded' and isinstance(job['result']['seed'], int)
+
+
+def test_load_season_only_loads_what_the_mode_needs(app, monkeypatch):
+    from models import season_sim
+    from models.team_features import get_fixture_features
+
+    teams = _league()
+    both = season_sim.load_season(LEAGUE)
+    assert both.probs.shape == both.rates.shape[:1] + (3,) and len(both.home_idx) == 6
+    # Bulk lookups give what the single-fixture path does
+    date, home_id, away_id = db.session.execute(
+        db.select(Match.date, Match.home_team_id, Match.away_team_id)
+        .where(Match.home_score.is_(None)).order_by(Match.date, Match.id)).first()
+    home_team, away_team, context = get_fixture_features(home_id, away_id, as_of=date)
+    single = season_sim.predictor.predict(home_team, away_team, context)
+    np.testing.assert_allclose(both.probs[0], np.array([single['home_win'], single['draw'], single['away_win']])
+                               / (single['home_win'] + single['draw'] + single['away_win']))
+
+    def no_predictions(*args, **kwargs):
+        raise AssertionError("xg mode shouldn't run the model")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(season_sim.predictor, 'predict_many', no_predictions)
+        xg = season_sim.load_season(LEAGUE, mode='xg')
+    assert xg.probs is None
+    np.testing.assert_array_equal(xg.rates, both.rates)
+    assert simulate_season(xg, n_sims=500, seed=1, mode='xg', n_jobs=1)['sims'] == 500
+
+    model = season_sim.load_season(LEAGUE, mode='model')
+    assert model.rates is None
+    np.testing.assert_array_equal(model.probs, both.probs)
+    assert model.team_ids == sorted(t.id for t in teams)
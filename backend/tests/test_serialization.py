@@ -0,0 +1,35 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from services.serialization import encode, stream_rows
+
+
+@pytest.mark.parametrize('value', [2 ** 64, -(2 ** 70), 2 ** 127 + 1])
+def test_encode_handles_integers_beyond_64_bits(value):
+    body = {'seed': value, 'probs': np.array([0.5, 0.25]), 'n': np.int64(3)}
+    assert json.loads(encode(body)) == {'seed': value, 'probs': [0.5, 0.25], 'n': 3}
+
+
+def test_encode_still_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        encode({'x': object()})
+
+
+def test_provider_falls_back_for_big_integers(app):
+    with app.test_request_context():
+        assert json.loads(app.json.dumps({'seed': 2 ** 100, 'at': datetime(2025, 1, 1)})) == {
+            'seed': 2 ** 100, 'at': 'Wed, 01 Jan 2025 00:00:00 GMT'}
+
+
+@pytest.mark.parametrize('fmt', ['ndjson', 'json'])
+def test_stream_rows_round_trips(fmt):
+    rows = [(i, f"player {i}") for i in range(1234)]
+    body = b''.join(stream_rows(iter(rows), ['id', 'name'], fmt))
+    if fmt == 'ndjson':
+        decoded = [json.loads(line) for line in body.splitlines()]
+    else:
+        decoded = json.loads(body)
+    assert decoded == [{'id': i, 'name': name} for i, name in rows]
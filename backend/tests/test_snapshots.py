@@ -0,0 +1,106 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from models import snapshots
+
+pytestmark = pytest.mark.skipif(not snapshots.available(), reason="needs pyarrow")
+
+
+def _frame(league, n, start=0):
+    return pd.DataFrame({'id': range(start, start + n), 'league': league, 'xG': [0.5] * n})
+
+
+def _versions(root):
+    return sorted(e for e in os.listdir(root) if snapshots._VERSION.match(e))
+
+
+def test_full_export_swaps_versions(app, tmp_path):
+    from models.db import db, Team
+
+    db.session.add_all([Team(fbref_id=f"t{i}", name=f"Team {i}", league='Premier-League-Stats') for i in range(3)])
+    db.session.commit()
+    first = snapshots.export_table('teams', str(tmp_path))
+    assert first['rows'] == 3
+
+    db.session.add(Team(fbref_id='t9', name='Team 9', league='La-Liga-Stats'))
+    db.session.commit()
+    second = snapshots.export_table('teams', str(tmp_path))
+    assert second['version'] != first['version']
+    assert snapshots.manifest('teams', str(tmp_path))['version'] == second['version']
+    assert snapshots.load('teams', directory=str(tmp_path)).num_rows == 4
+    assert snapshots.load('teams', filters={'league': 'La-Liga-Stats'}, directory=str(tmp_path)).num_rows == 1
+
+
+def test_partial_write_keeps_other_partitions(tmp_path):
+    snapshots.write_frame('scrape', _frame('A', 3), ['league'], str(tmp_path))
+    snapshots.write_frame('scrape', _frame('B', 2), ['league'], str(tmp_path))
+    snapshots.write_frame('scrape', _frame('A', 1, start=10), ['league'], str(tmp_path))
+
+    frame = snapshots.load_frame('scrape', directory=str(tmp_path))
+    assert sorted(zip(frame['league'], frame['id'])) == [('A', 10), ('B', 0), ('B', 1)]
+
+
+def test_old_versions_are_pruned_but_the_previous_one_kept(tmp_path):
+    root = tmp_path / 'scrape'
+    for i in range(4):
+        snapshots.write_frame('scrape', _frame('A', 1, start=i), ['league'], str(tmp_path))
+    versions = _versions(root)
+    assert len(versions) == 2
+    assert (root / snapshots.ACTIVE_FILE).read_text() == versions[-1]
+    assert not [e for e in os.listdir(root) if e.startswith('.')]
+
+
+def test_a_snapshot_is_always_readable_during_swaps(tmp_path):
+    snapshots.write_frame('scrape', _frame('A', 50), ['league'], str(tmp_path))
+    failures, done = [], threading.Event()
+
+    def read():
+        while not done.is_set():
+            try:
+                assert snapshots.load('scrape', directory=str(tmp_path)).num_rows == 50
+            except Exception as e:  # a missing or half-written snapshot
+                failures.append(e)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for i in range(20):
+            snapshots.write_frame('scrape', _frame('A', 50, start=i), ['league'], str(tmp_path))
+    finally:
+        done.set()
+        reader.join()
+    assert failures == []
+
+
+def test_failed_write_leaves_the_active_version(tmp_path):
+    snapshots.write_frame('scrape', _frame('A', 2), ['league'], str(tmp_path))
+    active = snapshots.manifest('scrape', str(tmp_path))['version']
+    with pytest.raises(Exception):
+        snapshots.write_frame('scrape', _frame('A', 2).assign(league=None).drop(columns='id'), ['missing'],
+                              str(tmp_path))
+    assert snapshots.manifest('scrape', str(tmp_path))['version'] == active
+    assert not [e for e in os.listdir(tmp_path / 'scrape') if e.startswith('.tmp-')]
+
+
+def test_unversioned_snapshots_still_load_and_are_migrated(tmp_path):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    root = tmp_path / 'scrape'
+    table = pa.Table.from_pandas(_frame('A', 2), preserve_index=False)
+    partitioning = ds.partitioning(pa.schema([('league', pa.string())]), flavor='hive')
+    ds.write_dataset(table, str(root), format='parquet', partitioning=partitioning)
+    snapshots._write_manifest(str(root), 'scrape', table.schema, ['league'], None)
+    assert snapshots.load('scrape', directory=str(tmp_path)).num_rows == 2
+
+    snapshots.write_frame('scrape', _frame('B', 1, start=5), ['league'], str(tmp_path))
+    assert snapshots.load('scrape', directory=str(tmp_path)).num_rows == 3
+    assert sorted(os.listdir(root)) == [snapshots.ACTIVE_FILE] + _versions(root)
+
+
+def test_missing_snapshot(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        snapshots.load('nothing', directory=str(tmp_path))
@@ -0,0 +1,145 @@
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from models.db import db, Player
+from models.squad_optimizer import METRICS, SquadOptimizer
+
+SLOTS = ['GK', 'CB', 'CB', 'ST', 'ST']
+
+
+def _row(player_id, position, overall, team='A', minutes=1800, **metrics):
+    return (player_id, f"P{player_id}", team, position, 25, minutes, overall,
+            *[metrics.get(m, 0) for m in METRICS])
+
+
+def _pool():
+    rng = np.random.default_rng(7)
+    rows = []
+    positions = ['GK'] * 2 + ['DF'] * 4 + ['FW'] * 4 + ['MF,FW']
+    for i, position in enumerate(positions, start=1):
+        rows.append(_row(i, position, int(rng.integers(60, 90)), team='ABC'[i % 3],
+                         goals=int(rng.integers(0, 20)), xG=float(rng.uniform(0, 15)),
+                         tackles=int(rng.integers(0, 80)), interceptions=int(rng.integers(0, 60))))
+    return rows
+
+
+def _total(optimizer, lineup):
+    return sum(optimizer.suitability[i, optimizer.roles.index(slot)] for slot, i in lineup)
+
+
+def _brute_force(optimizer, slots, allowed=lambda rows: True):
+    """Best total suitability over every assignment of players to slots"""
+    best = None
+    cols = [optimizer.roles.index(s) for s in slots]
+    for rows in permutations(range(len(optimizer.ids)), len(slots)):
+        scores = optimizer.suitability[list(rows), cols]
+        if np.isfinite(scores).all() and allowed(rows):
+            total = scores.sum()
+            best = total if best is None else max(best, total)
+    return best
+
+
+def _assert_valid(optimizer, slots, lineup):
+    assert [slot for slot, _ in lineup] == slots
+    rows = [i for _, i in lineup]
+    assert len(set(rows)) == len(rows)
+    for slot, i in lineup:
+        assert optimizer.eligible[i, optimizer.roles.index(slot)]
+
+
+def test_assignment_path_is_optimal():
+    optimizer = SquadOptimizer(_pool())
+    lineup = optimizer.best_xi(SLOTS)
+
+    _assert_valid(optimizer, SLOTS, lineup)
+    assert _total(optimizer, lineup) == pytest.approx(_brute_force(optimizer, SLOTS))
+
+
+def test_milp_respects_budget():
+    optimizer = SquadOptimizer(_pool())
+    prices = {int(i): float(overall) - 55 for i, overall in zip(optimizer.ids, optimizer.overall)}
+    cost = np.array([prices[int(i)] for i in optimizer.ids])
+    unconstrained = optimizer.best_xi(SLOTS)
+    budget = cost[[i for _, i in unconstrained]].sum() - 25
+
+    lineup = optimizer.best_xi(SLOTS, budget=budget, prices=prices)
+
+    _assert_valid(optimizer, SLOTS, lineup)
+    assert cost[[i for _, i in lineup]].sum() <= budget + 1e-9
+    assert _total(optimizer, lineup) == pytest.approx(
+        _brute_force(optimizer, SLOTS, lambda rows: cost[list(rows)].sum() <= budget))
+
+
+def test_milp_respects_club_limit():
+    optimizer = SquadOptimizer(_pool())
+    lineup = optimizer.best_xi(SLOTS, max_per_club=2)
+
+    _assert_valid(optimizer, SLOTS, lineup)
+    clubs = [optimizer.teams[i] for _, i in lineup]
+    assert max(clubs.count(c) for c in set(clubs)) <= 2
+    assert _total(optimizer, lineup) == pytest.approx(_brute_force(
+        optimizer, SLOTS, lambda rows: max(np.unique(optimizer.teams[list(rows)], return_counts=True)[1]) <= 2))
+
+
+def test_players_without_a_price_are_skipped_under_a_budget():
+    optimizer = SquadOptimizer(_pool())
+    prices = {int(i): 1.0 for i in optimizer.ids if int(i) != 1}
+    lineup = optimizer.best_xi(['GK'], budget=10, prices=prices)
+    assert optimizer.ids[lineup[0][1]] != 1
+
+
+def test_infeasible_constraints_return_none():
+    optimizer = SquadOptimizer(_pool())
+    # Only two goalkeepers
+    assert optimizer.best_xi(['GK'] * 3) is None
+    assert optimizer.best_xi(['GK'] * 3, max_per_club=3) is None
+    prices = {int(i): 10.0 for i in optimizer.ids}
+    assert optimizer.best_xi(SLOTS, budget=49, prices=prices) is None
+    # Three clubs, at most one player each, five slots
+    assert optimizer.best_xi(SLOTS, max_per_club=1) is None
+    with pytest.raises(ValueError):
+        optimizer.best_xi(['GK', 'LIBERO'])
+
+
+def _store(rows):
+    for row in rows:
+        player_id, name, team, position, age, minutes, overall, *metrics = row
+        db.session.add(Player(id=player_id, fbref_id=f"p-{player_id}", name=name, team=team, position=position,
+                              age=age, minutes=minutes, overall=overall, **dict(zip(METRICS, metrics))))
+    db.session.commit()
+
+
+def test_analyze_squad_route(client):
+    _store(_pool())
+    response = client.post('/api/analyze-squad', json={'positions': ['gk', 'cb', 'cb', 'st', 'st'],
+                                                       'max_per_club': '2'})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [p['slot'] for p in body['lineup']] == SLOTS
+    clubs = [p['team'] for p in body['lineup']]
+    assert max(clubs.count(c) for c in set(clubs)) <= 2
+
+    prices = {str(i): 10 for i in range(1, 12)}
+    response = client.post('/api/analyze-squad', json={'positions': SLOTS, 'budget': 49, 'prices': prices})
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize('payload', [
+    {'positions': 'GKCBCB'},
+    {'positions': ['GK', 'LIBERO']},
+    {'positions': ['GK', 7]},
+    {'positions': []},
+    {'formation': '2-3-5'},
+    {'max_per_club': 'two'},
+    {'max_per_club': 1.5},
+    {'max_per_club': 0},
+    {'max_per_club': True},
+    {'max_age': 'old'},
+    {'min_minutes': [90]},
+])
+def test_analyze_squad_rejects_invalid_requests(client, payload):
+    response = client.post('/api/analyze-squad', json=payload)
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
@@ -0,0 +1,135 @@
+import pandas as pd
+import pytest
+
+from benchmarks.fixtures import make_squad_page
+from scraper.fbref_scraper import FBrefScraper
+from scraper.table_extractor import extract_squad_players, find_stat_tables
+
+STANDARD = '''
+<table class="stats_table" id="stats_standard_9">
+  <thead><tr><th data-stat="player">Player</th><th data-stat="position">Pos</th></tr></thead>
+  <tbody>
+    <tr>
+      <th data-stat="player" data-append-csv="aa11"><a href="/en/players/aa11/">Martin &Oslash;degaard</a></th>
+      <td data-stat="nationality"><a href="/en/country/NOR/"><span>NOR</span></a></td>
+      <td data-stat="position">MF</td><td data-stat="age">26-123</td><td data-stat="games">30</td>
+      <td data-stat="games_starts">29</td><td data-stat="minutes">2,512</td><td data-stat="goals">8</td>
+      <td data-stat="assists">10</td><td data-stat="cards_yellow">3</td><td data-stat="cards_red"></td>
+      <td data-stat="progressive_carries">71</td><td data-stat="progressive_passes">240</td>
+    </tr>
+    <tr class="thead"><th data-stat="player">Player</th><th data-stat="position">Pos</th></tr>
+    <tr>
+      <th data-stat="player" data-append-csv="bb22"><a href="/en/players/bb22/">Ben White &amp; Co</a></th>
+      <td data-stat="position">DF,MF</td><td data-stat="age">27</td><td data-stat="games">5</td>
+      <td data-stat="games_starts"></td><td data-stat="minutes">301</td><td data-stat="goals">0</td>
+      <td data-stat="assists">1</td><td data-stat="cards_yellow">1</td><td data-stat="cards_red">1</td>
+      <td data-stat="progressive_carries">n/a</td><td data-stat="progressive_passes">12</td>
+    </tr>
+    <tr>
+      <th data-stat="player" data-append-csv="cc33"><a href="/en/players/cc33/"><strong>Kai</strong> Havertz</a></th>
+      <td data-stat="position">FW</td><td data-stat="age">25-001</td><td data-stat="minutes">1,800</td>
+    </tr>
+    <tr><th data-stat="player">Squad Total</th><td data-stat="minutes">4,613</td></tr>
+  </tbody>
+</table>
+'''
+
+# Shooting and passing are commented out, as FBref ships them; rows come in
+# another order and Ben White is missing from the shooting table
+COMMENTED = '''
+<div class="placeholder"></div>
+<!--
+<table class="stats_table" id="stats_shooting_9">
+  <tbody>
+    <tr><th data-stat="player" data-append-csv="cc33">Kai Havertz</th><td data-stat="xg">9.4</td></tr>
+    <tr><th data-stat="player" data-append-csv="aa11">Martin Odegaard</th><td data-stat="xg">5.1</td></tr>
+  </tbody>
+</table>
+-->
+<div class="placeholder"></div>
+<!--
+<table class="stats_table" id="stats_passing_9">
+  <tbody>
+    <tr><th data-stat="player" data-append-csv="bb22">Ben White</th><td data-stat="pass_xa">0.7</td></tr>
+    <tr><th data-stat="player" data-append-csv="cc33">Kai Havertz</th><td data-stat="pass_xa">3.2</td></tr>
+    <tr><th data-stat="player" data-append-csv="aa11">Martin Odegaard</th><td data-stat="pass_xa">8.8</td></tr>
+    <tr><th data-stat="player" data-append-csv="zz99">Not In Squad</th><td data-stat="pass_xa">1.0</td></tr>
+  </tbody>
+</table>
+-->
+<!--
+<table class="stats_table" id="stats_defense_9">
+  <tbody>
+    <tr><th data-stat="player" data-append-csv="aa11">Martin Odegaard</th>
+        <td data-stat="tackles">40</td><td data-stat="interceptions">12</td></tr>
+  </tbody>
+</table>
+-->
+<!-- A later table of a kind already found is ignored -->
+<!--
+<table id="stats_shooting_combined"><tbody>
+  <tr><th data-stat="player" data-append-csv="aa11">Martin Odegaard</th><td data-stat="xg">99</td></tr>
+</tbody></table>
+-->
+<!--
+<table id="stats_keeper_9"><tbody>
+  <tr><th data-stat="player" data-append-csv="aa11">Martin Odegaard</th><td data-stat="xg">77</td></tr>
+</tbody></table>
+-->
+'''
+
+PAGE = f'<html><head><script>var x = "<table>";</script></head><body>{STANDARD}{COMMENTED}</body></html>'
+
+
+def _parse(mode, html):
+    scraper = FBrefScraper.__new__(FBrefScraper)  # no session or user agent needed to parse
+    scraper.parse_mode = mode
+    return pd.DataFrame(scraper._parse_players(html))
+
+
+def test_fast_and_soup_give_identical_frames():
+    fast, soup = _parse('fast', PAGE), _parse('soup', PAGE)
+    pd.testing.assert_frame_equal(fast, soup)
+
+
+def test_parsed_values():
+    players = {p['fbref_id']: p for p in extract_squad_players(PAGE)}
+
+    assert list(players) == ['aa11', 'bb22', 'cc33']
+    odegaard = players['aa11']
+    assert odegaard['name'] == 'Martin Ødegaard'
+    assert (odegaard['position'], odegaard['age'], odegaard['minutes']) == ('MF', 26, 2512)
+    assert (odegaard['cards_red'], odegaard['progressive_passes']) == (0, 240)
+    # From the commented-out tables, joined on the player id
+    assert (odegaard['xg'], odegaard['xa'], odegaard['tackles'], odegaard['interceptions']) == (5.1, 8.8, 40, 12)
+
+    white = players['bb22']
+    assert white['name'] == 'Ben White & Co'
+    assert (white['position'], white['starts'], white['progressive_carries'], white['xa']) == ('DF,MF', 0, 0, 0.7)
+    assert 'xg' not in white
+
+    havertz = players['cc33']
+    assert havertz['name'] == 'Kai Havertz'
+    assert (havertz['age'], havertz['minutes'], havertz['goals'], havertz['xg']) == (25, 1800, 0, 9.4)
+
+
+def test_first_table_of_each_kind_wins():
+    tables = find_stat_tables(PAGE)
+    assert sorted(tables) == ['defense', 'passing', 'shooting', 'standard']
+    assert 'stats_shooting_9' in tables['shooting']
+
+
+@pytest.mark.parametrize('commented', [True, False])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_modes_agree_on_synthetic_squad_pages(commented, seed):
+    html = make_squad_page(n_players=30, seed=seed, commented=commented)
+    fast, soup = _parse('fast', html), _parse('soup', html)
+
+    assert len(fast) == 30
+    assert fast['xg'].notna().all() and fast['xa'].notna().all()
+    pd.testing.assert_frame_equal(fast, soup)
+
+
+def test_page_without_a_standard_table():
+    html = f'<html><body>{COMMENTED}</body></html>'
+    assert _parse('fast', html).empty and _parse('soup', html).empty
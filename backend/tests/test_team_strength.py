@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from models.db import db, Match, Team, TeamRating
+from models.team_strength import INITIAL_RATING, K_FACTOR, expected_home, margin_multiplier, team_strength
+
+
+@pytest.fixture
+def teams(app):
+    rows = [Team(fbref_id=f"t{i}", name=f"Team {i}", league='Premier-League-Stats') for i in range(4)]
+    db.session.add_all(rows)
+    db.session.commit()
+    return [t.id for t in rows]
+
+
+def _match(home, away, score, day):
+    match = Match(date=datetime(2025, 8, 1) + timedelta(days=day), season='2025-2026',
+                  home_team_id=home, away_team_id=away, home_score=score[0], away_score=score[1])
+    db.session.add(match)
+    db.session.commit()
+    return match
+
+
+def _ratings():
+    rows = db.session.execute(select(TeamRating.team_id, TeamRating.match_id, TeamRating.rating_before,
+                                     TeamRating.rating).order_by(TeamRating.team_id, TeamRating.match_id)).all()
+    return [tuple(round(v, 9) if isinstance(v, float) else v for v in row) for row in rows]
+
+
+def test_margin_and_home_advantage():
+    assert expected_home(INITIAL_RATING, INITIAL_RATING) > 0.5
+    assert [margin_multiplier(d) for d in (0, 1, -2, 3)] == [1.0, 1.0, 1.5, 14 / 8]
+
+
+def test_sync_rates_a_win(teams):
+    _match(teams[0], teams[1], (2, 0), 0)
+    assert team_strength.sync() == 1
+    delta = K_FACTOR * 1.5 * (1 - expected_home(INITIAL_RATING, INITIAL_RATING))
+    assert team_strength.current(teams[0]) == pytest.approx(INITIAL_RATING + delta)
+    assert team_strength.current(teams[1]) == pytest.approx(INITIAL_RATING - delta)
+    assert team_strength.sync() == 0
+
+
+def test_incremental_sync_matches_rebuild(teams):
+    _match(teams[0], teams[1], (1, 0), 0)
+    team_strength.sync()
+    _match(teams[1], teams[2], (2, 2), 7)
+    _match(teams[2], teams[0], (0, 3), 14)
+    assert team_strength.sync() == 2
+    incremental = _ratings()
+    team_strength.rebuild()
+    assert _ratings() == incremental
+
+
+def test_late_result_is_rated_and_later_ratings_replayed(teams):
+    _match(teams[0], teams[1], (1, 0), 0)
+    _match(teams[0], teams[2], (0, 1), 14)
+    team_strength.sync()
+    # A postponed fixture from before the latest rated match is played
+    late = _match(teams[1], teams[0], (4, 0), 7)
+
+    assert team_strength.sync() == 2
+    assert db.session.execute(select(func.count()).where(TeamRating.match_id == late.id)).scalar() == 2
+    synced = _ratings()
+    team_strength.rebuild()
+    assert _ratings() == synced
+
+
+def test_as_of_uses_matches_before_the_date(teams):
+    _match(teams[0], teams[1], (1, 0), 0)
+    team_strength.sync()
+    assert team_strength.as_of(teams[0], datetime(2025, 8, 1)) == INITIAL_RATING
+    assert team_strength.as_of(teams[0], datetime(2025, 8, 2)) == team_strength.current(teams[0])
+
+
+def test_corrected_score_is_re_rated(teams):
+    first = _match(teams[0], teams[1], (1, 0), 0)
+    _match(teams[1], teams[2], (2, 0), 7)
+    team_strength.sync()
+    before = team_strength.current(teams[2])
+
+    first.home_score = 0
+    db.session.commit()
+    assert team_strength.sync() == 2  # the corrected match and the one after it
+    assert team_strength.current(teams[0]) < INITIAL_RATING
+    # teams[1] went into its second match stronger, so teams[2] lost less
+    assert team_strength.current(teams[2]) != before
+    synced = _ratings()
+    team_strength.rebuild()
+    assert _ratings() == synced
+    assert team_strength.sync() == 0
+
+
+def test_removed_result_is_unrated(teams):
+    _match(teams[0], teams[1], (1, 0), 0)
+    later = _match(teams[2], teams[3], (3, 0), 7)
+    team_strength.sync()
+    later.home_score = later.away_score = None
+    db.session.commit()
+
+    assert team_strength.sync() == 0
+    assert team_strength.current(teams[2]) is None
+    assert team_strength.current(teams[0]) > INITIAL_RATING
+
+
+def test_ratings_without_stored_scores_are_replayed_once(teams):
+    _match(teams[0], teams[1], (1, 0), 0)
+    team_strength.sync()
+    db.session.execute(TeamRating.__table__.update().values(goals_for=None, goals_against=None))
+    db.session.commit()
+    assert team_strength.sync() == 1
+    assert team_strength.sync() == 0
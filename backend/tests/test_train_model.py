@@ -0,0 +1,61 @@
+import pytest
+
+import train_model
+from models.predictor import IdentityScaler, PriorModel, predictor
+from models.registry import ModelRegistry
+from tests.test_training import COLUMNS, _history
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """The global predictor on a fresh registry serving a prior model, put back afterwards"""
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    registry.register(PriorModel(), IdentityScaler(), COLUMNS, data_hash='serving', activate=True)
+    for name in ('registry', '_bundle', '_active_stamp'):
+        monkeypatch.setattr(predictor, name, getattr(predictor, name))
+    predictor.registry = registry
+    predictor.load_model()
+    return registry
+
+
+def test_trains_from_a_csv(tmp_path, registry):
+    path = tmp_path / 'matches.csv'
+    _history().to_csv(path, index=False)
+    previous = registry.active_version()
+
+    assert train_model.main(['--data', str(path), '--jobs', '1', '--families', 'logreg', '--splits', '3']) == 0
+    assert registry.active_version() != previous
+    assert predictor.version == registry.active_version()
+    assert registry.meta(predictor.version)['metrics']['family'] == 'logreg'
+
+
+def test_failed_training_exits_nonzero_and_keeps_the_model(tmp_path, registry):
+    path = tmp_path / 'matches.csv'
+    _history().drop(columns=['result']).to_csv(path, index=False)
+    previous = registry.active_version()
+
+    assert train_model.main(['--data', str(path), '--jobs', '1', '--families', 'logreg']) == 1
+    assert registry.active_version() == previous == predictor.version
+
+
+def test_empty_match_history(tmp_path, monkeypatch, registry):
+    import app as app_module
+    from models.db import migrate
+
+    # The module-level app load_history uses, on an empty database
+    empty = app_module.create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'empty.db'}"})
+    with empty.app_context():
+        migrate()
+    monkeypatch.setattr(app_module, '_default_app', empty)
+    assert train_model.main(['--jobs', '1']) == 1
+    assert len(registry.list_versions()) == 1
+
+
+@pytest.mark.parametrize('argv', [
+    ['--families', 'logreg,perceptron'],
+    ['--seasons', '2024-2025'],
+])
+def test_invalid_arguments(argv, registry):
+    with pytest.raises(SystemExit) as exc:
+        train_model.main(argv)
+    assert exc.value.code == 2
@@ -0,0 +1,154 @@
+import multiprocessing
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models import training
+from models.predictor import IdentityScaler, MatchPredictor, PriorModel
+from models.registry import ModelRegistry
+
+COLUMNS = MatchPredictor().feature_columns
+
+
+def _history(n=120, seed=0, seasons=None):
+    """Synthetic training rows where the rating gap drives the result"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(1.0, 0.5, size=(n, len(COLUMNS))), columns=COLUMNS)
+    df['home_team_rating'] = rng.normal(75, 5, n)
+    df['away_team_rating'] = rng.normal(75, 5, n)
+    margin = df['home_team_rating'] - df['away_team_rating'] + rng.normal(0, 3, n)
+    df['result'] = np.where(margin > 1.5, 'home', np.where(margin < -1.5, 'away', 'draw'))
+    df['date'] = pd.date_range('2020-08-01', periods=n, freq='3D')
+    if seasons:
+        df['season'] = np.repeat(seasons, -(-n // len(seasons)))[:n]
+    # Shuffled, so the splits have to put rows in time order themselves
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+class SlowClassifier:
+    """Candidate that never finishes within a test's time budget"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def fit(self, X, y):
+        time.sleep(self.delay)
+        return self
+
+
+class BrokenClassifier:
+    def __init__(self, **params):
+        pass
+
+    def fit(self, X, y):
+        raise RuntimeError("boom")
+
+
+def test_rolling_origin_folds_never_train_on_the_future():
+    df = _history()
+    dates = pd.to_datetime(df['date']).to_numpy()
+    splits = training.rolling_origin_splits(df, n_splits=4)
+
+    assert len(splits) == 4
+    for train, val in splits:
+        assert dates[train].max() < dates[val].min()
+        assert not set(train) & set(val)
+    # Expanding window: each fold trains on everything the previous one saw
+    for (train, val), (next_train, _) in zip(splits, splits[1:]):
+        assert set(train) | set(val) == set(next_train)
+
+
+def test_rolling_origin_folds_by_season():
+    seasons = ['2019-2020', '2020-2021', '2021-2022', '2022-2023', '2023-2024', '2024-2025']
+    df = _history(n=180, seasons=seasons)
+    splits = training.rolling_origin_splits(df, n_splits=4)
+
+    assert [df['season'][val].unique().tolist() for _, val in splits] == [[s] for s in seasons[-4:]]
+    for train, val in splits:
+        assert df['season'][train].max() < df['season'][val].min()
+
+
+def test_too_little_history_has_no_folds():
+    assert training.rolling_origin_splits(_history(n=15), n_splits=4) == []
+    with pytest.raises(ValueError):
+        training.search_models(_history(n=15), COLUMNS, n_jobs=1)
+
+
+def test_search_ranks_candidates_and_fit_final_uses_every_row():
+    df = _history()
+    search = training.search_models(df, COLUMNS, n_jobs=2, families=['logreg'])
+
+    assert search['skipped'] == 0
+    losses = [r['scores']['log_loss'] for r in search['leaderboard']]
+    assert losses == sorted(losses) and len(losses) == len(training.candidate_configs(['logreg']))
+    assert search['best']['family'] == 'logreg'
+
+    model, scaler = training.fit_final(df, COLUMNS, 'logreg', search['best']['params'])
+    assert scaler.n_samples_seen_ == len(df)
+    assert sorted(model.classes_) == ['away', 'draw', 'home']
+
+
+def test_search_stops_at_the_deadline(monkeypatch):
+    monkeypatch.setitem(training.MODEL_FAMILIES, 'slow', (SlowClassifier, {'delay': [60]}))
+    df = _history()
+
+    started = time.monotonic()
+    search = training.search_models(df, COLUMNS, n_jobs=2, time_budget=3, families=['logreg', 'slow'])
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 20
+    assert search['skipped'] == 1
+    assert {r['family'] for r in search['leaderboard']} == {'logreg'}
+    # The pool was terminated rather than left running the slow candidate
+    assert multiprocessing.active_children() == []
+
+
+def test_search_with_nothing_finished_raises(monkeypatch):
+    monkeypatch.setitem(training.MODEL_FAMILIES, 'slow', (SlowClassifier, {'delay': [60]}))
+    with pytest.raises(TimeoutError):
+        training.search_models(_history(), COLUMNS, n_jobs=1, time_budget=1, families=['slow'])
+    assert multiprocessing.active_children() == []
+
+
+def test_failed_candidates_are_skipped(monkeypatch):
+    monkeypatch.setitem(training.MODEL_FAMILIES, 'broken', (BrokenClassifier, {'x': [1]}))
+    search = training.search_models(_history(), COLUMNS, n_jobs=1, families=['broken', 'logreg'])
+    assert search['skipped'] == 1
+    assert {r['family'] for r in search['leaderboard']} == {'logreg'}
+
+
+@pytest.fixture
+def serving(tmp_path):
+    """Predictor serving an active registry version"""
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    version = registry.register(PriorModel(), IdentityScaler(), COLUMNS, data_hash='serving', activate=True)
+    predictor = MatchPredictor(registry)
+    predictor.load_model()
+    assert predictor.version == version
+    return predictor
+
+
+def test_train_registers_and_serves_a_new_version(serving):
+    previous = serving.version
+    version = serving.train(_history(), n_jobs=1, families=['logreg'])
+
+    assert version is not None and version != previous
+    assert serving.version == version and serving.is_trained
+    assert serving.registry.active_version() == version
+    assert serving.registry.meta(version)['metrics']['family'] == 'logreg'
+
+
+@pytest.mark.parametrize('history', [
+    None,
+    _history(n=10),
+    _history().drop(columns=['result']),
+    _history().assign(home_xG='n/a'),
+])
+def test_failed_training_keeps_the_active_model(serving, history):
+    bundle, versions = serving._current_bundle(), serving.registry.list_versions()
+
+    assert serving.train(history, n_jobs=1, families=['logreg']) is None
+    assert serving._current_bundle() is bundle
+    assert serving.registry.list_versions() == versions
@@ -0,0 +1,85 @@
+# backend/train_model.py
+"""
+Retrain MatchPredictor with time-aware model search, e.g. nightly:
+
+    python train_model.py --jobs 8 --budget 1800
+    python train_model.py --data matches.csv
+    python train_model.py --snapshot --seasons 2022-2023,2023-2024
+
+Without --data or --snapshot the training rows are built from the matches
+table by the feature store. --snapshot reads the training_rows Parquet
+snapshot (see models.snapshots) instead, only the needed columns and seasons.
+"""
+import argparse
+
+import pandas as pd
+
+from models.predictor import predictor
+from models.training import MODEL_FAMILIES
+
+
+def load_training_data(path):
+    """Training rows from a CSV or Parquet file"""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def load_snapshot(seasons=None):
+    """Training rows from the Parquet snapshot, optionally only some seasons"""
+    from models import snapshots
+
+    columns = predictor.feature_columns + ['result', 'date', 'season']
+    return snapshots.load_frame('training_rows', columns=columns,
+                                filters={'season': seasons} if seasons else None)
+
+
+def load_history():
+    """Point-in-time training rows for every completed match in the DB"""
+    from app import app
+    from models.feature_store import feature_store
+
+    with app.app_context():
+        return feature_store.training_rows(predictor.feature_columns)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Retrain MatchPredictor with time-aware model search")
+    parser.add_argument('--data', default=None,
+                        help='CSV/Parquet with the feature columns, result and date or season '
+                             '(default: build from the matches table)')
+    parser.add_argument('--snapshot', action='store_true',
+                        help='load the training rows from the Parquet snapshot')
+    parser.add_argument('--seasons', default=None,
+                        help='comma separated seasons to train on (with --snapshot)')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--budget', type=float, default=None, help='search time budget in seconds')
+    parser.add_argument('--splits', type=int, default=4, help='rolling-origin folds')
+    parser.add_argument('--families', default=None,
+                        help=f"comma separated subset of {','.join(MODEL_FAMILIES)}")
+    args = parser.parse_args(argv)
+
+    families = args.families.split(',') if args.families else None
+    unknown = [f for f in families or [] if f not in MODEL_FAMILIES]
+    if unknown:
+        parser.error(f"unknown model families: {', '.join(unknown)}")
+
+    if args.seasons and not args.snapshot:
+        parser.error("--seasons needs --snapshot")
+
+    if args.data:
+        df = load_training_data(args.data)
+    elif args.snapshot:
+        df = load_snapshot(args.seasons.split(',') if args.seasons else None)
+    else:
+        df = load_history()
+    if df.empty:
+        print("No completed matches to train on")
+        return 1
+    version = predictor.train(df, n_jobs=args.jobs, time_budget=args.budget,
+                              n_splits=args.splits, families=families)
+    return 0 if version else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
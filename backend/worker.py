@@ -0,0 +1,40 @@
+# backend/worker.py
+"""
+Run background job workers (scraping, ingestion, training, simulations):
+
+    python worker.py --processes 2
+
+Jobs are submitted through the /api/jobs endpoints and queued in the
+database, so workers can be started and stopped independently of the web
+server.
+"""
+import argparse
+import signal
+import sys
+
+from app import create_app
+from models.jobs import JobWorkerPool
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument('--processes', type=int, default=2, help='worker processes')
+    parser.add_argument('--poll', type=float, default=1.0, help='seconds between queue checks when idle')
+    args = parser.parse_args(argv)
+
+    pool = JobWorkerPool(create_app, processes=args.processes, poll_interval=args.poll)
+    pool.start()
+    print(f"Started {args.processes} job workers")
+    # Stop the workers on SIGTERM too (e.g. from the gunicorn master); set after
+    # they started so they keep the default handler
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        pool.join()
+    except (KeyboardInterrupt, SystemExit):
+        print("Stopping job workers")
+        pool.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
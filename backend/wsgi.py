@@ -0,0 +1,28 @@
+# backend/wsgi.py
+"""
+Production entry point
+
+    gunicorn -c gunicorn.conf.py wsgi:app      # Linux/macOS, multi-process
+    python wsgi.py                             # waitress, e.g. on Windows
+
+With gunicorn's preload_app the master imports this module once: the ML
+stack, model and player index are loaded before the workers fork and are
+shared copy-on-write. Set PRELOAD=0 to skip that and load lazily per worker.
+"""
+import os
+
+from app import create_app, start_background, start_job_workers, warm_up
+
+app = create_app()
+
+if os.getenv("PRELOAD", "1") != "0":
+    warm_up(app)
+
+if __name__ == "__main__":
+    from waitress import serve
+
+    # waitress is one process with a thread pool, so background work and job workers start here
+    start_background(app)
+    start_job_workers()
+    serve(app, host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", 8000)),
+          threads=int(os.getenv("WAITRESS_THREADS", 8)))
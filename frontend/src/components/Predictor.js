@@ -19,13 +19,33 @@ const Predictor = () => {
 
   const fetchFBrefData = () => {
     setIsLoading(true);
+    // The scrape runs as a background job; poll it until it finishes
     axios.post('http://localhost:5000/api/fetch-fbref')
-      .then(() => {
-        alert('FBref data loaded successfully!');
-        window.location.reload();
+      .then(res => {
+        const poll = () => axios.get(`http://localhost:5000/api/jobs/${res.data.job_id}`)
+          .then(({ data: job }) => {
+            if (job.status === 'queued' || job.status === 'running') {
+              setTimeout(poll, 2000);
+              return;
+            }
+            setIsLoading(false);
+            if (job.status === 'succeeded') {
+              alert('FBref data loaded successfully!');
+              window.location.reload();
+            } else {
+              alert(`FBref load ${job.status}: ${job.error || ''}`);
+            }
+          })
+          .catch(err => {
+            console.error(err);
+            setIsLoading(false);
+          });
+        poll();
       })
-      .catch(err => console.error(err))
-      .finally(() => setIsLoading(false));
+      .catch(err => {
+        console.error(err);
+        setIsLoading(false);
+      });
   };
 
   const predictMatch = () => {
@@ -5,9 +5,23 @@ const Scout = () => {
   const [players, setPlayers] = useState([]);
   const [squad, setSquad] = useState([]);
 
+  // /api/players returns one page at a time; follow X-Next-Cursor until
+  // the last page, showing each page as it arrives
   useEffect(() => {
-    axios.get('http://localhost:5000/api/players')
-      .then(res => setPlayers(res.data));
+    let cancelled = false;
+    const loadPage = cursor => {
+      const params = { fields: 'id,name,position', limit: 1000 };
+      if (cursor) params.cursor = cursor;
+      return axios.get('http://localhost:5000/api/players', { params })
+        .then(res => {
+          if (cancelled) return;
+          setPlayers(loaded => (cursor ? loaded.concat(res.data) : res.data));
+          const next = res.headers['x-next-cursor'];
+          if (next) return loadPage(next);
+        });
+    };
+    loadPage(null).catch(console.error);
+    return () => { cancelled = true; };
   }, []);
 
   return (
@@ -13,6 +13,8 @@ export default function TeamPicker() {
       .catch(console.error);
   }, []);
 
+  // Options carry DB team ids (team_id), which /api/predict expects;
+  // teams the football-data sync hasn't stored yet can't be picked
   const predict = async () => {
     const r = await fetch("/api/predict", {
       method: "POST",
@@ -39,12 +41,12 @@ export default function TeamPicker() {
       <div style={{ display: "flex", gap: 12, alignItems: "center" }}>
         <select value={home} onChange={e => setHome(e.target.value)}>
           <option value="">Home team…</option>
-          {teams.map(t => <option key={t.id} value={t.id}>{t.name}</option>)}
+          {teams.map(t => <option key={t.id} value={t.team_id ?? ""} disabled={t.team_id == null}>{t.name}</option>)}
         </select>
         <span>vs</span>
         <select value={away} onChange={e => setAway(e.target.value)}>
           <option value="">Away team…</option>
-          {teams.map(t => <option key={t.id} value={t.id}>{t.name}</option>)}
+          {teams.map(t => <option key={t.id} value={t.team_id ?? ""} disabled={t.team_id == null}>{t.name}</option>)}
         </select>
         <button disabled={!home || !away} onClick={predict}>Predict</button>
       </div>